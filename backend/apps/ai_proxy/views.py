@@ -9,6 +9,7 @@ import logging
 from typing import Any, Dict, List, Optional
 
 import requests
+from django.conf import settings
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -18,8 +19,11 @@ from apps.models.serializers import ModelProviderListSerializer
 from core.ai_client.base import AIResponse
 from core.ai_client.factory import create_ai_client
 from core.ai_client.image_service import ImageGenerationService
+from core.ai_client.rate_limit import RateLimitExceeded, rate_limit_policy
 from core.ai_client.schemas import ImageEditRequest, Text2ImageRequest
 from core.utils.file_storage import image_storage, video_storage
+from core.redis.rate_limiter import get_rate_limiter
+from core.utils.http_transport import http_post
 
 logger = logging.getLogger(__name__)
 
@@ -137,6 +141,16 @@ def _pick_provider(provider_type: str, model: str = '') -> Optional[ModelProvide
     return queryset.first()
 
 
+def _rate_limited_response(exc: RateLimitExceeded) -> Response:
+    """代理接口不排队等待，超出提供商限流时直接返回 429"""
+    response = Response(
+        {'error': str(exc), 'retry_after': round(exc.retry_after, 1)},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response['Retry-After'] = str(max(int(exc.retry_after + 0.999), 1))
+    return response
+
+
 class AIModelsView(APIView):
     """
     统一模型列表接口
@@ -208,8 +222,12 @@ class ChatCompletionsProxyView(APIView):
         }
 
         try:
+            if getattr(settings, 'AI_RATE_LIMIT_ENABLED', True):
+                get_rate_limiter().reserve(
+                    str(provider.pk), provider.rate_limit_rpm, provider.rate_limit_rpd, max_wait=0
+                )
             start_time = time.time()
-            upstream_response = requests.post(
+            upstream_response = http_post(
                 provider.api_url,
                 headers=headers,
                 json=payload,
@@ -240,6 +258,8 @@ class ChatCompletionsProxyView(APIView):
             })
             return Response(result)
 
+        except RateLimitExceeded as exc:
+            return _rate_limited_response(exc)
         except requests.Timeout:
             return Response(
                 {'error': '上游 API 请求超时'},
@@ -353,39 +373,11 @@ class ImagesGenerationsProxyView(APIView):
 
         try:
             client = create_ai_client(provider)
-            if provider_type == 'image_edit':
-                ai_response = ImageGenerationService.edit(
-                    provider,
-                    ImageEditRequest(
-                        source_images=context['reference_images'],
-                        prompt=context['prompt'],
-                        mask_image=context['mask'],
-                        negative_prompt=context['negative_prompt'],
-                        strength=context['strength'],
-                        width=context['width'],
-                        height=context['height'],
-                        edit_mode=context['mode'] or 'img2img',
-                        extra=context['extra'],
-                    ),
-                    client=client,
-                )
-            else:
-                ai_response = ImageGenerationService.generate(
-                    provider,
-                    Text2ImageRequest(
-                        prompt=context['prompt'],
-                        negative_prompt=context['negative_prompt'],
-                        reference_images=context['reference_images'],
-                        width=context['width'],
-                        height=context['height'],
-                        aspect_ratio=context['aspect_ratio'],
-                        sample_count=context['sample_count'],
-                        seed=context['seed'],
-                        extra=context['extra'],
-                    ),
-                    client=client,
-                )
+            with rate_limit_policy(wait=False):
+                ai_response = self._call_provider(provider, provider_type, context, client)
             return self._normalize_image_result(ai_response, provider, provider_type)
+        except RateLimitExceeded as exc:
+            return _rate_limited_response(exc)
         except Exception as exc:
             logger.error('图片代理异常: %s', exc, exc_info=True)
             return Response(
@@ -393,6 +385,41 @@ class ImagesGenerationsProxyView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    def _call_provider(self, provider, provider_type: str, context: Dict[str, Any], client):
+        """调用图片生成/编辑服务"""
+        if provider_type == 'image_edit':
+            return ImageGenerationService.edit(
+                provider,
+                ImageEditRequest(
+                    source_images=context['reference_images'],
+                    prompt=context['prompt'],
+                    mask_image=context['mask'],
+                    negative_prompt=context['negative_prompt'],
+                    strength=context['strength'],
+                    width=context['width'],
+                    height=context['height'],
+                    edit_mode=context['mode'] or 'img2img',
+                    extra=context['extra'],
+                ),
+                client=client,
+            )
+        else:
+            return ImageGenerationService.generate(
+                provider,
+                Text2ImageRequest(
+                    prompt=context['prompt'],
+                    negative_prompt=context['negative_prompt'],
+                    reference_images=context['reference_images'],
+                    width=context['width'],
+                    height=context['height'],
+                    aspect_ratio=context['aspect_ratio'],
+                    sample_count=context['sample_count'],
+                    seed=context['seed'],
+                    extra=context['extra'],
+                ),
+                client=client,
+            )
+
 
 class VideosGenerationsProxyView(APIView):
     """
@@ -454,27 +481,28 @@ class VideosGenerationsProxyView(APIView):
 
         try:
             client = create_ai_client(provider)
-            raw_result = client._generate_video(
-                prompt=prompt,
-                model=provider.model_name,
-                image_uri=image_inputs[0] if image_inputs else '',
-                image_uris=image_inputs,
-                image_base64=image_base64,
-                image_base64s=image_base64s,
-                image_mime_type=request.data.get('image_mime_type', 'image/jpeg'),
-                duration_seconds=_parse_int(request.data.get('duration_seconds'), _parse_int(request.data.get('duration'), 5)) or 5,
-                sample_count=_parse_int(request.data.get('sample_count'), _parse_int(request.data.get('n'), 1)) or 1,
-                aspect_ratio=request.data.get('aspect_ratio') or request.data.get('ratio') or '16:9',
-                resolution=request.data.get('resolution'),
-                seed=_parse_int(request.data.get('seed')),
-                negative_prompt=request.data.get('negative_prompt'),
-                generate_audio=request.data.get('generate_audio', True),
-                camera_movement_description=(
-                    request.data.get('camera_movement_description')
-                    or request.data.get('cameraMovementDescription')
-                    or ''
-                ),
-            )
+            with rate_limit_policy(wait=False):
+                raw_result = client._generate_video(
+                    prompt=prompt,
+                    model=provider.model_name,
+                    image_uri=image_inputs[0] if image_inputs else '',
+                    image_uris=image_inputs,
+                    image_base64=image_base64,
+                    image_base64s=image_base64s,
+                    image_mime_type=request.data.get('image_mime_type', 'image/jpeg'),
+                    duration_seconds=_parse_int(request.data.get('duration_seconds'), _parse_int(request.data.get('duration'), 5)) or 5,
+                    sample_count=_parse_int(request.data.get('sample_count'), _parse_int(request.data.get('n'), 1)) or 1,
+                    aspect_ratio=request.data.get('aspect_ratio') or request.data.get('ratio') or '16:9',
+                    resolution=request.data.get('resolution'),
+                    seed=_parse_int(request.data.get('seed')),
+                    negative_prompt=request.data.get('negative_prompt'),
+                    generate_audio=request.data.get('generate_audio', True),
+                    camera_movement_description=(
+                        request.data.get('camera_movement_description')
+                        or request.data.get('cameraMovementDescription')
+                        or ''
+                    ),
+                )
             result = self._normalize_video_result(raw_result)
             if not result['success']:
                 return Response(
@@ -491,6 +519,8 @@ class VideosGenerationsProxyView(APIView):
                 'data': result['data'],
                 'metadata': result['metadata'],
             })
+        except RateLimitExceeded as exc:
+            return _rate_limited_response(exc)
         except Exception as exc:
             logger.error('视频代理异常: %s', exc, exc_info=True)
             return Response(
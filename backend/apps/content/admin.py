@@ -9,6 +9,7 @@ from .models import (
     MultiGridImageTask,
     MultiGridTile,
     EditedImage,
+    ProviderTask,
 )
 
 
@@ -61,3 +62,10 @@ class MultiGridTileAdmin(admin.ModelAdmin):
 class EditedImageAdmin(admin.ModelAdmin):
     list_display = ['storyboard', 'source_stage_type', 'status', 'width', 'height', 'created_at']
     list_filter = ['source_stage_type', 'status', 'created_at']
+
+
+@admin.register(ProviderTask)
+class ProviderTaskAdmin(admin.ModelAdmin):
+    list_display = ['storyboard', 'stage_type', 'task_id', 'status', 'model_provider', 'created_at']
+    list_filter = ['stage_type', 'status', 'created_at']
+    search_fields = ['task_id']
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0003_auto_20260320_1121'),
+        ('content', '0002_unify_camera_movement_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderTask',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('stage_type', models.CharField(max_length=50, verbose_name='阶段类型')),
+                ('task_id', models.CharField(max_length=255, verbose_name='提供商任务ID')),
+                ('source_url', models.URLField(blank=True, default='', max_length=1024, verbose_name='源素材URL')),
+                ('status', models.CharField(choices=[('submitted', '已提交'), ('completed', '已完成'), ('failed', '失败')], default='submitted', max_length=20, verbose_name='状态')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('model_provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='models.modelprovider', verbose_name='使用的模型')),
+                ('storyboard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='provider_tasks', to='content.storyboard', verbose_name='分镜')),
+            ],
+            options={
+                'verbose_name': '提供商异步任务',
+                'verbose_name_plural': '提供商异步任务',
+                'db_table': 'provider_tasks',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='providertask',
+            index=models.Index(fields=['storyboard', 'stage_type', 'status'], name='provider_ta_storybo_903ad8_idx'),
+        ),
+    ]
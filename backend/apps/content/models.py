@@ -468,3 +468,51 @@ class EditedImage(models.Model):
 
     def __str__(self):
         return f'{self.storyboard} - 图片编辑结果'
+
+
+class ProviderTask(models.Model):
+    """
+    提供商异步任务
+    职责: 记录已提交到提供商的异步任务ID,Worker 中断后重新执行阶段时继续轮询该任务而不是重复提交
+    """
+
+    STATUS_CHOICES = [
+        ('submitted', '已提交'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    storyboard = models.ForeignKey(
+        Storyboard,
+        on_delete=models.CASCADE,
+        related_name='provider_tasks',
+        verbose_name='分镜'
+    )
+    stage_type = models.CharField('阶段类型', max_length=50)
+    model_provider = models.ForeignKey(
+        ModelProvider,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='使用的模型'
+    )
+    task_id = models.CharField('提供商任务ID', max_length=255)
+    # 提交时的源素材(如图生视频的源图片),素材变化后旧任务不再续用
+    source_url = models.URLField('源素材URL', max_length=1024, blank=True, default='')
+    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='submitted')
+    error_message = models.TextField('错误信息', blank=True, default='')
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        db_table = 'provider_tasks'
+        verbose_name = '提供商异步任务'
+        verbose_name_plural = '提供商异步任务'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['storyboard', 'stage_type', 'status']),
+        ]
+
+    def __str__(self):
+        return f'{self.storyboard} - {self.stage_type} - {self.task_id}'
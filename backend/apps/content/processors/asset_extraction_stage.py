@@ -186,14 +186,6 @@ class AssetExtractionStageProcessor(LLMStageProcessor):
     def _get_ai_client(self, project: Project):
         return super()._get_ai_client(project)
 
-    def _get_current_provider(self, project: Project):
-        config = getattr(project, 'model_config', None)
-        if config:
-            providers = list(config.rewrite_providers.all())
-            if providers:
-                return providers[0]
-        return super()._get_current_provider(project)
-
     def _get_max_tokens(self) -> int:
         return 4096
 
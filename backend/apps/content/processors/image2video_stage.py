@@ -6,10 +6,16 @@
 
 import copy
 import logging
-from typing import Any, Dict, Generator, List, Optional
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 
 from django.conf import settings
 from core.ai_client.factory import create_ai_client
+from core.ai_client.image2video_client import VideoTaskFailedError
+from core.ai_client.polling import build_poll_schedule, get_duration_model
+from core.ai_client.circuit import get_failover_provider
+from core.ai_client.router import route_stage_provider
 from core.pipeline.base import PipelineContext, StageProcessor, StageResult
 from django.utils import timezone
 from jinja2 import Template, TemplateError
@@ -18,6 +24,7 @@ from pathlib import Path
 
 from apps.models.models import ModelProvider
 from apps.projects.models import Project, ProjectStage
+from apps.projects.utils import is_stage_template_enabled
 from apps.prompts.client_param_resolver import resolve_stage_client_params
 
 logger = logging.getLogger(__name__)
@@ -48,6 +55,8 @@ class Image2VideoStageProcessor(StageProcessor):
         self.max_concurrent = 2  # 最大并发生成数(视频生成较慢,建议并发数小一些)
         self.poll_interval = 10  # 轮询间隔(秒)
         self.max_wait_time = 600  # 最大等待时间(秒)
+        self.max_poll_errors = 5  # 批量轮询时单个任务允许的连续查询异常次数
+        self.follow_interval = 3  # 跟随上游执行时检查新就绪分镜的间隔(秒)
 
     def validate(self, context: PipelineContext) -> bool:
         """
@@ -122,6 +131,7 @@ class Image2VideoStageProcessor(StageProcessor):
         project_id: str,
         storyboard_ids: List[int] = None,
         force_regenerate: bool = False,
+        upstream_done: Optional[Callable[[], bool]] = None,
     ) -> Generator[Dict[str, Any], None, None]:
         """
         流式执行图生视频生成
@@ -131,6 +141,8 @@ class Image2VideoStageProcessor(StageProcessor):
             project_id: 项目ID
             storyboard_ids: 指定要生成的分镜ID列表(可选,默认生成所有)
             force_regenerate: 是否强制重生成已完成分镜视频
+            upstream_done: 跟随上游阶段执行时传入,返回上游(图片/运镜)是否全部结束;
+                结束前只为图片(及运镜)已就绪的分镜提交视频任务
 
         Yields:
             Dict包含: type (progress/task_created/task_status/video_generated/done/error), content, data
@@ -193,124 +205,157 @@ class Image2VideoStageProcessor(StageProcessor):
 
             # 获取AI客户端配置
             provider = self._get_image2video_provider(project)
+            batch_submit, max_concurrency = self._resolve_submit_options(project, provider)
 
             # 批量生成视频
             generated_videos = []
             failed_count = 0
 
-            for index, storyboard_obj in enumerate(storyboards, 1):
-                try:
-                    # 构建分镜数据字典(兼容原有接口)
-                    storyboard_dict = {
-                        "scene_number": storyboard_obj.sequence_number,
-                        "narration": storyboard_obj.narration_text,
-                        "visual_prompt": storyboard_obj.image_prompt,
-                        "shot_type": storyboard_obj.scene_description,
-                    }
+            if upstream_done is not None and not batch_submit:
+                # 跟随上游执行时统一走轮询流程,关闭批量提交则同一时刻只保留一个任务
+                batch_submit, max_concurrency = True, 1
 
-                    # 进度更新
-                    yield {
-                        "type": "progress",
-                        "current": index,
-                        "total": total,
-                        "message": f"正在生成第 {index}/{total} 个视频...",
-                        "scene_number": storyboard_obj.sequence_number,
-                    }
+            if batch_submit:
+                yield {
+                    "type": "info",
+                    "message": f"批量提交视频任务，最大并发数 {max_concurrency}",
+                }
 
-                    # 检查是否有图片URL
-                    # 从 GeneratedImage 模型获取该分镜的图片
-                    from apps.content.models import GeneratedImage
+                pending_storyboards = list(storyboards)
+                require_camera = upstream_done is not None and is_stage_template_enabled(
+                    project, "camera_movement"
+                )
 
-                    generated_images = GeneratedImage.objects.filter(
-                        storyboard=storyboard_obj, status="completed"
-                    ).order_by("-created_at")
+                def next_jobs():
+                    return self._collect_ready_jobs(
+                        project, pending_storyboards, upstream_done, require_camera
+                    )
 
-                    if not generated_images.exists():
-                        failed_count += 1
-                        yield {
-                            "type": "warning",
-                            "message": f"分镜 {storyboard_obj.sequence_number} 没有生成的图片，跳过",
-                        }
+                finished_count = 0
+                for job, event in self._iter_multiplexed_videos(
+                    project, provider, max_concurrency, next_jobs
+                ):
+                    storyboard_obj = job["storyboard"]
+                    if event["type"] == "task_created":
+                        yield event
                         continue
 
-                    # 使用第一张生成的图片
-                    first_image = generated_images.first()
-                    storyboard_dict["urls"] = [{"url": first_image.image_url}]
-
-                    # 生成视频 (流式推送状态更新)
+                    finished_count += 1
                     video_urls = None
-                    for event in self._generate_single_video_stream(
-                        project=project,
-                        storyboard=storyboard_dict,
-                        scene_number=storyboard_obj.sequence_number,
-                        provider=provider,
-                    ):
-                        # 转发所有事件
-                        yield event
-
-                        # 保存最终生成的视频URL
-                        if event["type"] == "video_generated":
-                            video_urls_obj = event.get("video_urls", {})
-                            ## todo bug ["http"]
-                            if getattr(video_urls_obj, "data", None):
-                                video_urls = video_urls_obj.data
-                            else:
-                                video_urls = video_urls_obj.get("data", [])
+                    if event["type"] == "video_generated":
+                        video_urls = self._extract_video_urls(event.get("video_urls"))
 
                     if video_urls:
+                        self._save_generated_videos(
+                            storyboard_obj,
+                            job["storyboard_dict"],
+                            job["image"],
+                            video_urls,
+                            job.get("provider") or provider,
+                        )
                         generated_videos.append(
                             {
                                 "scene_number": storyboard_obj.sequence_number,
                                 "video_urls": video_urls,
                             }
                         )
-
-                        # 保存到 GeneratedVideo 模型
-                        from apps.content.models import GeneratedVideo, CameraMovement
-
-                        # 获取运镜参数(如果有)
-                        camera_movement = CameraMovement.objects.filter(
-                            storyboard=storyboard_obj
-                        ).first()
-
-                        for video_data in video_urls:
-                            GeneratedVideo.objects.create(
-                                storyboard=storyboard_obj,
-                                image=first_image,
-                                camera_movement=camera_movement,
-                                video_url=video_data.get("url", ""),
-                                thumbnail_url="",
-                                generation_params={
-                                    "prompt": storyboard_dict.get("visual_prompt", ""),
-                                    "model": provider.model_name if provider else "",
-                                    "original_data": video_data,
-                                },
-                                model_provider=provider,
-                                status="completed",
-                                duration=video_data.get("duration", 0),
-                                width=video_data.get("width", 0),
-                                height=video_data.get("height", 0),
-                                fps=video_data.get("fps", 0),
-                                file_size=video_data.get("file_size", 0),
-                            )
+                        yield event
                     else:
                         failed_count += 1
                         yield {
                             "type": "warning",
-                            "message": f"分镜 {storyboard_obj.sequence_number} 视频生成失败",
+                            "message": event.get("message")
+                            or f"分镜 {storyboard_obj.sequence_number} 视频生成失败",
+                            "scene_number": storyboard_obj.sequence_number,
                         }
 
-                except Exception as e:
-                    failed_count += 1
-                    logger.error(
-                        f"分镜 {storyboard_obj.sequence_number} 生成失败: {str(e)}"
-                    )
                     yield {
-                        "type": "error",
-                        "error": f"分镜 {storyboard_obj.sequence_number} 生成失败: {str(e)}",
+                        "type": "progress",
+                        "current": finished_count,
+                        "total": total,
+                        "message": f"已完成 {finished_count}/{total} 个视频",
                         "scene_number": storyboard_obj.sequence_number,
                     }
 
+            else:
+                for index, storyboard_obj in enumerate(storyboards, 1):
+                    try:
+                        # 构建分镜数据字典(兼容原有接口)
+                        storyboard_dict = self._build_storyboard_dict(storyboard_obj)
+
+                        # 进度更新
+                        yield {
+                            "type": "progress",
+                            "current": index,
+                            "total": total,
+                            "message": f"正在生成第 {index}/{total} 个视频...",
+                            "scene_number": storyboard_obj.sequence_number,
+                        }
+
+                        # 检查是否有图片URL
+                        # 从 GeneratedImage 模型获取该分镜的图片
+                        first_image = self._get_first_image(storyboard_obj)
+
+                        if not first_image:
+                            failed_count += 1
+                            yield {
+                                "type": "warning",
+                                "message": f"分镜 {storyboard_obj.sequence_number} 没有生成的图片，跳过",
+                            }
+                            continue
+
+                        # 使用第一张生成的图片
+                        storyboard_dict["urls"] = [{"url": first_image.image_url}]
+
+                        # 生成视频 (流式推送状态更新)
+                        video_urls = None
+                        for event in self._generate_single_video_stream(
+                            project=project,
+                            storyboard=storyboard_dict,
+                            scene_number=storyboard_obj.sequence_number,
+                            provider=provider,
+                        ):
+                            # 转发所有事件
+                            yield event
+
+                            # 保存最终生成的视频URL
+                            if event["type"] == "video_generated":
+                                video_urls = self._extract_video_urls(event.get("video_urls"))
+
+                        if video_urls:
+                            generated_videos.append(
+                                {
+                                    "scene_number": storyboard_obj.sequence_number,
+                                    "video_urls": video_urls,
+                                }
+                            )
+
+                            # 保存到 GeneratedVideo 模型
+                            self._save_generated_videos(
+                                storyboard_obj,
+                                storyboard_dict,
+                                first_image,
+                                video_urls,
+                                provider,
+                            )
+                        else:
+                            failed_count += 1
+                            yield {
+                                "type": "warning",
+                                "message": f"分镜 {storyboard_obj.sequence_number} 视频生成失败",
+                            }
+
+                    except Exception as e:
+                        failed_count += 1
+                        logger.error(
+                            f"分镜 {storyboard_obj.sequence_number} 生成失败: {str(e)}"
+                        )
+                        yield {
+                            "type": "error",
+                            "error": f"分镜 {storyboard_obj.sequence_number} 生成失败: {str(e)}",
+                            "scene_number": storyboard_obj.sequence_number,
+                        }
+
             # 保存最终结果到阶段
             success_count = len(generated_videos)
             output_data = {
@@ -369,10 +414,15 @@ class Image2VideoStageProcessor(StageProcessor):
     def _get_image2video_provider(self, project: Project) -> Optional[ModelProvider]:
         """获取图生视频模型提供商"""
 
-        # 1. 从提示词模板获取默认模型
+        # 1. 从项目模型配置获取(多个提供商时按负载均衡策略选择)
+        provider = route_stage_provider(project, self.stage_type)
+        if provider:
+            return provider
+
+        # 2. 从提示词模板获取默认模型(已熔断时切换到同类型的可用提供商)
         template = self._get_prompt_template(project)
         if template and template.model_provider:
-            return template.model_provider
+            return get_failover_provider(template.model_provider)
         return None
 
     def image_to_base64(self, image_path):
@@ -406,15 +456,8 @@ class Image2VideoStageProcessor(StageProcessor):
             Dict包含: type (task_created/task_status/video_generated/error), data
         """
         try:
-            # 准备生成参数
-            # toto test
-            try:
-                prompt = self._build_prompt(project, storyboard)
-            except Exception:
-                prompt = ""
-            image_urls = storyboard.get("urls", [])
-
-            if not image_urls:
+            generate_kwargs = self._build_generate_kwargs(project, storyboard, scene_number, provider)
+            if generate_kwargs is None:
                 yield {
                     "type": "error",
                     "error": f"分镜 {scene_number} 没有图片URL",
@@ -422,44 +465,7 @@ class Image2VideoStageProcessor(StageProcessor):
                 }
                 return
 
-            model_name = provider.model_name
-            api_key = provider.api_key
-            api_url = provider.api_url
-            image_url = image_urls[0].get("url", "") if image_urls else ""
-            image_base64 = storyboard.get("url", "")
-            camera_movement_description = self._build_camera_movement_description(project, scene_number)
-            template = self._get_prompt_template(project)
-            client_params = resolve_stage_client_params(
-                self.stage_type,
-                template=template,
-                provider=provider,
-                runtime_overrides={
-                    'poll_interval': self.poll_interval,
-                    'max_wait_time': self.max_wait_time,
-                },
-            )
-
             client = create_ai_client(provider)
-            generate_kwargs = {
-                'api_url': api_url,
-                'session_id': api_key,
-                'model': model_name,
-                'prompt': prompt,
-                'camera_movement_description': camera_movement_description,
-                'duration': client_params.get('duration', 5),
-                'duration_seconds': client_params.get('duration', 5),
-                'fps': client_params.get('fps', 24),
-                'aspect_ratio': client_params.get('aspect_ratio', '16:9'),
-                'resolution': client_params.get('resolution') or None,
-                'negative_prompt': client_params.get('negative_prompt', ''),
-                'poll_interval': client_params.get('poll_interval', self.poll_interval),
-                'max_wait_time': client_params.get('max_wait_time', self.max_wait_time),
-            }
-            if image_base64:
-                generate_kwargs['image_base64'] = image_base64
-            elif image_url:
-                generate_kwargs['image_uri'] = image_url
-
             video_urls = client._generate_video(**generate_kwargs)
 
             yield {
@@ -475,6 +481,758 @@ class Image2VideoStageProcessor(StageProcessor):
 
             yield {"type": "error", "error": str(e), "scene_number": scene_number}
 
+    def _build_generate_kwargs(
+        self,
+        project: Project,
+        storyboard: Dict[str, Any],
+        scene_number: int,
+        provider: ModelProvider,
+    ) -> Optional[Dict[str, Any]]:
+        """构建单个分镜的视频生成参数,没有图片URL时返回None"""
+        # 准备生成参数
+        # toto test
+        try:
+            prompt = self._build_prompt(project, storyboard)
+        except Exception:
+            prompt = ""
+        image_urls = storyboard.get("urls", [])
+
+        if not image_urls:
+            return None
+
+        image_url = image_urls[0].get("url", "") if image_urls else ""
+        image_base64 = storyboard.get("url", "")
+        camera_movement_description = self._build_camera_movement_description(project, scene_number)
+        client_params = self._resolve_client_params(project, provider)
+
+        generate_kwargs = {
+            'api_url': provider.api_url,
+            'session_id': provider.api_key,
+            'model': provider.model_name,
+            'prompt': prompt,
+            'camera_movement_description': camera_movement_description,
+            'duration': client_params.get('duration', 5),
+            'duration_seconds': client_params.get('duration', 5),
+            'fps': client_params.get('fps', 24),
+            'aspect_ratio': client_params.get('aspect_ratio', '16:9'),
+            'resolution': client_params.get('resolution') or None,
+            'negative_prompt': client_params.get('negative_prompt', ''),
+            'poll_interval': client_params.get('poll_interval', self.poll_interval),
+            'max_wait_time': client_params.get('max_wait_time', self.max_wait_time),
+        }
+        if image_base64:
+            generate_kwargs['image_base64'] = image_base64
+        elif image_url:
+            generate_kwargs['image_uri'] = image_url
+        return generate_kwargs
+
+    def _iter_multiplexed_videos(
+        self,
+        project: Project,
+        provider: ModelProvider,
+        max_concurrency: int,
+        next_jobs: Callable[[], Tuple[List[Dict[str, Any]], bool]],
+    ) -> Generator[Tuple[Dict[str, Any], Dict[str, Any]], None, None]:
+        """
+        先提交、后统一轮询的视频生成
+
+        - 最多 max_concurrency 个任务同时在途,完成一个补交一个
+        - 每轮依次查询全部在途任务,任一完成即产出,无需等待前序分镜
+        - 每轮通过 next_jobs 补充新就绪的分镜,直到其返回已取尽
+        - 不支持单独提交/查询的Client退化为逐个同步生成
+
+        Yields:
+            (job, event): event.type 为 task_created/video_generated/warning
+        """
+        clients = {}
+        client = self._get_client(clients, provider)
+        waiting = deque()
+        active: List[Dict[str, Any]] = []
+        exhausted = False
+        # 上一次休眠所等待的查询时刻,休眠结束即视为已到达(不受时钟精度影响)
+        poll_clock = 0.0
+
+        while True:
+            if not exhausted:
+                new_jobs, exhausted = next_jobs()
+                for job in new_jobs:
+                    if job["image"] is None:
+                        yield job, {
+                            "type": "warning",
+                            "message": f"分镜 {job['storyboard'].sequence_number} 没有生成的图片，跳过",
+                            "scene_number": job["storyboard"].sequence_number,
+                        }
+                        continue
+                    waiting.append(job)
+
+            if not waiting and not active:
+                if exhausted:
+                    break
+                time.sleep(self.follow_interval)
+                continue
+
+            while waiting and len(active) < max_concurrency:
+                job = waiting.popleft()
+                scene_number = job["storyboard"].sequence_number
+                provider_task, submission = None, None
+                try:
+                    generate_kwargs = self._build_generate_kwargs(
+                        project, job["storyboard_dict"], scene_number, provider
+                    )
+                    if generate_kwargs is None:
+                        yield job, {
+                            "type": "warning",
+                            "message": f"分镜 {scene_number} 没有图片URL",
+                            "scene_number": scene_number,
+                        }
+                        continue
+
+                    # 上次执行中断时已提交的任务直接续接轮询,避免重复提交(提供商已计费)
+                    provider_task = self._find_pollable_task(job, project, clients)
+                    if provider_task is None and not self._supports_polling(client):
+                        yield job, {
+                            "type": "video_generated",
+                            "scene_number": scene_number,
+                            "video_urls": client._generate_video(**generate_kwargs),
+                        }
+                        continue
+
+                    if provider_task is None:
+                        task_provider = provider
+                        submission = client.submit_video_task(**generate_kwargs)
+                    else:
+                        # 续接的任务可能提交给了其他提供商(负载均衡/熔断切换),按其原提供商查询
+                        task_provider = provider_task.model_provider
+                        generate_kwargs = self._build_generate_kwargs(
+                            project, job["storyboard_dict"], scene_number, task_provider
+                        )
+                except Exception as e:
+                    logger.error(f"分镜 {scene_number} 视频任务提交失败: {str(e)}", exc_info=True)
+                    yield job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 视频任务提交失败: {str(e)}",
+                        "scene_number": scene_number,
+                    }
+                    continue
+
+                if submission is not None and (
+                    submission.get("result") is not None or not submission.get("task_id")
+                ):
+                    yield job, {
+                        "type": "video_generated",
+                        "scene_number": scene_number,
+                        "video_urls": submission.get("result"),
+                    }
+                    continue
+
+                resumed = provider_task is not None
+                if resumed:
+                    submitted_at = provider_task.created_at.timestamp()
+                    logger.info(f"分镜 {scene_number} 续接已提交的视频任务: task_id={provider_task.task_id}")
+                else:
+                    provider_task = self._record_provider_task(job, provider, submission["task_id"])
+                    submitted_at = time.time()
+
+                task_client = self._get_client(clients, task_provider)
+                polling_key = self._get_polling_key(task_client, task_provider)
+                schedule = build_poll_schedule(polling_key, generate_kwargs["poll_interval"])
+                job.update(
+                    task_id=provider_task.task_id,
+                    provider_task=provider_task,
+                    provider=task_provider,
+                    client=task_client,
+                    polling_key=polling_key,
+                    generate_kwargs=generate_kwargs,
+                    submitted_at=submitted_at,
+                    poll_errors=0,
+                    schedule=schedule,
+                    next_poll_at=time.time() + schedule.next_delay(time.time() - submitted_at),
+                )
+                active.append(job)
+                yield job, {
+                    "type": "task_created",
+                    "scene_number": scene_number,
+                    "task_id": job["task_id"],
+                    "resumed": resumed,
+                }
+
+            now = max(time.time(), poll_clock)
+            for job in list(active):
+                if job["next_poll_at"] > now:
+                    continue
+                scene_number = job["storyboard"].sequence_number
+                generate_kwargs = job["generate_kwargs"]
+                job["next_poll_at"] = now + job["schedule"].next_delay(now - job["submitted_at"])
+                try:
+                    response = job["client"].check_video_task(
+                        job["task_id"], started_at=job["submitted_at"], **generate_kwargs
+                    )
+                except VideoTaskFailedError as e:
+                    active.remove(job)
+                    self._finish_provider_task(job, "failed", str(e))
+                    yield job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 视频生成失败: {str(e)}",
+                        "scene_number": scene_number,
+                    }
+                    continue
+                except Exception as e:
+                    job["poll_errors"] += 1
+                    logger.warning(
+                        f"分镜 {scene_number} 视频任务状态查询异常: "
+                        f"task_id={job['task_id']} attempt={job['poll_errors']} error={str(e)}"
+                    )
+                    if job["poll_errors"] < self.max_poll_errors:
+                        continue
+                    # 查询异常不代表任务失败,保留已提交状态,重新执行阶段时继续轮询
+                    active.remove(job)
+                    yield job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 连续查询异常 {job['poll_errors']} 次: {str(e)}",
+                        "scene_number": scene_number,
+                    }
+                    continue
+
+                job["poll_errors"] = 0
+                if response is not None:
+                    active.remove(job)
+                    get_duration_model().record(job["polling_key"], time.time() - job["submitted_at"])
+                    yield job, {
+                        "type": "video_generated",
+                        "scene_number": scene_number,
+                        "video_urls": response,
+                    }
+                    # 调用方保存视频后(生成器恢复时)才标记完成,保存前中断仍可续接
+                    self._finish_provider_task(job, "completed")
+                elif time.time() - job["submitted_at"] > generate_kwargs["max_wait_time"]:
+                    active.remove(job)
+                    self._finish_provider_task(job, "failed", "等待超时")
+                    yield job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 视频任务超时: 等待时间超过 {generate_kwargs['max_wait_time']} 秒",
+                        "scene_number": scene_number,
+                    }
+
+            # 有空位且仍有待提交任务时立即补交,否则休眠到最早需要查询的任务(自适应间隔)
+            if active and not (waiting and len(active) < max_concurrency):
+                poll_clock = min(job["next_poll_at"] for job in active)
+                time.sleep(max(poll_clock - time.time(), 0))
+
+    def supports_deferred_completion(self, project: Project) -> bool:
+        """是否以延迟完成模式执行: 模板开启 deferred_completion 且 Client 支持单独提交/查询"""
+        provider = self._get_image2video_provider(project)
+        if provider is None or not self._resolve_client_params(project, provider).get("deferred_completion"):
+            return False
+        return self._supports_polling(create_ai_client(provider))
+
+    def process_deferred_round(
+        self,
+        project_id: str,
+        state: Dict[str, Any],
+        storyboard_ids: List[int] = None,
+        force_regenerate: bool = False,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        延迟完成模式的一轮处理
+
+        每轮只做不阻塞的工作: 查询到期的在途任务、保存已完成视频、补交新任务,
+        随后产出 {"type": "deferred", "countdown": 秒} 由调用方按 countdown 重新调度下一轮;
+        全部结束时更新阶段并产出 done。在途任务ID保存在 ProviderTask,
+        跨轮状态(目标分镜、结果、下次查询时间)保存在 state 中,需可JSON序列化。
+
+        Args:
+            project_id: 项目ID
+            state: 跨轮状态,首轮传入空字典
+            storyboard_ids: 指定要生成的分镜ID列表(仅首轮使用)
+            force_regenerate: 是否强制重生成已完成分镜视频(仅首轮使用)
+
+        Yields:
+            Dict包含: type (stage_update/task_created/video_generated/warning/progress/deferred/done/error)
+        """
+        from apps.content.models import GeneratedVideo, Storyboard as StoryboardModel
+
+        stage = None
+        try:
+            project = Project.objects.get(id=project_id)
+            stage, _ = ProjectStage.objects.get_or_create(project=project, stage_type=self.stage_type)
+
+            if not state:
+                storyboards_query = StoryboardModel.objects.filter(project=project).order_by("sequence_number")
+                if storyboard_ids:
+                    storyboards_query = storyboards_query.filter(id__in=storyboard_ids)
+                if not force_regenerate:
+                    storyboards_query = storyboards_query.exclude(
+                        id__in=GeneratedVideo.objects.filter(
+                            storyboard__project=project, status="completed"
+                        ).values("storyboard_id")
+                    )
+                targets = [str(pk) for pk in storyboards_query.values_list("id", flat=True)]
+                if not targets:
+                    yield {"type": "error", "error": "没有找到分镜数据"}
+                    return
+
+                state.update(targets=targets, failed=[], generated=[], next_poll={}, poll_errors={})
+                stage.status = "processing"
+                stage.started_at = timezone.now()
+                stage.save()
+                yield {
+                    "type": "stage_update",
+                    "stage": {
+                        "id": str(stage.id),
+                        "status": "processing",
+                        "stage_type": self.stage_type,
+                        "started_at": stage.started_at.isoformat(),
+                    },
+                }
+
+            provider = self._get_pinned_provider(project, state)
+            clients = {}
+            client = self._get_client(clients, provider)
+            _, max_concurrency = self._resolve_submit_options(project, provider)
+            total = len(state["targets"])
+            finished_ids = set(state["failed"]) | {item["storyboard_id"] for item in state["generated"]}
+            remaining = list(
+                StoryboardModel.objects.filter(id__in=state["targets"])
+                .exclude(id__in=finished_ids)
+                .order_by("sequence_number")
+            )
+
+            def finish(job, event):
+                storyboard_obj = job["storyboard"]
+                video_urls = None
+                if event["type"] == "video_generated":
+                    video_urls = self._extract_video_urls(event.get("video_urls"))
+                if video_urls:
+                    self._save_generated_videos(
+                        storyboard_obj,
+                        job["storyboard_dict"],
+                        job["image"],
+                        video_urls,
+                        job.get("provider") or provider,
+                    )
+                    state["generated"].append(
+                        {
+                            "storyboard_id": str(storyboard_obj.id),
+                            "scene_number": storyboard_obj.sequence_number,
+                            "video_urls": video_urls,
+                        }
+                    )
+                    yield event
+                else:
+                    state["failed"].append(str(storyboard_obj.id))
+                    yield {
+                        "type": "warning",
+                        "message": event.get("message")
+                        or f"分镜 {storyboard_obj.sequence_number} 视频生成失败",
+                        "scene_number": storyboard_obj.sequence_number,
+                    }
+                finished = len(state["generated"]) + len(state["failed"])
+                yield {
+                    "type": "progress",
+                    "current": finished,
+                    "total": total,
+                    "message": f"已完成 {finished}/{total} 个视频",
+                    "scene_number": storyboard_obj.sequence_number,
+                }
+
+            jobs, _ = self._collect_ready_jobs(project, list(remaining))
+            in_flight, unsubmitted = [], []
+            for job in jobs:
+                if job["image"] is None:
+                    yield from finish(job, {
+                        "type": "warning",
+                        "message": f"分镜 {job['storyboard'].sequence_number} 没有生成的图片，跳过",
+                    })
+                    continue
+                provider_task = self._find_pollable_task(job, project, clients)
+                task_provider = provider if provider_task is None else provider_task.model_provider
+                task_client = self._get_client(clients, task_provider)
+                job.update(
+                    provider=task_provider,
+                    client=task_client,
+                    polling_key=self._get_polling_key(task_client, task_provider),
+                    generate_kwargs=self._build_generate_kwargs(
+                        project, job["storyboard_dict"], job["storyboard"].sequence_number, task_provider
+                    ),
+                )
+                if provider_task is None:
+                    unsubmitted.append(job)
+                else:
+                    job.update(provider_task=provider_task, task_id=provider_task.task_id)
+                    in_flight.append(job)
+
+            now = time.time()
+            for job in list(in_flight):
+                provider_task = job["provider_task"]
+                task_key = str(provider_task.pk)
+                if state["next_poll"].get(task_key, 0) > now:
+                    continue
+                scene_number = job["storyboard"].sequence_number
+                generate_kwargs = job["generate_kwargs"]
+                submitted_at = provider_task.created_at.timestamp()
+                state["next_poll"][task_key] = now + build_poll_schedule(
+                    job["polling_key"], generate_kwargs["poll_interval"]
+                ).next_delay(now - submitted_at)
+                try:
+                    response = job["client"].check_video_task(
+                        provider_task.task_id, started_at=submitted_at, **generate_kwargs
+                    )
+                except VideoTaskFailedError as e:
+                    in_flight.remove(job)
+                    self._finish_provider_task(job, "failed", str(e))
+                    yield from finish(job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 视频生成失败: {str(e)}",
+                    })
+                    continue
+                except Exception as e:
+                    errors = state["poll_errors"][task_key] = state["poll_errors"].get(task_key, 0) + 1
+                    logger.warning(
+                        f"分镜 {scene_number} 视频任务状态查询异常: "
+                        f"task_id={provider_task.task_id} attempt={errors} error={str(e)}"
+                    )
+                    if errors < self.max_poll_errors:
+                        continue
+                    in_flight.remove(job)
+                    yield from finish(job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 连续查询异常 {errors} 次: {str(e)}",
+                    })
+                    continue
+
+                state["poll_errors"].pop(task_key, None)
+                if response is not None:
+                    in_flight.remove(job)
+                    state["next_poll"].pop(task_key, None)
+                    get_duration_model().record(job["polling_key"], time.time() - submitted_at)
+                    yield from finish(job, {
+                        "type": "video_generated",
+                        "scene_number": scene_number,
+                        "video_urls": response,
+                    })
+                    self._finish_provider_task(job, "completed")
+                elif time.time() - submitted_at > generate_kwargs["max_wait_time"]:
+                    in_flight.remove(job)
+                    state["next_poll"].pop(task_key, None)
+                    self._finish_provider_task(job, "failed", "等待超时")
+                    yield from finish(job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 视频任务超时: 等待时间超过 {generate_kwargs['max_wait_time']} 秒",
+                    })
+
+            while unsubmitted and len(in_flight) < max_concurrency:
+                job = unsubmitted.pop(0)
+                scene_number = job["storyboard"].sequence_number
+                generate_kwargs = job["generate_kwargs"]
+                try:
+                    submission = client.submit_video_task(**generate_kwargs)
+                except Exception as e:
+                    logger.error(f"分镜 {scene_number} 视频任务提交失败: {str(e)}", exc_info=True)
+                    yield from finish(job, {
+                        "type": "warning",
+                        "message": f"分镜 {scene_number} 视频任务提交失败: {str(e)}",
+                    })
+                    continue
+
+                if submission.get("result") is not None or not submission.get("task_id"):
+                    yield from finish(job, {
+                        "type": "video_generated",
+                        "scene_number": scene_number,
+                        "video_urls": submission.get("result"),
+                    })
+                    continue
+
+                provider_task = self._record_provider_task(job, provider, submission["task_id"])
+                job.update(provider_task=provider_task, task_id=provider_task.task_id)
+                in_flight.append(job)
+                state["next_poll"][str(provider_task.pk)] = time.time() + build_poll_schedule(
+                    job["polling_key"], generate_kwargs["poll_interval"]
+                ).next_delay(0)
+                yield {
+                    "type": "task_created",
+                    "scene_number": scene_number,
+                    "task_id": provider_task.task_id,
+                    "resumed": False,
+                }
+
+            if in_flight or unsubmitted:
+                next_polls = [
+                    state["next_poll"].get(str(job["provider_task"].pk), 0) for job in in_flight
+                ]
+                countdown = max(min(next_polls) - time.time(), 0) if next_polls else 0
+                yield {
+                    "type": "deferred",
+                    "countdown": max(countdown, getattr(settings, "AI_POLL_MIN_INTERVAL", 1.0)),
+                    "in_flight": len(in_flight),
+                    "waiting": len(unsubmitted),
+                }
+                return
+
+            success_count = len(state["generated"])
+            stage.output_data = {
+                "total_storyboards": total,
+                "success_count": success_count,
+                "failed_count": len(state["failed"]),
+                "generated_videos": [
+                    {"scene_number": item["scene_number"], "video_urls": item["video_urls"]}
+                    for item in state["generated"]
+                ],
+            }
+            stage.status = "completed"
+            stage.completed_at = timezone.now()
+            stage.save()
+
+            yield {
+                "type": "done",
+                "message": f"视频生成完成: 成功 {success_count}/{total}",
+                "stage": {"id": str(stage.id), "status": stage.status},
+            }
+
+        except Exception as e:
+            logger.error(f"延迟完成图生视频处理失败: {str(e)}", exc_info=True)
+            if stage:
+                try:
+                    stage.status = "failed"
+                    stage.error_message = str(e)
+                    stage.save()
+                except Exception:
+                    pass
+            yield {"type": "error", "error": str(e)}
+
+    def _get_pinned_provider(self, project: Project, state: Dict[str, Any]) -> Optional[ModelProvider]:
+        """延迟完成模式首轮选定提供商并记入 state,后续轮次沿用,不再重新路由"""
+        provider = None
+        if state.get("provider_id"):
+            provider = ModelProvider.objects.filter(pk=state["provider_id"]).first()
+        if provider is None:
+            provider = self._get_image2video_provider(project)
+            if provider is not None:
+                state["provider_id"] = str(provider.pk)
+        return provider
+
+    def _get_client(self, clients: Dict[Any, Any], provider: ModelProvider):
+        """按提供商复用本次执行内的Client"""
+        if provider.pk not in clients:
+            clients[provider.pk] = create_ai_client(provider)
+        return clients[provider.pk]
+
+    @staticmethod
+    def _get_polling_key(client, provider: ModelProvider) -> str:
+        return getattr(client, "polling_key", None) or f"provider:{provider.pk}"
+
+    @staticmethod
+    def _supports_polling(client) -> bool:
+        """Client 是否支持单独提交/查询视频任务"""
+        return hasattr(client, "submit_video_task") and hasattr(client, "check_video_task")
+
+    def _find_pollable_task(self, job: Dict[str, Any], project: Project, clients: Dict[Any, Any]):
+        """
+        查找可续接且能按其原提供商查询的已提交任务
+
+        原提供商的 Client 不支持单独查询时(如执行器已更换)无法续接,标记失败后按新任务提交
+        """
+        provider_task = self._find_resumable_task(job, project)
+        if provider_task is None or self._supports_polling(
+            self._get_client(clients, provider_task.model_provider)
+        ):
+            return provider_task
+        provider_task.status = "failed"
+        provider_task.error_message = "提供商不支持任务查询"
+        provider_task.save(update_fields=["status", "error_message", "updated_at"])
+        return None
+
+    def _find_resumable_task(self, job: Dict[str, Any], project: Project):
+        """
+        查找分镜可续接的已提交任务
+
+        - 只续接同一源图片且未超过其提供商 max_wait_time 的最新任务,
+          不限于本次选中的提供商: 任务由提交时的提供商续接查询,避免路由变化后重复提交
+        - 其余已提交任务标记为失败,不再续接
+
+        Returns:
+            ProviderTask 或 None (续接时使用其 model_provider)
+        """
+        from apps.content.models import ProviderTask
+
+        source_url = job["image"].image_url if job["image"] else ""
+        resumable = None
+        for provider_task in ProviderTask.objects.filter(
+            storyboard=job["storyboard"],
+            stage_type=self.stage_type,
+            status="submitted",
+        ).select_related("model_provider").order_by("-created_at"):
+            task_provider = provider_task.model_provider
+            max_wait_time = (
+                self._resolve_client_params(project, task_provider).get("max_wait_time", self.max_wait_time)
+                if task_provider else 0
+            )
+            if task_provider is None:
+                reason = "提供商已删除"
+            elif (timezone.now() - provider_task.created_at).total_seconds() > max_wait_time:
+                reason = "等待超时"
+            elif provider_task.source_url != source_url:
+                reason = "源图片已变更"
+            elif resumable is not None:
+                reason = "已有更新的任务"
+            else:
+                resumable = provider_task
+                continue
+            provider_task.status = "failed"
+            provider_task.error_message = reason
+            provider_task.save(update_fields=["status", "error_message", "updated_at"])
+        return resumable
+
+    def _record_provider_task(self, job: Dict[str, Any], provider: ModelProvider, task_id: str):
+        """提交成功后立即记录提供商任务ID"""
+        from apps.content.models import ProviderTask
+
+        return ProviderTask.objects.create(
+            storyboard=job["storyboard"],
+            stage_type=self.stage_type,
+            model_provider=provider,
+            task_id=str(task_id),
+            source_url=job["image"].image_url if job["image"] else "",
+        )
+
+    def _finish_provider_task(self, job: Dict[str, Any], status: str, error_message: str = "") -> None:
+        """更新提供商任务的最终状态"""
+        provider_task = job.get("provider_task")
+        if provider_task is None:
+            return
+        provider_task.status = status
+        provider_task.error_message = error_message
+        provider_task.save(update_fields=["status", "error_message", "updated_at"])
+
+    def _collect_ready_jobs(
+        self,
+        project: Project,
+        pending_storyboards: List[Any],
+        upstream_done: Optional[Callable[[], bool]] = None,
+        require_camera: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        从待处理分镜中取出可以提交视频任务的分镜
+
+        - 未跟随上游时一次性取出全部分镜
+        - 跟随上游时只取出图片(及运镜)已就绪的分镜,上游结束后取出剩余分镜
+
+        Returns:
+            (jobs, exhausted): 没有图片的分镜 job["image"] 为 None
+        """
+        if upstream_done is not None and Project.objects.filter(id=project.id, status="paused").exists():
+            raise RuntimeError("项目已暂停，停止提交视频任务")
+
+        upstream_finished = upstream_done is None or upstream_done()
+        jobs = []
+        for storyboard_obj in list(pending_storyboards):
+            first_image = self._get_first_image(storyboard_obj)
+            if not upstream_finished:
+                if not first_image:
+                    continue
+                if require_camera and not self._has_camera_movement(storyboard_obj):
+                    continue
+
+            pending_storyboards.remove(storyboard_obj)
+            storyboard_dict = self._build_storyboard_dict(storyboard_obj)
+            if first_image:
+                storyboard_dict["urls"] = [{"url": first_image.image_url}]
+            jobs.append(
+                {
+                    "storyboard": storyboard_obj,
+                    "storyboard_dict": storyboard_dict,
+                    "image": first_image,
+                }
+            )
+
+        return jobs, upstream_finished and not pending_storyboards
+
+    def _has_camera_movement(self, storyboard_obj) -> bool:
+        """分镜是否已生成运镜"""
+        from apps.content.models import CameraMovement
+
+        return CameraMovement.objects.filter(storyboard=storyboard_obj).exists()
+
+    def _resolve_client_params(self, project: Project, provider: ModelProvider) -> Dict[str, Any]:
+        """解析图生视频阶段的Client参数"""
+        return resolve_stage_client_params(
+            self.stage_type,
+            template=self._get_prompt_template(project),
+            provider=provider,
+            runtime_overrides={
+                'poll_interval': self.poll_interval,
+                'max_wait_time': self.max_wait_time,
+            },
+        )
+
+    def _resolve_submit_options(self, project: Project, provider: ModelProvider) -> Tuple[bool, int]:
+        """解析提交模式: (是否批量提交后统一轮询, 最大在途任务数)"""
+        client_params = self._resolve_client_params(project, provider)
+        batch_submit = bool(client_params.get("batch_submit", True))
+        max_concurrency = max(int(client_params.get("max_concurrency") or self.max_concurrent), 1)
+        return batch_submit, max_concurrency
+
+    def _build_storyboard_dict(self, storyboard_obj) -> Dict[str, Any]:
+        """构建分镜数据字典(兼容原有接口)"""
+        return {
+            "scene_number": storyboard_obj.sequence_number,
+            "narration": storyboard_obj.narration_text,
+            "visual_prompt": storyboard_obj.image_prompt,
+            "shot_type": storyboard_obj.scene_description,
+        }
+
+    def _get_first_image(self, storyboard_obj):
+        """获取分镜最新一张已完成的图片"""
+        from apps.content.models import GeneratedImage
+
+        return (
+            GeneratedImage.objects.filter(storyboard=storyboard_obj, status="completed")
+            .order_by("-created_at")
+            .first()
+        )
+
+    def _extract_video_urls(self, video_urls_obj) -> List[Dict[str, Any]]:
+        """兼容 AIResponse 与字典两种返回结构,取出视频列表"""
+        if isinstance(video_urls_obj, dict):
+            return video_urls_obj.get("data") or []
+        return getattr(video_urls_obj, "data", None) or []
+
+    def _save_generated_videos(
+        self,
+        storyboard_obj,
+        storyboard_dict: Dict[str, Any],
+        first_image,
+        video_urls: List[Dict[str, Any]],
+        provider: Optional[ModelProvider],
+    ) -> None:
+        """保存分镜视频到 GeneratedVideo 模型"""
+        from apps.content.models import GeneratedVideo, CameraMovement
+
+        # 获取运镜参数(如果有)
+        camera_movement = CameraMovement.objects.filter(
+            storyboard=storyboard_obj
+        ).first()
+
+        for video_data in video_urls:
+            GeneratedVideo.objects.create(
+                storyboard=storyboard_obj,
+                image=first_image,
+                camera_movement=camera_movement,
+                video_url=video_data.get("url", ""),
+                thumbnail_url="",
+                generation_params={
+                    "prompt": storyboard_dict.get("visual_prompt", ""),
+                    "model": provider.model_name if provider else "",
+                    "original_data": video_data,
+                },
+                model_provider=provider,
+                status="completed",
+                duration=video_data.get("duration", 0),
+                width=video_data.get("width", 0),
+                height=video_data.get("height", 0),
+                fps=video_data.get("fps", 0),
+                file_size=video_data.get("file_size", 0),
+            )
+
     def _build_camera_movement_description(self, project: Project, scene_number: int) -> str:
         """构建运镜节点的运镜描述文本。"""
         from apps.content.models import CameraMovement
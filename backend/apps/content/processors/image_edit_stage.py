@@ -13,6 +13,7 @@ from jinja2 import Template, TemplateError
 from apps.content.models import EditedImage, MultiGridTile, Storyboard
 from apps.projects.models import Project, ProjectStage
 from apps.prompts.client_param_resolver import resolve_stage_client_params
+from core.ai_client.circuit import get_failover_provider
 from core.ai_client.factory import create_ai_client
 from core.ai_client.image_service import ImageGenerationService
 from core.ai_client.schemas import ImageEditRequest
@@ -33,7 +34,7 @@ class ImageEditStageProcessor(Text2ImageStageProcessor):
     def _get_image_edit_provider(self, project: Project):
         template = self._get_prompt_template(project)
         if template and template.model_provider:
-            return template.model_provider
+            return get_failover_provider(template.model_provider)
         return None
 
     def _build_prompt(self, project: Project, storyboard: dict) -> str:
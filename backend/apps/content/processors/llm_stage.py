@@ -8,6 +8,7 @@ import copy
 import logging
 from typing import Any, Dict, Generator, List, Optional
 from core.pipeline.base import PipelineContext, StageProcessor, StageResult
+from django.db import transaction
 from django.utils import timezone
 from jinja2 import Template, TemplateError
 
@@ -15,10 +16,29 @@ from apps.models.models import ModelProvider
 from apps.projects.models import Project, ProjectStage
 from apps.prompts.models import PromptTemplate
 from apps.prompts.client_param_resolver import resolve_stage_client_params
-from apps.projects.utils import parse_storyboard_json
+from apps.projects.utils import (
+    IncrementalJsonArrayParser,
+    is_valid_storyboard_scene,
+    parse_camera_movement_batch_json,
+    parse_storyboard_json,
+)
+from core.ai_client.circuit import get_failover_provider
+from core.ai_client.router import route_stage_provider
+from core.utils.concurrency import iter_concurrent_streams
 
 logger = logging.getLogger(__name__)
 
+# 流式写入分镜前记录的原值,生成失败时据此恢复
+STORYBOARD_STREAM_FIELDS = [
+    'scene_description',
+    'narration_text',
+    'image_prompt',
+    'duration_seconds',
+    'model_provider_id',
+    'prompt_used',
+    'generation_metadata',
+]
+
 
 class LLMStageProcessor(StageProcessor):
     """
@@ -44,6 +64,8 @@ class LLMStageProcessor(StageProcessor):
         """
         super().__init__(stage_type)
         self.stage_type = stage_type
+        # 本次执行按负载均衡策略选中的提供商 {project_id: provider}
+        self._routed_providers: Dict[Any, Optional[ModelProvider]] = {}
 
     def validate(self, context: PipelineContext) -> bool:
         """
@@ -90,6 +112,9 @@ class LLMStageProcessor(StageProcessor):
             Dict包含: type (token/done/error/stage_update), content, stage_data
         """
         stage = None
+        project = None
+        # 本次流式写入的分镜序号及写入前的原值,生成失败时恢复
+        streamed_scenes, scene_snapshot = set(), {}
         try:
             # 获取项目和阶段
             project = Project.objects.get(id=project_id)
@@ -174,60 +199,82 @@ class LLMStageProcessor(StageProcessor):
             max_tokens = client_params.get('max_tokens', ai_client_config.get("max_tokens", self._get_max_tokens()))
             temperature = client_params.get('temperature', ai_client_config.get("temperature", self._get_temperature()))
             top_p = client_params.get('top_p', ai_client_config.get('top_p', 1.0))
-            for index, task in enumerate(tasks, 1):
-                # 流式生成
-                full_text = ""
-                for chunk in ai_client.generate_stream(
-                    prompt=f'## 用户输入\n{task.get("user_prompt", "")}',
-                    system_prompt=prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    top_p=top_p,
-                ):
-                    if chunk['type'] == 'token':
-                        full_text = chunk['full_text']
-                        print(chunk['content'], end="")
-                        yield {
-                            'type': 'token',
-                            'content': chunk['content'],
-                            'full_text': full_text
-                        }
-
-                    elif chunk['type'] == 'done':
-                        # 保存结果到领域模型
-                        self._save_result(
-                            project, stage, full_text, prompt, {"index": task.get("scene_number", "")}
-                        )
-
-                        # 如果是运镜生成，发送单个运镜完成消息
-                        if self.stage_type == 'camera_movement':
+            max_concurrency = self._resolve_max_concurrency(client_params)
+            batch_size = self._resolve_batch_size(client_params)
+            if self.stage_type == 'camera_movement' and len(tasks) > 1 and (max_concurrency > 1 or batch_size > 1):
+                # 运镜生成: 各分镜互不依赖,支持并发与批量请求
+                yield from self._stream_camera_movements(
+                    project,
+                    stage,
+                    ai_client,
+                    prompt,
+                    tasks,
+                    {'max_tokens': max_tokens, 'temperature': temperature, 'top_p': top_p},
+                    max_concurrency=max_concurrency,
+                    batch_size=batch_size,
+                )
+
+            else:
+                for index, task in enumerate(tasks, 1):
+                    # 分镜生成: 增量解析输出,每个分镜闭合即入库
+                    scene_parser = IncrementalJsonArrayParser('scenes') if self.stage_type == 'storyboard' else None
+                    scene_provider = self._get_current_provider(project) if scene_parser else None
+                    if scene_parser:
+                        streamed_scenes, scene_snapshot = set(), self._snapshot_storyboards(project)
+
+                    # 流式生成
+                    full_text = ""
+                    for chunk in ai_client.generate_stream(
+                        prompt=f'## 用户输入\n{task.get("user_prompt", "")}',
+                        system_prompt=prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        top_p=top_p,
+                    ):
+                        if chunk['type'] == 'token':
+                            full_text = chunk['full_text']
                             yield {
-                                'type': 'camera_generated',
-                                'scene_number': task.get("scene_number", index),
-                                'sequence_number': task.get("scene_number", index),
+                                'type': 'token',
+                                'content': chunk['content'],
+                                'full_text': full_text
                             }
 
-                        # 更新阶段状态
-                        ProjectStage.objects.filter(id=stage.id).update(
-                            completed_at=timezone.now(),
-                            status='completed'
-                        )
-
-                    elif chunk['type'] == 'error':
-                        # 更新阶段状态为失败
-                        stage.status = 'failed'
-                        stage.error_message = chunk['error']
-                        stage.save()
-
-                        yield {
-                            'type': 'error',
-                            'error': chunk['error'],
-                            'stage': {
-                                'id': str(stage.id),
-                                'status': 'failed',
-                                'error_message': chunk['error']
-                            }
-                        }
+                            if scene_parser:
+                                for scene in scene_parser.feed(chunk['content']):
+                                    if not is_valid_storyboard_scene(scene):
+                                        continue
+                                    # 模型可能以字符串返回序号,统一为整数以匹配分镜快照
+                                    try:
+                                        scene_number = int(scene['scene_number'])
+                                    except (TypeError, ValueError):
+                                        continue
+                                    scene['scene_number'] = scene_number
+                                    self._save_storyboard_scene(project, scene, scene_provider, prompt)
+                                    streamed_scenes.add(scene_number)
+                                    yield {
+                                        'type': 'storyboard_generated',
+                                        'scene_number': scene_number,
+                                        'sequence_number': scene_number,
+                                    }
+
+                        elif chunk['type'] == 'done':
+                            # 保存结果到领域模型 (完整解析成功后流式写入的分镜才算生效)
+                            self._complete_task(project, stage, full_text, prompt, task)
+                            streamed_scenes = set()
+
+                            # 如果是运镜生成，发送单个运镜完成消息
+                            if self.stage_type == 'camera_movement':
+                                yield {
+                                    'type': 'camera_generated',
+                                    'scene_number': task.get("scene_number", index),
+                                    'sequence_number': task.get("scene_number", index),
+                                }
+
+                        elif chunk['type'] == 'error':
+                            # 更新阶段状态为失败
+                            self._restore_streamed_storyboards(project, streamed_scenes, scene_snapshot)
+                            streamed_scenes = set()
+                            yield self._fail_stage(stage, chunk['error'])
 
             yield {
                 'type': 'done',
@@ -239,6 +286,12 @@ class LLMStageProcessor(StageProcessor):
         except Exception as e:
             logger.error(f"流式{self.stage_type}处理失败: {str(e)}", exc_info=True)
 
+            if streamed_scenes:
+                try:
+                    self._restore_streamed_storyboards(project, streamed_scenes, scene_snapshot)
+                except Exception:
+                    logger.exception(f"恢复流式写入的分镜失败: project_id={project_id}")
+
             # 更新阶段状态
             if stage:
                 try:
@@ -298,6 +351,302 @@ class LLMStageProcessor(StageProcessor):
         else:
             return [{"user_prompt": str(input_data)}]
 
+    def _stream_camera_movements(
+        self,
+        project: Project,
+        stage: ProjectStage,
+        ai_client,
+        prompt: str,
+        tasks: List[Dict[str, Any]],
+        generate_kwargs: Dict[str, Any],
+        max_concurrency: int = 1,
+        batch_size: int = 0,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        运镜生成(并发/批量)
+
+        - batch_size > 1 时每批分镜合并为一次请求,结果为 JSON 数组并批量入库,
+          批量结果中缺失的分镜回退为逐个生成
+        - 逐个生成时最多 max_concurrency 个分镜并发,各分镜完成即入库并推送
+        """
+        pending = tasks
+        if batch_size > 1:
+            pending = yield from self._stream_camera_movement_batches(
+                project, stage, ai_client, prompt, tasks, generate_kwargs,
+                max_concurrency=max_concurrency,
+                batch_size=batch_size,
+            )
+            if not pending:
+                # 全部批次结束且均有结果后统一标记阶段完成
+                ProjectStage.objects.filter(id=stage.id).update(
+                    completed_at=timezone.now(),
+                    status='completed'
+                )
+                return
+
+            yield {
+                'type': 'info',
+                'message': f'{len(pending)} 个分镜未在批量结果中返回，逐个重新生成',
+                'scene_numbers': [task.get('scene_number') for task in pending],
+            }
+        elif max_concurrency > 1:
+            yield {
+                'type': 'info',
+                'message': f'并发生成{self._get_stage_display_name()}，最大并发数 {max_concurrency}',
+            }
+
+        def stream_task(task):
+            return ai_client.generate_stream(
+                prompt=f'## 用户输入\n{task.get("user_prompt", "")}',
+                system_prompt=prompt,
+                **generate_kwargs,
+            )
+
+        task_texts = {}
+        has_failed = False
+        for task, chunk, finished, error in iter_concurrent_streams(
+            pending,
+            stream_task,
+            max_workers=max_concurrency,
+            thread_name_prefix='camera-movement',
+        ):
+            scene_number = task.get('scene_number')
+            if finished:
+                if error is None:
+                    continue
+                chunk = {'type': 'error', 'error': f'分镜 {scene_number} 运镜生成失败: {str(error)}'}
+
+            if chunk['type'] == 'token':
+                task_texts[scene_number] = chunk['full_text']
+                yield {
+                    'type': 'token',
+                    'content': chunk['content'],
+                    'full_text': chunk['full_text'],
+                    'scene_number': scene_number,
+                }
+
+            elif chunk['type'] == 'done':
+                # 已有分镜失败时只保存结果,不覆盖阶段失败状态
+                self._complete_task(
+                    project, stage, task_texts.get(scene_number, ''), prompt, task,
+                    mark_completed=not has_failed,
+                )
+                yield {
+                    'type': 'camera_generated',
+                    'scene_number': scene_number,
+                    'sequence_number': scene_number,
+                }
+
+            elif chunk['type'] == 'error':
+                has_failed = True
+                yield self._fail_stage(stage, chunk['error'])
+
+    def _stream_camera_movement_batches(
+        self,
+        project: Project,
+        stage: ProjectStage,
+        ai_client,
+        prompt: str,
+        tasks: List[Dict[str, Any]],
+        generate_kwargs: Dict[str, Any],
+        max_concurrency: int = 1,
+        batch_size: int = 10,
+    ) -> Generator[Dict[str, Any], None, List[Dict[str, Any]]]:
+        """
+        按批生成运镜,每批一次请求
+
+        Returns:
+            未能从批量结果中得到运镜的分镜任务(需逐个重试)
+        """
+        batches = [tasks[index:index + batch_size] for index in range(0, len(tasks), batch_size)]
+        yield {
+            'type': 'info',
+            'message': f'批量生成{self._get_stage_display_name()}，共 {len(batches)} 批，每批最多 {batch_size} 个分镜',
+        }
+
+        def stream_batch(batch):
+            return ai_client.generate_stream(
+                prompt=self._build_camera_movement_batch_prompt(batch),
+                system_prompt=prompt,
+                **generate_kwargs,
+            )
+
+        batch_texts = {}
+        missing: List[Dict[str, Any]] = []
+        for batch, chunk, finished, error in iter_concurrent_streams(
+            batches,
+            stream_batch,
+            max_workers=max_concurrency,
+            thread_name_prefix='camera-movement-batch',
+        ):
+            scene_numbers = [task.get('scene_number') for task in batch]
+            batch_key = id(batch)
+            if finished:
+                if error is None:
+                    continue
+                chunk = {'type': 'error', 'error': str(error)}
+
+            if chunk['type'] == 'token':
+                batch_texts[batch_key] = chunk['full_text']
+                # 各批并发输出,以批内首个分镜序号作为该批的流标识,避免文本互相覆盖
+                yield {
+                    'type': 'token',
+                    'content': chunk['content'],
+                    'full_text': chunk['full_text'],
+                    'scene_number': scene_numbers[0],
+                    'scene_numbers': scene_numbers,
+                }
+
+            elif chunk['type'] == 'done':
+                try:
+                    descriptions = parse_camera_movement_batch_json(batch_texts.get(batch_key, ''))
+                except ValueError as e:
+                    logger.warning(f"运镜批量结果解析失败, 分镜 {scene_numbers} 将逐个重试: {str(e)}")
+                    descriptions = {}
+
+                results = {
+                    scene_number: descriptions[scene_number]
+                    for scene_number in scene_numbers
+                    if descriptions.get(scene_number)
+                }
+                self._save_camera_movements_bulk(project, results, prompt)
+                missing.extend(task for task in batch if task.get('scene_number') not in results)
+
+                for scene_number in results:
+                    yield {
+                        'type': 'camera_generated',
+                        'scene_number': scene_number,
+                        'sequence_number': scene_number,
+                    }
+
+            elif chunk['type'] == 'error':
+                # 批量请求失败不终止阶段,该批分镜回退为逐个生成
+                logger.warning(f"运镜批量请求失败, 分镜 {scene_numbers} 将逐个重试: {chunk['error']}")
+                missing.extend(batch)
+
+        return missing
+
+    def _build_camera_movement_batch_prompt(self, batch: List[Dict[str, Any]]) -> str:
+        """构建批量运镜请求的用户输入,要求模型返回 JSON 数组"""
+        sections = [
+            f'### 分镜 {task.get("scene_number")}\n{task.get("user_prompt", "")}'
+            for task in batch
+        ]
+        return (
+            f'## 用户输入\n以下共 {len(batch)} 个分镜，请分别为每个分镜生成运镜描述。\n\n'
+            + '\n\n'.join(sections)
+            + '\n\n## 输出格式\n'
+            '仅输出 JSON 数组，每个分镜对应一个元素: '
+            '[{"scene_number": 分镜序号, "description": "运镜描述"}]，不要输出其他内容。'
+        )
+
+    def _save_camera_movements_bulk(
+        self,
+        project: Project,
+        results: Dict[int, str],
+        prompt_used: str,
+    ) -> None:
+        """批量保存运镜结果: 已有运镜批量更新,其余批量创建"""
+        from apps.content.models import CameraMovement, Storyboard
+
+        if not results:
+            return
+
+        storyboards = {
+            storyboard.sequence_number: storyboard
+            for storyboard in Storyboard.objects.filter(
+                project=project,
+                sequence_number__in=list(results),
+            ).select_related('camera_movement')
+        }
+        provider = self._get_current_provider(project)
+        now = timezone.now()
+
+        to_create = []
+        to_update = []
+        for scene_number, description in results.items():
+            storyboard = storyboards.get(scene_number)
+            if not storyboard:
+                logger.error(f"未找到序号为 {scene_number} 的分镜")
+                continue
+
+            values = {
+                'movement_type': '',
+                'movement_params': {'description': description.strip()},
+                'model_provider': provider,
+                'prompt_used': prompt_used,
+                'generation_metadata': {'index': scene_number, 'batch': True},
+            }
+            camera = getattr(storyboard, 'camera_movement', None)
+            if camera:
+                for field, value in values.items():
+                    setattr(camera, field, value)
+                camera.updated_at = now
+                to_update.append(camera)
+            else:
+                to_create.append(CameraMovement(storyboard=storyboard, **values))
+
+        if to_create:
+            CameraMovement.objects.bulk_create(to_create)
+        if to_update:
+            CameraMovement.objects.bulk_update(
+                to_update,
+                ['movement_type', 'movement_params', 'model_provider', 'prompt_used', 'generation_metadata', 'updated_at'],
+            )
+
+    def _complete_task(
+        self,
+        project: Project,
+        stage: ProjectStage,
+        full_text: str,
+        prompt: str,
+        task: Dict[str, Any],
+        mark_completed: bool = True,
+    ) -> None:
+        """保存单个任务的生成结果并刷新阶段完成时间"""
+        self._save_result(
+            project, stage, full_text, prompt, {"index": task.get("scene_number", "")}
+        )
+
+        if not mark_completed:
+            return
+
+        # 更新阶段状态
+        ProjectStage.objects.filter(id=stage.id).update(
+            completed_at=timezone.now(),
+            status='completed'
+        )
+
+    def _fail_stage(self, stage: ProjectStage, error: str) -> Dict[str, Any]:
+        """将阶段标记为失败并返回错误事件"""
+        stage.status = 'failed'
+        stage.error_message = error
+        stage.save()
+
+        return {
+            'type': 'error',
+            'error': error,
+            'stage': {
+                'id': str(stage.id),
+                'status': 'failed',
+                'error_message': error
+            }
+        }
+
+    def _resolve_batch_size(self, client_params: Dict[str, Any]) -> int:
+        """解析批量生成的分镜数量(仅运镜阶段支持),0 表示不启用"""
+        try:
+            return max(int(client_params.get('batch_size') or 0), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _resolve_max_concurrency(self, client_params: Dict[str, Any]) -> int:
+        """解析并发生成数量(仅运镜阶段支持),最小为1"""
+        try:
+            return max(int(client_params.get('max_concurrency') or 1), 1)
+        except (TypeError, ValueError):
+            return 1
+
     def on_failure(self, context: PipelineContext, error: Exception):
         """失败处理"""
         try:
@@ -444,42 +793,8 @@ class LLMStageProcessor(StageProcessor):
         """获取AI客户端（使用动态执行器）"""
         from core.ai_client.factory import create_ai_client
 
-        # 获取项目模型配置
-        config = getattr(project, 'model_config', None)
-
-        provider = None
-
-        if config:
-            # 根据阶段类型获取对应的模型提供商
-            provider_field_map = {
-                'rewrite': 'rewrite_providers',
-                'asset_extraction': 'rewrite_providers',
-                'storyboard': 'storyboard_providers',
-                'camera_movement': 'camera_providers',
-            }
-
-            field_name = provider_field_map.get(self.stage_type)
-            if field_name:
-                providers = list(getattr(config, field_name).all())
-
-                if providers:
-                    # 简化版: 使用第一个提供商
-                    # TODO: 实现负载均衡策略
-                    provider = providers[0]
-
-        # 如果没有配置,尝试从提示词模板获取默认模型
-        if not provider:
-            template = self._get_prompt_template(project)
-            # template.model_provider已经通过select_related预加载,可以直接访问
-            if template and template.model_provider:
-                provider = template.model_provider
-
-        # 最后尝试获取系统默认提供商
-        if not provider:
-            provider = self._get_default_provider()
-
         # 使用工厂函数动态创建客户端
-        return create_ai_client(provider)
+        return create_ai_client(self._get_current_provider(project))
 
     def _get_default_provider(self) -> ModelProvider:
         """获取默认的LLM提供商"""
@@ -530,23 +845,9 @@ class LLMStageProcessor(StageProcessor):
             provider = self._get_current_provider(project)
 
             # 批量创建或更新分镜
-            for scene in scenes:
-                Storyboard.objects.update_or_create(
-                    project=project,
-                    sequence_number=scene['scene_number'],
-                    defaults={
-                        'scene_description': scene.get('shot_type', ''),
-                        'narration_text': scene.get('narration', ''),
-                        'image_prompt': scene.get('visual_prompt', ''),
-                        'duration_seconds': scene.get('duration', 3.0),
-                        'model_provider': provider,
-                        'prompt_used': prompt_used,
-                        'generation_metadata': {
-                            'shot_type': scene.get('shot_type', ''),
-                            'raw_scene_data': scene
-                        }
-                    }
-                )
+            with transaction.atomic():
+                for scene in scenes:
+                    self._save_storyboard_scene(project, scene, provider, prompt_used)
 
         elif self.stage_type == 'camera_movement':
             # 运镜生成: 保存到 CameraMovement 模型
@@ -579,39 +880,92 @@ class LLMStageProcessor(StageProcessor):
                 }
             )
 
+    def _save_storyboard_scene(
+        self,
+        project: Project,
+        scene: Dict[str, Any],
+        provider: Optional[ModelProvider],
+        prompt_used: str,
+    ) -> None:
+        """创建或更新单个分镜"""
+        from apps.content.models import Storyboard
+
+        Storyboard.objects.update_or_create(
+            project=project,
+            sequence_number=scene['scene_number'],
+            defaults={
+                'scene_description': scene.get('shot_type', ''),
+                'narration_text': scene.get('narration', ''),
+                'image_prompt': scene.get('visual_prompt', ''),
+                'duration_seconds': scene.get('duration', 3.0),
+                'model_provider': provider,
+                'prompt_used': prompt_used,
+                'generation_metadata': {
+                    'shot_type': scene.get('shot_type', ''),
+                    'raw_scene_data': scene
+                }
+            }
+        )
+
+    def _snapshot_storyboards(self, project: Project) -> Dict[int, Dict[str, Any]]:
+        """记录项目现有分镜的可被流式写入覆盖的字段"""
+        from apps.content.models import Storyboard
+
+        return {
+            row.pop('sequence_number'): row
+            for row in Storyboard.objects.filter(project=project).values(
+                'sequence_number', *STORYBOARD_STREAM_FIELDS
+            )
+        }
+
+    def _restore_streamed_storyboards(
+        self,
+        project: Optional[Project],
+        scene_numbers: set,
+        snapshot: Dict[int, Dict[str, Any]],
+    ) -> None:
+        """生成失败时撤销流式写入: 原有分镜恢复原值,新建的分镜删除"""
+        from apps.content.models import Storyboard
+
+        if project is None or not scene_numbers:
+            return
+        with transaction.atomic():
+            for scene_number in scene_numbers:
+                storyboards = Storyboard.objects.filter(project=project, sequence_number=scene_number)
+                if scene_number in snapshot:
+                    storyboards.update(**snapshot[scene_number])
+                else:
+                    storyboards.delete()
+        logger.info(f"分镜生成失败,已撤销流式写入的 {len(scene_numbers)} 个分镜: project_id={project.id}")
+
     def _get_current_provider(self, project: Project) -> Optional[ModelProvider]:
         """
         获取当前阶段使用的模型提供商
 
         优先级:
-        1. 项目模型配置
+        1. 项目模型配置(多个提供商时按负载均衡策略选择)
         2. 提示词模板配置
         3. 系统默认提供商
+
+        选中的提供商已熔断时切换到同类型的可用提供商,同一次执行内保持不变
         """
-        # 1. 从项目模型配置获取
-        config = getattr(project, 'model_config', None)
-
-        if config:
-            provider_field_map = {
-                'rewrite': 'rewrite_providers',
-                'asset_extraction': 'rewrite_providers',
-                'storyboard': 'storyboard_providers',
-                'camera_movement': 'camera_providers',
-            }
+        if project.pk not in self._routed_providers:
+            self._routed_providers[project.pk] = self._select_provider(project)
+        return self._routed_providers[project.pk]
 
-            field_name = provider_field_map.get(self.stage_type)
-            if field_name:
-                providers = list(getattr(config, field_name).all())
-                if providers:
-                    return providers[0]
+    def _select_provider(self, project: Project) -> Optional[ModelProvider]:
+        # 1. 从项目模型配置获取
+        provider = route_stage_provider(project, self.stage_type)
+        if provider:
+            return provider
 
         # 2. 从提示词模板获取
         template = self._get_prompt_template(project)
         if template and template.model_provider:
-            return template.model_provider
+            return get_failover_provider(template.model_provider)
 
         # 3. 获取系统默认提供商
-        return self._get_default_provider()
+        return get_failover_provider(self._get_default_provider())
     
     def _get_max_tokens(self) -> int:
         """获取最大token数(根据阶段类型)"""
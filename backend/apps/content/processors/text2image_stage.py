@@ -17,10 +17,14 @@ import requests
 from django.conf import settings
 from jinja2 import Template, TemplateError
 
+from core.ai_client.circuit import get_failover_provider, is_provider_available
 from core.ai_client.factory import create_ai_client
+from core.ai_client.hedging import HedgePolicy
 from core.ai_client.image_service import ImageGenerationService
+from core.ai_client.router import get_stage_providers, route_stage_provider
 from core.ai_client.schemas import Text2ImageRequest
 from core.pipeline.base import PipelineContext, StageProcessor
+from core.utils.concurrency import iter_bounded_concurrent
 from django.utils import timezone
 
 from apps.content.models import GeneratedImage, Storyboard
@@ -221,36 +225,49 @@ class Text2ImageStageProcessor(StageProcessor):
 
             # 获取AI客户端配置
             provider = self._get_text2image_provider(project)
+            max_concurrency = self._resolve_max_concurrency(project, provider)
+            # 项目配置了多个文生图模型时,每个分镜单独按负载均衡策略路由
+            stage_providers = get_stage_providers(project, self.stage_type)
 
-            # 批量生成图片
+            if max_concurrency > 1:
+                yield {
+                    'type': 'info',
+                    'message': f'并发生成图片，最大并发数 {max_concurrency}'
+                }
+
+            # 批量生成图片: 最多 max_concurrency 个请求在途，结果按完成顺序返回
             generated_count = 0
             failed_count = 0
+            finished_count = 0
+
+            def generate(storyboard_obj):
+                storyboard_dict = self._build_storyboard_dict(storyboard_obj)
+                item_provider = provider
+                if len(stage_providers) > 1:
+                    item_provider = route_stage_provider(project, self.stage_type, stage_providers)
+                # 提供商在执行过程中熔断时,尚未开始的分镜切换到同类型的可用提供商
+                item_provider = get_failover_provider(item_provider, stage_providers)
+                result = self._generate_single_image(
+                    project=project,
+                    storyboard=storyboard_dict,
+                    provider=item_provider
+                )
+                return storyboard_dict, item_provider, result
 
-            for index, storyboard_obj in enumerate(storyboards, 1):
-                try:
-                    # 构建分镜数据字典(兼容原有接口)
-                    storyboard_dict = {
-                        'scene_number': storyboard_obj.sequence_number,
-                        'narration': storyboard_obj.narration_text,
-                        'visual_prompt': storyboard_obj.image_prompt,
-                        'shot_type': storyboard_obj.scene_description
-                    }
+            for storyboard_obj, outcome, error in iter_bounded_concurrent(
+                storyboards,
+                generate,
+                max_workers=max_concurrency,
+                thread_name_prefix='text2image',
+            ):
+                finished_count += 1
+                sequence_number = storyboard_obj.sequence_number
 
-                    # 进度更新
-                    yield {
-                        'type': 'progress',
-                        'current': index,
-                        'total': total,
-                        'message': f'正在生成第 {index}/{total} 张图片...',
-                        'storyboard': storyboard_dict
-                    }
+                try:
+                    if error is not None:
+                        raise error
 
-                    # 生成图片
-                    result = self._generate_single_image(
-                        project=project,
-                        storyboard=storyboard_dict,
-                        provider=provider
-                    )
+                    storyboard_dict, item_provider, result = outcome
 
                     if result:
                         generated_count += 1
@@ -260,31 +277,41 @@ class Text2ImageStageProcessor(StageProcessor):
                             project=project,
                             stage=stage,
                             storyboard=storyboard_dict,
-                            result=result
+                            result=result,
+                            provider=item_provider
                         )
 
                         # 图片生成成功
                         yield {
                             'type': 'image_generated',
-                            'storyboard_id': storyboard_obj.sequence_number,
-                            'sequence_number': storyboard_obj.sequence_number,
+                            'storyboard_id': sequence_number,
+                            'sequence_number': sequence_number,
                         }
                     else:
                         failed_count += 1
                         yield {
                             'type': 'warning',
-                            'message': f'分镜 {storyboard_obj.sequence_number} 图片生成失败'
+                            'message': f'分镜 {sequence_number} 图片生成失败'
                         }
 
                 except Exception as e:
                     failed_count += 1
-                    logger.error(f"分镜 {index} 生成失败: {str(e)}")
+                    logger.error(f"分镜 {sequence_number} 生成失败: {str(e)}")
                     yield {
                         'type': 'error',
-                        'error': f'分镜 {index} 生成失败: {str(e)}',
-                        'storyboard_id': str(storyboard_obj.sequence_number)
+                        'error': f'分镜 {sequence_number} 生成失败: {str(e)}',
+                        'storyboard_id': str(sequence_number)
                     }
 
+                # 进度更新(按已完成数量计算)
+                yield {
+                    'type': 'progress',
+                    'current': finished_count,
+                    'total': total,
+                    'message': f'已完成 {finished_count}/{total} 张图片',
+                    'storyboard': {'scene_number': sequence_number},
+                }
+
             # 保存最终结果到阶段
             completed_storyboards = GeneratedImage.objects.filter(
                 storyboard__project=project,
@@ -354,12 +381,34 @@ class Text2ImageStageProcessor(StageProcessor):
 
     # ===== 私有辅助方法 =====
 
+    def _build_storyboard_dict(self, storyboard_obj: Storyboard) -> Dict[str, Any]:
+        """构建分镜数据字典(兼容原有接口)"""
+        return {
+            'scene_number': storyboard_obj.sequence_number,
+            'narration': storyboard_obj.narration_text,
+            'visual_prompt': storyboard_obj.image_prompt,
+            'shot_type': storyboard_obj.scene_description
+        }
+
+    def _resolve_max_concurrency(self, project: Project, provider: Optional[ModelProvider]) -> int:
+        """
+        解析文生图最大并发数
+
+        优先级: 模板 client_params > 模型 extra_config > 处理器默认值
+        """
+        client_params = self._resolve_generation_client_params(project, provider) if provider else {}
+        try:
+            return max(int(client_params.get('max_concurrency', self.max_concurrent)), 1)
+        except (TypeError, ValueError):
+            return self.max_concurrent
+
     def _save_result(
         self,
         project: Project,
         stage: ProjectStage,
         storyboard: dict,
-        result: List[Dict[str, Any]]
+        result: List[Dict[str, Any]],
+        provider: Optional[ModelProvider] = None
     ) -> None:
         """
         保存图片生成结果到 GeneratedImage 模型
@@ -369,6 +418,7 @@ class Text2ImageStageProcessor(StageProcessor):
             stage: 当前阶段对象(image_generation)
             storyboard: 分镜数据字典
             result: 生成的图片URL列表 [{"url": "...", "width": 1920, "height": 1080}]
+            provider: 实际生成图片的模型提供商(默认按阶段配置获取)
         """
         from apps.content.models import Storyboard as StoryboardModel, GeneratedImage
 
@@ -384,13 +434,18 @@ class Text2ImageStageProcessor(StageProcessor):
             return
 
         # 获取模型提供商
-        provider = self._get_text2image_provider(project)
+        if provider is None:
+            provider = self._get_text2image_provider(project)
 
         # 保存每张生成的图片
         for image_data in result:
             image_url = image_data.get('url', '')
             width = image_data.get('width', 0)
             height = image_data.get('height', 0)
+            image_provider = provider
+            hedge_info = image_data.get('hedge')
+            if hedge_info:
+                image_provider = ModelProvider.objects.filter(pk=hedge_info.get('provider_id')).first() or provider
 
             GeneratedImage.objects.create(
                 storyboard=storyboard_obj,
@@ -398,10 +453,10 @@ class Text2ImageStageProcessor(StageProcessor):
                 thumbnail_url='',
                 generation_params={
                     'prompt': storyboard.get('visual_prompt', ''),
-                    'model': provider.model_name if provider else '',
+                    'model': image_provider.model_name if image_provider else '',
                     'original_data': image_data
                 },
-                model_provider=provider,
+                model_provider=image_provider,
                 status='completed',
                 width=width,
                 height=height,
@@ -411,10 +466,15 @@ class Text2ImageStageProcessor(StageProcessor):
     def _get_text2image_provider(self, project: Project) -> Optional[ModelProvider]:
         """获取文生图模型提供商"""
 
-        # 1. 从提示词模板获取默认模型
+        # 1. 从项目模型配置获取(多个提供商时按负载均衡策略选择)
+        provider = route_stage_provider(project, self.stage_type)
+        if provider:
+            return provider
+
+        # 2. 从提示词模板获取默认模型(已熔断时切换到同类型的可用提供商)
         template = self._get_prompt_template(project)
         if template and template.model_provider:
-            return template.model_provider
+            return get_failover_provider(template.model_provider)
 
 
         return None
@@ -724,6 +784,33 @@ class Text2ImageStageProcessor(StageProcessor):
             runtime_overrides=runtime_overrides or {},
         )
             
+    def _build_hedge_policy(
+        self,
+        project: Project,
+        provider: ModelProvider,
+        client_params: Dict[str, Any],
+    ) -> Optional[HedgePolicy]:
+        """
+        构建对冲策略(client_params.hedge_enabled 开启时)
+
+        对冲目标优先选择项目为该阶段配置的其他可用提供商,没有时对同一提供商再发一次
+        """
+        if not client_params.get('hedge_enabled'):
+            return None
+
+        backup_provider = None
+        for candidate in get_stage_providers(project, self.stage_type):
+            if candidate.pk != provider.pk and is_provider_available(candidate):
+                backup_provider = candidate
+                break
+
+        return HedgePolicy(
+            budget_key=str(project.id),
+            budget=int(client_params.get('hedge_budget', 20) or 0),
+            delay=float(client_params.get('hedge_delay', 0) or 0),
+            backup_provider=backup_provider,
+        )
+
     def _generate_single_image(
         self,
         project: Project,
@@ -778,6 +865,7 @@ class Text2ImageStageProcessor(StageProcessor):
             response = ImageGenerationService.generate(
                 provider=provider,
                 client=client,
+                hedge=self._build_hedge_policy(project, provider, client_params),
                 request=Text2ImageRequest(
                     prompt=prompt,
                     negative_prompt=client_params.get('negative_prompt', ''),
@@ -828,6 +916,14 @@ class Text2ImageStageProcessor(StageProcessor):
             # [{"url": "http://"}]
             image_data = response_data
 
+            hedge_info = (getattr(response, 'metadata', None) or {}).get('hedge')
+            if hedge_info:
+                # 由对冲请求胜出时记录实际出图的提供商
+                image_data = [
+                    {**item, 'hedge': hedge_info} if isinstance(item, Mapping) else item
+                    for item in image_data
+                ]
+
             return image_data
 
         except Exception as e:
@@ -6,3 +6,6 @@ class ModelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.models'
     verbose_name = '模型管理'
+
+    def ready(self):
+        from . import signals
@@ -7,6 +7,7 @@
 from rest_framework import serializers
 from .models import ModelProvider, ModelUsageLog, VendorConnectionConfig
 from .vendor_catalog import VENDOR_CATALOG
+from core.redis.circuit_breaker import get_circuit_breaker
 
 
 class ModelProviderListSerializer(serializers.ModelSerializer):
@@ -20,13 +21,14 @@ class ModelProviderListSerializer(serializers.ModelSerializer):
     # 统计信息
     total_usage_count = serializers.SerializerMethodField()
     recent_usage_count = serializers.SerializerMethodField()
+    circuit_breaker = serializers.SerializerMethodField()
 
     class Meta:
         model = ModelProvider
         fields = [
             'id', 'name', 'provider_type', 'provider_type_display',
             'model_name', 'executor_class', 'is_active', 'priority',
-            'total_usage_count', 'recent_usage_count',
+            'total_usage_count', 'recent_usage_count', 'circuit_breaker',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -42,6 +44,10 @@ class ModelProviderListSerializer(serializers.ModelSerializer):
         seven_days_ago = timezone.now() - timedelta(days=7)
         return obj.usage_logs.filter(created_at__gte=seven_days_ago).count()
 
+    def get_circuit_breaker(self, obj):
+        """获取熔断状态(所有 Worker 共享)"""
+        return get_circuit_breaker().get_state(str(obj.id))
+
 
 class ModelProviderDetailSerializer(serializers.ModelSerializer):
     """模型提供商详情序列化器 - 完整信息"""
@@ -58,6 +64,7 @@ class ModelProviderDetailSerializer(serializers.ModelSerializer):
     success_rate = serializers.SerializerMethodField()
     avg_latency_ms = serializers.SerializerMethodField()
     total_tokens_used = serializers.SerializerMethodField()
+    circuit_breaker = serializers.SerializerMethodField()
 
     class Meta:
         model = ModelProvider
@@ -75,6 +82,8 @@ class ModelProviderDetailSerializer(serializers.ModelSerializer):
             # 统计信息
             'total_usage_count', 'success_count', 'failed_count',
             'success_rate', 'avg_latency_ms', 'total_tokens_used',
+            # 熔断状态
+            'circuit_breaker',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -116,6 +125,10 @@ class ModelProviderDetailSerializer(serializers.ModelSerializer):
         result = obj.usage_logs.aggregate(total_tokens=Sum('tokens_used'))
         return result['total_tokens'] or 0
 
+    def get_circuit_breaker(self, obj):
+        """获取熔断状态(所有 Worker 共享)"""
+        return get_circuit_breaker().get_state(str(obj.id))
+
 
 class ModelProviderCreateSerializer(serializers.ModelSerializer):
     """模型提供商创建序列化器"""
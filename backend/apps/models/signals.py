@@ -0,0 +1,15 @@
+"""模型应用信号"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.ai_client.factory import invalidate_ai_client_cache
+
+from .models import ModelProvider
+
+
+@receiver(post_save, sender=ModelProvider)
+@receiver(post_delete, sender=ModelProvider)
+def invalidate_provider_client_cache(sender, instance, **kwargs):
+    """模型配置变更或删除后失效进程内缓存的客户端"""
+    invalidate_ai_client_cache(instance.pk)
@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.ai_client.comfyui_client import ComfyUIClient
+from core.ai_client.polling import DurationModel, PollSchedule, poll_until
+
+
+class PollScheduleTestCase(SimpleTestCase):
+    def test_without_estimate_backs_off_from_poll_interval(self):
+        schedule = PollSchedule(None, base_interval=2, min_interval=1, max_interval=10, jitter=0)
+
+        delays = [schedule.next_delay(0) for _ in range(5)]
+
+        self.assertEqual(delays, [2, 3, 4.5, 6.75, 10])
+
+    def test_schedule_converges_on_expected_completion_window(self):
+        # 预计 60±6 秒完成: 窗口 [54, 66]
+        schedule = PollSchedule((60, 6), min_interval=1, max_interval=30, jitter=0)
+
+        self.assertEqual(schedule.next_delay(0), 27)
+        self.assertEqual(schedule.next_delay(50), 2)
+        self.assertEqual(schedule.next_delay(55), 1)
+        self.assertEqual(schedule.next_delay(70), 2)
+        self.assertEqual(schedule.next_delay(72), 4)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PollUntilTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_completed_tasks_train_duration_model(self):
+        model = DurationModel()
+        for _ in range(3):
+            model.record('video-api:model-a', 40)
+
+        mean, dev = model.estimate('video-api:model-a')
+        self.assertAlmostEqual(mean, 40)
+        # 偏差从均值的 25% 开始,耗时稳定后逐步收窄
+        self.assertAlmostEqual(dev, 4.9)
+        self.assertIsNone(model.estimate('video-api:model-b'))
+
+    def test_poll_until_returns_result_and_records_duration(self):
+        results = iter([None, None, {'url': 'https://video.example.com/1.mp4'}])
+
+        with patch('core.ai_client.polling.time.sleep') as sleep:
+            result = poll_until(lambda: next(results), key='video-api:model-c', poll_interval=1)
+
+        self.assertEqual(result['url'], 'https://video.example.com/1.mp4')
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(cache.get('ai_story:poll_duration:video-api:model-c')['samples'], 1)
+
+    def test_comfyui_history_polling_reports_estimated_progress(self):
+        client = ComfyUIClient(api_url='http://127.0.0.1:8188', api_key='', model_name='model.safetensors')
+        model = DurationModel()
+        for _ in range(3):
+            model.record(f'comfyui:{client.server_address}:video', 40)
+        histories = iter([{}, {}, {'p1': {'status': {'completed': True}, 'outputs': {'9': {}}}}])
+        ticks = iter(range(1000, 2000, 5))
+        reported = []
+
+        with patch.object(client, '_get_history', side_effect=lambda prompt_id: next(histories)), \
+                patch('core.ai_client.polling.time.sleep'), \
+                patch('time.time', side_effect=lambda: float(next(ticks))):
+            client._wait_for_history('p1', started_at=1000.0, progress_callback=reported.append)
+
+        self.assertEqual(len(reported), 3)
+        self.assertEqual(reported, sorted(reported))
+        self.assertTrue(all(15 < value < 95 for value in reported))
@@ -0,0 +1,135 @@
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+
+from apps.models.models import ModelProvider
+from core.ai_client.base import AIResponse
+from core.ai_client.circuit import CircuitOpenError, apply_circuit_breaker, get_failover_provider
+from core.redis.circuit_breaker import ProviderCircuitBreaker
+
+
+User = get_user_model()
+
+
+class CountingBreaker:
+    """连续失败达到阈值即熔断的假熔断器"""
+
+    def __init__(self, threshold=2, open_ids=()):
+        self.threshold = threshold
+        self.failures = {}
+        self.records = []
+        self.open_ids = set(open_ids)
+
+    def before_call(self, provider_id):
+        if provider_id in self.open_ids:
+            raise CircuitOpenError(provider_id, 30)
+
+    def record(self, provider_id, success, latency, timeout=None):
+        self.records.append((provider_id, success))
+        self.failures[provider_id] = 0 if success else self.failures.get(provider_id, 0) + 1
+        if self.failures[provider_id] >= self.threshold:
+            self.open_ids.add(provider_id)
+
+    def is_available(self, provider_id):
+        return provider_id not in self.open_ids
+
+    def get_state(self, provider_id):
+        return {'state': 'open' if provider_id in self.open_ids else 'closed', 'available': True}
+
+
+def create_provider(name, provider_type='text2image', priority=0):
+    return ModelProvider.objects.create(
+        name=name,
+        provider_type=provider_type,
+        api_url=f'https://{name}.example.com/v1',
+        api_key='test-key',
+        model_name=f'{name}-model',
+        priority=priority,
+    )
+
+
+class ClientCircuitBreakerTestCase(TestCase):
+    def test_failed_calls_open_circuit_and_later_calls_fail_fast(self):
+        provider = create_provider('breaker-image')
+        breaker = CountingBreaker(threshold=2)
+        client = Mock(spec=['generate'])
+        client.generate.return_value = AIResponse(success=False, error='timeout')
+        apply_circuit_breaker(client, provider)
+        raw_generate = client.generate.__wrapped__
+
+        with patch('core.ai_client.circuit.get_circuit_breaker', return_value=breaker):
+            client.generate('画面1')
+            client.generate('画面2')
+            with self.assertRaises(CircuitOpenError):
+                client.generate('画面3')
+
+        self.assertEqual(raw_generate.call_count, 2)
+        self.assertEqual(breaker.records, [(str(provider.pk), False), (str(provider.pk), False)])
+
+    def test_stream_error_chunk_is_recorded_as_failure(self):
+        provider = create_provider('breaker-llm', provider_type='llm')
+        breaker = CountingBreaker(threshold=5)
+
+        class StreamClient:
+            def generate_stream(self, prompt):
+                yield {'type': 'token', 'content': 'a'}
+                yield {'type': 'error', 'error': 'upstream reset'}
+
+        with patch('core.ai_client.circuit.get_circuit_breaker', return_value=breaker):
+            client = apply_circuit_breaker(StreamClient(), provider)
+            list(client.generate_stream('x'))
+
+        self.assertEqual(breaker.records, [(str(provider.pk), False)])
+
+    def test_failover_picks_available_provider_of_same_type(self):
+        primary = create_provider('primary-image', priority=10)
+        backup = create_provider('backup-image', priority=5)
+        other_type = create_provider('other-llm', provider_type='llm', priority=99)
+        ModelProvider.objects.exclude(pk__in=[primary.pk, backup.pk, other_type.pk]).update(is_active=False)
+        breaker = CountingBreaker(open_ids={str(primary.pk)})
+
+        with patch('core.ai_client.circuit.get_circuit_breaker', return_value=breaker):
+            self.assertEqual(get_failover_provider(primary), backup)
+            breaker.open_ids.add(str(backup.pk))
+            self.assertEqual(get_failover_provider(primary), primary)
+
+
+class ProviderCircuitBreakerTestCase(SimpleTestCase):
+    def test_slow_successful_call_counts_as_failure(self):
+        redis_client = Mock()
+        script = redis_client.register_script.return_value
+        script.return_value = 'closed'
+        breaker = ProviderCircuitBreaker(redis_client=redis_client)
+
+        breaker.record('p1', success=True, latency=50, timeout=60)
+        breaker.record('p1', success=True, latency=5, timeout=60)
+
+        self.assertEqual([call.kwargs['args'][0] for call in script.call_args_list], [1, 0])
+
+    def test_open_circuit_rejects_call_with_retry_after(self):
+        redis_client = Mock()
+        redis_client.register_script.return_value.return_value = [0, 'open', '12.5']
+        breaker = ProviderCircuitBreaker(redis_client=redis_client)
+
+        with self.assertRaises(CircuitOpenError) as context:
+            breaker.before_call('p1')
+
+        self.assertEqual(context.exception.retry_after, 12.5)
+
+
+class ProviderCircuitStateApiTestCase(APITestCase):
+    def test_provider_list_includes_circuit_state(self):
+        user = User.objects.create_user(username='circuit-api-user', password='secret123')
+        self.client.force_authenticate(user)
+        provider = create_provider('api-image')
+        breaker = CountingBreaker(open_ids={str(provider.pk)})
+
+        with patch('apps.models.serializers.get_circuit_breaker', return_value=breaker):
+            response = self.client.get('/api/v1/models/providers/', {'provider_type': 'text2image'})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data.get('results', response.data)
+        states = {item['name']: item['circuit_breaker']['state'] for item in results}
+        self.assertEqual(states['api-image'], 'open')
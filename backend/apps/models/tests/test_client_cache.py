@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.models.models import ModelProvider
+from core.ai_client.factory import create_ai_client
+
+
+class AIClientCacheTestCase(TestCase):
+    def setUp(self):
+        self.provider = ModelProvider.objects.create(
+            name='缓存测试LLM',
+            provider_type='llm',
+            api_url='https://llm.example.com/v1/chat/completions',
+            api_key='test-key',
+            model_name='llm-model',
+            executor_class='core.ai_client.openai_client.OpenAIClient',
+        )
+
+    def test_client_is_reused_until_provider_is_saved(self):
+        client = create_ai_client(self.provider)
+
+        self.assertIs(create_ai_client(ModelProvider.objects.get(pk=self.provider.pk)), client)
+
+        self.provider.model_name = 'llm-model-v2'
+        self.provider.save()
+        refreshed = create_ai_client(self.provider)
+
+        self.assertIsNot(refreshed, client)
+        self.assertEqual(refreshed.model_name, 'llm-model-v2')
+
+    def test_update_without_signal_is_detected_by_updated_at(self):
+        client = create_ai_client(self.provider)
+
+        # 模拟其他进程修改配置: 本进程不会收到 post_save 信号
+        ModelProvider.objects.filter(pk=self.provider.pk).update(
+            model_name='llm-model-v3',
+            updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        refreshed = create_ai_client(ModelProvider.objects.get(pk=self.provider.pk))
+
+        self.assertIsNot(refreshed, client)
+        self.assertEqual(refreshed.model_name, 'llm-model-v3')
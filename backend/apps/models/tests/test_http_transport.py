@@ -0,0 +1,94 @@
+import threading
+from http.client import HTTPMessage
+from unittest.mock import Mock, patch
+
+import requests
+from requests.cookies import extract_cookies_to_jar
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from core.utils.http_transport import HttpTransport
+
+
+User = get_user_model()
+
+
+class HttpTransportTestCase(SimpleTestCase):
+    @patch.object(requests.Session, 'request')
+    def test_sessions_are_pooled_per_host_and_counted(self, mock_request):
+        mock_request.return_value = Mock(status_code=200)
+        transport = HttpTransport(connect_timeout=3, read_timeout=30)
+
+        transport.post('https://api.example.com/v1/chat', json={})
+        transport.get('https://api.example.com/v1/models', timeout=5)
+        transport.get('http://cdn.example.com/a.png')
+
+        self.assertIs(
+            transport._get_session('https://api.example.com:443').get_adapter('https://api.example.com:443'),
+            transport._adapters['https://api.example.com:443'],
+        )
+        self.assertEqual(
+            set(transport._adapters),
+            {'https://api.example.com:443', 'http://cdn.example.com:80'},
+        )
+        self.assertEqual(mock_request.call_args_list[0].kwargs['timeout'], (3, 30))
+        self.assertEqual(mock_request.call_args_list[1].kwargs['timeout'], 5)
+
+        stats = transport.stats()
+        self.assertEqual(stats['hosts']['https://api.example.com:443']['requests'], 2)
+        self.assertEqual(stats['hosts']['http://cdn.example.com:80']['in_flight'], 0)
+
+    @patch.object(requests.Session, 'request', side_effect=requests.ConnectionError('refused'))
+    def test_errors_are_recorded_and_reraised(self, mock_request):
+        transport = HttpTransport()
+
+        with self.assertRaises(requests.ConnectionError):
+            transport.get('https://api.example.com/v1/models')
+
+        self.assertEqual(transport.stats()['hosts']['https://api.example.com:443']['errors'], 1)
+
+    def test_threads_share_the_pool_but_not_sessions_or_cookies(self):
+        transport = HttpTransport()
+        host_key = 'https://api.example.com:443'
+        main_session = transport._get_session(host_key)
+        results = {}
+
+        def worker():
+            results['session'] = transport._get_session(host_key)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(results['session'], main_session)
+        self.assertIs(results['session'].get_adapter(host_key), main_session.get_adapter(host_key))
+
+        headers = HTTPMessage()
+        headers['Set-Cookie'] = 'session=tenant-a; Path=/'
+        raw = Mock(_original_response=Mock(msg=headers))
+        request = requests.Request('GET', 'https://api.example.com/v1/models').prepare()
+        extract_cookies_to_jar(main_session.cookies, request, raw)
+
+        self.assertEqual(len(main_session.cookies), 0)
+
+    def test_post_is_not_retried_on_read_errors(self):
+        transport = HttpTransport(max_retries=3)
+        session = transport._get_session('https://api.example.com:443')
+        retry = session.get_adapter('https://api.example.com:443').max_retries
+
+        self.assertEqual(retry.connect, 3)
+        self.assertFalse(retry._is_method_retryable('POST'))
+        self.assertTrue(retry._is_method_retryable('GET'))
+
+
+class TransportStatsApiTestCase(APITestCase):
+    def test_transport_stats_endpoint_returns_pool_snapshot(self):
+        user = User.objects.create_user(username='transport-user', password='secret123')
+        self.client.force_authenticate(user)
+
+        response = self.client.get('/api/v1/models/providers/transport_stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hosts', response.data)
+        self.assertIn('pool_maxsize', response.data['config'])
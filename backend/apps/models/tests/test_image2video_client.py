@@ -2,12 +2,12 @@ from unittest.mock import Mock, patch
 
 from django.test import SimpleTestCase
 
-from core.ai_client.image2video_client import VideoGeneratorClient
+from core.ai_client.image2video_client import VideoGeneratorClient, VideoTaskFailedError
 from core.ai_client.volcengine_image2video_client import VolcengineImage2VideoClient
 
 
 class VideoGeneratorClientTestCase(SimpleTestCase):
-    @patch('core.ai_client.image2video_client.requests.post')
+    @patch('core.ai_client.image2video_client.http_post')
     def test_chat_completions_endpoint_extracts_video_url(self, mock_post):
         mock_response = Mock()
         mock_response.raise_for_status.return_value = None
@@ -51,7 +51,7 @@ class VideoGeneratorClientTestCase(SimpleTestCase):
             mock_post.call_args.kwargs['json']['messages'][0]['content'][0]['text'],
         )
 
-    @patch('core.ai_client.image2video_client.requests.post')
+    @patch('core.ai_client.image2video_client.http_post')
     def test_video_generations_endpoint_keeps_original_url(self, mock_post):
         mock_response = Mock()
         mock_response.raise_for_status.return_value = None
@@ -94,7 +94,7 @@ class VideoGeneratorClientTestCase(SimpleTestCase):
 
     @patch('core.ai_client.image2video_client.VideoGeneratorClient._localize_video_data', side_effect=lambda data, timeout: data)
     @patch('core.ai_client.image2video_client.Path.read_bytes', return_value=b'local-image-bytes')
-    @patch('core.ai_client.image2video_client.requests.post')
+    @patch('core.ai_client.image2video_client.http_post')
     def test_chat_completions_endpoint_reads_storage_image_as_base64(self, mock_post, mock_read_bytes, mock_localize):
         post_response = Mock()
         post_response.raise_for_status.return_value = None
@@ -132,8 +132,8 @@ class VideoGeneratorClientTestCase(SimpleTestCase):
 
 class VolcengineImage2VideoClientTestCase(SimpleTestCase):
     @patch('core.ai_client.volcengine_image2video_client.VideoGeneratorClient._localize_video_data', side_effect=lambda data, timeout: data)
-    @patch('core.ai_client.volcengine_image2video_client.requests.get')
-    @patch('core.ai_client.volcengine_image2video_client.requests.post')
+    @patch('core.ai_client.volcengine_image2video_client.http_get')
+    @patch('core.ai_client.volcengine_image2video_client.http_post')
     def test_generate_video_uses_volc_task_api(self, mock_post, mock_get, mock_localize):
         create_response = Mock()
         create_response.raise_for_status.return_value = None
@@ -227,3 +227,28 @@ class VolcengineImage2VideoClientTestCase(SimpleTestCase):
 
         self.assertIn('连续查询异常达到 2 次', str(exc.exception))
         self.assertEqual(mock_get_task.call_count, 2)
+
+    @patch('core.ai_client.volcengine_image2video_client.VideoGeneratorClient._localize_video_data', side_effect=lambda data, timeout: data)
+    def test_check_video_task_reports_running_success_and_failure(self, mock_localize):
+        client = VolcengineImage2VideoClient(
+            api_url='https://ark.cn-beijing.volces.com/api/v3/contents/generations/tasks',
+            api_token='secret',
+            model='doubao-seedance-1-5-pro-251215',
+        )
+
+        with patch.object(client, '_get_volc_task', return_value={'status': 'running'}):
+            self.assertIsNone(client.check_video_task('task-123'))
+
+        with patch.object(
+            client,
+            '_get_volc_task',
+            return_value={'status': 'succeeded', 'content': {'video_url': 'https://example.com/generated.mp4'}},
+        ):
+            result = client.check_video_task('task-123')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data'], [{'url': 'https://example.com/generated.mp4'}])
+        self.assertEqual(result['metadata']['task_id'], 'task-123')
+
+        with patch.object(client, '_get_volc_task', return_value={'status': 'failed', 'message': 'quota'}):
+            with self.assertRaises(VideoTaskFailedError):
+                client.check_video_task('task-123')
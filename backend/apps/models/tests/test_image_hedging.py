@@ -0,0 +1,77 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.ai_client.base import AIResponse
+from core.ai_client.hedging import HedgePolicy, LatencyTracker, resolve_hedge_delay
+from core.ai_client.image_service import ImageGenerationService
+from core.ai_client.schemas import Text2ImageRequest
+
+
+class FakeImageClient:
+    """按给定耗时返回固定图片的假客户端"""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.calls = 0
+        self.released = threading.Event()
+
+    def generate_from_text2image_request(self, request):
+        self.calls += 1
+        self.released.wait(self.delay)
+        return AIResponse(success=True, data=[{'url': f'https://img.example.com/{self.name}.png'}])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ImageHedgingTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.primary = SimpleNamespace(pk='primary', name='primary', timeout=60)
+        self.backup = SimpleNamespace(pk='backup', name='backup', timeout=60)
+        self.request = Text2ImageRequest(prompt='雨夜街道')
+
+    def generate(self, primary_client, backup_client, policy):
+        with patch('core.ai_client.image_service.create_ai_client', return_value=backup_client):
+            return ImageGenerationService.generate(
+                provider=self.primary,
+                client=primary_client,
+                request=self.request,
+                hedge=policy,
+            )
+
+    def test_slow_primary_is_hedged_to_backup_provider(self):
+        primary_client = FakeImageClient('primary', delay=5)
+        backup_client = FakeImageClient('backup')
+        policy = HedgePolicy(budget_key='project-1', budget=1, delay=0.05, backup_provider=self.backup)
+
+        response = self.generate(primary_client, backup_client, policy)
+        primary_client.released.set()
+
+        self.assertEqual(response.data[0]['url'], 'https://img.example.com/backup.png')
+        self.assertEqual(response.metadata['hedge']['provider_id'], 'backup')
+        self.assertEqual(cache.get('ai_story:hedge_budget:project-1'), 1)
+
+    def test_exhausted_budget_waits_for_primary(self):
+        primary_client = FakeImageClient('primary', delay=0.2)
+        backup_client = FakeImageClient('backup')
+        policy = HedgePolicy(budget_key='project-2', budget=0, delay=0.05, backup_provider=self.backup)
+
+        response = self.generate(primary_client, backup_client, policy)
+
+        self.assertEqual(response.data[0]['url'], 'https://img.example.com/primary.png')
+        self.assertEqual(backup_client.calls, 0)
+        self.assertNotIn('hedge', response.metadata)
+
+    def test_delay_defaults_to_provider_latency_percentile(self):
+        tracker = LatencyTracker()
+        tracker._seeded.update({'primary', 'backup'})
+        for latency in range(1, 21):
+            tracker.record('primary', float(latency))
+
+        with patch('core.ai_client.hedging.get_latency_tracker', return_value=tracker):
+            self.assertEqual(resolve_hedge_delay(HedgePolicy(budget_key='p'), self.primary), 19.0)
+            self.assertIsNone(resolve_hedge_delay(HedgePolicy(budget_key='p'), self.backup))
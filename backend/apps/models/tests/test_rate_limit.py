@@ -0,0 +1,112 @@
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+
+from apps.models.models import ModelProvider
+from core.ai_client.factory import create_ai_client
+from core.ai_client.image2video_client import VideoGeneratorClient
+from core.ai_client.rate_limit import RateLimitExceeded, apply_rate_limit, rate_limit_policy
+from core.redis.rate_limiter import ProviderRateLimiter
+
+
+User = get_user_model()
+
+
+class RecordingLimiter:
+    """记录预约调用的假限流器"""
+
+    def __init__(self, retry_after=None):
+        self.calls = []
+        self.retry_after = retry_after
+
+    def reserve(self, provider_id, rpm, rpd, max_wait=None):
+        self.calls.append((provider_id, rpm, rpd, max_wait))
+        if self.retry_after is not None and max_wait == 0:
+            raise RateLimitExceeded(provider_id, self.retry_after)
+        return 0.0
+
+    def acquire(self, provider_id, rpm, rpd, max_wait=None):
+        return self.reserve(provider_id, rpm, rpd, max_wait=max_wait)
+
+
+class ClientRateLimitTestCase(TestCase):
+    def setUp(self):
+        self.provider = ModelProvider.objects.create(
+            name='限流测试视频',
+            provider_type='image2video',
+            api_url='https://video.example.com/v1/video/generations',
+            api_key='test-key',
+            model_name='video-model',
+            executor_class='core.ai_client.image2video_client.VideoGeneratorClient',
+            rate_limit_rpm=10,
+            rate_limit_rpd=100,
+        )
+
+    def test_nested_entry_points_reserve_quota_once(self):
+        limiter = RecordingLimiter()
+
+        with patch('core.ai_client.rate_limit.get_rate_limiter', return_value=limiter), \
+                patch.object(VideoGeneratorClient, 'create_video_task', return_value={'task_id': 'task-1'}):
+            client = create_ai_client(self.provider)
+            client.submit_video_task('推近镜头')
+
+        self.assertEqual(limiter.calls, [(str(self.provider.pk), 10, 100, None)])
+
+    def test_fail_fast_policy_raises_when_quota_is_exhausted(self):
+        limiter = RecordingLimiter(retry_after=4.2)
+        client = apply_rate_limit(Mock(spec=['generate']), self.provider)
+
+        with patch('core.ai_client.rate_limit.get_rate_limiter', return_value=limiter):
+            with rate_limit_policy(wait=False):
+                with self.assertRaises(RateLimitExceeded) as ctx:
+                    client.generate(prompt='测试')
+
+        self.assertEqual(ctx.exception.retry_after, 4.2)
+
+
+class ProviderRateLimiterTestCase(SimpleTestCase):
+    def test_reservation_result_is_translated_to_wait_or_error(self):
+        limiter = ProviderRateLimiter(redis_client=Mock())
+        limiter._script = Mock(side_effect=[[1, '1.5', '-0.5', '98'], [0, '7.0', '-1.0', '97']])
+
+        self.assertEqual(limiter.reserve('p1', 10, 100), 1.5)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.reserve('p1', 10, 100, max_wait=0)
+
+    def test_unavailable_redis_lets_requests_through(self):
+        import redis
+
+        limiter = ProviderRateLimiter(redis_client=Mock())
+        limiter._script = Mock(side_effect=redis.ConnectionError('down'))
+
+        self.assertEqual(limiter.reserve('p1', 10, 100), 0.0)
+        self.assertIsNone(limiter._get_client())
+
+
+class RateLimitBudgetApiTestCase(APITestCase):
+    def test_budget_endpoint_reports_remaining_quota(self):
+        user = User.objects.create_user(username='rate-limit-user', password='secret123')
+        self.client.force_authenticate(user)
+        provider = ModelProvider.objects.create(
+            name='配额测试LLM',
+            provider_type='llm',
+            api_url='https://llm.example.com/v1/chat/completions',
+            api_key='test-key',
+            model_name='llm-model',
+            executor_class='core.ai_client.openai_client.OpenAIClient',
+            rate_limit_rpm=60,
+            rate_limit_rpd=1000,
+        )
+        redis_client = Mock()
+        redis_client.time.return_value = (1000, 0)
+        redis_client.hmget.side_effect = [('10', '970'), (None, None)]
+
+        with patch('apps.models.views.get_rate_limiter', return_value=ProviderRateLimiter(redis_client)):
+            response = self.client.get(f'/api/v1/models/providers/{provider.pk}/rate_limit/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rpm_remaining'], 40)
+        self.assertEqual(response.data['rpd_remaining'], 1000)
+        self.assertTrue(response.data['available'])
@@ -6,7 +6,7 @@ from core.ai_client.text2image_client import Text2ImageClient
 
 
 class Text2ImageClientTestCase(SimpleTestCase):
-    @patch('core.ai_client.text2image_client.requests.post')
+    @patch('core.ai_client.text2image_client.http_post')
     def test_images_generations_endpoint_includes_image_array(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 200
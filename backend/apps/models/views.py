@@ -28,6 +28,9 @@ from .serializers import (
     VendorConnectionConfigQuerySerializer,
 )
 from .services import ModelProviderService, ModelUsageLogService
+from core.redis.circuit_breaker import get_circuit_breaker
+from core.redis.rate_limiter import get_rate_limiter
+from core.utils.http_transport import get_http_transport
 
 
 class ModelProviderViewSet(viewsets.ModelViewSet):
@@ -151,6 +154,25 @@ class ModelProviderViewSet(viewsets.ModelViewSet):
 
         return Response(stats)
 
+    @action(detail=True, methods=['get'])
+    def rate_limit(self, request, pk=None):
+        """
+        获取模型提供商当前剩余的限流配额(所有 Worker 共享)
+        GET /api/v1/models/providers/{id}/rate_limit/
+        """
+        instance = self.get_object()
+        return Response(get_rate_limiter().get_budget(instance))
+
+    @action(detail=True, methods=['post'])
+    def reset_circuit(self, request, pk=None):
+        """
+        手动关闭模型提供商熔断
+        POST /api/v1/models/providers/{id}/reset_circuit/
+        """
+        instance = self.get_object()
+        get_circuit_breaker().reset(str(instance.id))
+        return Response(get_circuit_breaker().get_state(str(instance.id)))
+
     @action(detail=True, methods=['post'])
     def test_connection(self, request, pk=None):
         """
@@ -290,6 +312,14 @@ class ModelProviderViewSet(viewsets.ModelViewSet):
             'results': serializer.data
         })
 
+    @action(detail=False, methods=['get'])
+    def transport_stats(self, request):
+        """
+        获取当前进程的HTTP连接池统计(按主机)
+        GET /api/v1/models/providers/transport_stats/
+        """
+        return Response(get_http_transport().stats())
+
     @action(detail=False, methods=['get'])
     def executor_choices(self, request):
         """
@@ -0,0 +1,70 @@
+"""项目实时进度服务。
+
+优先读取发布器维护的Redis进度快照 (O(1)),快照不存在时回退到 ProjectStage 记录。
+暂停、重置、重试与队列恢复只修改数据库,因此阶段状态与流程状态始终以数据库为准,
+快照只提供数量、当前处理项等细粒度进度。
+"""
+
+import logging
+from typing import Any, Dict
+
+from core.redis.progress import read_progress_snapshot
+
+from .models import Project, ProjectStage
+
+logger = logging.getLogger(__name__)
+
+
+def build_progress_from_db(project: Project) -> Dict[str, Any]:
+    """按 ProjectStage 记录构造与快照同结构的进度 (无数量信息)"""
+    stages = {}
+    for stage in ProjectStage.objects.filter(project=project).only(
+        'stage_type', 'status', 'error_message', 'completed_at'
+    ):
+        entry = {'status': stage.status}
+        if stage.error_message:
+            entry['last_error'] = stage.error_message
+        if stage.status == 'completed':
+            entry['progress'] = 100
+        stages[stage.stage_type] = entry
+
+    pipeline = {}
+    if project.status in ('completed', 'failed'):
+        pipeline['status'] = project.status
+
+    return {'stages': stages, 'pipeline': pipeline, 'updated_at': None, 'source': 'database'}
+
+
+def _apply_db_status(snapshot: Dict[str, Any], project: Project) -> Dict[str, Any]:
+    """用数据库中的阶段/流程状态覆盖快照中的状态字段"""
+    database = build_progress_from_db(project)
+    for stage_type, entry in database['stages'].items():
+        stage = snapshot['stages'].setdefault(stage_type, {})
+        stage['status'] = entry['status']
+        if 'last_error' in entry:
+            stage['last_error'] = entry['last_error']
+        else:
+            stage.pop('last_error', None)
+        if entry['status'] == 'completed':
+            stage['progress'] = 100
+
+    pipeline = database['pipeline']
+    if pipeline.get('status') == 'failed' and snapshot['pipeline'].get('error'):
+        pipeline['error'] = snapshot['pipeline']['error']
+    snapshot['pipeline'] = pipeline
+    return snapshot
+
+
+def get_project_progress(project: Project) -> Dict[str, Any]:
+    """
+    获取项目实时进度
+
+    Returns:
+        {'stages': {stage: {...}}, 'pipeline': {...}, 'updated_at': ..., 'source': 'redis'|'database'}
+    """
+    snapshot = read_progress_snapshot(str(project.id))
+    if snapshot is not None:
+        snapshot = _apply_db_status(snapshot, project)
+        snapshot['source'] = 'redis'
+        return snapshot
+    return build_progress_from_db(project)
@@ -0,0 +1,146 @@
+"""分集任务队列位置索引。
+
+每个作品一个 Redis 有序集合,成员为活跃 (waiting/running) 队列任务ID,分值为创建时间,
+队列位置即 ZRANK + 1 (O(log n)),一页内的所有位置通过一次 pipeline 批量读取。
+
+- 入队时加入,任务进入完成/失败/取消时移除 (均在数据库事务提交之后)
+- 查询时发现活跃任务不在索引中,按数据库重建该作品的索引后重新读取
+- Redis 不可用时回退到数据库 COUNT 查询
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from core.redis.pool import get_redis_client
+
+from .models import EpisodeTaskQueue
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_QUEUE_STATUSES = ['waiting', 'running']
+
+
+def get_queue_index_key(series_id) -> str:
+    return f"ai_story:queue:series:{series_id}"
+
+
+def _score(queue_task: EpisodeTaskQueue) -> float:
+    return queue_task.created_at.timestamp()
+
+
+def index_queue_task(queue_task: EpisodeTaskQueue) -> None:
+    """将活跃队列任务加入索引 (重复加入无副作用)"""
+    try:
+        get_redis_client('cache').zadd(
+            get_queue_index_key(queue_task.series_id), {str(queue_task.id): _score(queue_task)}
+        )
+    except Exception as e:
+        logger.warning(f"更新队列索引失败: queue_task={queue_task.id}, error={str(e)}")
+
+
+def unindex_queue_task(queue_task: EpisodeTaskQueue) -> None:
+    """将已结束的队列任务移出索引"""
+    try:
+        get_redis_client('cache').zrem(get_queue_index_key(queue_task.series_id), str(queue_task.id))
+    except Exception as e:
+        logger.warning(f"更新队列索引失败: queue_task={queue_task.id}, error={str(e)}")
+
+
+def rebuild_series_index(series_id) -> None:
+    """按数据库重建作品的队列索引"""
+    members = {
+        str(task_id): created_at.timestamp()
+        for task_id, created_at in EpisodeTaskQueue.objects.filter(
+            series_id=series_id,
+            status__in=ACTIVE_QUEUE_STATUSES,
+        ).values_list('id', 'created_at')
+    }
+    key = get_queue_index_key(series_id)
+    pipe = get_redis_client('cache').pipeline(transaction=True)
+    pipe.delete(key)
+    if members:
+        pipe.zadd(key, members)
+    pipe.execute()
+    logger.info(f"重建队列索引: series_id={series_id}, 活跃任务={len(members)}")
+
+
+def _read_ranks(queue_tasks: List[EpisodeTaskQueue]) -> List[Optional[int]]:
+    pipe = get_redis_client('cache').pipeline(transaction=False)
+    for queue_task in queue_tasks:
+        pipe.zrank(get_queue_index_key(queue_task.series_id), str(queue_task.id))
+    return pipe.execute()
+
+
+def _count_position(queue_task: EpisodeTaskQueue) -> int:
+    return (
+        EpisodeTaskQueue.objects.filter(
+            series_id=queue_task.series_id,
+            status__in=ACTIVE_QUEUE_STATUSES,
+            created_at__lt=queue_task.created_at,
+        ).count() + 1
+    )
+
+
+def get_queue_positions(queue_tasks: Iterable[EpisodeTaskQueue]) -> Dict[str, int]:
+    """
+    批量获取活跃队列任务的位置
+
+    Args:
+        queue_tasks: 活跃 (waiting/running) 队列任务
+
+    Returns:
+        {queue_task_id(str): 位置(从1开始)}
+    """
+    queue_tasks = [task for task in queue_tasks if task.status in ACTIVE_QUEUE_STATUSES]
+    if not queue_tasks:
+        return {}
+
+    try:
+        ranks = _read_ranks(queue_tasks)
+        missing_series = {
+            task.series_id for task, rank in zip(queue_tasks, ranks) if rank is None
+        }
+        if missing_series:
+            for series_id in missing_series:
+                rebuild_series_index(series_id)
+            ranks = _read_ranks(queue_tasks)
+    except Exception as e:
+        logger.warning(f"读取队列索引失败,回退到数据库: {str(e)}")
+        return {str(task.id): _count_position(task) for task in queue_tasks}
+
+    positions = {}
+    for task, rank in zip(queue_tasks, ranks):
+        # 重建后仍不在索引中 (并发结束),按数据库计算
+        positions[str(task.id)] = rank + 1 if rank is not None else _count_position(task)
+    return positions
+
+
+def get_queue_position(queue_task: EpisodeTaskQueue) -> int:
+    """获取单个活跃队列任务的位置"""
+    return get_queue_positions([queue_task]).get(str(queue_task.id)) or _count_position(queue_task)
+
+
+def repair_index_drift(active_counts: Dict[str, int]) -> int:
+    """
+    校正索引与数据库不一致的作品 (一次 pipeline 读取所有 ZCARD)
+
+    Args:
+        active_counts: {series_id: 数据库中活跃队列任务数}
+
+    Returns:
+        重建的作品数
+    """
+    if not active_counts:
+        return 0
+    series_ids = list(active_counts)
+    pipe = get_redis_client('cache').pipeline(transaction=False)
+    for series_id in series_ids:
+        pipe.zcard(get_queue_index_key(series_id))
+    sizes = pipe.execute()
+
+    rebuilt = 0
+    for series_id, size in zip(series_ids, sizes):
+        if size != active_counts[series_id]:
+            rebuild_series_index(series_id)
+            rebuilt += 1
+    return rebuilt
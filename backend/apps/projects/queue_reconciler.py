@@ -0,0 +1,160 @@
+"""分集任务队列后台校准。
+
+由 Celery Beat 定时触发 (QUEUE_RECONCILE_INTERVAL),一次扫描所有作品:
+
+- 一次聚合查询统计各作品的活跃队列任务
+- 执行中任务按 QUEUE_RECONCILE_BATCH_SIZE 分批,每批一次 pipeline 读取任务心跳,
+  将已结束或失联的任务标记为完成/失败/取消
+- 为有等待任务但没有执行中任务的作品调度下一集
+- 校正与数据库不一致的队列位置索引
+
+各作品的异常互不影响;运行结果与累计值写入缓存,供管理接口查看。
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from core.redis.task_heartbeat import get_tasks_alive
+
+from .models import EpisodeTaskQueue
+from .queue_index import ACTIVE_QUEUE_STATUSES, repair_index_drift
+from .queue_service import _repair_stale_running_task, dispatch_next_episode_task
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_METRICS_KEY = 'ai_story:queue_reconcile:metrics'
+
+RECONCILE_COUNTERS = [
+    'series_scanned',
+    'running_checked',
+    'repaired_completed',
+    'repaired_failed',
+    'repaired_cancelled',
+    'dispatched',
+    'index_rebuilt',
+    'errors',
+]
+
+
+def _count_active_tasks() -> Dict[str, int]:
+    return {
+        str(row['series_id']): row['count']
+        for row in EpisodeTaskQueue.objects.filter(status__in=ACTIVE_QUEUE_STATUSES)
+        .values('series_id')
+        .annotate(count=Count('id'))
+    }
+
+
+def _repair_batch(batch: List[tuple], metrics: Dict[str, int]) -> None:
+    """校准一批执行中任务 (一次心跳读取 + 一次结果统计)"""
+    celery_task_ids = [celery_task_id for _, _, celery_task_id in batch if celery_task_id]
+    liveness = get_tasks_alive(celery_task_ids)
+    if liveness is None:
+        # Redis 不可用时无法判断存活,只处理已有明确结果的任务
+        liveness = {celery_task_id: None for celery_task_id in celery_task_ids}
+
+    for series_id in {series_id for _, series_id, _ in batch}:
+        try:
+            _repair_stale_running_task(series_id, liveness=liveness)
+        except Exception:
+            metrics['errors'] += 1
+            logger.exception(f"队列校准失败: series_id={series_id}")
+
+    repaired = (
+        EpisodeTaskQueue.objects.filter(id__in=[task_id for task_id, _, _ in batch])
+        .exclude(status='running')
+        .values('status')
+        .annotate(count=Count('id'))
+    )
+    for row in repaired:
+        key = f"repaired_{row['status']}"
+        if key in metrics:
+            metrics[key] += row['count']
+
+
+def _dispatch_idle_series(metrics: Dict[str, int]) -> None:
+    """为有等待任务但没有执行中任务的作品调度下一集"""
+    running_series = EpisodeTaskQueue.objects.filter(status='running').values('series_id')
+    idle_series = (
+        EpisodeTaskQueue.objects.filter(status='waiting')
+        .exclude(series_id__in=running_series)
+        .values_list('series_id', flat=True)
+        .distinct()
+    )
+    for series_id in list(idle_series):
+        try:
+            if dispatch_next_episode_task(str(series_id)):
+                metrics['dispatched'] += 1
+        except Exception:
+            metrics['errors'] += 1
+            logger.exception(f"队列调度失败: series_id={series_id}")
+
+
+def _record_metrics(metrics: Dict[str, Any]) -> None:
+    previous = get_reconcile_metrics()
+    totals = previous.get('totals') or {}
+    cache.set(
+        RECONCILE_METRICS_KEY,
+        {
+            'last_run': metrics,
+            'runs': (previous.get('runs') or 0) + 1,
+            'totals': {name: totals.get(name, 0) + metrics[name] for name in RECONCILE_COUNTERS},
+        },
+        timeout=None,
+    )
+
+
+def get_reconcile_metrics() -> Dict[str, Any]:
+    """获取最近一次校准结果与累计值"""
+    return cache.get(RECONCILE_METRICS_KEY) or {'last_run': None, 'runs': 0, 'totals': {}}
+
+
+def reconcile_episode_queues(batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    校准所有作品的分集任务队列
+
+    Args:
+        batch_size: 每批校准的执行中任务数,默认 QUEUE_RECONCILE_BATCH_SIZE
+
+    Returns:
+        本次运行的统计
+    """
+    batch_size = batch_size or getattr(settings, 'QUEUE_RECONCILE_BATCH_SIZE', 50)
+    started = time.monotonic()
+    metrics: Dict[str, Any] = {name: 0 for name in RECONCILE_COUNTERS}
+
+    metrics['series_scanned'] = len(_count_active_tasks())
+
+    running_tasks = list(
+        EpisodeTaskQueue.objects.filter(status='running')
+        .order_by('created_at')
+        .values_list('id', 'series_id', 'celery_task_id')
+    )
+    metrics['running_checked'] = len(running_tasks)
+    for offset in range(0, len(running_tasks), batch_size):
+        _repair_batch(running_tasks[offset:offset + batch_size], metrics)
+
+    _dispatch_idle_series(metrics)
+
+    try:
+        metrics['index_rebuilt'] = repair_index_drift(_count_active_tasks())
+    except Exception as e:
+        logger.warning(f"校正队列索引失败: {str(e)}")
+
+    metrics['finished_at'] = timezone.now().isoformat()
+    metrics['duration_ms'] = int((time.monotonic() - started) * 1000)
+    _record_metrics(metrics)
+
+    logger.info(
+        f"队列校准完成: 作品={metrics['series_scanned']}, 执行中={metrics['running_checked']}, "
+        f"完成={metrics['repaired_completed']}, 失败={metrics['repaired_failed']}, "
+        f"取消={metrics['repaired_cancelled']}, 调度={metrics['dispatched']}, "
+        f"重建索引={metrics['index_rebuilt']}, 异常={metrics['errors']}, 耗时={metrics['duration_ms']}ms"
+    )
+    return metrics
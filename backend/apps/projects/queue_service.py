@@ -9,13 +9,14 @@ from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 
-from config.celery_app import app
+from core.redis.progress import clear_progress_snapshot
+from core.redis.task_heartbeat import is_task_alive
 
 from .models import EpisodeTaskQueue, Project, ProjectStage, Series
+from .queue_index import ACTIVE_QUEUE_STATUSES, get_queue_position, index_queue_task, unindex_queue_task
 
 logger = logging.getLogger(__name__)
 
-ACTIVE_QUEUE_STATUSES = ['waiting', 'running']
 STALE_QUEUE_TASK_TIMEOUT = timedelta(minutes=2)
 
 
@@ -30,49 +31,9 @@ def _register_project_task(project_id: str, task_id: str) -> None:
     cache.set(_project_task_cache_key(project_id), task_ids, timeout=24 * 60 * 60)
 
 
-def _get_queue_position(queue_task: EpisodeTaskQueue) -> int:
-    return (
-        EpisodeTaskQueue.objects.filter(
-            series_id=queue_task.series_id,
-            status__in=ACTIVE_QUEUE_STATUSES,
-            created_at__lt=queue_task.created_at,
-        ).count() + 1
-    )
-
-
-def _get_worker_task_ids() -> Optional[set]:
-    try:
-        inspector = app.control.inspect(timeout=1.0)
-        worker_task_ids = set()
-
-        for task_map in [inspector.active() or {}, inspector.reserved() or {}]:
-            for tasks in task_map.values():
-                for task in tasks or []:
-                    task_id = task.get('id') or task.get('request', {}).get('id')
-                    if task_id:
-                        worker_task_ids.add(task_id)
-
-        for tasks in (inspector.scheduled() or {}).values():
-            for task in tasks or []:
-                request_data = task.get('request', {})
-                task_id = request_data.get('id') or task.get('id')
-                if task_id:
-                    worker_task_ids.add(task_id)
-
-        return worker_task_ids
-    except Exception:
-        logger.exception('检查 Celery worker 任务状态失败')
-        return None
-
-
 def _is_task_visible_to_workers(task_id: str) -> Optional[bool]:
-    if not task_id:
-        return False
-
-    worker_task_ids = _get_worker_task_ids()
-    if worker_task_ids is None:
-        return None
-    return task_id in worker_task_ids
+    """任务是否仍被 Worker 持有 (读取任务心跳键, 见 core.redis.task_heartbeat)"""
+    return is_task_alive(task_id)
 
 
 def _is_queue_task_stale(queue_task: EpisodeTaskQueue) -> bool:
@@ -82,7 +43,10 @@ def _is_queue_task_stale(queue_task: EpisodeTaskQueue) -> bool:
     return timezone.now() - started_at >= STALE_QUEUE_TASK_TIMEOUT
 
 
-def _get_recovery_final_status(queue_task: EpisodeTaskQueue) -> Optional[str]:
+def _get_recovery_final_status(
+    queue_task: EpisodeTaskQueue,
+    liveness: Optional[Dict[str, Optional[bool]]] = None,
+) -> Optional[str]:
     if not queue_task.celery_task_id:
         return 'failed' if _is_queue_task_stale(queue_task) else None
 
@@ -96,7 +60,10 @@ def _get_recovery_final_status(queue_task: EpisodeTaskQueue) -> Optional[str]:
     if task_state == 'RETRY':
         return None
 
-    visible_to_workers = _is_task_visible_to_workers(queue_task.celery_task_id)
+    if liveness is not None and queue_task.celery_task_id in liveness:
+        visible_to_workers = liveness[queue_task.celery_task_id]
+    else:
+        visible_to_workers = _is_task_visible_to_workers(queue_task.celery_task_id)
     if visible_to_workers is True:
         return None
     if visible_to_workers is None:
@@ -106,7 +73,10 @@ def _get_recovery_final_status(queue_task: EpisodeTaskQueue) -> Optional[str]:
     return None
 
 
-def _repair_stale_running_task(series_id: str) -> Optional[EpisodeTaskQueue]:
+def _repair_stale_running_task(
+    series_id: str,
+    liveness: Optional[Dict[str, Optional[bool]]] = None,
+) -> Optional[EpisodeTaskQueue]:
     with transaction.atomic():
         running_task = (
             EpisodeTaskQueue.objects.select_for_update()
@@ -118,7 +88,7 @@ def _repair_stale_running_task(series_id: str) -> Optional[EpisodeTaskQueue]:
         if not running_task:
             return None
 
-        final_status = _get_recovery_final_status(running_task)
+        final_status = _get_recovery_final_status(running_task, liveness=liveness)
         if not final_status:
             return running_task
 
@@ -142,7 +112,9 @@ def _repair_stale_running_task(series_id: str) -> Optional[EpisodeTaskQueue]:
                 error_message='任务异常中断，系统已自动标记失败并释放队列。',
             )
 
-        return None
+    unindex_queue_task(running_task)
+    clear_progress_snapshot(str(running_task.project_id))
+    return None
 
 
 def get_active_queue_task_for_project(project: Project) -> Optional[EpisodeTaskQueue]:
@@ -195,12 +167,13 @@ def enqueue_episode_task(
                 project.completed_at = None
                 project.save(update_fields=['status', 'completed_at', 'updated_at'])
 
+    index_queue_task(queue_task)
     dispatch_next_episode_task(project.series_id)
     queue_task.refresh_from_db()
 
     return {
         'queue_task': queue_task,
-        'queue_position': _get_queue_position(queue_task),
+        'queue_position': get_queue_position(queue_task),
         'started': queue_task.status == 'running',
         'already_exists': existing_task is not None,
     }
@@ -320,6 +293,7 @@ def dispatch_next_episode_task(series_id: str) -> Optional[EpisodeTaskQueue]:
             completed_at=None,
         )
 
+    index_queue_task(queue_task)
     try:
         return _launch_queue_task(str(queue_task.id))
     except Exception:
@@ -349,6 +323,7 @@ def complete_episode_task_by_celery_id(
         queue_task.save(update_fields=['status', 'completed_at', 'updated_at'])
         series_id = queue_task.series_id
 
+    unindex_queue_task(queue_task)
     dispatch_next_episode_task(series_id)
     return queue_task
 
@@ -373,6 +348,7 @@ def cancel_running_queue_task(project: Project) -> Optional[EpisodeTaskQueue]:
         queue_task.save(update_fields=['status', 'completed_at', 'updated_at'])
         series_id = queue_task.series_id
 
+    unindex_queue_task(queue_task)
     dispatch_next_episode_task(series_id)
     return queue_task
 
@@ -401,6 +377,8 @@ def force_release_queue_task(project: Project, reason: str = '') -> Optional[Epi
             queue_task.save(update_fields=['status', 'completed_at', 'updated_at'])
             if project.status == 'queued':
                 Project.objects.filter(id=project.id).update(status='draft')
+            # 提前移出索引是安全的: 若事务回滚,查询时发现缺失会按数据库重建
+            unindex_queue_task(queue_task)
             return queue_task
 
         queue_task.status = 'failed'
@@ -415,5 +393,6 @@ def force_release_queue_task(project: Project, reason: str = '') -> Optional[Epi
         )
         series_id = queue_task.series_id
 
+    unindex_queue_task(queue_task)
     dispatch_next_episode_task(series_id)
     return queue_task
@@ -4,14 +4,15 @@
 遵循单一职责原则(SRP)
 """
 
-from django.db import transaction
+from django.db import models, transaction
 from rest_framework import serializers
 
 from apps.content.models import ContentRewrite, EditedImage
 from apps.models.serializers import ModelProviderDetailSerializer
 from apps.prompts.serializers import GlobalVariableListSerializer
 from apps.projects.utils import ensure_project_stages, parse_storyboard_json
-from .models import EpisodeTaskQueue, Project, ProjectStage, ProjectModelConfig, ProjectAssetBinding, Series
+from .models import Project, ProjectStage, ProjectModelConfig, ProjectAssetBinding, Series
+from .queue_index import get_queue_positions
 
 
 def get_latest_episode(series):
@@ -396,6 +397,18 @@ class ProjectAssetBindingUpdateSerializer(serializers.Serializer):
     )
 
 
+class QueuePositionListSerializer(serializers.ListSerializer):
+    """列表序列化时一次性批量读取整页分集的队列位置"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        queue_tasks = [
+            task for task in (self.child._get_active_queue_task(item) for item in items if item.series_id) if task
+        ]
+        self.child._queue_positions = get_queue_positions(queue_tasks)
+        return super().to_representation(items)
+
+
 class ProjectListSerializer(serializers.ModelSerializer):
     """项目列表序列化器 - 轻量级"""
 
@@ -420,6 +433,7 @@ class ProjectListSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'completed_at'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at', 'completed_at']
+        list_serializer_class = QueuePositionListSerializer
 
     def get_stages_count(self, obj):
         return obj.stages.count()
@@ -449,11 +463,10 @@ class ProjectListSerializer(serializers.ModelSerializer):
         queue_task = self._get_active_queue_task(obj)
         if not queue_task or not obj.series_id:
             return None
-        return EpisodeTaskQueue.objects.filter(
-            series_id=obj.series_id,
-            status__in=['waiting', 'running'],
-            created_at__lt=queue_task.created_at,
-        ).count() + 1
+        positions = getattr(self, '_queue_positions', None) or {}
+        if str(queue_task.id) not in positions:
+            positions = get_queue_positions([queue_task])
+        return positions.get(str(queue_task.id))
 
 
 class ProjectDetailSerializer(serializers.ModelSerializer):
@@ -527,11 +540,10 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         queue_task = self._get_active_queue_task(obj)
         if not queue_task or not obj.series_id:
             return None
-        return EpisodeTaskQueue.objects.filter(
-            series_id=obj.series_id,
-            status__in=['waiting', 'running'],
-            created_at__lt=queue_task.created_at,
-        ).count() + 1
+        positions = getattr(self, '_queue_positions', None) or {}
+        if str(queue_task.id) not in positions:
+            positions = get_queue_positions([queue_task])
+        return positions.get(str(queue_task.id))
 
 
 class ProjectCreateSerializer(serializers.ModelSerializer):
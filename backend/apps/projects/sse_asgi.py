@@ -0,0 +1,231 @@
+"""
+异步SSE (ASGI)
+职责: 在ASGI部署下以原生协程提供项目SSE接口,替代占用线程的同步流式视图
+
+- 路径、消息格式、Last-Event-ID重放、心跳与空闲超时与 sse_views 完全一致
+- 基于 redis.asyncio 读取事件日志,等待消息时不占用线程,单进程可维持数千个连接
+- 同一项目的所有连接共用 sse_hub 中的一个读取协程,事件只解析、格式化一次
+- Django 3.2 的 StreamingHttpResponse 不支持异步迭代器,因此直接实现ASGI应用,
+  匹配SSE路径的GET请求在此处理,其余请求交给Django
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qs
+
+from core.redis.subscriber import normalize_event_id
+
+from .sse_hub import SSEListener, get_sse_hub
+from .sse_views import (
+    ALL_STAGES_IDLE_TIMEOUT_SECONDS,
+    HEARTBEAT_FRAME,
+    HEARTBEAT_INTERVAL_SECONDS,
+    SINGLE_STAGE_IDLE_TIMEOUT_SECONDS,
+    format_sse_message,
+    is_terminal_event,
+)
+
+logger = logging.getLogger(__name__)
+
+SSE_PATH_PATTERN = re.compile(
+    r'^/api/v1/projects/sse/projects/(?P<project_id>[^/]+)/(?:stages/(?P<stage_name>[^/]+)/)?$'
+)
+
+SSE_RESPONSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache, no-transform'),
+    (b'x-accel-buffering', b'no'),
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-methods', b'GET'),
+    (b'access-control-allow-headers', b'Content-Type, Last-Event-ID'),
+]
+
+Send = Callable[[dict], Awaitable[None]]
+Receive = Callable[[], Awaitable[dict]]
+
+
+def get_last_event_id(scope: dict) -> Optional[str]:
+    """读取客户端最后收到的事件ID (Last-Event-ID 请求头或 last_event_id 查询参数)"""
+    for name, value in scope.get('headers') or []:
+        if name.lower() == b'last-event-id':
+            event_id = normalize_event_id(value.decode('latin-1'))
+            if event_id:
+                return event_id
+    query = parse_qs((scope.get('query_string') or b'').decode('latin-1'))
+    return normalize_event_id((query.get('last_event_id') or [None])[0])
+
+
+class ProjectSSEApplication:
+    """
+    项目SSE的ASGI应用
+
+    URL:
+        /api/v1/projects/sse/projects/{project_id}/stages/{stage_name}/  单阶段
+        /api/v1/projects/sse/projects/{project_id}/                      所有阶段
+    """
+
+    def __init__(self, fallback):
+        """
+        Args:
+            fallback: 非SSE请求交给的ASGI应用 (Django)
+        """
+        self.fallback = fallback
+
+    async def __call__(self, scope: dict, receive: Receive, send: Send):
+        match = self._match(scope)
+        if match is None:
+            return await self.fallback(scope, receive, send)
+
+        await self.handle(
+            send=send,
+            receive=receive,
+            project_id=match['project_id'],
+            stage_name=match['stage_name'],
+            last_event_id=get_last_event_id(scope),
+        )
+
+    def _match(self, scope: dict) -> Optional[Dict[str, Optional[str]]]:
+        if scope.get('type') != 'http' or scope.get('method') != 'GET':
+            return None
+        match = SSE_PATH_PATTERN.match(scope.get('path') or '')
+        return match.groupdict() if match else None
+
+    async def handle(
+        self,
+        send: Send,
+        receive: Receive,
+        project_id: str,
+        stage_name: Optional[str] = None,
+        last_event_id: Optional[str] = None,
+    ):
+        """发送SSE响应,客户端断开时立即停止读取"""
+        logger.info(
+            f"异步SSE连接建立: project_id={project_id}, stage_name={stage_name}, last_event_id={last_event_id}"
+        )
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_RESPONSE_HEADERS})
+
+        stream = asyncio.ensure_future(self._stream(send, project_id, stage_name, last_event_id))
+        disconnect = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            await asyncio.wait({stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (stream, disconnect):
+                task.cancel()
+            await asyncio.gather(stream, disconnect, return_exceptions=True)
+
+        if disconnect.done() and not disconnect.cancelled():
+            logger.info(f"SSE客户端断开: project_id={project_id}, stage_name={stage_name}")
+            return
+
+        try:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except Exception:
+            pass
+        logger.info(f"SSE连接关闭: project_id={project_id}, stage_name={stage_name}")
+
+    async def _wait_for_disconnect(self, receive: Receive):
+        while True:
+            message = await receive()
+            if message.get('type') == 'http.disconnect':
+                return
+
+    async def _stream(
+        self,
+        send: Send,
+        project_id: str,
+        stage_name: Optional[str],
+        last_event_id: Optional[str],
+    ):
+        all_stages_mode = stage_name is None
+        listener = get_sse_hub().subscribe(project_id, stage_name)
+
+        async def write(body: bytes):
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        try:
+            connected = {
+                'type': 'connected',
+                'project_id': project_id,
+                'message': 'SSE连接已建立(所有阶段)' if all_stages_mode else 'SSE连接已建立',
+            }
+            if not all_stages_mode:
+                connected['stage'] = stage_name
+            await write(format_sse_message(connected))
+
+            if last_event_id:
+                for frame in await listener.backfill(last_event_id):
+                    await write(frame.data)
+                    if is_terminal_event(frame.type, all_stages_mode):
+                        logger.info(f"SSE流结束(重放): {frame.type}, all_stages={all_stages_mode}")
+                        return
+
+            await self._stream_messages(
+                write,
+                listener,
+                project_id=project_id,
+                stage_name=stage_name,
+                idle_timeout=ALL_STAGES_IDLE_TIMEOUT_SECONDS if all_stages_mode else SINGLE_STAGE_IDLE_TIMEOUT_SECONDS,
+                all_stages_mode=all_stages_mode,
+            )
+        except asyncio.CancelledError:
+            raise
+        except (BrokenPipeError, ConnectionResetError, OSError) as exc:
+            logger.info(f"SSE连接被客户端关闭: project_id={project_id}, stage_name={stage_name}, error={exc}")
+        except Exception as exc:
+            logger.error(f"SSE流异常: {str(exc)}")
+            await write(format_sse_message({
+                'type': 'error',
+                'error': f'SSE流异常: {str(exc)}',
+                'project_id': project_id
+            }))
+        finally:
+            listener.close()
+
+    async def _stream_messages(
+        self,
+        write: Callable[[bytes], Awaitable[None]],
+        listener: SSEListener,
+        project_id: str,
+        stage_name: Optional[str],
+        idle_timeout: float,
+        all_stages_mode: bool,
+    ):
+        """等待分发的帧并定期发送心跳"""
+        start_time = time.monotonic()
+        last_activity_at = start_time
+        last_heartbeat_at = start_time
+
+        while True:
+            now = time.monotonic()
+            wait = min(
+                last_heartbeat_at + HEARTBEAT_INTERVAL_SECONDS - now,
+                last_activity_at + idle_timeout - now,
+            )
+            frame = await listener.get(timeout=max(wait, 0.001))
+            now = time.monotonic()
+
+            if frame:
+                last_activity_at = now
+                await write(frame.data)
+                if is_terminal_event(frame.type, all_stages_mode):
+                    logger.info(f"SSE流结束: {frame.type}, all_stages={all_stages_mode}")
+                    return
+                continue
+
+            if listener.lagged:
+                # 结束响应,客户端携带 Last-Event-ID 重连后从事件日志补齐
+                logger.info(f"SSE监听者落后,结束响应等待重连: project_id={project_id}, stage_name={stage_name}")
+                return
+
+            if now - last_heartbeat_at >= HEARTBEAT_INTERVAL_SECONDS:
+                last_heartbeat_at = now
+                await write(HEARTBEAT_FRAME)
+
+            if now - last_activity_at >= idle_timeout:
+                logger.info(
+                    f"SSE空闲超时关闭: project_id={project_id}, stage_name={stage_name}, all_stages={all_stages_mode}"
+                )
+                return
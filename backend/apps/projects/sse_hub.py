@@ -0,0 +1,204 @@
+"""
+SSE进程内分发中心
+职责: 每个进程对每个项目只读取一次事件日志,将解码并格式化好的SSE帧分发给本进程内的所有监听者
+
+- Redis连接数与JSON解析/序列化开销随项目数增长,与观看者数量无关
+- 每个监听者使用有界队列,分发时从不阻塞读取协程
+- 监听者跟不上时 (队列已满) 停止向其投递并结束其响应;
+  浏览器 EventSource 会携带 Last-Event-ID 自动重连,从事件日志补齐落下的事件,不丢数据
+- 携带 Last-Event-ID 的新监听者先从事件日志补读历史,再无缝切换到实时分发
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+
+from core.redis.subscriber import AsyncRedisStreamSubscriber
+
+from .sse_views import format_sse_message
+
+logger = logging.getLogger(__name__)
+
+
+class SSEFrame(NamedTuple):
+    """已格式化的SSE帧"""
+    event_id: str
+    stage: Optional[str]
+    type: Optional[str]
+    data: bytes
+
+
+def _event_id_key(event_id: str) -> Tuple[int, int]:
+    ms, _, seq = event_id.partition('-')
+    return int(ms), int(seq or 0)
+
+
+class _FrameReader(AsyncRedisStreamSubscriber):
+    """事件日志读取器,条目解析后直接生成SSE帧 (每条事件只做一次JSON解析与序列化)"""
+
+    def _parse_entry(self, event_id: str, fields: Dict[str, str]) -> Optional[SSEFrame]:
+        data = super()._parse_entry(event_id, fields)
+        if data is None:
+            return None
+        return SSEFrame(event_id, fields.get('stage'), data.get('type'), format_sse_message(data))
+
+
+class SSEListener:
+    """
+    单个SSE连接的监听者
+
+    Args:
+        feed: 所属项目分发源
+        stage_name: 只接收该阶段 (None为所有阶段)
+        max_queue: 队列上限
+    """
+
+    def __init__(self, feed: 'ProjectFeed', stage_name: Optional[str], max_queue: int):
+        self.feed = feed
+        self.stage_name = stage_name
+        self.queue: 'asyncio.Queue[SSEFrame]' = asyncio.Queue(maxsize=max_queue)
+        self.lagged = False
+        self.last_id: Optional[str] = None
+
+    def offer(self, frame: SSEFrame) -> None:
+        """由分发源调用,不阻塞;队列已满时标记为落后并停止投递"""
+        if self.lagged or (self.stage_name and frame.stage != self.stage_name):
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.lagged = True
+            logger.warning(
+                f"SSE监听者落后,停止投递: project_id={self.feed.project_id}, stage_name={self.stage_name}"
+            )
+
+    async def backfill(self, last_event_id: str) -> List[SSEFrame]:
+        """从事件日志补读 last_event_id 之后的历史帧,之后实时帧中已补读的部分会被跳过"""
+        # 等分发源确定读取起点,保证补读与实时帧之间没有缺口 (重叠部分按事件ID去重)
+        await self.feed.ready.wait()
+        reader = _FrameReader(self.feed.project_id, self.stage_name, last_event_id=last_event_id)
+        await reader.subscribe()
+        frames = []
+        while True:
+            response = await reader.redis_client.xread(
+                {reader.stream_key: reader.last_id}, count=reader.batch_size
+            )
+            if not response:
+                break
+            reader._buffer_entries(response)
+            frames.extend(reader._buffer)
+            reader._buffer.clear()
+        self.last_id = reader.last_id
+        return frames
+
+    async def get(self, timeout: float) -> Optional[SSEFrame]:
+        """获取下一帧,超时返回 None;已落后且队列排空时也返回 None"""
+        while True:
+            if self.lagged and self.queue.empty():
+                return None
+            try:
+                frame = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            if self.last_id and _event_id_key(frame.event_id) <= _event_id_key(self.last_id):
+                continue
+            self.last_id = frame.event_id
+            return frame
+
+    def close(self) -> None:
+        self.feed.remove(self)
+
+
+class ProjectFeed:
+    """单个项目的事件日志读取协程,读取一次,分发给所有监听者"""
+
+    # 单次阻塞读取时长(秒),监听者全部离开后最迟在该时长内停止
+    read_timeout = 5.0
+
+    def __init__(self, hub: 'SSEHub', project_id: str):
+        self.hub = hub
+        self.project_id = project_id
+        self.listeners: Set[SSEListener] = set()
+        self.reader = _FrameReader(project_id)
+        self.task: Optional[asyncio.Task] = None
+        self.ready = asyncio.Event()
+
+    def add(self, listener: SSEListener) -> None:
+        self.listeners.add(listener)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+
+    def remove(self, listener: SSEListener) -> None:
+        self.listeners.discard(listener)
+        if not self.listeners:
+            self.stop()
+
+    def stop(self) -> None:
+        self.hub.feeds.pop(self.project_id, None)
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        logger.info(f"SSE分发源启动: project_id={self.project_id}")
+        try:
+            while not self.ready.is_set():
+                try:
+                    await self.reader.subscribe()
+                    self.ready.set()
+                except Exception as e:
+                    logger.error(f"SSE分发源订阅失败: project_id={self.project_id}, error={str(e)}")
+                    await asyncio.sleep(1.0)
+            while self.listeners:
+                frame = await self.reader.get_message(timeout=self.read_timeout)
+                if frame is None:
+                    continue
+                for listener in list(self.listeners):
+                    listener.offer(frame)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.reader.close()
+            logger.info(f"SSE分发源停止: project_id={self.project_id}")
+
+
+class SSEHub:
+    """
+    进程内SSE分发中心 (每个事件循环一个)
+
+    feeds: {project_id: ProjectFeed}
+    """
+
+    def __init__(self, max_queue: Optional[int] = None):
+        self.max_queue = max_queue or getattr(settings, 'SSE_LISTENER_QUEUE_SIZE', 1000)
+        self.feeds: Dict[str, ProjectFeed] = {}
+
+    def subscribe(self, project_id: str, stage_name: Optional[str] = None) -> SSEListener:
+        """注册监听者,需在使用结束后调用 listener.close()"""
+        feed = self.feeds.get(project_id)
+        if feed is None:
+            feed = self.feeds[project_id] = ProjectFeed(self, project_id)
+        listener = SSEListener(feed, stage_name, self.max_queue)
+        feed.add(listener)
+        return listener
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'projects': len(self.feeds),
+            'listeners': sum(len(feed.listeners) for feed in self.feeds.values()),
+        }
+
+
+_hubs: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SSEHub]' = weakref.WeakKeyDictionary()
+
+
+def get_sse_hub() -> SSEHub:
+    """获取当前事件循环的分发中心"""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = SSEHub()
+    return hub
@@ -1,19 +1,23 @@
 """
 SSE流式视图
-职责: 提供基于Redis Pub/Sub的Server-Sent Events接口
+职责: 提供基于Redis Stream事件日志的Server-Sent Events接口
 遵循单一职责原则(SRP)
+
+- 每条事件携带 id (事件日志条目ID)
+- 客户端重连时通过 Last-Event-ID 请求头 (或 last_event_id 查询参数) 从断点重放,不丢失断线期间的事件
+- 同步视图用于 WSGI/runserver; ASGI 部署下由 sse_asgi 的异步实现接管同样的路径
 """
 
 import json
 import logging
 import time
-from typing import Generator
+from typing import Generator, Optional
 from django.http import StreamingHttpResponse
 from django.views import View
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
-from core.redis.subscriber import RedisStreamSubscriber
+from core.redis.subscriber import RedisStreamSubscriber, normalize_event_id
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,43 @@ HEARTBEAT_INTERVAL_SECONDS = 15
 MESSAGE_POLL_TIMEOUT_SECONDS = 1.0
 SINGLE_STAGE_IDLE_TIMEOUT_SECONDS = 600
 ALL_STAGES_IDLE_TIMEOUT_SECONDS = 1800
+HEARTBEAT_FRAME = b': heartbeat\n\n'
+
+
+def format_sse_message(data: dict) -> bytes:
+    """
+    格式化SSE消息
+
+    SSE格式:
+    id: 1700000000000-0
+    data: {"type": "token", "content": "..."}
+
+    Args:
+        data: 消息数据字典
+
+    Returns:
+        bytes: SSE格式的消息
+    """
+    try:
+        json_data = json.dumps(data, ensure_ascii=False)
+        sse_message = f"data: {json_data}\n\n"
+        if data.get('event_id'):
+            sse_message = f"id: {data['event_id']}\n{sse_message}"
+        return sse_message.encode('utf-8')
+    except Exception as exc:
+        logger.error(f"SSE消息格式化失败: {str(exc)}")
+        error_data = json.dumps({
+            'type': 'error',
+            'error': f'消息格式化失败: {str(exc)}'
+        }, ensure_ascii=False)
+        return f"data: {error_data}\n\n".encode('utf-8')
+
+
+def is_terminal_event(message_type: Optional[str], all_stages_mode: bool) -> bool:
+    """该类型消息之后SSE流是否结束 (单阶段: done/error; 所有阶段: pipeline_done/pipeline_error)"""
+    if all_stages_mode:
+        return message_type in ('pipeline_done', 'pipeline_error')
+    return message_type in ('done', 'error')
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -28,7 +69,7 @@ class ProjectStageSSEView(View):
     """
     项目阶段SSE流式视图
 
-    通过Redis Pub/Sub订阅项目阶段的实时数据流
+    读取项目事件日志中该阶段的实时数据流
     使用Server-Sent Events (SSE)协议推送给前端
 
     """
@@ -44,9 +85,10 @@ class ProjectStageSSEView(View):
         Returns:
             StreamingHttpResponse: SSE流式响应
         """
-        logger.info(f"SSE连接建立: project_id={project_id}, stage_name={stage_name}")
+        last_event_id = self._get_last_event_id(request)
+        logger.info(f"SSE连接建立: project_id={project_id}, stage_name={stage_name}, last_event_id={last_event_id}")
 
-        event_stream = self._create_event_stream(project_id, stage_name)
+        event_stream = self._create_event_stream(project_id, stage_name, last_event_id)
 
         response = StreamingHttpResponse(
             event_stream,
@@ -57,17 +99,29 @@ class ProjectStageSSEView(View):
         response['X-Accel-Buffering'] = 'no'
         response['Access-Control-Allow-Origin'] = '*'
         response['Access-Control-Allow-Methods'] = 'GET'
-        response['Access-Control-Allow-Headers'] = 'Content-Type'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, Last-Event-ID'
 
         return response
 
-    def _create_event_stream(self, project_id: str, stage_name: str) -> Generator[bytes, None, None]:
+    def _get_last_event_id(self, request) -> Optional[str]:
+        """读取客户端最后收到的事件ID (EventSource 自动重连时发送 Last-Event-ID 请求头)"""
+        return normalize_event_id(
+            request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('last_event_id')
+        )
+
+    def _create_event_stream(
+        self,
+        project_id: str,
+        stage_name: str,
+        last_event_id: Optional[str] = None,
+    ) -> Generator[bytes, None, None]:
         """
         创建SSE事件流生成器
 
         Args:
             project_id: 项目ID
             stage_name: 阶段名称
+            last_event_id: 从该事件之后重放 (可选)
 
         Yields:
             bytes: SSE格式的事件数据
@@ -75,7 +129,7 @@ class ProjectStageSSEView(View):
         subscriber = None
 
         try:
-            subscriber = RedisStreamSubscriber(project_id, stage_name)
+            subscriber = RedisStreamSubscriber(project_id, stage_name, last_event_id=last_event_id)
 
             yield self._format_sse_message({
                 'type': 'connected',
@@ -130,19 +184,14 @@ class ProjectStageSSEView(View):
                 last_activity_at = now
                 yield self._format_sse_message(message)
 
-                if all_stages_mode:
-                    if message.get('type') in ('pipeline_done', 'pipeline_error'):
-                        logger.info(f"SSE流结束(所有阶段): {message.get('type')}")
-                        break
-                else:
-                    if message.get('type') in ('done', 'error'):
-                        logger.info(f"SSE流结束: {message.get('type')}")
-                        break
+                if is_terminal_event(message.get('type'), all_stages_mode):
+                    logger.info(f"SSE流结束: {message.get('type')}, all_stages={all_stages_mode}")
+                    break
                 continue
 
             if now - last_heartbeat_at >= HEARTBEAT_INTERVAL_SECONDS:
                 last_heartbeat_at = now
-                yield b': heartbeat\n\n'
+                yield HEARTBEAT_FRAME
 
             if now - last_activity_at >= idle_timeout:
                 logger.info(
@@ -154,29 +203,8 @@ class ProjectStageSSEView(View):
                 break
 
     def _format_sse_message(self, data: dict) -> bytes:
-        """
-        格式化SSE消息
-
-        SSE格式:
-        data: {"type": "token", "content": "..."}
-
-        Args:
-            data: 消息数据字典
-
-        Returns:
-            bytes: SSE格式的消息
-        """
-        try:
-            json_data = json.dumps(data, ensure_ascii=False)
-            sse_message = f"data: {json_data}\n\n"
-            return sse_message.encode('utf-8')
-        except Exception as exc:
-            logger.error(f"SSE消息格式化失败: {str(exc)}")
-            error_data = json.dumps({
-                'type': 'error',
-                'error': f'消息格式化失败: {str(exc)}'
-            }, ensure_ascii=False)
-            return f"data: {error_data}\n\n".encode('utf-8')
+        """格式化SSE消息"""
+        return format_sse_message(data)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -184,7 +212,7 @@ class ProjectAllStagesSSEView(ProjectStageSSEView):
     """
     项目所有阶段SSE流式视图
 
-    订阅项目的所有阶段消息 (使用Redis模式匹配)
+    读取项目事件日志中所有阶段的消息
 
     URL: /api/v1/sse/projects/{project_id}/
     """
@@ -199,9 +227,10 @@ class ProjectAllStagesSSEView(ProjectStageSSEView):
         Returns:
             StreamingHttpResponse: SSE流式响应
         """
-        logger.info(f"SSE连接建立(所有阶段): project_id={project_id}")
+        last_event_id = self._get_last_event_id(request)
+        logger.info(f"SSE连接建立(所有阶段): project_id={project_id}, last_event_id={last_event_id}")
 
-        event_stream = self._create_event_stream(project_id)
+        event_stream = self._create_event_stream(project_id, last_event_id)
 
         response = StreamingHttpResponse(
             event_stream,
@@ -212,16 +241,17 @@ class ProjectAllStagesSSEView(ProjectStageSSEView):
         response['X-Accel-Buffering'] = 'no'
         response['Access-Control-Allow-Origin'] = '*'
         response['Access-Control-Allow-Methods'] = 'GET'
-        response['Access-Control-Allow-Headers'] = 'Content-Type'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, Last-Event-ID'
 
         return response
 
-    def _create_event_stream(self, project_id: str) -> Generator[bytes, None, None]:
+    def _create_event_stream(self, project_id: str, last_event_id: Optional[str] = None) -> Generator[bytes, None, None]:
         """
         创建SSE事件流生成器
 
         Args:
             project_id: 项目ID
+            last_event_id: 从该事件之后重放 (可选)
 
         Yields:
             bytes: SSE格式的事件数据
@@ -229,7 +259,7 @@ class ProjectAllStagesSSEView(ProjectStageSSEView):
         subscriber = None
 
         try:
-            subscriber = RedisStreamSubscriber(project_id, stage_name=None)
+            subscriber = RedisStreamSubscriber(project_id, stage_name=None, last_event_id=last_event_id)
 
             yield self._format_sse_message({
                 'type': 'connected',
@@ -5,12 +5,15 @@
 """
 
 import logging
-from typing import Dict, Any
-from celery.exceptions import TaskRevokedError
+import threading
+from typing import Callable, Dict, Any, List, Optional
+from celery.exceptions import Retry, TaskRevokedError
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 
 from core.redis import RedisStreamPublisher
+from core.redis.progress import clear_progress_snapshot
 from core.services.jianying_draft_service import JianyingDraftGenerator
 from apps.content.models import EditedImage, GeneratedImage, GeneratedVideo, Storyboard
 from apps.content.processors.llm_stage import LLMStageProcessor
@@ -20,9 +23,11 @@ from apps.content.processors.multi_grid_image_stage import MultiGridImageStagePr
 from apps.content.processors.image_edit_stage import ImageEditStageProcessor
 from apps.content.processors.image2video_stage import Image2VideoStageProcessor
 from apps.projects.models import Project, ProjectStage
+from apps.projects.queue_reconciler import reconcile_episode_queues
 from apps.projects.queue_service import complete_episode_task_by_celery_id
 from apps.projects.utils import get_project_stage_order, get_stage_template_states, is_stage_template_enabled
 from config.celery_app import app
+from core.utils.concurrency import iter_bounded_concurrent
 
 logger = logging.getLogger(__name__)
 
@@ -125,6 +130,7 @@ def _mark_stage_paused(project_id: str, stage_name: str) -> None:
         completed_at=None,
         error_message=''
     )
+    clear_progress_snapshot(project_id)
 
 
 def _is_project_paused(project_id: str) -> bool:
@@ -215,7 +221,7 @@ def execute_llm_stage(
                 # 发布token消息
                 content = chunk.get('content', '')
                 full_text = chunk.get('full_text', full_text)
-                publisher.publish_token(content, full_text)
+                publisher.publish_token(content, full_text, scene_number=chunk.get('scene_number'))
 
             elif chunk_type == 'camera_generated':
                 # 单个运镜生成完成，通知前端刷新
@@ -225,6 +231,14 @@ def execute_llm_stage(
                     metadata={'sequence_number': chunk.get('sequence_number', 0)}
                 )
 
+            elif chunk_type == 'storyboard_generated':
+                # 单个分镜在流式输出中闭合并已入库，通知前端刷新
+                publisher.publish_item_completed(
+                    item_type='storyboard',
+                    sequence_number=chunk.get('sequence_number', 0),
+                    metadata={'sequence_number': chunk.get('sequence_number', 0)}
+                )
+
             elif chunk_type == 'stage_update':
                 # 发布阶段更新
                 publisher.publish_stage_update(
@@ -815,17 +829,24 @@ def execute_image2video_stage(
     project_id: str,
     storyboard_ids: list = None,
     force_regenerate: bool = False,
-    user_id: int = None
+    user_id: int = None,
+    upstream_done: Optional[Callable[[], bool]] = None,
+    deferred_state: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     执行图生视频阶段任务
 
+    模板开启 deferred_completion 时以延迟完成模式执行: 每轮提交/查询后通过 retry(countdown)
+    重新调度自身并释放 Worker,任务ID保持不变(队列视为仍在运行),全部完成后才返回。
+
     Args:
         self: Celery任务实例
         project_id: 项目ID
         storyboard_ids: 分镜ID列表 (可选，为空则处理所有分镜)
         force_regenerate: 是否强制重生成已完成分镜视频
         user_id: 用户ID
+        upstream_done: 分镜级流水线内直接调用时传入，返回图片/运镜阶段是否已全部结束
+        deferred_state: 延迟完成模式的跨轮状态 (由任务自身重新调度时传入)
 
     Returns:
         Dict包含: success, task_id, channel, result
@@ -833,6 +854,7 @@ def execute_image2video_stage(
     task_id = self.request.id
     stage_name = 'video_generation'
     channel = f"ai_story:project:{project_id}:stage:{stage_name}"
+    rescheduled = False
 
     logger.info(f"开始执行图生视频任务, 项目: {project_id}, 任务ID: {task_id}")
 
@@ -842,8 +864,15 @@ def execute_image2video_stage(
         # 获取项目和阶段
         project = Project.objects.get(id=project_id)
         stage = ProjectStage.objects.get(project=project, stage_type=stage_name)
+        processor = Image2VideoStageProcessor()
 
-        if not is_stage_template_enabled(project, stage_name):
+        if deferred_state is not None:
+            # 延迟完成模式的后续轮次
+            if _is_project_paused(project_id):
+                _mark_stage_paused(project_id, stage_name)
+                return {'success': False, 'paused': True, 'error': '任务已暂停'}
+            stream = processor.process_deferred_round(project_id, deferred_state)
+        elif not is_stage_template_enabled(project, stage_name):
             message = '图生视频提示词模板未开启，已跳过该阶段'
             _skip_stage(stage, message)
             publisher.publish_stage_update(status='skipped', progress=100, message=message)
@@ -855,34 +884,49 @@ def execute_image2video_stage(
                 'skipped': True,
                 'message': message,
             }
+        else:
+            pending_storyboard_ids = _get_missing_video_storyboard_ids(
+                project,
+                storyboard_ids,
+                force_regenerate=force_regenerate,
+            )
 
-        pending_storyboard_ids = _get_missing_video_storyboard_ids(
-            project,
-            storyboard_ids,
-            force_regenerate=force_regenerate,
-        )
-
-        # 更新阶段状态
-        stage.status = 'processing'
-        stage.started_at = timezone.now()
-        stage.save()
+            # 更新阶段状态
+            stage.status = 'processing'
+            stage.started_at = timezone.now()
+            stage.save()
 
-        # 发布开始消息
-        publisher.publish_stage_update(
-            status='processing',
-            progress=0,
-            message='开始生成视频'
-        )
+            # 发布开始消息
+            publisher.publish_stage_update(
+                status='processing',
+                progress=0,
+                message='开始生成视频'
+            )
 
-        # 创建处理器
-        processor = Image2VideoStageProcessor()
+            target_storyboard_ids = (
+                pending_storyboard_ids if storyboard_ids is not None or force_regenerate else None
+            )
+            # 流水线内直接调用时需同步等待结果,只有独立调度的任务才延迟完成
+            deferrable = upstream_done is None and not self.request.called_directly
+            if deferrable and processor.supports_deferred_completion(project):
+                deferred_state = {}
+                stream = processor.process_deferred_round(
+                    project_id,
+                    deferred_state,
+                    storyboard_ids=target_storyboard_ids,
+                    force_regenerate=force_regenerate,
+                )
+            else:
+                stream = processor.process_stream(
+                    project_id=project_id,
+                    storyboard_ids=target_storyboard_ids,
+                    force_regenerate=force_regenerate,
+                    upstream_done=upstream_done,
+                )
 
         # 执行流式处理
-        for chunk in processor.process_stream(
-            project_id=project_id,
-            storyboard_ids=pending_storyboard_ids if storyboard_ids is not None or force_regenerate else None,
-            force_regenerate=force_regenerate,
-        ):
+        countdown = None
+        for chunk in stream:
             chunk_type = chunk.get('type')
 
             if chunk_type == 'progress':
@@ -917,11 +961,26 @@ def execute_image2video_stage(
                 # 发布阶段完成消息 (通知前端刷新画布)
                 publisher.publish_stage_completed(metadata)
 
+            elif chunk_type == 'deferred':
+                # 仍有在途任务, 本轮结束后重新调度
+                countdown = chunk.get('countdown', 0)
+
             elif chunk_type == 'error':
                 # 处理错误
                 error_msg = chunk.get('error', '未知错误')
                 raise Exception(error_msg)
 
+        if countdown is not None:
+            logger.info(
+                f"图生视频任务等待提供商完成, {countdown:.1f} 秒后继续, 项目: {project_id}, 任务ID: {task_id}"
+            )
+            rescheduled = True
+            raise self.retry(
+                kwargs={**(self.request.kwargs or {}), 'deferred_state': deferred_state},
+                countdown=countdown,
+                max_retries=getattr(settings, 'AI_VIDEO_DEFERRED_MAX_ROUNDS', 2000),
+            )
+
         logger.info(f"图生视频任务完成, 项目: {project_id}")
 
         return {
@@ -930,6 +989,9 @@ def execute_image2video_stage(
             'channel': channel
         }
 
+    except Retry:
+        raise
+
     except TaskRevokedError:
         logger.info(f"图生视频任务已撤销, 项目: {project_id}, 任务ID: {task_id}")
         _mark_stage_paused(project_id, stage_name)
@@ -967,7 +1029,8 @@ def execute_image2video_stage(
         return {'success': False, 'error': error_msg}
 
     finally:
-        _unregister_project_task(project_id, task_id)
+        if not rescheduled:
+            _unregister_project_task(project_id, task_id)
         publisher.close()
 
 
@@ -1102,6 +1165,151 @@ def generate_jianying_draft(
         pass
 
 
+def _resolve_pipeline_stage_action(project: Project, stage: ProjectStage) -> str:
+    """
+    判断完整工作流中阶段的处理方式
+
+    Returns:
+        'disabled': 提示词模板未开启; 'completed': 已完成可跳过; 'run': 需要执行
+    """
+    if not is_stage_template_enabled(project, stage.stage_type):
+        return 'disabled'
+
+    if stage.status != 'completed':
+        return 'run'
+
+    if stage.stage_type == 'image_generation' and not _is_image_generation_complete(project):
+        logger.warning(f"阶段 {stage.stage_type} 状态异常，检测到仍有未生成图片，自动继续补跑")
+        stage.status = 'failed'
+        stage.error_message = '检测到仍有分镜图片未生成完成，自动继续补跑'
+        stage.save(update_fields=['status', 'error_message'])
+        return 'run'
+
+    return 'completed'
+
+
+def _execute_pipeline_stage(
+    project_id: str,
+    stage_name: str,
+    user_id: int,
+    **kwargs
+) -> Dict[str, Any]:
+    """在完整工作流中同步执行单个阶段，返回阶段任务结果。"""
+    # 根据阶段类型调用对应的任务
+    if stage_name in ['rewrite', 'asset_extraction', 'storyboard', 'camera_movement']:
+        # LLM类阶段
+        stage = ProjectStage.objects.get(project_id=project_id, stage_type=stage_name)
+        return execute_llm_stage(
+            project_id=project_id,
+            stage_name=stage_name,
+            input_data=stage.input_data or {},
+            user_id=user_id
+        )
+
+    if stage_name == 'image_generation':
+        # 文生图阶段
+        return execute_text2image_stage(
+            project_id=project_id,
+            storyboard_ids=None,  # 处理所有分镜
+            user_id=user_id
+        )
+
+    if stage_name == 'multi_grid_image':
+        return execute_multi_grid_image_stage(
+            project_id=project_id,
+            storyboard_ids=None,
+            user_id=user_id,
+        )
+
+    if stage_name == 'image_edit':
+        return execute_image_edit_stage(
+            project_id=project_id,
+            storyboard_ids=None,
+            user_id=user_id,
+        )
+
+    if stage_name == 'video_generation':
+        # 图生视频阶段
+        return execute_image2video_stage(
+            project_id=project_id,
+            storyboard_ids=None,  # 处理所有分镜
+            user_id=user_id,
+            **kwargs
+        )
+
+    return {'success': False, 'error': f'不支持的阶段: {stage_name}'}
+
+
+def _get_streaming_stage_group(project: Project, stage_order: List[str], index: int) -> List[str]:
+    """
+    返回需要按分镜流水线执行的阶段组
+
+    仅当文生图与图生视频阶段都需要执行时成立; 运镜阶段若也需执行则与文生图并行。
+    其余情况返回空列表，按阶段逐个执行。
+    """
+    if not getattr(settings, 'PIPELINE_STREAMING_MODE', False):
+        return []
+    if stage_order[index] != 'image_generation':
+        return []
+
+    followers = []
+    for stage_name in ('camera_movement', 'video_generation'):
+        if stage_name not in stage_order[index + 1:]:
+            continue
+        stage = ProjectStage.objects.filter(project=project, stage_type=stage_name).first()
+        if stage and _resolve_pipeline_stage_action(project, stage) == 'run':
+            followers.append(stage_name)
+
+    if 'video_generation' not in followers:
+        return []
+    return ['image_generation', *followers]
+
+
+def _run_streaming_stages(project_id: str, stage_names: List[str], user_id: int) -> Dict[str, Dict[str, Any]]:
+    """
+    分镜级流水线执行图片/运镜/视频阶段
+
+    - 文生图与运镜阶段并行执行
+    - 视频阶段同时启动，某分镜图片(及运镜)就绪即提交该分镜的视频任务
+    - 上游阶段全部结束后，视频阶段处理剩余分镜并收尾
+    """
+    upstream_stages = {stage_name for stage_name in stage_names if stage_name != 'video_generation'}
+    finished_upstream = set()
+    upstream_lock = threading.Lock()
+    upstream_finished = threading.Event()
+
+    def run_stage(stage_name: str) -> Dict[str, Any]:
+        try:
+            if stage_name == 'video_generation':
+                return _execute_pipeline_stage(
+                    project_id,
+                    stage_name,
+                    user_id,
+                    upstream_done=upstream_finished.is_set,
+                )
+            return _execute_pipeline_stage(project_id, stage_name, user_id)
+        finally:
+            if stage_name in upstream_stages:
+                with upstream_lock:
+                    finished_upstream.add(stage_name)
+                    if finished_upstream >= upstream_stages:
+                        upstream_finished.set()
+
+    results = {}
+    for stage_name, result, error in iter_bounded_concurrent(
+        stage_names,
+        run_stage,
+        max_workers=len(stage_names),
+        thread_name_prefix='pipeline-stream',
+    ):
+        if error is not None:
+            logger.error(f"分镜级流水线阶段 {stage_name} 异常: {error}")
+            result = {'success': False, 'error': str(error)}
+        results[stage_name] = result
+
+    return {stage_name: results[stage_name] for stage_name in stage_names}
+
+
 @app.task(
     bind=True,
     max_retries=0,
@@ -1157,13 +1365,20 @@ def run_full_pipeline_task(
             message='开始执行完整工作流'
         )
 
+        # 已随分镜级流水线一并执行的阶段
+        streamed_stages = set()
+
         # 遍历所有阶段
         for index, stage_name in enumerate(stage_order):
+            if stage_name in streamed_stages:
+                continue
+
             try:
                 # 获取阶段
                 stage = ProjectStage.objects.get(project=project, stage_type=stage_name)
+                action = _resolve_pipeline_stage_action(project, stage)
 
-                if not is_stage_template_enabled(project, stage_name):
+                if action == 'disabled':
                     message = f'阶段 {stage.get_stage_type_display()} 的提示词模板未开启，自动跳过'
                     logger.info(message)
                     _skip_stage(stage, message)
@@ -1176,92 +1391,58 @@ def run_full_pipeline_task(
                     continue
 
                 # 检查阶段是否已完成
-                if stage.status == 'completed':
-                    if stage_name == 'image_generation' and not _is_image_generation_complete(project):
-                        logger.warning(f"阶段 {stage_name} 状态异常，检测到仍有未生成图片，自动继续补跑")
-                        stage.status = 'failed'
-                        stage.error_message = '检测到仍有分镜图片未生成完成，自动继续补跑'
-                        stage.save(update_fields=['status', 'error_message'])
-                    else:
-                        logger.info(f"阶段 {stage_name} 已完成，跳过")
-                        skipped_stages.append(stage_name)
+                if action == 'completed':
+                    logger.info(f"阶段 {stage_name} 已完成，跳过")
+                    skipped_stages.append(stage_name)
 
-                        # 发布跳过消息
-                        publisher.publish_stage_update(
-                            status='processing',
-                            progress=int((index + 1) / len(stage_order) * 100),
-                            message=f'阶段 {stage.get_stage_type_display()} 已完成，跳过'
-                        )
-                        continue
+                    # 发布跳过消息
+                    publisher.publish_stage_update(
+                        status='processing',
+                        progress=int((index + 1) / len(stage_order) * 100),
+                        message=f'阶段 {stage.get_stage_type_display()} 已完成，跳过'
+                    )
+                    continue
+
+                # 图片与视频阶段均需执行时，按分镜流水线执行(图片就绪即开始生成该分镜视频)
+                stream_group = _get_streaming_stage_group(project, stage_order, index)
 
                 # 执行阶段
-                logger.info(f"开始执行阶段: {stage_name}")
+                logger.info(f"开始执行阶段: {', '.join(stream_group or [stage_name])}")
 
                 # 发布阶段开始消息
                 publisher.publish_stage_update(
                     status='processing',
                     progress=int(index / len(stage_order) * 100),
                     message=f'开始执行阶段: {stage.get_stage_type_display()}'
+                    + ('（分镜级流水线）' if stream_group else '')
                 )
 
-                # 根据阶段类型调用对应的任务
-                if stage_name in ['rewrite', 'asset_extraction', 'storyboard', 'camera_movement']:
-                    # LLM类阶段
-                    input_data = stage.input_data or {}
-                    result = execute_llm_stage(
-                        project_id=project_id,
-                        stage_name=stage_name,
-                        input_data=input_data,
-                        user_id=user_id
-                    )
-
-                elif stage_name == 'image_generation':
-                    # 文生图阶段
-                    result = execute_text2image_stage(
-                        project_id=project_id,
-                        storyboard_ids=None,  # 处理所有分镜
-                        user_id=user_id
-                    )
-
-                elif stage_name == 'multi_grid_image':
-                    result = execute_multi_grid_image_stage(
-                        project_id=project_id,
-                        storyboard_ids=None,
-                        user_id=user_id,
-                    )
-
-                elif stage_name == 'image_edit':
-                    result = execute_image_edit_stage(
-                        project_id=project_id,
-                        storyboard_ids=None,
-                        user_id=user_id,
-                    )
-
-                elif stage_name == 'video_generation':
-                    # 图生视频阶段
-                    result = execute_image2video_stage(
-                        project_id=project_id,
-                        storyboard_ids=None,  # 处理所有分镜
-                        user_id=user_id
-                    )
+                if stream_group:
+                    streamed_stages.update(stream_group)
+                    results = _run_streaming_stages(project_id, stream_group, user_id)
+                else:
+                    results = {stage_name: _execute_pipeline_stage(project_id, stage_name, user_id)}
 
                 # 检查执行结果
-                if result.get('paused'):
-                    logger.info(f"阶段 {stage_name} 因项目暂停中断")
-                    return {
-                        'success': False,
-                        'paused': True,
-                        'task_id': task_id,
-                        'channel': channel,
-                        'completed_stages': completed_stages,
-                        'skipped_stages': skipped_stages
-                    }
-                if result.get('success'):
-                    completed_stages.append(stage_name)
-                    logger.info(f"阶段 {stage_name} 执行成功")
-                else:
-                    error_msg = result.get('error', '未知错误')
-                    raise Exception(f"阶段 {stage_name} 执行失败: {error_msg}")
+                for result_stage_name, result in results.items():
+                    if result.get('paused'):
+                        logger.info(f"阶段 {result_stage_name} 因项目暂停中断")
+                        return {
+                            'success': False,
+                            'paused': True,
+                            'task_id': task_id,
+                            'channel': channel,
+                            'completed_stages': completed_stages,
+                            'skipped_stages': skipped_stages
+                        }
+
+                for result_stage_name, result in results.items():
+                    if result.get('success'):
+                        completed_stages.append(result_stage_name)
+                        logger.info(f"阶段 {result_stage_name} 执行成功")
+                    else:
+                        error_msg = result.get('error', '未知错误')
+                        raise Exception(f"阶段 {result_stage_name} 执行失败: {error_msg}")
 
             except ProjectStage.DoesNotExist:
                 error_msg = f'阶段不存在: {stage_name}'
@@ -1358,3 +1539,20 @@ def run_full_pipeline_task(
             complete_episode_task_by_celery_id(task_id, queue_final_status)
         _unregister_project_task(project_id, task_id)
         publisher.close()
+
+
+@app.task(ignore_result=True, acks_late=False)
+def reconcile_episode_queues_task() -> None:
+    """
+    分集任务队列定时校准 (Celery Beat 每 QUEUE_RECONCILE_INTERVAL 秒触发)
+    修复失联的执行中任务并调度下一集, 请求路径只需处理自身的入队与完成
+    """
+    # 多个 Beat/Worker 同时触发时只执行一次
+    lock_timeout = max(int(settings.QUEUE_RECONCILE_INTERVAL * 4), 60)
+    if not cache.add('ai_story:queue_reconcile:lock', timezone.now().isoformat(), timeout=lock_timeout):
+        logger.info('队列校准正在执行, 跳过本次')
+        return
+    try:
+        reconcile_episode_queues()
+    finally:
+        cache.delete('ai_story:queue_reconcile:lock')
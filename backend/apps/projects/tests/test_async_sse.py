@@ -0,0 +1,169 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.projects import sse_asgi
+from apps.projects.sse_asgi import ProjectSSEApplication
+from apps.projects.sse_hub import SSEFrame, SSEHub
+
+
+class FakeAsyncRedis:
+    """内存中的单个事件日志,XREAD 无新条目时阻塞到超时"""
+
+    def __init__(self, entries=()):
+        self.entries = list(entries)
+        self.xread_calls = []
+        self.appended = asyncio.Event()
+
+    def append(self, event_id, stage, message_type):
+        self.entries.append(entry(event_id, stage, message_type))
+        self.appended.set()
+
+    async def xrevrange(self, key, count=1):
+        return self.entries[-1:]
+
+    async def xread(self, streams, count=100, block=None):
+        self.xread_calls.append(dict(streams))
+        (key, last_id), = streams.items()
+        last = tuple(map(int, last_id.split('-')))
+        pending = [item for item in self.entries if tuple(map(int, item[0].split('-'))) > last][:count]
+        if not pending and block is not None:
+            self.appended.clear()
+            try:
+                await asyncio.wait_for(self.appended.wait(), block / 1000)
+            except asyncio.TimeoutError:
+                return []
+            return await self.xread(streams, count)
+        return [[key, pending]] if pending else []
+
+
+def entry(event_id, stage, message_type):
+    return event_id, {'stage': stage, 'data': json.dumps({'type': message_type, 'stage': stage})}
+
+
+class AsyncSSETestCase(SimpleTestCase):
+    def run_app(self, redis_client, path, headers=None, disconnect_after=None):
+        sent = []
+        fallback_calls = []
+
+        async def fallback(scope, receive, send):
+            fallback_calls.append(scope['path'])
+
+        async def receive():
+            if disconnect_after is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(disconnect_after)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': headers or [],
+        }
+        with patch('core.redis.subscriber.get_async_redis_client', return_value=redis_client):
+            asyncio.run(ProjectSSEApplication(fallback)(scope, receive, send))
+
+        body = b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+        return sent, body, fallback_calls
+
+    def test_stage_stream_replays_from_last_event_id_and_ends_on_done(self):
+        redis_client = FakeAsyncRedis([
+            entry('11-0', 'rewrite', 'token'),
+            entry('12-0', 'storyboard', 'token'),
+            entry('13-0', 'storyboard', 'done'),
+        ])
+
+        sent, body, _ = self.run_app(
+            redis_client,
+            '/api/v1/projects/sse/projects/p1/stages/storyboard/',
+            headers=[(b'last-event-id', b'10-0')],
+        )
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), sent[0]['headers'])
+        self.assertIn({'ai_story:project:p1:events': '10-0'}, redis_client.xread_calls)
+        self.assertIn(b'"type": "connected"', body)
+        self.assertIn(b'id: 12-0\ndata: ', body)
+        self.assertIn(b'id: 13-0\ndata: ', body)
+        self.assertNotIn(b'11-0', body)
+        self.assertFalse(sent[-1]['more_body'])
+
+    def test_heartbeat_and_idle_timeout(self):
+        redis_client = FakeAsyncRedis([entry('5-0', 'rewrite', 'token')])
+
+        with patch.object(sse_asgi, 'HEARTBEAT_INTERVAL_SECONDS', 0.05), \
+                patch.object(sse_asgi, 'ALL_STAGES_IDLE_TIMEOUT_SECONDS', 0.18):
+            _, body, _ = self.run_app(redis_client, '/api/v1/projects/sse/projects/p1/')
+
+        self.assertEqual(redis_client.xread_calls[0], {'ai_story:project:p1:events': '5-0'})
+        self.assertGreaterEqual(body.count(b': heartbeat\n\n'), 2)
+        self.assertNotIn(b'id: 5-0', body)
+
+    def test_client_disconnect_stops_stream(self):
+        redis_client = FakeAsyncRedis()
+
+        sent, _, _ = self.run_app(
+            redis_client, '/api/v1/projects/sse/projects/p1/', disconnect_after=0.05
+        )
+
+        self.assertTrue(all(message.get('more_body', True) for message in sent[1:]))
+
+    def test_other_paths_fall_through_to_django(self):
+        _, _, fallback_calls = self.run_app(FakeAsyncRedis(), '/api/v1/projects/projects/')
+
+        self.assertEqual(fallback_calls, ['/api/v1/projects/projects/'])
+
+
+class SSEHubTestCase(SimpleTestCase):
+    def run_hub(self, redis_client, scenario):
+        with patch('core.redis.subscriber.get_async_redis_client', return_value=redis_client):
+            return asyncio.run(scenario())
+
+    def test_one_reader_per_project_fans_out_to_all_listeners(self):
+        redis_client = FakeAsyncRedis()
+
+        async def scenario():
+            hub = SSEHub(max_queue=10)
+            listeners = [hub.subscribe('p1', 'storyboard'), hub.subscribe('p1', 'storyboard'), hub.subscribe('p1')]
+            await listeners[0].feed.ready.wait()
+            with patch('apps.projects.sse_hub.format_sse_message', wraps=lambda data: b'frame') as fmt:
+                redis_client.append('1-0', 'rewrite', 'token')
+                redis_client.append('2-0', 'storyboard', 'done')
+                received = [
+                    [frame.event_id for frame in await asyncio.gather(*[listener.get(1.0) for _ in range(count)])]
+                    for listener, count in zip(listeners, (1, 1, 2))
+                ]
+                format_calls = fmt.call_count
+            stats = hub.stats()
+            for listener in listeners:
+                listener.close()
+            return received, format_calls, stats, hub.stats()
+
+        received, format_calls, stats, closed_stats = self.run_hub(redis_client, scenario)
+
+        self.assertEqual(received, [['2-0'], ['2-0'], ['1-0', '2-0']])
+        self.assertEqual(format_calls, 2)
+        self.assertEqual(stats, {'projects': 1, 'listeners': 3})
+        self.assertEqual(closed_stats, {'projects': 0, 'listeners': 0})
+
+    def test_slow_listener_is_cut_off_after_draining_queue(self):
+        async def scenario():
+            hub = SSEHub(max_queue=2)
+            listener = hub.subscribe('p1')
+            for index in range(3):
+                listener.offer(SSEFrame(f'{index + 1}-0', 'rewrite', 'token', b'x'))
+            frames = [await listener.get(0.01) for _ in range(3)]
+            listener.close()
+            return listener.lagged, frames
+
+        lagged, frames = self.run_hub(FakeAsyncRedis(), scenario)
+
+        self.assertTrue(lagged)
+        self.assertEqual([frame.event_id if frame else None for frame in frames], ['1-0', '2-0', None])
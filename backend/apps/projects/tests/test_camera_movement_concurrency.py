@@ -0,0 +1,290 @@
+import threading
+from collections import defaultdict
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from apps.content.models import CameraMovement, Storyboard
+from apps.content.processors.llm_stage import LLMStageProcessor
+from apps.projects.models import Project, ProjectStage, Series
+from apps.projects.tasks import execute_llm_stage
+from apps.prompts.models import PromptTemplate, PromptTemplateSet
+from core.utils.concurrency import iter_concurrent_streams
+
+
+User = get_user_model()
+
+
+class FakeStreamingLLMClient:
+    """按分镜返回预设运镜文本的假客户端,记录同时在途的流数量"""
+
+    config = {}
+
+    def __init__(self, barrier_parties=1, failing_scenes=()):
+        self.barrier = threading.Barrier(barrier_parties, timeout=5)
+        self.failing_scenes = set(failing_scenes)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def generate_stream(self, prompt, system_prompt=None, **kwargs):
+        scene = prompt.split('剧本:旁白')[1].split('\n')[0]
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self.barrier.wait()
+            if scene in self.failing_scenes:
+                yield {'type': 'error', 'error': f'场景{scene}超时'}
+                return
+            yield {'type': 'token', 'content': '镜头', 'full_text': '镜头'}
+            yield {'type': 'token', 'content': f'推近{scene}', 'full_text': f'镜头推近{scene}'}
+            yield {'type': 'done', 'full_text': f'镜头推近{scene}'}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class FakeBatchLLMClient:
+    """批量请求返回部分分镜的运镜数组,逐个请求返回单条运镜"""
+
+    config = {}
+
+    def __init__(self, batch_outputs, failing_scenes=()):
+        self.batch_outputs = list(batch_outputs)
+        self.failing_scenes = set(failing_scenes)
+        self.prompts = []
+
+    def generate_stream(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        if '## 输出格式' in prompt:
+            text = self.batch_outputs.pop(0)
+        else:
+            scene = prompt.split('剧本:旁白')[1].split('\n')[0]
+            if scene in self.failing_scenes:
+                yield {'type': 'error', 'error': f'场景{scene}超时'}
+                return
+            text = f'单独运镜{scene}'
+        yield {'type': 'token', 'content': text, 'full_text': text}
+        yield {'type': 'done', 'full_text': text}
+
+
+class FakeConcurrentBatchLLMClient:
+    """各批并发逐段输出运镜数组,所有批次都开始输出后才继续,保证片段交错"""
+
+    config = {}
+
+    def __init__(self, batch_count):
+        self.barrier = threading.Barrier(batch_count, timeout=5)
+
+    def generate_stream(self, prompt, system_prompt=None, **kwargs):
+        scenes = [int(line.split()[-1]) for line in prompt.split('\n') if line.startswith('### 分镜')]
+        parts = ['['] + [
+            f'{"," if index else ""}{{"scene_number": {scene}, "description": "批量运镜{scene}"}}'
+            for index, scene in enumerate(scenes)
+        ] + [']']
+        full_text = ''
+        for index, part in enumerate(parts):
+            full_text += part
+            yield {'type': 'token', 'content': part, 'full_text': full_text}
+            if index == 0:
+                self.barrier.wait()
+        yield {'type': 'done', 'full_text': full_text}
+
+
+class CameraMovementConcurrencyTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='camera-concurrency-user', password='secret123')
+        self.series = Series.objects.create(name='运镜测试系列', description='测试', user=self.user)
+        self.project = Project.objects.create(
+            user=self.user,
+            series=self.series,
+            episode_number=1,
+            sort_order=1,
+            episode_title='第1集',
+            name='并发运镜项目',
+            original_topic='测试并发运镜',
+        )
+        template_set = PromptTemplateSet.objects.create(name='运镜模板集', created_by=self.user)
+        self.project.prompt_template_set = template_set
+        self.project.save(update_fields=['prompt_template_set', 'updated_at'])
+        self.template = PromptTemplate.objects.create(
+            template_set=template_set,
+            stage_type='camera_movement',
+            template_content='为分镜设计运镜',
+            client_params={'max_concurrency': 3},
+            is_active=True,
+        )
+        for sequence_number in range(1, 4):
+            Storyboard.objects.create(
+                project=self.project,
+                sequence_number=sequence_number,
+                scene_description=f'场景{sequence_number}',
+                narration_text=f'旁白{sequence_number}',
+                image_prompt=f'提示词{sequence_number}',
+            )
+
+    def _run(self, fake_client):
+        processor = LLMStageProcessor('camera_movement')
+        with patch.object(processor, '_get_ai_client', return_value=fake_client), \
+                patch.object(processor, '_build_prompt', return_value='为分镜设计运镜'):
+            return list(processor.process_stream(str(self.project.id), input_data={'storyboard_ids': []}))
+
+    def test_scenes_are_generated_concurrently_and_saved_as_they_finish(self):
+        fake_client = FakeStreamingLLMClient(barrier_parties=3)
+
+        events = self._run(fake_client)
+
+        tokens = [event for event in events if event['type'] == 'token']
+        generated = sorted(event['scene_number'] for event in events if event['type'] == 'camera_generated')
+
+        self.assertEqual(fake_client.max_in_flight, 3)
+        self.assertEqual(generated, [1, 2, 3])
+        self.assertTrue(all('scene_number' in event for event in tokens))
+        self.assertEqual(
+            {event['scene_number']: event['full_text'] for event in tokens},
+            {1: '镜头推近1', 2: '镜头推近2', 3: '镜头推近3'},
+        )
+        self.assertEqual(
+            {
+                camera.storyboard.sequence_number: camera.movement_params['description']
+                for camera in CameraMovement.objects.filter(storyboard__project=self.project)
+            },
+            {1: '镜头推近1', 2: '镜头推近2', 3: '镜头推近3'},
+        )
+        self.assertEqual(events[-1]['type'], 'done')
+
+    def test_failed_scene_does_not_block_other_scenes(self):
+        fake_client = FakeStreamingLLMClient(barrier_parties=3, failing_scenes={'2'})
+
+        events = self._run(fake_client)
+
+        errors = [event for event in events if event['type'] == 'error']
+        self.assertEqual(len(errors), 1)
+        self.assertIn('场景2超时', errors[0]['error'])
+        self.assertEqual(
+            set(
+                CameraMovement.objects.filter(storyboard__project=self.project).values_list(
+                    'storyboard__sequence_number', flat=True
+                )
+            ),
+            {1, 3},
+        )
+        stage = ProjectStage.objects.get(project=self.project, stage_type='camera_movement')
+        self.assertEqual(stage.status, 'failed')
+
+    def test_batch_mode_fans_out_array_and_retries_missing_scenes(self):
+        self.template.client_params = {'batch_size': 2, 'max_concurrency': 1}
+        self.template.save(update_fields=['client_params'])
+        fake_client = FakeBatchLLMClient([
+            '```json\n[{"scene_number": 1, "description": "批量运镜1"}]\n```',
+            '无法解析的输出',
+        ])
+
+        events = self._run(fake_client)
+
+        batch_prompts = [prompt for prompt in fake_client.prompts if '## 输出格式' in prompt]
+        generated = [event['scene_number'] for event in events if event['type'] == 'camera_generated']
+        self.assertEqual(len(batch_prompts), 2)
+        self.assertIn('### 分镜 2', batch_prompts[0])
+        self.assertEqual(len(fake_client.prompts), 4)
+        self.assertEqual(generated, [1, 2, 3])
+        self.assertEqual(
+            {
+                camera.storyboard.sequence_number: camera.movement_params['description']
+                for camera in CameraMovement.objects.filter(storyboard__project=self.project)
+            },
+            {1: '批量运镜1', 2: '单独运镜2', 3: '单独运镜3'},
+        )
+        self.assertFalse(any(event['type'] == 'error' for event in events))
+
+    def _run_recording_stage_status(self, fake_client):
+        processor = LLMStageProcessor('camera_movement')
+        statuses = []
+        with patch.object(processor, '_get_ai_client', return_value=fake_client), \
+                patch.object(processor, '_build_prompt', return_value='为分镜设计运镜'):
+            for event in processor.process_stream(str(self.project.id), input_data={'storyboard_ids': []}):
+                if event['type'] == 'camera_generated':
+                    statuses.append(
+                        ProjectStage.objects.get(project=self.project, stage_type='camera_movement').status
+                    )
+        return statuses, ProjectStage.objects.get(project=self.project, stage_type='camera_movement').status
+
+    def test_batch_mode_marks_stage_completed_once_after_all_batches(self):
+        self.template.client_params = {'batch_size': 2, 'max_concurrency': 1}
+        self.template.save(update_fields=['client_params'])
+        fake_client = FakeBatchLLMClient([
+            '[{"scene_number": 1, "description": "批量运镜1"}, {"scene_number": 2, "description": "批量运镜2"}]',
+            '[{"scene_number": 3, "description": "批量运镜3"}]',
+        ])
+
+        statuses, final_status = self._run_recording_stage_status(fake_client)
+
+        self.assertEqual(statuses, ['processing'] * 3)
+        self.assertEqual(final_status, 'completed')
+
+    def test_batch_mode_reports_failure_when_fallback_scene_fails(self):
+        self.template.client_params = {'batch_size': 2, 'max_concurrency': 1}
+        self.template.save(update_fields=['client_params'])
+        fake_client = FakeBatchLLMClient(
+            ['[{"scene_number": 1, "description": "批量运镜1"}, {"scene_number": 2, "description": "批量运镜2"}]', '无法解析的输出'],
+            failing_scenes={'3'},
+        )
+
+        statuses, final_status = self._run_recording_stage_status(fake_client)
+
+        self.assertEqual(statuses, ['processing', 'processing'])
+        self.assertEqual(final_status, 'failed')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch('apps.projects.tasks.RedisStreamPublisher')
+    def test_concurrent_batches_publish_tokens_on_separate_streams(self, mock_publisher_class):
+        self.template.client_params = {'batch_size': 2, 'max_concurrency': 2}
+        self.template.save(update_fields=['client_params'])
+        ProjectStage.objects.create(project=self.project, stage_type='camera_movement')
+        publisher = mock_publisher_class.return_value
+        publisher.publish_token.return_value = True
+
+        with patch.object(LLMStageProcessor, '_get_ai_client', return_value=FakeConcurrentBatchLLMClient(2)), \
+                patch.object(LLMStageProcessor, '_build_prompt', return_value='为分镜设计运镜'):
+            result = execute_llm_stage.apply(
+                args=[str(self.project.id), 'camera_movement', {'storyboard_ids': []}, self.user.id]
+            ).get()
+
+        self.assertTrue(result['success'])
+        streams = defaultdict(str)
+        snapshots = {}
+        for call in publisher.publish_token.call_args_list:
+            content, full_text = call.args
+            streams[call.kwargs['scene_number']] += content
+            snapshots[call.kwargs['scene_number']] = full_text
+        self.assertEqual(set(streams), {1, 3})
+        self.assertEqual(
+            streams[1], '[{"scene_number": 1, "description": "批量运镜1"},{"scene_number": 2, "description": "批量运镜2"}]'
+        )
+        self.assertEqual(streams[3], '[{"scene_number": 3, "description": "批量运镜3"}]')
+        self.assertEqual(snapshots, dict(streams))
+        self.assertEqual(
+            CameraMovement.objects.filter(storyboard__project=self.project, movement_params__description__startswith='批量运镜').count(),
+            3,
+        )
+
+
+class IterConcurrentStreamsTestCase(SimpleTestCase):
+    def test_interleaves_streams_and_reports_errors(self):
+        def stream(item):
+            if item == 'bad':
+                yield 'partial'
+                raise RuntimeError('boom')
+            yield from (f'{item}-{index}' for index in range(2))
+
+        results = list(iter_concurrent_streams(['a', 'bad', 'c'], stream, max_workers=2))
+
+        finished = {item: error for item, chunk, done, error in results if done}
+        chunks = [chunk for item, chunk, done, error in results if not done]
+        self.assertEqual(set(finished), {'a', 'bad', 'c'})
+        self.assertIsNone(finished['a'])
+        self.assertIsInstance(finished['bad'], RuntimeError)
+        self.assertEqual(sorted(chunks), ['a-0', 'a-1', 'c-0', 'c-1', 'partial'])
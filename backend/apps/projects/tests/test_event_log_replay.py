@@ -0,0 +1,91 @@
+import json
+from unittest.mock import Mock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.projects.sse_views import ProjectStageSSEView
+from core.redis.pool import get_connection_pool, reset_connection_pools
+from core.redis.publisher import RedisStreamPublisher
+from core.redis.subscriber import RedisStreamSubscriber
+
+
+def entry(event_id, stage, message_type):
+    return event_id, {'stage': stage, 'data': json.dumps({'type': message_type, 'stage': stage})}
+
+
+class EventLogReplayTestCase(SimpleTestCase):
+    def test_publisher_appends_to_capped_project_stream(self):
+        redis_client = Mock()
+        with patch.object(RedisStreamPublisher, '_get_redis_client', return_value=redis_client):
+            publisher = RedisStreamPublisher('project-1', 'storyboard')
+        publisher.publish_stage_update(status='processing')
+
+        pipe = redis_client.pipeline.return_value
+        key, fields = pipe.xadd.call_args.args
+        self.assertEqual(key, 'ai_story:project:project-1:events')
+        self.assertEqual(fields['stage'], 'storyboard')
+        self.assertTrue(pipe.xadd.call_args.kwargs['approximate'])
+        pipe.expire.assert_any_call('ai_story:project:project-1:events', 86400)
+        redis_client.publish.assert_not_called()
+
+    def test_subscriber_replays_after_last_event_id_and_filters_stage(self):
+        redis_client = Mock()
+        redis_client.xread.return_value = [
+            ['ai_story:project:project-1:events', [
+                entry('11-0', 'rewrite', 'token'),
+                entry('12-0', 'storyboard', 'token'),
+                entry('13-0', 'storyboard', 'done'),
+            ]],
+        ]
+        subscriber = RedisStreamSubscriber('project-1', 'storyboard', last_event_id='10-0')
+        subscriber.redis_client = redis_client
+
+        messages = [subscriber.get_message(timeout=0.1) for _ in range(2)]
+
+        redis_client.xread.assert_called_once_with(
+            {'ai_story:project:project-1:events': '10-0'}, count=100, block=100
+        )
+        redis_client.xrevrange.assert_not_called()
+        self.assertEqual([message['event_id'] for message in messages], ['12-0', '13-0'])
+        self.assertEqual(subscriber.last_id, '13-0')
+
+    def test_new_subscriber_starts_from_stream_tail(self):
+        redis_client = Mock()
+        redis_client.xrevrange.return_value = [entry('42-0', 'rewrite', 'token')]
+        redis_client.xread.return_value = []
+        subscriber = RedisStreamSubscriber('project-1', 'rewrite')
+
+        with patch.object(RedisStreamSubscriber, '_get_redis_client', return_value=redis_client):
+            self.assertIsNone(subscriber.get_message(timeout=0.1))
+
+        self.assertEqual(redis_client.xread.call_args.args[0], {'ai_story:project:project-1:events': '42-0'})
+
+    def test_sse_view_honors_last_event_id_header(self):
+        request = RequestFactory().get('/sse/', HTTP_LAST_EVENT_ID='12-0')
+        view = ProjectStageSSEView()
+
+        with patch.object(ProjectStageSSEView, '_create_event_stream', return_value=iter([])) as create_stream:
+            view.get(request, project_id='project-1', stage_name='storyboard')
+
+        create_stream.assert_called_once_with('project-1', 'storyboard', '12-0')
+        self.assertTrue(
+            view._format_sse_message({'type': 'done', 'event_id': '13-0'}).startswith(b'id: 13-0\ndata: ')
+        )
+
+    def test_publishers_and_subscribers_share_process_pool(self):
+        reset_connection_pools()
+        self.addCleanup(reset_connection_pools)
+
+        publishers = [RedisStreamPublisher('project-1', stage) for stage in ('rewrite', 'storyboard')]
+        subscriber = RedisStreamSubscriber('project-1', 'rewrite')
+        subscriber.redis_client = subscriber._get_redis_client()
+        pool = get_connection_pool('pubsub')
+
+        self.assertTrue(all(publisher.redis_client.connection_pool is pool for publisher in publishers))
+        self.assertIs(subscriber.redis_client.connection_pool, pool)
+        self.assertIsNot(get_connection_pool('rate_limit'), pool)
+
+        with patch.object(pool, 'disconnect') as disconnect:
+            publishers[0].close()
+            subscriber.close()
+        disconnect.assert_not_called()
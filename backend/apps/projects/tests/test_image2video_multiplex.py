@@ -0,0 +1,349 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from apps.content.models import CameraMovement, GeneratedImage, GeneratedVideo, ProviderTask, Storyboard
+from apps.content.processors.image2video_stage import Image2VideoStageProcessor
+from apps.models.models import ModelProvider
+from apps.projects.models import Project, Series
+from apps.prompts.models import PromptTemplate, PromptTemplateSet
+from core.ai_client.image2video_client import VideoTaskFailedError
+
+
+User = get_user_model()
+
+
+class FakePollingVideoClient:
+    """按预设轮询次数完成任务的假客户端"""
+
+    def __init__(self, polls_until_done):
+        self.polls_until_done = polls_until_done
+        self.submitted = []
+        self.max_in_flight = 0
+        self.in_flight = set()
+        self.poll_counts = {}
+
+    def submit_video_task(self, prompt, **kwargs):
+        task_id = f"task-{len(self.submitted) + 1}"
+        self.submitted.append(task_id)
+        self.in_flight.add(task_id)
+        self.max_in_flight = max(self.max_in_flight, len(self.in_flight))
+        self.poll_counts[task_id] = 0
+        return {'task_id': task_id, 'result': None}
+
+    def check_video_task(self, task_id, started_at=None, **kwargs):
+        self.poll_counts[task_id] += 1
+        remaining = self.polls_until_done[task_id]
+        if self.poll_counts[task_id] < remaining:
+            return None
+        self.in_flight.discard(task_id)
+        if remaining < 0:
+            raise VideoTaskFailedError('任务失败: 内容审核未通过')
+        return {'success': True, 'data': [{'url': f'https://example.com/{task_id}.mp4'}]}
+
+
+class FakeSyncVideoClient:
+    """只支持同步生成(无单独提交/查询)的假客户端"""
+
+    def __init__(self):
+        self.generated = []
+
+    def _generate_video(self, prompt, **kwargs):
+        self.generated.append(prompt)
+        return {'success': True, 'data': [{'url': f'https://example.com/sync-{len(self.generated)}.mp4'}]}
+
+
+class Image2VideoMultiplexTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='video-multiplex-user', password='secret123')
+        self.series = Series.objects.create(name='视频测试系列', description='测试', user=self.user)
+        self.project = Project.objects.create(
+            user=self.user,
+            series=self.series,
+            episode_number=1,
+            sort_order=1,
+            episode_title='第1集',
+            name='批量图生视频项目',
+            original_topic='测试批量图生视频',
+        )
+        self.provider = ModelProvider.objects.create(
+            name='测试图生视频',
+            provider_type='image2video',
+            api_url='https://video.example.com/v1/video/generations',
+            api_key='test-key',
+            model_name='video-model',
+            executor_class='core.ai_client.image2video_client.VideoGeneratorClient',
+        )
+        template_set = PromptTemplateSet.objects.create(name='视频模板集', created_by=self.user)
+        self.project.prompt_template_set = template_set
+        self.project.save(update_fields=['prompt_template_set', 'updated_at'])
+        PromptTemplate.objects.create(
+            template_set=template_set,
+            stage_type='video_generation',
+            model_provider=self.provider,
+            template_content='{{ visual_prompt }}',
+            client_params={'max_concurrency': 2},
+            is_active=True,
+        )
+        for sequence_number in range(1, 4):
+            storyboard = Storyboard.objects.create(
+                project=self.project,
+                sequence_number=sequence_number,
+                scene_description=f'场景{sequence_number}',
+                narration_text=f'旁白{sequence_number}',
+                image_prompt=f'提示词{sequence_number}',
+            )
+            GeneratedImage.objects.create(
+                storyboard=storyboard,
+                image_url=f'https://example.com/{sequence_number}.png',
+                status='completed',
+            )
+            CameraMovement.objects.create(
+                storyboard=storyboard,
+                movement_type='zoom_in',
+                movement_params={'description': '镜头缓慢推近'},
+            )
+
+    @patch('apps.content.processors.image2video_stage.time.sleep', return_value=None)
+    def test_batch_submit_polls_all_tasks_and_streams_completed_clips(self, mock_sleep):
+        fake_client = FakePollingVideoClient({'task-1': 3, 'task-2': 1, 'task-3': -1})
+        processor = Image2VideoStageProcessor()
+
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            return_value=fake_client,
+        ):
+            events = list(processor.process_stream(project_id=str(self.project.id)))
+
+        created = [event['task_id'] for event in events if event['type'] == 'task_created']
+        generated = [event['scene_number'] for event in events if event['type'] == 'video_generated']
+        warnings = [event for event in events if event['type'] == 'warning']
+        progress = [event['current'] for event in events if event['type'] == 'progress']
+
+        self.assertEqual(created, ['task-1', 'task-2', 'task-3'])
+        self.assertEqual(fake_client.max_in_flight, 2)
+        self.assertEqual(generated, [2, 1])
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('内容审核未通过', warnings[0]['message'])
+        self.assertEqual(progress, [1, 2, 3])
+        self.assertEqual(
+            set(
+                GeneratedVideo.objects.filter(storyboard__project=self.project).values_list(
+                    'storyboard__sequence_number', flat=True
+                )
+            ),
+            {1, 2},
+        )
+        self.assertFalse(any(event['type'] == 'error' for event in events))
+
+    @patch('apps.content.processors.image2video_stage.time.sleep', return_value=None)
+    def test_follow_upstream_submits_scenes_as_images_become_ready(self, mock_sleep):
+        GeneratedImage.objects.filter(storyboard__sequence_number__in=[2, 3]).delete()
+        fake_client = FakePollingVideoClient({'task-1': 1, 'task-2': 1})
+        checks = {'count': 0}
+
+        def upstream_done():
+            checks['count'] += 1
+            if checks['count'] == 3:
+                GeneratedImage.objects.create(
+                    storyboard=Storyboard.objects.get(project=self.project, sequence_number=3),
+                    image_url='https://example.com/3.png',
+                    status='completed',
+                )
+            return checks['count'] >= 4
+
+        processor = Image2VideoStageProcessor()
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            return_value=fake_client,
+        ):
+            events = list(
+                processor.process_stream(project_id=str(self.project.id), upstream_done=upstream_done)
+            )
+
+        created = [event['scene_number'] for event in events if event['type'] == 'task_created']
+        warnings = [event['scene_number'] for event in events if event['type'] == 'warning']
+
+        self.assertEqual(created, [1, 3])
+        self.assertEqual(warnings, [2])
+        self.assertEqual(events[-1]['type'], 'done')
+
+    @patch('apps.content.processors.image2video_stage.time.sleep', return_value=None)
+    def test_rerun_resumes_submitted_provider_tasks_instead_of_resubmitting(self, mock_sleep):
+        storyboard = Storyboard.objects.get(project=self.project, sequence_number=1)
+        ProviderTask.objects.create(
+            storyboard=storyboard,
+            stage_type='video_generation',
+            model_provider=self.provider,
+            task_id='task-lost',
+            source_url='https://example.com/1.png',
+        )
+        fake_client = FakePollingVideoClient({'task-lost': 2, 'task-1': 1, 'task-2': 1})
+        fake_client.poll_counts['task-lost'] = 0
+
+        processor = Image2VideoStageProcessor()
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            return_value=fake_client,
+        ):
+            events = list(processor.process_stream(project_id=str(self.project.id)))
+
+        created = [(event['task_id'], event['resumed']) for event in events if event['type'] == 'task_created']
+
+        self.assertEqual(created, [('task-lost', True), ('task-1', False), ('task-2', False)])
+        self.assertEqual(fake_client.submitted, ['task-1', 'task-2'])
+        self.assertEqual(
+            dict(ProviderTask.objects.values_list('task_id', 'status')),
+            {'task-lost': 'completed', 'task-1': 'completed', 'task-2': 'completed'},
+        )
+        self.assertEqual(GeneratedVideo.objects.filter(storyboard__project=self.project).count(), 3)
+
+    def test_deferred_rounds_keep_tasks_in_flight_between_invocations(self):
+        PromptTemplate.objects.filter(stage_type='video_generation').update(
+            client_params={'max_concurrency': 2, 'deferred_completion': True}
+        )
+        fake_client = FakePollingVideoClient({'task-1': 2, 'task-2': 1, 'task-3': 1})
+        processor = Image2VideoStageProcessor()
+        state, rounds = {}, []
+
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            return_value=fake_client,
+        ):
+            self.assertTrue(processor.supports_deferred_completion(self.project))
+            while not rounds or rounds[-1][-1]['type'] == 'deferred':
+                rounds.append(list(processor.process_deferred_round(str(self.project.id), state)))
+                # 跨轮状态随 Celery 消息传递; 模拟 countdown 已到期
+                state = json.loads(json.dumps(state))
+                state['next_poll'] = {key: 0 for key in state['next_poll']}
+
+        created = [[event['task_id'] for event in events if event['type'] == 'task_created'] for events in rounds]
+        generated = [[event['scene_number'] for event in events if event['type'] == 'video_generated'] for events in rounds]
+
+        self.assertEqual(created, [['task-1', 'task-2'], ['task-3'], []])
+        self.assertEqual(generated, [[], [2], [1, 3]])
+        self.assertEqual(rounds[-1][-1]['type'], 'done')
+        self.assertEqual(set(ProviderTask.objects.values_list('status', flat=True)), {'completed'})
+        self.assertEqual(GeneratedVideo.objects.filter(storyboard__project=self.project).count(), 3)
+        self.assertEqual(self.project.stages.get(stage_type='video_generation').status, 'completed')
+
+    def _create_backup_provider(self):
+        return ModelProvider.objects.create(
+            name='备用图生视频',
+            provider_type='image2video',
+            api_url='https://backup.example.com/v1/video/generations',
+            api_key='backup-key',
+            model_name='backup-model',
+            executor_class='core.ai_client.image2video_client.VideoGeneratorClient',
+        )
+
+    @patch('apps.content.processors.image2video_stage.time.sleep', return_value=None)
+    def test_rerun_polls_resumed_task_with_its_original_provider(self, mock_sleep):
+        backup = self._create_backup_provider()
+        ProviderTask.objects.create(
+            storyboard=Storyboard.objects.get(project=self.project, sequence_number=1),
+            stage_type='video_generation',
+            model_provider=backup,
+            task_id='backup-task',
+            source_url='https://example.com/1.png',
+        )
+        primary_client = FakePollingVideoClient({'task-1': 1, 'task-2': 1})
+        backup_client = FakePollingVideoClient({'backup-task': 1})
+        backup_client.poll_counts['backup-task'] = 0
+        clients = {self.provider.pk: primary_client, backup.pk: backup_client}
+
+        processor = Image2VideoStageProcessor()
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            side_effect=lambda provider: clients[provider.pk],
+        ):
+            events = list(processor.process_stream(project_id=str(self.project.id)))
+
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(primary_client.submitted, ['task-1', 'task-2'])
+        self.assertEqual(backup_client.poll_counts['backup-task'], 1)
+        self.assertEqual(ProviderTask.objects.get(task_id='backup-task').status, 'completed')
+        self.assertEqual(
+            GeneratedVideo.objects.get(storyboard__sequence_number=1).model_provider,
+            backup,
+        )
+
+    def _create_resumable_task(self, provider, task_id):
+        return ProviderTask.objects.create(
+            storyboard=Storyboard.objects.get(project=self.project, sequence_number=1),
+            stage_type='video_generation',
+            model_provider=provider,
+            task_id=task_id,
+            source_url='https://example.com/1.png',
+        )
+
+    @patch('apps.content.processors.image2video_stage.time.sleep', return_value=None)
+    def test_resumed_task_is_polled_even_when_primary_client_cannot_poll(self, mock_sleep):
+        backup = self._create_backup_provider()
+        self._create_resumable_task(backup, 'backup-task')
+        primary_client = FakeSyncVideoClient()
+        backup_client = FakePollingVideoClient({'backup-task': 1})
+        backup_client.poll_counts['backup-task'] = 0
+        clients = {self.provider.pk: primary_client, backup.pk: backup_client}
+
+        processor = Image2VideoStageProcessor()
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            side_effect=lambda provider: clients[provider.pk],
+        ):
+            events = list(processor.process_stream(project_id=str(self.project.id)))
+
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(len(primary_client.generated), 2)
+        self.assertEqual(backup_client.poll_counts['backup-task'], 1)
+        self.assertEqual(ProviderTask.objects.get(task_id='backup-task').status, 'completed')
+        self.assertEqual(GeneratedVideo.objects.filter(storyboard__project=self.project).count(), 3)
+
+    @patch('apps.content.processors.image2video_stage.time.sleep', return_value=None)
+    def test_resumed_task_on_provider_without_polling_is_resubmitted(self, mock_sleep):
+        backup = self._create_backup_provider()
+        self._create_resumable_task(backup, 'sync-task')
+        primary_client = FakePollingVideoClient({'task-1': 1, 'task-2': 1, 'task-3': 1})
+        clients = {self.provider.pk: primary_client, backup.pk: FakeSyncVideoClient()}
+
+        processor = Image2VideoStageProcessor()
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            side_effect=lambda provider: clients[provider.pk],
+        ):
+            events = list(processor.process_stream(project_id=str(self.project.id)))
+
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(primary_client.submitted, ['task-1', 'task-2', 'task-3'])
+        self.assertEqual(ProviderTask.objects.get(task_id='sync-task').status, 'failed')
+        self.assertEqual(GeneratedVideo.objects.filter(storyboard__project=self.project).count(), 3)
+
+    def test_deferred_rounds_keep_the_first_rounds_provider(self):
+        PromptTemplate.objects.filter(stage_type='video_generation').update(
+            client_params={'max_concurrency': 3, 'deferred_completion': True}
+        )
+        backup = self._create_backup_provider()
+        primary_client = FakePollingVideoClient({'task-1': 1, 'task-2': 1, 'task-3': 1})
+        backup_client = FakePollingVideoClient({})
+        clients = {self.provider.pk: primary_client, backup.pk: backup_client}
+        processor = Image2VideoStageProcessor()
+        state = {}
+
+        with patch(
+            'apps.content.processors.image2video_stage.create_ai_client',
+            side_effect=lambda provider: clients[provider.pk],
+        ):
+            first = list(processor.process_deferred_round(str(self.project.id), state))
+            state = json.loads(json.dumps(state))
+            state['next_poll'] = {key: 0 for key in state['next_poll']}
+            # 后续轮次路由到其他提供商 (负载均衡/熔断切换)
+            with patch.object(processor, '_get_image2video_provider', return_value=backup):
+                second = list(processor.process_deferred_round(str(self.project.id), state))
+
+        self.assertEqual(first[-1]['type'], 'deferred')
+        self.assertEqual(second[-1]['type'], 'done')
+        self.assertEqual(primary_client.submitted, ['task-1', 'task-2', 'task-3'])
+        self.assertEqual(backup_client.submitted, [])
+        self.assertEqual(ProviderTask.objects.filter(status='submitted').count(), 0)
@@ -0,0 +1,92 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from apps.projects import tasks
+from apps.projects.models import Project, ProjectStage, Series
+from apps.projects.utils import PROJECT_STAGE_TYPES, ensure_project_stages
+
+
+User = get_user_model()
+
+ALL_ENABLED = {stage_type: True for stage_type in PROJECT_STAGE_TYPES}
+
+
+class PipelineStreamingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pipeline-stream-user', password='secret123')
+        self.series = Series.objects.create(name='流水线测试系列', description='测试', user=self.user)
+        self.project = Project.objects.create(
+            user=self.user,
+            series=self.series,
+            episode_number=1,
+            sort_order=1,
+            episode_title='第1集',
+            name='流水线项目',
+            original_topic='测试分镜级流水线',
+        )
+        ensure_project_stages(self.project)
+        self.stage_order = ['rewrite', 'asset_extraction', 'storyboard', 'image_generation', 'camera_movement', 'video_generation']
+
+    @override_settings(PIPELINE_STREAMING_MODE=True)
+    @patch('apps.projects.tasks.is_stage_template_enabled', return_value=True)
+    def test_stream_group_includes_pending_followers(self, mock_enabled):
+        group = tasks._get_streaming_stage_group(self.project, self.stage_order, 3)
+
+        self.assertEqual(group, ['image_generation', 'camera_movement', 'video_generation'])
+
+    @override_settings(PIPELINE_STREAMING_MODE=True)
+    @patch('apps.projects.tasks.is_stage_template_enabled', return_value=True)
+    def test_stream_group_skips_completed_camera_and_requires_video(self, mock_enabled):
+        ProjectStage.objects.filter(project=self.project, stage_type='camera_movement').update(status='completed')
+        self.assertEqual(
+            tasks._get_streaming_stage_group(self.project, self.stage_order, 3),
+            ['image_generation', 'video_generation'],
+        )
+
+        ProjectStage.objects.filter(project=self.project, stage_type='video_generation').update(status='completed')
+        self.assertEqual(tasks._get_streaming_stage_group(self.project, self.stage_order, 3), [])
+
+    @override_settings(PIPELINE_STREAMING_MODE=False)
+    @patch('apps.projects.tasks.is_stage_template_enabled', return_value=True)
+    def test_stream_group_disabled_by_setting(self, mock_enabled):
+        self.assertEqual(tasks._get_streaming_stage_group(self.project, self.stage_order, 3), [])
+
+    def test_run_streaming_stages_releases_video_stage_after_upstream(self):
+        image_started = threading.Event()
+        release_image = threading.Event()
+        observed = {}
+
+        def fake_execute(project_id, stage_name, user_id, **kwargs):
+            if stage_name == 'image_generation':
+                image_started.set()
+                release_image.wait(5)
+                return {'success': True}
+            if stage_name == 'camera_movement':
+                return {'success': True}
+
+            upstream_done = kwargs['upstream_done']
+            image_started.wait(5)
+            observed['before'] = upstream_done()
+            release_image.set()
+            for _ in range(100):
+                if upstream_done():
+                    break
+                threading.Event().wait(0.05)
+            observed['after'] = upstream_done()
+            return {'success': True}
+
+        with patch('apps.projects.tasks._execute_pipeline_stage', side_effect=fake_execute):
+            results = tasks._run_streaming_stages(
+                str(self.project.id),
+                ['image_generation', 'camera_movement', 'video_generation'],
+                self.user.id,
+            )
+
+        self.assertEqual(list(results), ['image_generation', 'camera_movement', 'video_generation'])
+        self.assertTrue(all(result['success'] for result in results.values()))
+        self.assertFalse(observed['before'])
+        self.assertTrue(observed['after'])
@@ -0,0 +1,124 @@
+from unittest.mock import Mock, call, patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from apps.projects.models import Project, ProjectStage
+from apps.projects.progress_service import get_project_progress
+from apps.projects.views import ProjectViewSet
+from core.redis.progress import build_progress_update, parse_progress_snapshot
+from core.redis.publisher import RedisStreamPublisher
+
+
+User = get_user_model()
+
+
+class FakeHash(dict):
+    """按 HSET 语义合并字段,HGETALL 返回字符串"""
+
+    def apply(self, mapping):
+        self.update({key: str(value) for key, value in mapping.items()})
+
+
+class ProgressSnapshotTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='progress-user', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(user=self.user, name='进度', original_topic='测试')
+        ProjectStage.objects.create(
+            project=self.project, stage_type='image_generation', status='failed', error_message='额度不足'
+        )
+
+    def test_events_merge_into_compact_snapshot(self):
+        snapshot = FakeHash()
+        for message in [
+            {'type': 'stage_update', 'status': 'processing', 'timestamp': 1.0},
+            {'type': 'progress', 'current': 3, 'total': 8, 'progress': 37, 'item_name': '分镜3', 'timestamp': 2.0},
+            {'type': 'token', 'content': '忽略', 'timestamp': 2.5},
+            {'type': 'error', 'error': '超时', 'timestamp': 3.0},
+        ]:
+            snapshot.apply(build_progress_update(message, 'image_generation'))
+        snapshot.apply(build_progress_update({'type': 'pipeline_error', 'error': '超时', 'timestamp': 4.0}, 'pipeline'))
+
+        parsed = parse_progress_snapshot(snapshot)
+
+        self.assertEqual(parsed['stages']['image_generation'], {
+            'status': 'failed',
+            'done': 3,
+            'total': 8,
+            'progress': 37,
+            'current_item': '分镜3',
+            'last_error': '超时',
+            'updated_at': 3.0,
+        })
+        self.assertEqual(parsed['pipeline'], {'status': 'failed', 'error': '超时'})
+        self.assertEqual(parsed['updated_at'], 4.0)
+
+    def test_publisher_updates_snapshot_in_same_pipeline(self):
+        redis_client = Mock()
+        with patch.object(RedisStreamPublisher, '_get_redis_client', return_value=redis_client):
+            publisher = RedisStreamPublisher(str(self.project.id), 'video_generation')
+        publisher.publish_progress(current=1, total=4, item_name='分镜1')
+        publisher.publish_token('片段')
+        publisher.flush_tokens()
+
+        pipe = redis_client.pipeline.return_value
+        pipe.hset.assert_called_once()
+        key = pipe.hset.call_args.args[0]
+        mapping = pipe.hset.call_args.kwargs['mapping']
+        self.assertEqual(key, f'ai_story:project:{self.project.id}:progress')
+        self.assertEqual(mapping['video_generation:done'], 1)
+        self.assertEqual(mapping['video_generation:total'], 4)
+
+    @patch('apps.projects.views.AsyncResult', return_value=Mock(state='STARTED'))
+    def test_task_status_reads_snapshot_and_falls_back_to_stages(self, _):
+        url = reverse('project-task-status', args=[self.project.id])
+        redis_client = Mock()
+        redis_client.hgetall.return_value = {'rewrite:status': 'completed', 'rewrite:progress': '100'}
+
+        with patch('core.redis.progress.get_redis_client', return_value=redis_client):
+            response = self.client.get(url, {'task_id': 'celery-1'})
+        self.assertEqual(response.data['progress']['source'], 'redis')
+        self.assertEqual(response.data['progress']['stages']['rewrite'], {'status': 'completed', 'progress': 100})
+
+        redis_client.hgetall.return_value = {}
+        with patch('core.redis.progress.get_redis_client', return_value=redis_client):
+            response = self.client.get(url, {'task_id': 'celery-1'})
+        self.assertEqual(response.data['progress']['source'], 'database')
+        self.assertEqual(
+            response.data['progress']['stages']['image_generation'],
+            {'status': 'failed', 'last_error': '额度不足'},
+        )
+
+    def test_stage_status_comes_from_database_when_snapshot_is_stale(self):
+        ProjectStage.objects.filter(project=self.project).update(status='pending', error_message='')
+        redis_client = Mock()
+        redis_client.hgetall.return_value = {
+            'image_generation:status': 'failed',
+            'image_generation:last_error': '旧错误',
+            'image_generation:done': '3',
+            'image_generation:total': '8',
+            'pipeline:status': 'failed',
+        }
+
+        with patch('core.redis.progress.get_redis_client', return_value=redis_client):
+            progress = get_project_progress(self.project)
+
+        self.assertEqual(progress['source'], 'redis')
+        self.assertEqual(progress['stages']['image_generation'], {'status': 'pending', 'done': 3, 'total': 8})
+        self.assertEqual(progress['pipeline'], {})
+
+    @patch('apps.projects.views.cancel_running_queue_task')
+    def test_pause_and_rollback_clear_snapshot(self, _):
+        redis_client = Mock()
+        url = reverse('project-rollback-stage', args=[self.project.id])
+
+        with patch('core.redis.progress.get_redis_client', return_value=redis_client):
+            self.client.post(url, {'stage_name': 'image_generation'}, format='json')
+            Project.objects.filter(id=self.project.id).update(status='processing')
+            with patch.object(ProjectViewSet, '_revoke_project_tasks', return_value=[]):
+                self.client.post(reverse('project-pause', args=[self.project.id]))
+
+        key = f'ai_story:project:{self.project.id}:progress'
+        self.assertEqual(redis_client.delete.call_args_list, [call(key), call(key)])
@@ -0,0 +1,122 @@
+import random
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from apps.content.processors.llm_stage import LLMStageProcessor
+from apps.content.processors.text2image_stage import Text2ImageStageProcessor
+from apps.models.models import ModelProvider
+from apps.projects.models import Project, ProjectModelConfig, Series
+from core.ai_client.router import ProviderRouter, apply_in_flight_tracking, get_provider_router
+
+
+User = get_user_model()
+
+
+def build_provider(pk, priority=0):
+    return SimpleNamespace(pk=pk, name=f'provider-{pk}', priority=priority)
+
+
+class ProviderRouterTestCase(SimpleTestCase):
+    def test_round_robin_cycles_per_route_key(self):
+        router = ProviderRouter()
+        providers = [build_provider('a'), build_provider('b'), build_provider('c')]
+
+        picked = [router.select(providers, 'round_robin', 'cfg:image').pk for _ in range(4)]
+
+        self.assertEqual(picked, ['a', 'b', 'c', 'a'])
+        self.assertEqual(router.select(providers, 'round_robin', 'cfg:video').pk, 'a')
+
+    def test_weighted_uses_priority_and_skips_zero_weight(self):
+        router = ProviderRouter(rng=random.Random(7))
+        providers = [build_provider('heavy', priority=9), build_provider('light', priority=1), build_provider('off')]
+
+        picked = [router.select(providers, 'weighted').pk for _ in range(200)]
+
+        self.assertNotIn('off', picked)
+        self.assertGreater(picked.count('heavy'), picked.count('light') * 3)
+
+    def test_least_loaded_prefers_provider_with_fewest_in_flight_calls(self):
+        router = ProviderRouter()
+        providers = [build_provider('a', priority=5), build_provider('b', priority=1)]
+
+        self.assertEqual(router.select(providers, 'least_loaded').pk, 'a')
+        with router.track('a'):
+            self.assertEqual(router.select(providers, 'least_loaded').pk, 'b')
+            with router.track('b'), router.track('b'):
+                self.assertEqual(router.select(providers, 'least_loaded').pk, 'a')
+        self.assertEqual(router.in_flight('a'), 0)
+
+    def test_client_calls_are_counted_while_in_flight(self):
+        observed = []
+
+        class FakeClient:
+            def generate(self, prompt):
+                observed.append(get_provider_router().in_flight('p1'))
+                return self.submit_video_task(prompt)
+
+            def submit_video_task(self, prompt):
+                observed.append(get_provider_router().in_flight('p1'))
+                return prompt
+
+            def generate_stream(self, prompt):
+                observed.append(get_provider_router().in_flight('p1'))
+                yield prompt
+
+        client = apply_in_flight_tracking(FakeClient(), build_provider('p1'))
+        client.generate('x')
+        list(client.generate_stream('y'))
+
+        self.assertEqual(observed, [1, 1, 1])
+        self.assertEqual(get_provider_router().in_flight('p1'), 0)
+
+
+class StageProviderRoutingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='router-user', password='secret123')
+        series = Series.objects.create(name='路由测试系列', description='测试', user=self.user)
+        self.project = Project.objects.create(
+            user=self.user,
+            series=series,
+            episode_number=1,
+            sort_order=1,
+            episode_title='第1集',
+            name='路由测试项目',
+            original_topic='测试负载均衡',
+        )
+        self.config = ProjectModelConfig.objects.create(project=self.project, load_balance_strategy='round_robin')
+
+    def create_provider(self, name, provider_type, is_active=True):
+        return ModelProvider.objects.create(
+            name=name,
+            provider_type=provider_type,
+            api_url=f'https://{name}.example.com/v1',
+            api_key='test-key',
+            model_name=f'{name}-model',
+            is_active=is_active,
+        )
+
+    def test_image_stage_rotates_across_active_configured_providers(self):
+        first = self.create_provider('image-a', 'text2image')
+        second = self.create_provider('image-b', 'text2image')
+        disabled = self.create_provider('image-c', 'text2image', is_active=False)
+        self.config.image_providers.add(first, second, disabled)
+
+        processor = Text2ImageStageProcessor()
+        picked = {processor._get_text2image_provider(self.project).pk for _ in range(4)}
+
+        self.assertEqual(picked, {first.pk, second.pk})
+
+    def test_llm_stage_keeps_routed_provider_for_the_whole_run(self):
+        first = self.create_provider('llm-a', 'llm')
+        second = self.create_provider('llm-b', 'llm')
+        self.config.rewrite_providers.add(first, second)
+
+        processor = LLMStageProcessor('rewrite')
+        picked = {processor._get_current_provider(self.project).pk for _ in range(3)}
+        next_run = LLMStageProcessor('rewrite')._get_current_provider(self.project)
+
+        self.assertEqual(len(picked), 1)
+        self.assertNotEqual(next_run.pk, picked.pop())
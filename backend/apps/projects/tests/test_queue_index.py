@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.projects.models import EpisodeTaskQueue, Project, Series
+from apps.projects.queue_index import get_queue_index_key, get_queue_positions
+from apps.projects.queue_service import cancel_running_queue_task
+from apps.projects.serializers import ProjectListSerializer
+
+
+User = get_user_model()
+
+
+class FakeSortedSets:
+    """只实现队列索引用到的有序集合命令"""
+
+    def __init__(self):
+        self.sets = {}
+        self.commands = []
+
+    def zadd(self, key, mapping):
+        self.commands.append('zadd')
+        self.sets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        self.commands.append('zrem')
+        self.sets.get(key, {}).pop(member, None)
+
+    def zrank(self, key, member):
+        self.commands.append('zrank')
+        members = sorted(self.sets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        ranks = [name for name, _ in members]
+        return ranks.index(member) if member in ranks else None
+
+    def zcard(self, key):
+        return len(self.sets.get(key, {}))
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class QueueIndexTestCase(TestCase):
+    def setUp(self):
+        self.redis = FakeSortedSets()
+        patcher = patch('apps.projects.queue_index.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='index-user', password='secret123')
+        self.series = Series.objects.create(name='西游记', user=self.user)
+        self.projects = []
+        self.queue_tasks = []
+        for number in range(1, 4):
+            project = Project.objects.create(
+                user=self.user, series=self.series, episode_number=number, sort_order=number, name=f'第{number}集'
+            )
+            self.projects.append(project)
+            self.queue_tasks.append(EpisodeTaskQueue.objects.create(
+                series=self.series,
+                project=project,
+                created_by=self.user,
+                status='running' if number == 1 else 'waiting',
+            ))
+
+    def test_missing_index_is_rebuilt_and_read_in_one_batch(self):
+        positions = get_queue_positions(self.queue_tasks)
+
+        self.assertEqual([positions[str(task.id)] for task in self.queue_tasks], [1, 2, 3])
+        self.assertEqual(len(self.redis.sets[get_queue_index_key(self.series.id)]), 3)
+
+        self.redis.commands.clear()
+        with self.assertNumQueries(0):
+            get_queue_positions(self.queue_tasks)
+        self.assertEqual(self.redis.commands, ['zrank'] * 3)
+
+    def test_cancel_removes_entry_and_shifts_positions(self):
+        get_queue_positions(self.queue_tasks)
+
+        with patch('apps.projects.queue_service.dispatch_next_episode_task'):
+            cancel_running_queue_task(self.projects[0])
+
+        waiting = EpisodeTaskQueue.objects.filter(status='waiting').order_by('created_at')
+        positions = get_queue_positions(waiting)
+        self.assertEqual([positions[str(task.id)] for task in waiting], [1, 2])
+
+    def test_project_list_serializer_batches_positions(self):
+        get_queue_positions(self.queue_tasks)
+        projects = Project.objects.filter(series=self.series).prefetch_related('queue_tasks').order_by('sort_order')
+
+        self.redis.commands.clear()
+        with patch('apps.projects.serializers.get_queue_positions', wraps=get_queue_positions) as batch:
+            data = ProjectListSerializer(projects, many=True).data
+
+        self.assertEqual([item['queue_position'] for item in data], [1, 2, 3])
+        batch.assert_called_once()
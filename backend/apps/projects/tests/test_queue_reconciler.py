@@ -0,0 +1,113 @@
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.projects.models import EpisodeTaskQueue, Project, Series
+from apps.projects.queue_index import get_queue_index_key
+from apps.projects.queue_reconciler import get_reconcile_metrics, reconcile_episode_queues
+from apps.projects.tests.test_queue_index import FakeSortedSets
+
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QueueReconcilerTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeSortedSets()
+        for target in ['apps.projects.queue_index.get_redis_client', 'core.redis.progress.get_redis_client']:
+            patcher = patch(target, return_value=self.redis if 'queue_index' in target else Mock())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='reconcile-user', password='secret123')
+        self.stale_series = Series.objects.create(name='红楼梦', user=self.user)
+        self.live_series = Series.objects.create(name='三国演义', user=self.user)
+        self.idle_series = Series.objects.create(name='聊斋', user=self.user)
+
+        started_at = timezone.now() - timedelta(minutes=10)
+        self.stale_task = self._create_task(self.stale_series, 1, 'running', 'dead-task', started_at)
+        self.next_task = self._create_task(self.stale_series, 2, 'waiting')
+        self.live_task = self._create_task(self.live_series, 1, 'running', 'live-task', started_at)
+        self.idle_task = self._create_task(self.idle_series, 1, 'waiting')
+
+    def _create_task(self, series, number, status, celery_task_id='', started_at=None):
+        project = Project.objects.create(
+            user=self.user, series=series, episode_number=number, sort_order=number, name=f'第{number}集'
+        )
+        return EpisodeTaskQueue.objects.create(
+            series=series,
+            project=project,
+            created_by=self.user,
+            status=status,
+            celery_task_id=celery_task_id,
+            started_at=started_at,
+        )
+
+    @patch('apps.projects.queue_service._launch_queue_task', side_effect=lambda task_id: Mock(id=task_id))
+    @patch('apps.projects.queue_service.is_task_alive', side_effect=AssertionError('应批量读取心跳'))
+    @patch('apps.projects.queue_service.AsyncResult', return_value=Mock(state='STARTED'))
+    def test_repairs_stale_tasks_in_batches_and_dispatches_idle_series(self, *_):
+        with patch(
+            'apps.projects.queue_reconciler.get_tasks_alive',
+            side_effect=lambda task_ids: {task_id: task_id == 'live-task' for task_id in task_ids},
+        ) as tasks_alive:
+            metrics = reconcile_episode_queues(batch_size=1)
+
+        self.assertEqual(tasks_alive.call_count, 2)
+        self.stale_task.refresh_from_db()
+        self.live_task.refresh_from_db()
+        self.next_task.refresh_from_db()
+        self.idle_task.refresh_from_db()
+        self.assertEqual(self.stale_task.status, 'failed')
+        self.assertEqual(self.live_task.status, 'running')
+        self.assertEqual(self.next_task.status, 'running')
+        self.assertEqual(self.idle_task.status, 'running')
+
+        self.assertEqual(metrics['series_scanned'], 3)
+        self.assertEqual(metrics['running_checked'], 2)
+        self.assertEqual(metrics['repaired_failed'], 1)
+        self.assertEqual(metrics['dispatched'], 2)
+        self.assertEqual(metrics['errors'], 0)
+        # 索引与数据库一致: 已失败的任务被移出,新调度的任务仍在索引中
+        self.assertEqual(
+            set(self.redis.sets[get_queue_index_key(self.stale_series.id)]), {str(self.next_task.id)}
+        )
+
+        stored = get_reconcile_metrics()
+        self.assertEqual(stored['runs'], 1)
+        self.assertEqual(stored['totals']['repaired_failed'], 1)
+
+    @patch('apps.projects.queue_reconciler.dispatch_next_episode_task', return_value=Mock())
+    @patch('apps.projects.queue_reconciler.get_tasks_alive', return_value=None)
+    def test_series_errors_are_isolated(self, *_):
+        stale_series_id = self.stale_series.id
+
+        def repair(series_id, liveness=None):
+            self.assertEqual(liveness, {'dead-task': None, 'live-task': None})
+            if series_id == stale_series_id:
+                raise RuntimeError('数据库繁忙')
+
+        with patch('apps.projects.queue_reconciler._repair_stale_running_task', side_effect=repair) as repair_mock:
+            metrics = reconcile_episode_queues()
+
+        self.assertEqual(repair_mock.call_count, 2)
+        self.assertEqual(metrics['errors'], 1)
+        self.assertEqual(metrics['dispatched'], 1)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        url = reverse('series-queue-metrics')
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        admin = User.objects.create_user(username='reconcile-admin', password='secret123', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['runs'], 0)
@@ -0,0 +1,124 @@
+import asyncio
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.projects.utils import get_project_stage_graph
+from core.pipeline import PipelineContext, ProjectPipeline, StageProcessor, StageResult
+
+
+class RecordingStage(StageProcessor):
+    """记录执行时间线的测试阶段"""
+
+    def __init__(self, stage_name, timeline, delay=0.01, results=None):
+        super().__init__(stage_name)
+        self.timeline = timeline
+        self.delay = delay
+        self.results = list(results or [StageResult(success=True, data={'stage': stage_name})])
+        self.seen_results = None
+
+    async def validate(self, context: PipelineContext) -> bool:
+        return True
+
+    async def process(self, context: PipelineContext) -> StageResult:
+        self.seen_results = dict(context.results)
+        self.timeline.append(('start', self.stage_name))
+        await asyncio.sleep(self.delay)
+        self.timeline.append(('end', self.stage_name))
+        return self.results.pop(0) if len(self.results) > 1 else self.results[0]
+
+    async def on_failure(self, context: PipelineContext, error: Exception):
+        pass
+
+
+class ProjectStageGraphTestCase(SimpleTestCase):
+    def test_stage_graph_lets_camera_movement_run_beside_image_generation(self):
+        graph = get_project_stage_graph({
+            'rewrite': True,
+            'asset_extraction': True,
+            'storyboard': True,
+            'image_generation': True,
+            'camera_movement': True,
+            'video_generation': True,
+        })
+
+        self.assertEqual(graph['image_generation'], ['storyboard'])
+        self.assertEqual(graph['camera_movement'], ['storyboard'])
+        self.assertEqual(graph['video_generation'], ['image_generation', 'camera_movement'])
+
+    def test_disabled_stage_is_bridged_to_its_upstream(self):
+        graph = get_project_stage_graph({
+            'storyboard': True,
+            'image_generation': True,
+            'video_generation': True,
+        })
+
+        self.assertNotIn('camera_movement', graph)
+        self.assertEqual(graph['video_generation'], ['image_generation'])
+
+
+class ProjectPipelineDagTestCase(SimpleTestCase):
+    def test_independent_stages_run_concurrently_and_merge_results(self):
+        timeline = []
+        stages = [
+            RecordingStage('storyboard', timeline),
+            RecordingStage('image_generation', timeline, delay=0.05),
+            RecordingStage('camera_movement', timeline, delay=0.02),
+            RecordingStage('video_generation', timeline),
+        ]
+        pipeline = ProjectPipeline(stages, {
+            'image_generation': ['storyboard'],
+            'camera_movement': ['storyboard'],
+            'video_generation': ['image_generation', 'camera_movement'],
+        })
+
+        context = asyncio.run(pipeline.execute('project-1'))
+
+        self.assertEqual(
+            timeline[:4],
+            [
+                ('start', 'storyboard'),
+                ('end', 'storyboard'),
+                ('start', 'image_generation'),
+                ('start', 'camera_movement'),
+            ],
+        )
+        self.assertEqual(timeline[-2], ('start', 'video_generation'))
+        self.assertEqual(
+            set(stages[3].seen_results),
+            {'storyboard', 'image_generation', 'camera_movement'},
+        )
+        self.assertEqual(set(context.results), {stage.stage_name for stage in stages})
+
+    @patch('core.pipeline.orchestrator.asyncio.sleep')
+    def test_failed_stage_is_retried_and_blocks_dependents(self, mock_sleep):
+        async def no_sleep(seconds):
+            return None
+
+        mock_sleep.side_effect = no_sleep
+        timeline = []
+        failure = StageResult(success=False, error='boom')
+        stages = [
+            RecordingStage('storyboard', timeline),
+            RecordingStage('image_generation', timeline, results=[failure]),
+            RecordingStage('camera_movement', timeline),
+            RecordingStage('video_generation', timeline),
+        ]
+        pipeline = ProjectPipeline(stages, {
+            'image_generation': ['storyboard'],
+            'camera_movement': ['storyboard'],
+            'video_generation': ['image_generation', 'camera_movement'],
+        })
+
+        context = asyncio.run(pipeline.execute('project-1'))
+
+        self.assertEqual(timeline.count(('start', 'image_generation')), 4)
+        self.assertNotIn(('start', 'video_generation'), timeline)
+        self.assertIn('camera_movement', context.results)
+        self.assertNotIn('image_generation', context.results)
+
+    def test_cyclic_dependencies_are_rejected(self):
+        stages = [RecordingStage('a', []), RecordingStage('b', [])]
+
+        with self.assertRaises(ValueError):
+            ProjectPipeline(stages, {'a': ['b'], 'b': ['a']})
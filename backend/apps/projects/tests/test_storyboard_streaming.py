@@ -0,0 +1,162 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from apps.content.models import Storyboard
+from apps.content.processors.llm_stage import LLMStageProcessor
+from apps.projects.models import Project, Series
+from apps.projects.utils import IncrementalJsonArrayParser
+from apps.prompts.models import PromptTemplate, PromptTemplateSet
+
+
+User = get_user_model()
+
+
+def build_scene(scene_number):
+    return {
+        'scene_number': scene_number,
+        'narration': f'旁白{scene_number}',
+        'visual_prompt': f'画面{scene_number}',
+        'shot_type': '中景',
+    }
+
+
+class FakeStoryboardClient:
+    """按固定长度切片流式输出分镜 JSON 的假客户端"""
+
+    config = {}
+
+    def __init__(self, text, chunk_size=7):
+        self.text = text
+        self.chunk_size = chunk_size
+
+    def generate_stream(self, prompt, system_prompt=None, **kwargs):
+        full_text = ''
+        for index in range(0, len(self.text), self.chunk_size):
+            content = self.text[index:index + self.chunk_size]
+            full_text += content
+            yield {'type': 'token', 'content': content, 'full_text': full_text}
+        yield {'type': 'done', 'full_text': full_text}
+
+
+class StoryboardStreamingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='storyboard-stream-user', password='secret123')
+        self.series = Series.objects.create(name='分镜测试系列', description='测试', user=self.user)
+        self.project = Project.objects.create(
+            user=self.user,
+            series=self.series,
+            episode_number=1,
+            sort_order=1,
+            episode_title='第1集',
+            name='流式分镜项目',
+            original_topic='测试流式分镜',
+        )
+        template_set = PromptTemplateSet.objects.create(name='分镜模板集', created_by=self.user)
+        self.project.prompt_template_set = template_set
+        self.project.save(update_fields=['prompt_template_set', 'updated_at'])
+        PromptTemplate.objects.create(
+            template_set=template_set,
+            stage_type='storyboard',
+            template_content='生成分镜',
+            is_active=True,
+        )
+
+    def test_scenes_are_saved_as_soon_as_they_close(self):
+        text = '```json\n' + json.dumps(
+            {'scenes': [build_scene(1), build_scene(2), build_scene(3)]},
+            ensure_ascii=False,
+        ) + '\n```'
+        processor = LLMStageProcessor('storyboard')
+
+        saved_counts = []
+        with patch.object(processor, '_get_ai_client', return_value=FakeStoryboardClient(text)), \
+                patch.object(processor, '_build_prompt', return_value='生成分镜'):
+            for event in processor.process_stream(str(self.project.id), input_data={'raw_text': '文案'}):
+                if event['type'] == 'storyboard_generated':
+                    saved_counts.append(
+                        (event['scene_number'], Storyboard.objects.filter(project=self.project).count())
+                    )
+
+        self.assertEqual(saved_counts, [(1, 1), (2, 2), (3, 3)])
+        self.assertEqual(
+            list(
+                Storyboard.objects.filter(project=self.project)
+                .order_by('sequence_number')
+                .values_list('image_prompt', flat=True)
+            ),
+            ['画面1', '画面2', '画面3'],
+        )
+
+    def _run_stream(self, client):
+        processor = LLMStageProcessor('storyboard')
+        with patch.object(processor, '_get_ai_client', return_value=client), \
+                patch.object(processor, '_build_prompt', return_value='生成分镜'):
+            return list(processor.process_stream(str(self.project.id), input_data={'raw_text': '文案'}))
+
+    def test_failed_stream_restores_overwritten_storyboards(self):
+        Storyboard.objects.create(project=self.project, sequence_number=1, image_prompt='旧画面1')
+        scenes = json.dumps({'scenes': [build_scene(1), build_scene(2)]}, ensure_ascii=False)
+        client = FakeStoryboardClient(scenes[:-2])
+        original_stream = client.generate_stream
+
+        def failing_stream(*args, **kwargs):
+            for chunk in original_stream(*args, **kwargs):
+                if chunk['type'] == 'done':
+                    yield {'type': 'error', 'error': '连接中断'}
+                    return
+                yield chunk
+
+        client.generate_stream = failing_stream
+        events = self._run_stream(client)
+
+        self.assertEqual(
+            [event['scene_number'] for event in events if event['type'] == 'storyboard_generated'], [1, 2]
+        )
+        self.assertEqual(
+            list(Storyboard.objects.filter(project=self.project).values_list('sequence_number', 'image_prompt')),
+            [(1, '旧画面1')],
+        )
+
+    def test_unparseable_final_output_restores_overwritten_storyboards(self):
+        Storyboard.objects.create(project=self.project, sequence_number=1, image_prompt='旧画面1')
+        # 第1个分镜完整闭合,但整体 JSON 被截断
+        text = json.dumps({'scenes': [build_scene(1)]}, ensure_ascii=False)[:-2] + ', {"scene_number": 2'
+
+        events = self._run_stream(FakeStoryboardClient(text))
+
+        self.assertEqual(events[-1]['type'], 'error')
+        self.assertEqual(
+            list(Storyboard.objects.filter(project=self.project).values_list('sequence_number', 'image_prompt')),
+            [(1, '旧画面1')],
+        )
+
+    def test_string_scene_numbers_restore_overwritten_storyboards(self):
+        Storyboard.objects.create(project=self.project, sequence_number=3, image_prompt='旧画面3')
+        text = json.dumps({'scenes': [build_scene('3'), build_scene('4')]}, ensure_ascii=False)[:-2]
+
+        events = self._run_stream(FakeStoryboardClient(text))
+
+        self.assertEqual(
+            [event['scene_number'] for event in events if event['type'] == 'storyboard_generated'], [3, 4]
+        )
+        self.assertEqual(events[-1]['type'], 'error')
+        self.assertEqual(
+            list(Storyboard.objects.filter(project=self.project).values_list('sequence_number', 'image_prompt')),
+            [(3, '旧画面3')],
+        )
+
+
+class IncrementalJsonArrayParserTestCase(SimpleTestCase):
+    def test_only_closed_items_of_target_array_are_emitted(self):
+        parser = IncrementalJsonArrayParser('scenes')
+
+        self.assertEqual(parser.feed('{"title": "含 [括号] 与 {花括号}", "scenes": [{"scene_number": 1, '), [])
+        self.assertEqual(parser.feed('"narration": "引号\\"和}"}'), [{'scene_number': 1, 'narration': '引号"和}'}])
+        self.assertEqual(
+            parser.feed(', {"scene_number": 2, "tags": [{"a": 1}]}], "other": [{"x": 1}]}'),
+            [{'scene_number': 2, 'tags': [{'a': 1}]}],
+        )
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from celery.exceptions import Retry
+from celery.signals import task_postrun, task_prerun, task_received, task_retry
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.projects.models import EpisodeTaskQueue, Project, Series
+from apps.projects.queue_service import _get_recovery_final_status
+from config.celery_app import debug_task
+from core.redis.task_heartbeat import get_task_heartbeat_key, get_task_heartbeat_registry
+
+
+User = get_user_model()
+
+
+class FakeKeys:
+    """记录键值与过期时间"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def pipeline(self, transaction=True):
+        pipe = Mock()
+        pipe.set.side_effect = self.set
+        return pipe
+
+
+class TaskHeartbeatTestCase(TestCase):
+    def setUp(self):
+        self.redis = FakeKeys()
+        patcher = patch('core.redis.task_heartbeat.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 不启动后台心跳线程
+        refresher = patch.object(get_task_heartbeat_registry(), '_ensure_refresher')
+        refresher.start()
+        self.addCleanup(refresher.stop)
+
+    def test_signals_track_task_lifecycle(self):
+        key = get_task_heartbeat_key('task-1')
+        eta = (datetime.now(dt_timezone.utc) + timedelta(seconds=600)).isoformat()
+
+        task_received.send(sender=None, request=SimpleNamespace(id='task-1', eta=eta))
+        self.assertEqual(self.redis.values[key], 'reserved')
+        self.assertGreater(self.redis.ttls[key], 600)
+
+        task_prerun.send(sender=debug_task, task_id='task-1', task=debug_task)
+        self.assertEqual(self.redis.values[key], 'active')
+        get_task_heartbeat_registry().refresh_active()
+        self.assertEqual(self.redis.ttls[key], 90)
+
+        task_retry.send(sender=debug_task, request=SimpleNamespace(id='task-1'), reason=Retry(when=300))
+        task_postrun.send(sender=debug_task, task_id='task-1', task=debug_task, state='RETRY')
+        self.assertEqual(self.redis.values[key], 'retry')
+        self.assertGreaterEqual(self.redis.ttls[key], 390)
+
+        task_prerun.send(sender=debug_task, task_id='task-1', task=debug_task)
+        task_postrun.send(sender=debug_task, task_id='task-1', task=debug_task, state='SUCCESS')
+        self.assertNotIn(key, self.redis.values)
+
+    @patch('apps.projects.queue_service.AsyncResult', return_value=Mock(state='STARTED'))
+    def test_recovery_uses_heartbeat_instead_of_inspect(self, _):
+        user = User.objects.create_user(username='heartbeat-user', password='secret123')
+        series = Series.objects.create(name='水浒传', user=user)
+        project = Project.objects.create(user=user, series=series, name='第1集')
+        queue_task = EpisodeTaskQueue.objects.create(
+            series=series,
+            project=project,
+            created_by=user,
+            status='running',
+            celery_task_id='task-2',
+            started_at=timezone.now() - timedelta(minutes=10),
+        )
+
+        with patch('config.celery_app.app.control.inspect', side_effect=AssertionError('不应广播')):
+            get_task_heartbeat_registry().on_started('task-2')
+            self.assertIsNone(_get_recovery_final_status(queue_task))
+
+            get_task_heartbeat_registry().on_finished('task-2', state='FAILURE')
+            self.assertEqual(_get_recovery_final_status(queue_task), 'failed')
@@ -1,9 +1,11 @@
 import base64
+import tempfile
 from types import SimpleNamespace
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
 from rest_framework.test import APITestCase
 
 from apps.content.processors.text2image_stage import Text2ImageStageProcessor
@@ -19,6 +21,7 @@ TINY_PNG_BYTES = base64.b64decode(
 )
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class Text2ImageAssetPromptTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='image-asset-user', password='secret123')
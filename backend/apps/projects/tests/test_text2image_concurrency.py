@@ -0,0 +1,145 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from apps.content.models import GeneratedImage, Storyboard
+from apps.content.processors.text2image_stage import Text2ImageStageProcessor
+from apps.models.models import ModelProvider
+from apps.projects.models import Project, ProjectStage, Series
+from apps.projects.tasks import execute_text2image_stage
+from apps.prompts.models import PromptTemplate, PromptTemplateSet
+from core.utils.concurrency import iter_bounded_concurrent
+
+
+User = get_user_model()
+
+
+class BoundedConcurrencyTestCase(APITestCase):
+    def test_limits_in_flight_calls_and_yields_in_completion_order(self):
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'peak': 0}
+
+        def work(delay):
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            time.sleep(delay)
+            with lock:
+                state['in_flight'] -= 1
+            return delay
+
+        results = [item for item, _, _ in iter_bounded_concurrent([0.2, 0.05, 0.05, 0.05], work, max_workers=2)]
+
+        self.assertEqual(sorted(results), [0.05, 0.05, 0.05, 0.2])
+        self.assertEqual(results[-1], 0.2)
+        self.assertEqual(state['peak'], 2)
+
+    def test_sequential_mode_reports_errors_per_item(self):
+        def work(value):
+            if value == 2:
+                raise ValueError('boom')
+            return value * 10
+
+        outcomes = list(iter_bounded_concurrent([1, 2, 3], work, max_workers=1))
+
+        self.assertEqual([item for item, _, _ in outcomes], [1, 2, 3])
+        self.assertEqual(outcomes[0][1], 10)
+        self.assertIsInstance(outcomes[1][2], ValueError)
+
+
+class Text2ImageConcurrentStageTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='image-concurrency-user', password='secret123')
+        self.series = Series.objects.create(name='并发测试系列', description='测试', user=self.user)
+        self.project = Project.objects.create(
+            user=self.user,
+            series=self.series,
+            episode_number=1,
+            sort_order=1,
+            episode_title='第1集',
+            name='并发文生图项目',
+            original_topic='测试并发文生图',
+        )
+        self.provider = ModelProvider.objects.create(
+            name='Mock 文生图',
+            provider_type='text2image',
+            api_url='https://example.com/images',
+            api_key='test-key',
+            model_name='mock-image',
+            executor_class='core.ai_client.mock_text2image_client.MockText2ImageClient',
+        )
+        template_set = PromptTemplateSet.objects.create(name='并发模板集', created_by=self.user)
+        self.project.prompt_template_set = template_set
+        self.project.save(update_fields=['prompt_template_set', 'updated_at'])
+        PromptTemplate.objects.create(
+            template_set=template_set,
+            stage_type='image_generation',
+            model_provider=self.provider,
+            template_content='{{ visual_prompt }}',
+            client_params={'max_concurrency': 3},
+            is_active=True,
+        )
+        ProjectStage.objects.create(project=self.project, stage_type='image_generation', status='pending')
+        for sequence_number in range(1, 5):
+            Storyboard.objects.create(
+                project=self.project,
+                sequence_number=sequence_number,
+                scene_description=f'场景{sequence_number}',
+                narration_text=f'旁白{sequence_number}',
+                image_prompt=f'提示词{sequence_number}',
+            )
+
+    def test_process_stream_saves_images_as_they_complete(self):
+        delays = {1: 0.3, 2: 0.05, 3: 0.1, 4: 0.05}
+
+        def fake_generate(project, storyboard, provider):
+            time.sleep(delays[storyboard['scene_number']])
+            if storyboard['scene_number'] == 3:
+                return None
+            return [{'url': f"https://example.com/{storyboard['scene_number']}.png", 'width': 64, 'height': 64}]
+
+        processor = Text2ImageStageProcessor()
+        with patch.object(processor, '_generate_single_image', side_effect=fake_generate):
+            events = list(processor.process_stream(project_id=str(self.project.id)))
+
+        generated = [event['sequence_number'] for event in events if event['type'] == 'image_generated']
+        progress = [event['current'] for event in events if event['type'] == 'progress']
+        done = next(event for event in events if event['type'] == 'done')
+
+        self.assertEqual(sorted(generated), [1, 2, 4])
+        self.assertEqual(generated[-1], 1)
+        self.assertEqual(progress, [1, 2, 3, 4])
+        self.assertEqual(done['data']['generated_count'], 3)
+        self.assertEqual(done['data']['failed_count'], 1)
+        self.assertEqual(
+            GeneratedImage.objects.filter(storyboard__project=self.project, status='completed').count(),
+            3,
+        )
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch('apps.projects.tasks.RedisStreamPublisher', return_value=Mock())
+    def test_stage_task_runs_processor_and_completes_stage(self, _):
+        def fake_generate(project, storyboard, provider):
+            return [{'url': f"https://example.com/{storyboard['scene_number']}.png", 'width': 64, 'height': 64}]
+
+        with patch.object(Text2ImageStageProcessor, '_generate_single_image', side_effect=fake_generate):
+            result = execute_text2image_stage.apply(args=[str(self.project.id)]).get()
+
+        self.assertTrue(result['success'])
+        stage = ProjectStage.objects.get(project=self.project, stage_type='image_generation')
+        self.assertEqual(stage.status, 'completed')
+        self.assertEqual(
+            GeneratedImage.objects.filter(storyboard__project=self.project, status='completed').count(),
+            4,
+        )
+
+    def test_max_concurrency_defaults_to_processor_setting_without_template_override(self):
+        PromptTemplate.objects.filter(stage_type='image_generation').update(client_params={})
+
+        processor = Text2ImageStageProcessor()
+
+        self.assertEqual(processor._resolve_max_concurrency(self.project, self.provider), processor.max_concurrent)
@@ -0,0 +1,63 @@
+import json
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from core.redis.publisher import RedisStreamPublisher, TokenCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenCoalescerTestCase(SimpleTestCase):
+    def test_tokens_are_merged_within_time_and_size_window(self):
+        clock = FakeClock()
+        coalescer = TokenCoalescer(flush_interval=0.05, flush_chars=8, snapshot_interval=60, snapshot_chars=1000, clock=clock)
+
+        first = coalescer.add('从')
+        buffered = [coalescer.add(token) for token in ['前', '有', '座']]
+        clock.now = 0.06
+        timed = coalescer.add('山')
+        sized = coalescer.add('山上有座小庙庙里')
+
+        self.assertEqual(first, {'content': '从', 'offset': 0})
+        self.assertEqual(buffered, [None, None, None])
+        self.assertEqual(timed, {'content': '前有座山', 'offset': 1})
+        self.assertEqual(sized, {'content': '山上有座小庙庙里', 'offset': 5})
+
+    def test_snapshot_carries_full_text_per_scene(self):
+        clock = FakeClock()
+        coalescer = TokenCoalescer(flush_interval=0, flush_chars=256, snapshot_interval=60, snapshot_chars=4, clock=clock)
+
+        payloads = [coalescer.add(token, scene_number=1) for token in ['镜头', '推近', '人物']]
+        other_scene = coalescer.add('远景', scene_number=2)
+
+        self.assertNotIn('full_text', payloads[0])
+        self.assertEqual(payloads[1]['full_text'], '镜头推近')
+        self.assertTrue(payloads[1]['snapshot'])
+        self.assertEqual(payloads[2], {'content': '人物', 'offset': 4, 'scene_number': 1})
+        self.assertEqual(other_scene, {'content': '远景', 'offset': 0, 'scene_number': 2})
+
+
+class PublisherTokenFlushTestCase(SimpleTestCase):
+    def test_pending_tokens_are_flushed_before_done(self):
+        redis_client = Mock()
+        with patch.object(RedisStreamPublisher, '_get_redis_client', return_value=redis_client):
+            publisher = RedisStreamPublisher('project-1', 'rewrite')
+
+        text = ''
+        for token in ['一', '二', '三']:
+            text += token
+            publisher.publish_token(token, text)
+        publisher.publish_done(text)
+
+        xadd_calls = redis_client.pipeline.return_value.xadd.call_args_list
+        messages = [json.loads(call.args[1]['data']) for call in xadd_calls]
+        self.assertEqual([message['type'] for message in messages], ['token', 'token', 'done'])
+        self.assertEqual(''.join(message['content'] for message in messages[:2]), '一二三')
+        self.assertNotIn('full_text', messages[1])
@@ -52,24 +52,76 @@ def normalize_stage_template_states(stage_states):
     return normalized
 
 
-def get_project_stage_order(stage_states=None):
-    """根据阶段启用状态返回实际执行顺序。"""
+# 阶段依赖关系: {阶段: [前置阶段, ...]}
+PROJECT_STAGE_DEPENDENCIES = {
+    'rewrite': [],
+    'asset_extraction': ['rewrite'],
+    'storyboard': ['asset_extraction'],
+    'multi_grid_image': ['storyboard'],
+    'image_edit': ['multi_grid_image'],
+    'image_generation': ['storyboard'],
+    'camera_movement': ['storyboard'],
+    'video_generation': ['image_generation', 'image_edit', 'camera_movement'],
+}
+
+# 同时可执行的阶段之间的展示/串行执行顺序
+PROJECT_STAGE_PRIORITY = [
+    'rewrite',
+    'asset_extraction',
+    'storyboard',
+    'multi_grid_image',
+    'image_edit',
+    'image_generation',
+    'camera_movement',
+    'video_generation',
+]
+
+# 无论模板是否开启都保留在工作流中的阶段(未开启时由执行方跳过)
+PROJECT_REQUIRED_STAGES = ('rewrite', 'asset_extraction', 'storyboard')
+
+
+def get_project_stage_graph(stage_states=None):
+    """
+    根据阶段启用状态返回阶段依赖图
+
+    未启用的阶段从图中移除,其下游阶段改为依赖它的前置阶段。
+    """
     normalized = normalize_stage_template_states(stage_states or {stage_type: True for stage_type in PROJECT_STAGE_TYPES})
+    included = {
+        stage_type
+        for stage_type in PROJECT_STAGE_DEPENDENCIES
+        if stage_type in PROJECT_REQUIRED_STAGES or normalized.get(stage_type)
+    }
+
+    def resolve_upstream(stage_type):
+        upstream = []
+        for dependency in PROJECT_STAGE_DEPENDENCIES[stage_type]:
+            if dependency in included:
+                upstream.append(dependency)
+            else:
+                upstream.extend(resolve_upstream(dependency))
+        return upstream
+
+    graph = {}
+    ancestors = {}
+    for stage_type in PROJECT_STAGE_PRIORITY:
+        if stage_type not in included:
+            continue
+        upstream = list(dict.fromkeys(resolve_upstream(stage_type)))
+        # 去掉已被其他前置阶段间接依赖的冗余边
+        graph[stage_type] = [
+            dependency for dependency in upstream
+            if not any(dependency in ancestors[other] for other in upstream if other != dependency)
+        ]
+        ancestors[stage_type] = set(upstream).union(*(ancestors[dependency] for dependency in upstream))
+    return graph
 
-    stage_order = ['rewrite', 'asset_extraction', 'storyboard']
 
-    if normalized.get('multi_grid_image'):
-        stage_order.append('multi_grid_image')
-    if normalized.get('image_edit'):
-        stage_order.append('image_edit')
-    if normalized.get('image_generation'):
-        stage_order.append('image_generation')
-    if normalized.get('camera_movement'):
-        stage_order.append('camera_movement')
-    if normalized.get('video_generation'):
-        stage_order.append('video_generation')
+def get_project_stage_order(stage_states=None):
+    """根据阶段启用状态返回实际执行顺序(由阶段依赖图拓扑排序得出)。"""
+    from core.pipeline.graph import topological_sort
 
-    return stage_order
+    return topological_sort(get_project_stage_graph(stage_states), PROJECT_STAGE_PRIORITY)
 
 def get_stage_template_states(project):
     """返回项目各阶段对应提示词模板是否启用。"""
@@ -111,6 +163,101 @@ def _extract_json_from_text(text: str) -> str:
 
         return text.replace("\n", "")
 
+STORYBOARD_SCENE_REQUIRED_FIELDS = ('scene_number', 'narration', 'visual_prompt', 'shot_type')
+
+
+class IncrementalJsonArrayParser:
+    """
+    增量JSON数组解析器
+    职责: 在流式输出过程中逐段喂入文本,提取顶层对象中指定字段数组里已闭合的元素对象
+
+    例如分镜输出 {"scenes": [{...}, {...}]} 时,每个 scene 对象闭合即可取得,
+    无需等待完整文本。Markdown 代码块等 JSON 以外的字符会被忽略。
+    """
+
+    def __init__(self, array_key: str = 'scenes'):
+        self.array_key = array_key
+        self._buffer = ''
+        self._pos = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._stack = []
+        self._array_depth = None
+        self._item_start = None
+        self._array_closed = False
+
+    def feed(self, text: str) -> list:
+        """
+        喂入新的文本片段
+
+        Returns:
+            list: 本次新闭合的数组元素(dict)
+        """
+        self._buffer += text or ''
+        buffer = self._buffer
+        items = []
+
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:self._pos]
+
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos + 1
+
+            elif char in '{[':
+                if (
+                    char == '['
+                    and self._array_depth is None
+                    and not self._array_closed
+                    and len(self._stack) == 1
+                    and self._last_string == self.array_key
+                ):
+                    self._array_depth = len(self._stack) + 1
+                elif char == '{' and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item_start = self._pos
+                self._stack.append(char)
+
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if self._array_depth is not None:
+                    if char == '}' and self._item_start is not None and len(self._stack) == self._array_depth:
+                        item = self._load_item(buffer[self._item_start:self._pos + 1])
+                        if item is not None:
+                            items.append(item)
+                        self._item_start = None
+                    elif char == ']' and len(self._stack) < self._array_depth:
+                        self._array_depth = None
+                        self._array_closed = True
+
+            self._pos += 1
+
+        return items
+
+    @staticmethod
+    def _load_item(text: str):
+        try:
+            item = json.loads(text, strict=False)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+
+def is_valid_storyboard_scene(scene: dict) -> bool:
+    """检查单个分镜是否包含必需字段"""
+    return isinstance(scene, dict) and all(field in scene for field in STORYBOARD_SCENE_REQUIRED_FIELDS)
+
 def parse_storyboard_json(json_text: str) -> dict:
     """解析分镜JSON数据"""
     try:
@@ -129,8 +276,7 @@ def parse_storyboard_json(json_text: str) -> dict:
 
         # 验证每个场景的必需字段
         for i, scene in enumerate(storyboard_data['scenes']):
-            required_fields = ['scene_number', 'narration', 'visual_prompt', 'shot_type']
-            for field in required_fields:
+            for field in STORYBOARD_SCENE_REQUIRED_FIELDS:
                 if field not in scene:
                     raise ValueError(f"场景 {i+1} 缺少必需字段: {field}")
 
@@ -142,6 +288,40 @@ def parse_storyboard_json(json_text: str) -> dict:
         raise ValueError(f"分镜数据解析失败: {str(e)}")
 
 
+def parse_camera_movement_batch_json(json_text: str) -> dict:
+    """
+    解析批量运镜JSON数据
+
+    支持 [{"scene_number": 1, "description": "..."}] 或 {"scenes": [...]} 格式
+
+    Returns:
+        dict: {分镜序号: 运镜描述}
+    """
+    try:
+        data = json.loads(_extract_json_from_text(json_text))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON解析失败: {str(e)}\n原始内容:\n{json_text[:200]}...")
+
+    if isinstance(data, dict):
+        data = data.get('scenes', data.get('camera_movements'))
+    if not isinstance(data, list):
+        raise ValueError("运镜数据必须是数组类型")
+
+    results = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        try:
+            scene_number = int(item.get('scene_number'))
+        except (TypeError, ValueError):
+            continue
+        description = item.get('description') or item.get('camera_movement') or ''
+        if isinstance(description, str) and description.strip():
+            results[scene_number] = description.strip()
+
+    return results
+
+
 def parse_json(json_text: str) -> dict:
     """解析JSON数据"""
     try:
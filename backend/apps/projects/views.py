@@ -24,7 +24,7 @@ import requests
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import AccessToken
 
@@ -33,8 +33,11 @@ from apps.prompts.models import PromptTemplate, PromptTemplateSet
 from apps.prompts.models import GlobalVariable
 from apps.prompts.serializers import GlobalVariableListSerializer
 from core.ai_client.factory import create_ai_client
+from core.redis.progress import clear_progress_snapshot
 from core.utils.file_storage import image_storage
 from .models import Project, ProjectAssetBinding, ProjectModelConfig, ProjectStage, Series
+from .progress_service import get_project_progress
+from .queue_reconciler import get_reconcile_metrics
 from .queue_service import cancel_running_queue_task, enqueue_episode_task, force_release_queue_task
 from .serializers import (
     ProjectBatchCreateSerializer,
@@ -98,6 +101,11 @@ class SeriesViewSet(viewsets.ModelViewSet):
         kwargs['partial'] = True
         return self.update(request, *args, **kwargs)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def queue_metrics(self, request):
+        """分集任务队列后台校准统计 (仅管理员)"""
+        return Response(get_reconcile_metrics())
+
 
 class ProjectViewSet(viewsets.ModelViewSet):
     """
@@ -1495,7 +1503,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
             "task_id": "xxx",
             "state": "PENDING|STARTED|SUCCESS|FAILURE|RETRY",
             "result": {...},
-            "info": {...}
+            "info": {...},
+            "progress": {"stages": {...}, "pipeline": {...}, "source": "redis|database"}
         }
         """
         project = self.get_object()
@@ -1530,8 +1539,19 @@ class ProjectViewSet(viewsets.ModelViewSet):
         else:
             response_data["info"] = task_result.info
 
+        response_data["progress"] = get_project_progress(project)
+
         return Response(response_data)
 
+    @action(detail=True, methods=["get"])
+    def progress(self, request, pk=None):
+        """
+        获取项目实时进度 (Redis快照,缺失时回退到阶段记录)
+        GET /api/v1/projects/{id}/progress/
+        """
+        project = self.get_object()
+        return Response(get_project_progress(project))
+
     @action(detail=True, methods=["post"])
     def retry_stage(self, request, pk=None):
         """
@@ -1554,6 +1574,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         stage.error_message = ""
         stage.started_at = timezone.now()
         stage.save()
+        clear_progress_snapshot(str(project.id))
 
         # TODO: 调用Celery任务
         # from apps.content.tasks import execute_project_stage
@@ -1587,6 +1608,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             completed_at=None,
             error_message=''
         )
+        clear_progress_snapshot(str(project.id))
 
         cancel_running_queue_task(project)
 
@@ -1671,6 +1693,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 completed_at=None,
             )
 
+        clear_progress_snapshot(str(project.id))
+
         # 更新项目状态
         project.status = "draft"
         project.save()
@@ -2025,6 +2049,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         )
         project.completed_at = None
         project.save(update_fields=['completed_at', 'updated_at'])
+        clear_progress_snapshot(str(project.id))
 
         return self.run_pipeline(request, pk=pk)
 
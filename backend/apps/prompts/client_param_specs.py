@@ -136,6 +136,24 @@ STAGE_CLIENT_PARAM_SPECS = {
             'step': 0.05,
             'description': '控制采样概率范围。',
         },
+        {
+            'key': 'max_concurrency',
+            'label': '最大并发数',
+            'type': 'integer',
+            'default': 4,
+            'min': 1,
+            'max': 32,
+            'description': '同时生成运镜的分镜数量，1 表示逐个生成。',
+        },
+        {
+            'key': 'batch_size',
+            'label': '批量分镜数',
+            'type': 'integer',
+            'default': 0,
+            'min': 0,
+            'max': 50,
+            'description': '单次请求合并生成运镜的分镜数量，要求模型返回 JSON 数组；0 表示逐个分镜请求。',
+        },
     ],
     'image_generation': [
         {
@@ -195,6 +213,41 @@ STAGE_CLIENT_PARAM_SPECS = {
             'max': 8,
             'description': '单次请求返回的图片数量。',
         },
+        {
+            'key': 'max_concurrency',
+            'label': '最大并发数',
+            'type': 'integer',
+            'default': 3,
+            'min': 1,
+            'max': 32,
+            'description': '同时在途的文生图请求数量，1 表示逐个生成。',
+        },
+        {
+            'key': 'hedge_enabled',
+            'label': '对冲请求',
+            'type': 'boolean',
+            'default': False,
+            'description': '请求超过阈值未返回时再发一次，取先完成的结果，降低长尾耗时。',
+        },
+        {
+            'key': 'hedge_delay',
+            'label': '对冲阈值',
+            'type': 'number',
+            'default': 0,
+            'min': 0,
+            'max': 600,
+            'step': 1,
+            'description': '发出对冲请求前的等待秒数，0 表示按模型近期耗时的 p90 计算。',
+        },
+        {
+            'key': 'hedge_budget',
+            'label': '对冲预算',
+            'type': 'integer',
+            'default': 20,
+            'min': 0,
+            'max': 1000,
+            'description': '每个项目每天最多额外发出的对冲请求数。',
+        },
     ],
     'multi_grid_image': [
         {
@@ -357,6 +410,29 @@ STAGE_CLIENT_PARAM_SPECS = {
             'max': 7200,
             'description': '异步任务最长等待时间，单位秒。',
         },
+        {
+            'key': 'batch_submit',
+            'label': '批量提交',
+            'type': 'boolean',
+            'default': True,
+            'description': '先提交全部分镜的视频任务再统一轮询，关闭后逐个生成。',
+        },
+        {
+            'key': 'max_concurrency',
+            'label': '最大并发数',
+            'type': 'integer',
+            'default': 2,
+            'min': 1,
+            'max': 500,
+            'description': '批量提交(或延迟完成)时同时在途的视频任务数量。',
+        },
+        {
+            'key': 'deferred_completion',
+            'label': '延迟完成',
+            'type': 'boolean',
+            'default': False,
+            'description': '提交任务后释放 Worker，由任务按轮询间隔重新调度自身查询状态，适合大量长耗时视频任务；仅对单独执行的图生视频阶段生效。',
+        },
     ],
 }
 
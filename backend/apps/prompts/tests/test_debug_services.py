@@ -1,9 +1,10 @@
 import base64
+import tempfile
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from apps.models.models import ModelProvider
 from apps.prompts.debug_services import PromptDebugService
@@ -17,6 +18,7 @@ TINY_PNG_BYTES = base64.b64decode(
 )
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class PromptDebugServiceText2ImageTestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='prompt-debug-user', password='secret123')
@@ -1,6 +1,8 @@
 """
 ASGI配置
 用于异步Web服务器
+
+项目SSE路径由 apps.projects.sse_asgi 以协程处理 (基于 redis.asyncio),其余请求交给Django
 """
 
 import os
@@ -8,4 +10,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# 需在 Django 初始化之后导入
+from apps.projects.sse_asgi import ProjectSSEApplication  # noqa: E402
+
+application = ProjectSSEApplication(django_application)
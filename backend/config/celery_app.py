@@ -6,9 +6,11 @@ Celery配置
 import os
 
 from celery import Celery
-from celery.signals import task_failure, task_postrun, task_prerun
+from celery.signals import task_failure, task_postrun, task_prerun, task_received, task_retry, task_revoked
 from django.conf import settings
 
+from core.redis.task_heartbeat import get_task_heartbeat_registry
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.base')
 
 app = Celery('ai_story')
@@ -61,6 +63,15 @@ app.conf.update(
     # Worker配置
     worker_prefetch_multiplier=1,  # 每次只预取1个任务
     worker_max_tasks_per_child=100,  # 每个worker处理100个任务后重启
+
+    # 定时任务 (需启动 celery beat)
+    beat_schedule={
+        'reconcile-episode-queues': {
+            'task': 'apps.projects.tasks.reconcile_episode_queues_task',
+            'schedule': settings.QUEUE_RECONCILE_INTERVAL,
+            'options': {'expires': settings.QUEUE_RECONCILE_INTERVAL},
+        },
+    },
 )
 
 @app.task(bind=True, ignore_result=True)
@@ -69,17 +80,40 @@ def debug_task(self):
     print(f'Request: {self.request!r}')
 
 
-# Celery信号处理 (可选，用于监控)
+# Celery信号处理 (监控与任务存活登记, 队列恢复据此判断任务是否仍被Worker持有)
+@task_received.connect
+def task_received_handler(sender=None, request=None, **kwargs):
+    """Worker 接收任务 (含 ETA/countdown 任务)"""
+    if request is not None:
+        get_task_heartbeat_registry().on_received(request.id, eta=getattr(request, 'eta', None))
+
+
 @task_prerun.connect
 def task_prerun_handler(sender=None, task_id=None, task=None, **kwargs):
     """任务开始前"""
     print(f'任务开始: {task.name} [{task_id}]')
+    get_task_heartbeat_registry().on_started(task_id)
 
 
 @task_postrun.connect
-def task_postrun_handler(sender=None, task_id=None, task=None, **kwargs):
+def task_postrun_handler(sender=None, task_id=None, task=None, state=None, **kwargs):
     """任务完成后"""
     print(f'任务完成: {task.name} [{task_id}]')
+    get_task_heartbeat_registry().on_finished(task_id, state=state)
+
+
+@task_retry.connect
+def task_retry_handler(sender=None, request=None, reason=None, **kwargs):
+    """任务将重新投递"""
+    if request is not None:
+        get_task_heartbeat_registry().on_retry(request.id, when=getattr(reason, 'when', None))
+
+
+@task_revoked.connect
+def task_revoked_handler(sender=None, request=None, **kwargs):
+    """任务被撤销"""
+    if request is not None:
+        get_task_heartbeat_registry().on_finished(request.id)
 
 
 @task_failure.connect
@@ -142,9 +142,68 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BROKER_VISIBILITY_TIMEOUT = int(os.getenv('CELERY_BROKER_VISIBILITY_TIMEOUT', 3600 * 3))  # 3小时，需大于最长任务执行时间
+CELERY_TASK_HEARTBEAT_TTL = int(os.getenv('CELERY_TASK_HEARTBEAT_TTL', 90))  # 任务存活键过期时间(秒), Worker 失联后该时长内判定任务不存活
+CELERY_TASK_HEARTBEAT_INTERVAL = int(os.getenv('CELERY_TASK_HEARTBEAT_INTERVAL', 30))  # 执行中任务的心跳续期间隔(秒), 需小于TTL
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'  # 定时任务启动时写入数据库, 可在管理后台调整
 
-# Redis Pub/Sub配置 (用于实时流式推送)
-REDIS_PUBSUB_URL = os.getenv('REDIS_PUBSUB_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/2')  # 数据库2: Pub/Sub专用
+# 分集任务队列后台校准 (Celery Beat 定时执行, 修复失联任务并调度下一集)
+QUEUE_RECONCILE_INTERVAL = float(os.getenv('QUEUE_RECONCILE_INTERVAL', 30))  # 校准间隔(秒)
+QUEUE_RECONCILE_BATCH_SIZE = int(os.getenv('QUEUE_RECONCILE_BATCH_SIZE', 50))  # 每批校准的执行中任务数
+
+# 完整工作流: 分镜级流水线，某分镜图片(及运镜)就绪后立即开始生成该分镜视频 (可选模式，默认关闭)
+PIPELINE_STREAMING_MODE = os.getenv('PIPELINE_STREAMING_MODE', 'false').strip().lower() in ('1', 'true', 'yes', 'on')
+
+# AI 服务 HTTP 连接池 (每个主机一个长连接池, 进程内复用)
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 600))  # 调用方未指定超时时使用
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 2))  # 仅重试连接失败与幂等请求
+HTTP_RETRY_BACKOFF_FACTOR = float(os.getenv('HTTP_RETRY_BACKOFF_FACTOR', 0.5))
+
+# 模型提供商限流 (ModelProvider.rate_limit_rpm / rate_limit_rpd, 多 Worker 共享)
+AI_RATE_LIMIT_ENABLED = os.getenv('AI_RATE_LIMIT_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+AI_RATE_LIMIT_MAX_WAIT = float(os.getenv('AI_RATE_LIMIT_MAX_WAIT', 300))  # 排队等待上限(秒), 超过即失败
+REDIS_RATE_LIMIT_URL = os.getenv('REDIS_RATE_LIMIT_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/3')  # 数据库3: 限流令牌桶与熔断状态
+
+# 模型提供商熔断 (状态存放于 REDIS_RATE_LIMIT_URL, 多 Worker 共享)
+AI_CIRCUIT_BREAKER_ENABLED = os.getenv('AI_CIRCUIT_BREAKER_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+AI_CIRCUIT_FAILURE_RATE = float(os.getenv('AI_CIRCUIT_FAILURE_RATE', 0.5))  # 窗口内失败率(含慢调用)达到即熔断
+AI_CIRCUIT_MIN_CALLS = int(os.getenv('AI_CIRCUIT_MIN_CALLS', 5))  # 窗口内最少调用数, 不足时不判定
+AI_CIRCUIT_WINDOW_SECONDS = int(os.getenv('AI_CIRCUIT_WINDOW_SECONDS', 60))
+AI_CIRCUIT_OPEN_SECONDS = int(os.getenv('AI_CIRCUIT_OPEN_SECONDS', 30))  # 熔断持续时间, 之后放行一次探测
+AI_CIRCUIT_SLOW_CALL_RATIO = float(os.getenv('AI_CIRCUIT_SLOW_CALL_RATIO', 0.8))  # 耗时超过 timeout 的该比例记为失败
+
+# 文生图对冲请求 (模板 client_params.hedge_enabled 开启后生效)
+AI_HEDGE_MAX_WORKERS = int(os.getenv('AI_HEDGE_MAX_WORKERS', 16))  # 对冲调用线程池大小
+AI_HEDGE_BUDGET_WINDOW = int(os.getenv('AI_HEDGE_BUDGET_WINDOW', 86400))  # 项目对冲预算周期(秒)
+
+# 异步视频任务自适应轮询 (按提供商学习任务耗时)
+AI_POLL_MIN_INTERVAL = float(os.getenv('AI_POLL_MIN_INTERVAL', 1.0))  # 最小查询间隔(秒)
+AI_POLL_MAX_INTERVAL = float(os.getenv('AI_POLL_MAX_INTERVAL', 30.0))  # 最大查询间隔(秒)
+AI_VIDEO_DEFERRED_MAX_ROUNDS = int(os.getenv('AI_VIDEO_DEFERRED_MAX_ROUNDS', 2000))  # 图生视频延迟完成模式最多重新调度轮数
+
+# Redis流式推送配置 (项目事件日志, Redis Stream)
+REDIS_PUBSUB_URL = os.getenv('REDIS_PUBSUB_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/2')  # 数据库2: 流式推送专用
+REDIS_EVENT_STREAM_MAXLEN = int(os.getenv('REDIS_EVENT_STREAM_MAXLEN', 5000))  # 项目事件日志保留条数(近似)
+REDIS_EVENT_STREAM_TTL = int(os.getenv('REDIS_EVENT_STREAM_TTL', 86400))  # 项目事件日志最后写入后的保留时间(秒)
+SSE_LISTENER_QUEUE_SIZE = int(os.getenv('SSE_LISTENER_QUEUE_SIZE', 1000))  # 异步SSE每个连接的待发送帧上限,超出后断开让客户端重连补齐
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/4')  # 数据库4: Django缓存与队列记录
+
+# Redis连接池 (进程内按用途共享, 见 core/redis/pool.py)
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv('REDIS_POOL_MAX_CONNECTIONS', 50))  # 每个用途每个进程的连接上限
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 20))  # 连接用尽时等待归还的最长秒数
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30))  # 空闲连接复用前的健康检查间隔(秒)
+REDIS_POOLS = {
+    'pubsub': {},
+    'rate_limit': {'socket_connect_timeout': 2, 'socket_timeout': 2, 'retry_on_timeout': False},
+    'cache': {},
+}
+
+# 流式Token推送 (增量合并发送, 定期附带完整文本快照)
+AI_STREAM_TOKEN_FLUSH_MS = int(os.getenv('AI_STREAM_TOKEN_FLUSH_MS', 50))  # 合并窗口(毫秒)
+AI_STREAM_TOKEN_FLUSH_CHARS = int(os.getenv('AI_STREAM_TOKEN_FLUSH_CHARS', 256))  # 缓冲达到该字符数立即发送
+AI_STREAM_SNAPSHOT_INTERVAL = float(os.getenv('AI_STREAM_SNAPSHOT_INTERVAL', 2.0))  # 快照间隔(秒)
+AI_STREAM_SNAPSHOT_CHARS = int(os.getenv('AI_STREAM_SNAPSHOT_CHARS', 4096))  # 新增该字符数后发送快照
 
 # CORS配置
 CORS_ALLOW_ALL_ORIGINS = False
@@ -197,9 +256,13 @@ SIMPLE_JWT = {
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/4',  # 数据库4: Django缓存
+        'LOCATION': REDIS_CACHE_URL,  # 数据库4: Django缓存
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_POOL_KWARGS': {
+                'max_connections': REDIS_POOL_MAX_CONNECTIONS,
+                'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+            },
         }
     }
 }
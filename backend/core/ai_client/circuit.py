@@ -0,0 +1,165 @@
+"""
+AI客户端熔断接入
+职责: 为工厂创建的客户端实例挂载提供商熔断,并在提供商熔断时切换到同类型的可用提供商
+
+- 仅包装发起生成请求的入口方法(见 rate_limit.RATE_LIMITED_METHODS),入口方法互相调用时只记录一次
+- 调用抛出异常、返回 success=False 的 AIResponse 或流式输出 error 块均记为失败
+- 熔断中的提供商直接抛出 CircuitOpenError,不再等待 provider.timeout
+- 熔断统计在限流排队之后开始计时(限流包装在外层),排队时间不计入延迟
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import time
+from typing import Any, Optional, Sequence
+
+from django.conf import settings
+
+from core.redis.circuit_breaker import CircuitOpenError, get_circuit_breaker
+
+from .base import AIResponse
+from .rate_limit import RATE_LIMITED_METHODS
+
+logger = logging.getLogger(__name__)
+
+_active_var = contextvars.ContextVar('ai_circuit_active', default=False)
+
+__all__ = ['CircuitOpenError', 'apply_circuit_breaker', 'get_failover_provider', 'is_provider_available']
+
+
+def _enabled() -> bool:
+    return getattr(settings, 'AI_CIRCUIT_BREAKER_ENABLED', True)
+
+
+def is_provider_available(provider) -> bool:
+    """提供商当前是否未熔断(熔断关闭或未启用时始终可用)"""
+    if not _enabled() or getattr(provider, 'pk', None) is None:
+        return True
+    return get_circuit_breaker().is_available(str(provider.pk))
+
+
+def get_failover_provider(provider, candidates: Optional[Sequence[Any]] = None):
+    """
+    提供商熔断时选择替代提供商
+
+    依次尝试 candidates(如项目为该阶段配置的提供商)与其余同 provider_type 的激活提供商(按优先级),
+    全部熔断时返回原提供商,由调用时的 CircuitOpenError 快速失败
+
+    Args:
+        provider: 首选 ModelProvider
+        candidates: 优先尝试的候选列表
+
+    Returns:
+        可用的 ModelProvider
+    """
+    if provider is None or is_provider_available(provider):
+        return provider
+
+    from apps.models.models import ModelProvider
+
+    seen = {provider.pk}
+    same_type = ModelProvider.objects.filter(
+        provider_type=provider.provider_type,
+        is_active=True,
+    ).exclude(pk=provider.pk).order_by('-priority', '-created_at')
+
+    for candidate in list(candidates or []) + list(same_type):
+        if candidate.pk in seen or candidate.provider_type != provider.provider_type:
+            continue
+        seen.add(candidate.pk)
+        if is_provider_available(candidate):
+            logger.warning(f"模型提供商 {provider.name} 已熔断, 切换到 {candidate.name}")
+            return candidate
+
+    logger.warning(f"模型提供商 {provider.name} 已熔断, 且没有可切换的同类型提供商")
+    return provider
+
+
+def apply_circuit_breaker(client, provider):
+    """
+    为客户端实例挂载提供商熔断
+
+    Args:
+        client: AI客户端实例
+        provider: ModelProvider实例
+
+    Returns:
+        挂载熔断后的同一客户端实例
+    """
+    if not _enabled() or getattr(provider, 'pk', None) is None:
+        return client
+
+    provider_id = str(provider.pk)
+    timeout = getattr(provider, 'timeout', None)
+    for name in RATE_LIMITED_METHODS:
+        method = getattr(client, name, None)
+        if callable(method):
+            setattr(client, name, _wrap_method(method, provider_id, timeout))
+    return client
+
+
+def _is_failed_result(result) -> bool:
+    return isinstance(result, AIResponse) and not result.success
+
+
+def _wrap_method(method, provider_id: str, timeout: Optional[float]):
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            get_circuit_breaker().before_call(provider_id)
+            start_time = time.time()
+            success = True
+            try:
+                for chunk in method(*args, **kwargs):
+                    if isinstance(chunk, dict) and chunk.get('type') == 'error':
+                        success = False
+                    yield chunk
+            except Exception:
+                success = False
+                raise
+            finally:
+                # 流式调用总耗时与单次请求超时不可比,不参与慢调用判定
+                get_circuit_breaker().record(provider_id, success, time.time() - start_time)
+
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            if _active_var.get():
+                return await method(*args, **kwargs)
+            get_circuit_breaker().before_call(provider_id)
+            token = _active_var.set(True)
+            start_time = time.time()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception:
+                get_circuit_breaker().record(provider_id, False, time.time() - start_time, timeout)
+                raise
+            finally:
+                _active_var.reset(token)
+            get_circuit_breaker().record(provider_id, not _is_failed_result(result), time.time() - start_time, timeout)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if _active_var.get():
+            return method(*args, **kwargs)
+        get_circuit_breaker().before_call(provider_id)
+        token = _active_var.set(True)
+        start_time = time.time()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            get_circuit_breaker().record(provider_id, False, time.time() - start_time, timeout)
+            raise
+        finally:
+            _active_var.reset(token)
+        get_circuit_breaker().record(provider_id, not _is_failed_result(result), time.time() - start_time, timeout)
+        return result
+
+    return wrapper
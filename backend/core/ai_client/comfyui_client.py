@@ -15,7 +15,10 @@ import requests
 import websocket
 
 from .base import Text2ImageClient as BaseText2ImageClient
+from .image2video_client import VideoTaskFailedError
+from .polling import get_duration_model, poll_until
 from core.utils.file_storage import image_storage, video_storage
+from core.utils.http_transport import http_get, http_post
 
 
 class ComfyUIClient(BaseText2ImageClient):
@@ -113,7 +116,7 @@ class ComfyUIClient(BaseText2ImageClient):
             "prompt_id": prompt_id
         }
 
-        response = requests.post(url, json=payload, timeout=self.timeout)
+        response = http_post(url, json=payload, timeout=self.timeout)
         if response.status_code != 200:
             raise Exception(f"提交任务失败: HTTP {response.status_code}")
 
@@ -129,11 +132,65 @@ class ComfyUIClient(BaseText2ImageClient):
         """
         url = f"http://{self.server_address}/history/{prompt_id}"
 
-        response = requests.get(url, timeout=self.timeout)
+        response = http_get(url, timeout=self.timeout)
         if response.status_code != 200:
             raise Exception(f"获取历史失败: HTTP {response.status_code}")
         return response.json()
 
+    def _wait_for_history(
+        self,
+        prompt_id: str,
+        poll_interval: float = 5,
+        max_wait_time: float = 600,
+        started_at: Optional[float] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        progress_range: tuple = (15.0, 95.0),
+    ) -> Dict[str, Any]:
+        """
+        轮询任务历史直至任务执行结束
+
+        /history 不提供执行进度,每次查询时按已等待时间占预计耗时
+        (耗时模型的均值+偏差,无样本时用 max_wait_time) 的比例估算进度并回调,
+        进度在 progress_range 内单调递增且不会到达上限
+
+        Returns:
+            Dict[str, Any]: 包含该任务的历史数据
+
+        Raises:
+            VideoTaskFailedError: 任务执行出错
+            TimeoutError: 超过 max_wait_time
+        """
+        key = f'comfyui:{self.server_address}:video'
+        start_time = started_at or time.time()
+        estimate = get_duration_model().estimate(key)
+        expected = min(sum(estimate), max_wait_time) if estimate else max_wait_time
+        low, high = progress_range
+
+        def fetch() -> Optional[Dict[str, Any]]:
+            if progress_callback:
+                ratio = min((time.time() - start_time) / max(expected, 1), 0.99)
+                progress_callback(round(low + (high - low) * ratio, 1))
+            history = self._get_history(prompt_id)
+            entry = history.get(prompt_id)
+            if not entry:
+                return None
+            status = entry.get('status') or {}
+            if status.get('status_str') == 'error':
+                raise VideoTaskFailedError(f'任务 {prompt_id} 执行失败')
+            if not status.get('completed', bool(entry.get('outputs'))):
+                return None
+            return history
+
+        return poll_until(
+            fetch,
+            key=key,
+            poll_interval=poll_interval,
+            max_wait_time=max_wait_time,
+            max_consecutive_errors=5,
+            fatal_errors=(VideoTaskFailedError,),
+            started_at=started_at,
+        )
+
     def _get_image(self, filename: str, subfolder: str, folder_type: str) -> bytes:
         """
         下载生成的图片
@@ -152,7 +209,7 @@ class ComfyUIClient(BaseText2ImageClient):
             "type": folder_type
         }
         url = f"http://{self.server_address}/view"
-        response = requests.get(url, params=params, timeout=self.timeout)
+        response = http_get(url, params=params, timeout=self.timeout)
         if response.status_code != 200:
             raise Exception(f"下载图片失败: HTTP {response.status_code}")
         return response.content
@@ -191,7 +248,7 @@ class ComfyUIClient(BaseText2ImageClient):
         url = f"http://{self.server_address}/view"
 
         # 使用流式请求
-        response = requests.get(url, params=params, stream=True, timeout=self.timeout)
+        response = http_get(url, params=params, stream=True, timeout=self.timeout)
 
         if response.status_code != 200:
             raise Exception(f"下载视频失败: HTTP {response.status_code}")
@@ -507,28 +564,18 @@ class ComfyUIClient(BaseText2ImageClient):
             if progress_callback:
                 progress_callback(15.0)
 
-            # 建立 WebSocket 连接并监听进度
-            ws_url = f"ws://{self.server_address}/ws?clientId={self.client_id}"
-            ws = websocket.WebSocket()
-
-            try:
-                ws.connect(ws_url)
-                self._get_images_sync(
-                    ws,
-                    workflow,
-                    prompt_id,
-                    progress_callback
-                )
-
-            finally:
-                ws.close()
+            # 轮询任务历史直至完成(视频任务耗时长,按自适应间隔查询,见 core.ai_client.polling)
+            history = self._wait_for_history(
+                prompt_id,
+                poll_interval=kwargs.get('poll_interval', 5),
+                max_wait_time=kwargs.get('max_wait_time', 600),
+                started_at=start_time,
+                progress_callback=progress_callback,
+            )
 
             if progress_callback:
                 progress_callback(95.0)
 
-            # 获取结果
-            history = self._get_history(prompt_id)
-
             if prompt_id not in history:
                 return dict(
                     success=False,
@@ -625,7 +672,7 @@ class ComfyUIClient(BaseText2ImageClient):
         # 尝试连接服务器
         try:
             url = f"http://{self.server_address}/system_stats"
-            response = requests.get(url, timeout=5)
+            response = http_get(url, timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -14,6 +14,7 @@ from core.ai_client.image_result_utils import (
     normalize_result_data,
 )
 from core.ai_client.schemas import ImageEditRequest
+from core.utils.http_transport import http_post
 
 
 class OpenAIImagesEditExecutor(BaseImageEditClient):
@@ -96,7 +97,7 @@ class OpenAIImagesEditExecutor(BaseImageEditClient):
         }
 
         try:
-            response = requests.post(
+            response = http_post(
                 request_url,
                 headers=headers,
                 json=payload,
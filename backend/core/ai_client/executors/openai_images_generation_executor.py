@@ -15,6 +15,7 @@ from core.ai_client.image_result_utils import (
     normalize_result_data,
 )
 from core.ai_client.schemas import Text2ImageRequest
+from core.utils.http_transport import http_post
 
 
 class OpenAIImagesGenerationExecutor(BaseText2ImageClient):
@@ -101,7 +102,7 @@ class OpenAIImagesGenerationExecutor(BaseText2ImageClient):
         }
 
         try:
-            response = requests.post(
+            response = http_post(
                 request_url,
                 headers=headers,
                 json=payload,
@@ -1,20 +1,68 @@
 """
 执行器工厂
-职责: 根据ModelProvider配置动态创建AI客户端实例
+职责: 根据ModelProvider配置动态创建AI客户端实例,并在进程内缓存执行器类与客户端实例
 遵循工厂模式: 封装复杂的对象创建逻辑
+
+缓存说明:
+- 客户端实例按 ModelProvider.id + updated_at 缓存,配置变更后 updated_at 变化即自动重建
+- 同进程内保存/删除 ModelProvider 时通过信号主动失效(见 apps.models.signals)
+- 客户端在初始化后不再修改自身状态,可在线程间共享
+- 缓存的是已挂载提供商熔断(见 circuit.py)、限流(见 rate_limit.py)与在途调用统计(见 router.py)的实例
 """
 
 import logging
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
 from .base import BaseAIClient
+from .circuit import apply_circuit_breaker
+from .rate_limit import apply_rate_limit
+from .router import apply_in_flight_tracking
 from .registry import get_executor_class, validate_executor_for_provider
 
 logger = logging.getLogger(__name__)
 
+_executor_class_cache: Dict[str, Type[BaseAIClient]] = {}
+_client_cache: Dict[str, Tuple[Any, BaseAIClient]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_cached_executor_class(class_path: str) -> Type[BaseAIClient]:
+    """带进程内缓存的 get_executor_class"""
+    executor_class = _executor_class_cache.get(class_path)
+    if executor_class is None:
+        executor_class = get_executor_class(class_path)
+        with _cache_lock:
+            _executor_class_cache[class_path] = executor_class
+    return executor_class
+
+
+def invalidate_ai_client_cache(provider_id=None) -> None:
+    """
+    失效客户端缓存
+
+    Args:
+        provider_id: ModelProvider ID,为空时清空全部缓存
+    """
+    with _cache_lock:
+        if provider_id is None:
+            _client_cache.clear()
+            _executor_class_cache.clear()
+        else:
+            _client_cache.pop(str(provider_id), None)
+
+
+def _get_client_cache_key(provider) -> Optional[Tuple[str, Any]]:
+    """未保存的 provider(无 id 或 updated_at)不参与缓存"""
+    provider_id = getattr(provider, 'pk', None)
+    updated_at = getattr(provider, 'updated_at', None)
+    if provider_id is None or updated_at is None:
+        return None
+    return str(provider_id), updated_at
+
 
 def create_ai_client(provider) -> BaseAIClient:
     """
-    根据ModelProvider实例创建AI客户端
+    根据ModelProvider实例获取AI客户端(优先复用进程内缓存)
 
     Args:
         provider: ModelProvider实例（来自apps.models.models）
@@ -31,6 +79,27 @@ def create_ai_client(provider) -> BaseAIClient:
     if not provider:
         raise ValueError("ModelProvider实例不能为空")
 
+    cache_key = _get_client_cache_key(provider)
+    if cache_key:
+        cached = _client_cache.get(cache_key[0])
+        if cached and cached[0] == cache_key[1]:
+            return cached[1]
+
+    # 由内到外: 熔断(只统计真实调用耗时) -> 限流排队 -> 在途调用统计
+    client = _build_ai_client(provider)
+    client = apply_circuit_breaker(client, provider)
+    client = apply_rate_limit(client, provider)
+    client = apply_in_flight_tracking(client, provider)
+
+    if cache_key:
+        with _cache_lock:
+            _client_cache[cache_key[0]] = (cache_key[1], client)
+
+    return client
+
+
+def _build_ai_client(provider) -> BaseAIClient:
+    """根据ModelProvider配置构建新的AI客户端实例"""
     # 获取执行器类路径
     executor_class_path = provider.executor_class
 
@@ -50,7 +119,7 @@ def create_ai_client(provider) -> BaseAIClient:
 
     try:
         # 动态导入执行器类
-        executor_class = get_executor_class(executor_class_path)
+        executor_class = get_cached_executor_class(executor_class_path)
 
         # 准备配置参数
         config = {
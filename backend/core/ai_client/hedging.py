@@ -0,0 +1,212 @@
+"""
+图片生成对冲请求
+职责: 请求在阈值时间内未返回时向备用提供商(或同一提供商)再发一次,取先成功的结果,削减长尾延迟
+
+- 阈值默认取提供商近期成功调用耗时的 p90(进程内样本不足时以 ModelUsageLog 历史补充)
+- 对冲请求计入项目预算(Django 缓存计数,所有 Worker 共享),预算用完后不再对冲
+- 落败请求无法中断已发出的HTTP调用,未开始的直接取消,已开始的结果被丢弃
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# 估算分位数所需的最少样本数
+MIN_LATENCY_SAMPLES = 10
+
+
+@dataclass
+class HedgePolicy:
+    """对冲策略"""
+
+    # 预算归属(通常为项目ID)
+    budget_key: str
+    # 预算周期内允许的对冲请求数
+    budget: int = 20
+    # 固定对冲阈值(秒),<=0 时按提供商历史耗时分位数计算
+    delay: float = 0
+    percentile: float = 0.9
+    # 对冲阈值下限(秒),避免样本偏小时过早对冲
+    min_delay: float = 5.0
+    # 对冲目标提供商,为空时对同一提供商再发一次
+    backup_provider: Any = None
+
+
+class LatencyTracker:
+    """进程内按提供商保存最近的成功调用耗时"""
+
+    def __init__(self, max_samples: int = 200):
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._seeded = set()
+        self._lock = threading.Lock()
+
+    def record(self, provider_id, latency: float) -> None:
+        provider_id = str(provider_id)
+        with self._lock:
+            samples = self._samples.get(provider_id)
+            if samples is None:
+                samples = self._samples[provider_id] = deque(maxlen=self.max_samples)
+            samples.append(latency)
+
+    def percentile(self, provider_id, q: float) -> Optional[float]:
+        """
+        计算提供商耗时分位数(秒)
+
+        Returns:
+            样本不足 MIN_LATENCY_SAMPLES 时返回 None
+        """
+        provider_id = str(provider_id)
+        if provider_id not in self._seeded:
+            self._seed_from_history(provider_id)
+
+        with self._lock:
+            samples = sorted(self._samples.get(provider_id, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(int(len(samples) * q), len(samples) - 1)
+        return samples[index]
+
+    def _seed_from_history(self, provider_id: str) -> None:
+        self._seeded.add(provider_id)
+        try:
+            from apps.models.models import ModelUsageLog
+
+            latencies = list(
+                ModelUsageLog.objects.filter(model_provider_id=provider_id, status='success')
+                .order_by('-created_at')
+                .values_list('latency_ms', flat=True)[:self.max_samples]
+            )
+        except Exception as e:
+            logger.debug(f"读取提供商 {provider_id} 历史耗时失败: {str(e)}")
+            return
+
+        with self._lock:
+            samples = self._samples.setdefault(provider_id, deque(maxlen=self.max_samples))
+            for latency_ms in reversed(latencies):
+                if latency_ms > 0:
+                    samples.appendleft(latency_ms / 1000)
+
+
+_latency_tracker = LatencyTracker()
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """获取进程内共享的耗时统计"""
+    return _latency_tracker
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'AI_HEDGE_MAX_WORKERS', 16),
+                    thread_name_prefix='image-hedge',
+                )
+    return _hedge_executor
+
+
+def resolve_hedge_delay(policy: HedgePolicy, provider) -> Optional[float]:
+    """计算对冲阈值,无法确定时返回 None(不对冲)"""
+    if policy.delay and policy.delay > 0:
+        return policy.delay
+    estimate = get_latency_tracker().percentile(provider.pk, policy.percentile)
+    if estimate is None:
+        return None
+    return max(estimate, policy.min_delay)
+
+
+def try_acquire_hedge_budget(policy: HedgePolicy) -> bool:
+    """扣减一次对冲预算,预算不足时返回 False"""
+    if policy.budget <= 0:
+        return False
+
+    key = f'ai_story:hedge_budget:{policy.budget_key}'
+    window = getattr(settings, 'AI_HEDGE_BUDGET_WINDOW', 86400)
+    try:
+        cache.add(key, 0, timeout=window)
+        used = cache.incr(key)
+    except Exception as e:
+        logger.warning(f"对冲预算计数失败, 本次不对冲: {str(e)}")
+        return False
+
+    if used > policy.budget:
+        cache.decr(key)
+        return False
+    return True
+
+
+def run_hedged(
+    primary: Callable[[], Any],
+    backup: Callable[[], Any],
+    delay: float,
+    policy: HedgePolicy,
+    is_success: Callable[[Any], bool],
+) -> Tuple[Any, str]:
+    """
+    执行对冲调用
+
+    Args:
+        primary: 主请求
+        backup: 对冲请求
+        delay: 主请求超过该秒数未返回时发出对冲请求
+        policy: 对冲策略(用于扣减预算)
+        is_success: 判断结果是否成功
+
+    Returns:
+        (结果, 'primary' | 'backup')
+    """
+    executor = _get_hedge_executor()
+    futures = {executor.submit(contextvars.copy_context().run, primary): 'primary'}
+    done, _ = wait(futures, timeout=delay)
+    if not done and try_acquire_hedge_budget(policy):
+        logger.info(f"请求 {delay:.1f} 秒未返回, 发出对冲请求")
+        futures[executor.submit(contextvars.copy_context().run, backup)] = 'backup'
+
+    has_result, last_result, last_error = False, None, None
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            label = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if is_success(result):
+                for loser in futures:
+                    # 已开始的请求无法中断,其结果直接丢弃
+                    loser.cancel()
+                return result, label
+            has_result, last_result = True, result
+
+    if has_result:
+        return last_result, 'primary'
+    raise last_error
+
+
+def timed(call: Callable[[], Any], provider, is_success: Callable[[Any], bool]) -> Callable[[], Any]:
+    """包装调用,成功时记录提供商耗时"""
+
+    def wrapper():
+        start_time = time.time()
+        result = call()
+        if is_success(result):
+            get_latency_tracker().record(provider.pk, time.time() - start_time)
+        return result
+
+    return wrapper
@@ -17,7 +17,9 @@ from urllib.parse import urlparse
 import requests
 from django.conf import settings
 
+from core.ai_client.polling import poll_until
 from core.utils.file_storage import video_storage
+from core.utils.http_transport import http_get, http_post
 
 
 class TaskStatus(Enum):
@@ -32,6 +34,10 @@ class TaskStatus(Enum):
     UNKNOWN = "Unknown"
 
 
+class VideoTaskFailedError(Exception):
+    """视频任务在服务端执行失败(区别于可重试的查询异常)"""
+
+
 class VideoGeneratorClient:
     """视频生成客户端"""
 
@@ -114,7 +120,7 @@ class VideoGeneratorClient:
 
     def _read_image_url_as_base64(self, image_url: str, timeout: int) -> str:
         """读取图片URL并转换为 base64 字符串。"""
-        response = requests.get(image_url, timeout=timeout)
+        response = http_get(image_url, timeout=timeout)
         response.raise_for_status()
         return base64.b64encode(response.content).decode('utf-8')
 
@@ -197,7 +203,7 @@ class VideoGeneratorClient:
                 'original_url': video_url,
             }
 
-        response = requests.get(video_url, stream=True, timeout=timeout)
+        response = http_get(video_url, stream=True, timeout=timeout)
         response.raise_for_status()
         extension = self._get_video_extension(
             content_type=response.headers.get('Content-Type', ''),
@@ -327,7 +333,7 @@ class VideoGeneratorClient:
             }
 
             try:
-                response = requests.post(url, json=payload, headers=self.headers)
+                response = http_post(url, json=payload, headers=self.headers)
                 response.raise_for_status()
                 result = response.json()
                 choices = result.get('choices') or []
@@ -380,7 +386,7 @@ class VideoGeneratorClient:
             payload['personGeneration'] = person_generation
 
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = http_post(url, json=payload, headers=self.headers)
             response.raise_for_status()
             result = response.json()
             data = result.get('data')
@@ -397,90 +403,87 @@ class VideoGeneratorClient:
         url = self._build_task_status_url(task_id)
 
         try:
-            response = requests.get(url, headers=self.headers)
+            response = http_get(url, headers=self.headers)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             raise Exception(f'查询任务状态失败: {str(e)}')
 
+    def _normalize_task_info(self, task_info: Dict[str, Any]):
+        """兼容 data 包裹的任务状态响应,返回 (任务信息, 状态)。"""
+        status = task_info.get('status')
+        if status is None and "data" in task_info:
+            task_info = task_info["data"]
+            status = task_info.get("status")
+        return task_info, status
+
     def wait_for_completion(
         self,
         task_id: str,
         poll_interval: int = 5,
         max_wait_time: int = 600,
         callback: Optional[callable] = None,
+        started_at: Optional[float] = None,
     ) -> Dict[str, Any]:
-        """轮询等待任务完成。"""
-        start_time = time.time()
-
-        while True:
-            elapsed_time = time.time() - start_time
-
-            if elapsed_time > max_wait_time:
-                raise TimeoutError(f'任务超时: 等待时间超过 {max_wait_time} 秒')
+        """轮询等待任务完成(自适应间隔,见 core.ai_client.polling)。"""
 
-            task_info = self.get_task_status(task_id)
-            status = task_info.get('status')
-            if status is None and "data" in task_info:
-                task_info = task_info["data"]
-                status = task_info.get("status")
+        def fetch() -> Optional[Dict[str, Any]]:
+            task_info, status = self._normalize_task_info(self.get_task_status(task_id))
             if callback:
                 callback(task_info)
-            if status == TaskStatus.SUCCESS.value:
-                return task_info
-            if status == TaskStatus.COMPLETED.value:
+            if status in (TaskStatus.SUCCESS.value, TaskStatus.COMPLETED.value):
                 return task_info
             if status == TaskStatus.FAILED.value:
                 message = task_info.get('message', '未知错误')
-                raise Exception(f'任务失败: {message}')
+                raise VideoTaskFailedError(f'任务失败: {message}')
+            return None
+
+        return poll_until(
+            fetch,
+            key=self.polling_key,
+            poll_interval=poll_interval,
+            max_wait_time=max_wait_time,
+            started_at=started_at,
+        )
 
-            time.sleep(poll_interval)
+    @property
+    def polling_key(self) -> str:
+        """轮询耗时模型键: 同一服务地址与模型共享耗时统计。"""
+        return f'{urlparse(self.base_url).netloc}:{self.model}'
 
-    def _generate_video(
+    def _build_direct_video_result(self, task_result: List[Any], start_time: float, **kwargs) -> Dict[str, Any]:
+        """构建同步接口(直接返回视频列表)的生成结果。"""
+        timeout = kwargs.get('timeout', self.timeout)
+        video_data = []
+        for item in task_result:
+            if isinstance(item, dict):
+                url = item.get('url')
+                if not url:
+                    continue
+                video_data.append(item)
+            elif item:
+                video_data.append({'url': item})
+
+        localized_video_data = self._localize_video_data(video_data, timeout)
+        return {
+            'success': True,
+            'data': localized_video_data,
+            'metadata': {
+                'latency_ms': int((time.time() - start_time) * 1000),
+                'model': kwargs.get('model') or self.model,
+                'request_url': self._build_create_video_url(),
+            },
+        }
+
+    def _build_task_video_result(
         self,
-        prompt: str,
-        poll_interval: int = 5,
-        max_wait_time: int = 600,
+        result: Dict[str, Any],
+        task_id: str,
+        start_time: float,
         **kwargs,
     ) -> Dict[str, Any]:
-        """同步生成视频(提交任务并等待完成)。"""
-        start_time = time.time()
+        """构建异步任务完成后的生成结果。"""
         timeout = kwargs.get('timeout', self.timeout)
-        task_result = self.create_video_task(prompt, **kwargs)
-
-        if isinstance(task_result, list):
-            video_data = []
-            for item in task_result:
-                if isinstance(item, dict):
-                    url = item.get('url')
-                    if not url:
-                        continue
-                    video_data.append(item)
-                elif item:
-                    video_data.append({'url': item})
-
-            localized_video_data = self._localize_video_data(video_data, timeout)
-            return {
-                'success': True,
-                'data': localized_video_data,
-                'metadata': {
-                    'latency_ms': int((time.time() - start_time) * 1000),
-                    'model': kwargs.get('model') or self.model,
-                    'request_url': self._build_create_video_url(),
-                },
-            }
-
-        task_id = task_result
-        if isinstance(task_result, dict):
-            task_id = task_result.get('task_id') or task_result.get('id')
-
-        result = self.wait_for_completion(
-            task_id,
-            poll_interval=poll_interval,
-            max_wait_time=max_wait_time,
-            callback=None,
-        )
-
         videos = result.get('data', {}).get('videos', [])
         if not videos:
             video = result.get('data', {}).get("content", {}).get("video_url")
@@ -506,3 +509,81 @@ class VideoGeneratorClient:
                 'task_id': task_id,
             },
         }
+
+    def submit_video_task(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        只提交视频任务,不等待完成
+
+        Returns:
+            {'task_id': 任务ID, 'result': None};
+            同步接口(如 chat/completions)直接返回 {'task_id': None, 'result': 生成结果}
+        """
+        start_time = time.time()
+        task_result = self.create_video_task(prompt, **kwargs)
+
+        if isinstance(task_result, list):
+            return {
+                'task_id': None,
+                'result': self._build_direct_video_result(task_result, start_time, **kwargs),
+            }
+
+        task_id = task_result
+        if isinstance(task_result, dict):
+            task_id = task_result.get('task_id') or task_result.get('id')
+        return {'task_id': task_id, 'result': None}
+
+    def check_video_task(
+        self,
+        task_id: str,
+        started_at: Optional[float] = None,
+        **kwargs,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        单次查询任务状态,供调用方统一轮询多个任务
+
+        Returns:
+            任务进行中返回 None; 完成时返回与 _generate_video 相同结构的结果
+
+        Raises:
+            VideoTaskFailedError: 任务失败
+        """
+        task_info, status = self._normalize_task_info(self.get_task_status(task_id))
+
+        if status in (TaskStatus.SUCCESS.value, TaskStatus.COMPLETED.value):
+            return self._build_task_video_result(
+                task_info,
+                task_id,
+                started_at or time.time(),
+                **kwargs,
+            )
+        if status == TaskStatus.FAILED.value:
+            message = task_info.get('message', '未知错误')
+            raise VideoTaskFailedError(f'任务失败: {message}')
+        return None
+
+    def _generate_video(
+        self,
+        prompt: str,
+        poll_interval: int = 5,
+        max_wait_time: int = 600,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """同步生成视频(提交任务并等待完成)。"""
+        start_time = time.time()
+        task_result = self.create_video_task(prompt, **kwargs)
+
+        if isinstance(task_result, list):
+            return self._build_direct_video_result(task_result, start_time, **kwargs)
+
+        task_id = task_result
+        if isinstance(task_result, dict):
+            task_id = task_result.get('task_id') or task_result.get('id')
+
+        result = self.wait_for_completion(
+            task_id,
+            poll_interval=poll_interval,
+            max_wait_time=max_wait_time,
+            callback=None,
+            started_at=start_time,
+        )
+        return self._build_task_video_result(result, task_id, start_time, **kwargs)
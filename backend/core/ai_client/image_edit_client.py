@@ -8,6 +8,8 @@ from urllib.parse import urlparse
 
 import requests
 
+from core.utils.http_transport import http_post
+
 from .base import ImageEditClient as BaseImageEditClient, AIResponse
 from .text2image_client import Text2ImageClient
 
@@ -51,7 +53,7 @@ class ImageEditClient(BaseImageEditClient):
         }
 
         try:
-            response = requests.post(
+            response = http_post(
                 request_url,
                 headers=headers,
                 json=payload,
@@ -8,9 +8,8 @@ import uuid
 from typing import Any, Iterable, List
 from urllib.parse import urlparse
 
-import requests
-
 from core.utils.file_storage import image_storage
+from core.utils.http_transport import http_get
 
 
 IMAGE_MARKDOWN_PATTERN = re.compile(r'!\[[^\]]*\]\((https?://[^)]+)\)')
@@ -66,7 +65,7 @@ def download_image_to_storage(image_url: str, timeout: int) -> dict:
             'original_url': image_url,
         }
 
-    response = requests.get(image_url, timeout=timeout)
+    response = http_get(image_url, timeout=timeout)
     response.raise_for_status()
     image_content = response.content
     extension = get_image_extension(
@@ -6,6 +6,7 @@ from typing import Optional
 
 from .base import AIResponse
 from .factory import create_ai_client
+from .hedging import HedgePolicy, resolve_hedge_delay, run_hedged, timed
 from .schemas import ImageEditRequest, Text2ImageRequest
 
 
@@ -13,11 +14,48 @@ class ImageGenerationService:
     """统一封装文生图和图片编辑请求。"""
 
     @staticmethod
-    def generate(provider, request: Text2ImageRequest, client=None) -> AIResponse:
+    def generate(
+        provider,
+        request: Text2ImageRequest,
+        client=None,
+        hedge: Optional[HedgePolicy] = None,
+    ) -> AIResponse:
+        """
+        文生图请求。
+
+        传入 hedge 时启用对冲: 超过阈值未返回则向 hedge.backup_provider(默认同一提供商)再发一次,
+        取先成功的结果;由备用提供商胜出时在 metadata['hedge'] 中标记。
+        """
         current_client = client or create_ai_client(provider)
-        request_method = getattr(type(current_client), 'generate_from_text2image_request', None)
-        if callable(request_method):
-            return request_method(current_client, request)
+        primary = timed(
+            lambda: ImageGenerationService._call_text2image(current_client, request),
+            provider,
+            _is_successful,
+        )
+        delay = resolve_hedge_delay(hedge, provider) if hedge else None
+        if delay is None:
+            return primary()
+
+        backup_provider = hedge.backup_provider or provider
+        backup_client = current_client if backup_provider is provider else create_ai_client(backup_provider)
+        backup = timed(
+            lambda: ImageGenerationService._call_text2image(backup_client, request),
+            backup_provider,
+            _is_successful,
+        )
+        response, winner = run_hedged(primary, backup, delay, hedge, _is_successful)
+        if winner == 'backup' and isinstance(response, AIResponse):
+            response.metadata['hedge'] = {
+                'provider_id': str(backup_provider.pk),
+                'delay': round(delay, 2),
+            }
+        return response
+
+    @staticmethod
+    def _call_text2image(current_client, request: Text2ImageRequest) -> AIResponse:
+        if callable(getattr(type(current_client), 'generate_from_text2image_request', None)):
+            # 通过实例调用,以便经过实例上挂载的限流包装
+            return current_client.generate_from_text2image_request(request)
 
         return current_client.generate(
             prompt=request.prompt,
@@ -34,9 +72,9 @@ class ImageGenerationService:
     @staticmethod
     def edit(provider, request: ImageEditRequest, client=None) -> AIResponse:
         current_client = client or create_ai_client(provider)
-        request_method = getattr(type(current_client), 'generate_from_image_edit_request', None)
-        if callable(request_method):
-            return request_method(current_client, request)
+        if callable(getattr(type(current_client), 'generate_from_image_edit_request', None)):
+            # 通过实例调用,以便经过实例上挂载的限流包装
+            return current_client.generate_from_image_edit_request(request)
 
         return current_client.generate(
             image_url=request.primary_source_image,
@@ -50,3 +88,9 @@ class ImageGenerationService:
             source_images=request.source_images,
             **(request.extra or {}),
         )
+
+
+def _is_successful(response) -> bool:
+    if isinstance(response, AIResponse):
+        return response.success
+    return bool(response)
@@ -7,6 +7,7 @@ import requests
 import json
 import time
 from typing import Dict, Any, Generator
+from core.utils.http_transport import http_get, http_post
 from .base import LLMClient, AIResponse
 
 
@@ -46,7 +47,7 @@ class OpenAIClient(LLMClient):
         try:
             timeout = self.config.get('timeout', 60)
 
-            response = requests.post(
+            response = http_post(
                 f'{self.api_url}',
                 headers=headers,
                 json=payload,
@@ -127,7 +128,7 @@ class OpenAIClient(LLMClient):
         try:
             timeout = self.config.get('timeout', 300)
             api_url = self.api_url
-            response = requests.post(
+            response = http_post(
                 api_url,
                 headers=headers,
                 json=payload,
@@ -213,7 +214,7 @@ class OpenAIClient(LLMClient):
         # 简单的连通性测试
         try:
             headers = {'Authorization': f'Bearer {self.api_key}'}
-            response = requests.get(
+            response = http_get(
                 f'{self.api_url}/models',
                 headers=headers,
                 timeout=10
@@ -0,0 +1,205 @@
+"""
+异步任务自适应轮询
+职责: 为各异步视频提供商(通用视频接口、火山方舟、ComfyUI)提供统一的任务状态轮询调度
+
+- 按提供商学习任务耗时(指数加权均值与平均偏差,存于 Django 缓存,所有 Worker 共享)
+- 预计完成之前按剩余时间对半逼近,长间隔少查询
+- 进入预计完成窗口后以最小间隔快速查询,尽早发现完成
+- 超出窗口后指数退避,直至 max_interval
+- 尚无耗时数据时从配置的 poll_interval 开始逐步放大间隔
+- 每次间隔叠加随机抖动,避免大量任务同时查询
+"""
+
+import logging
+import random
+import time
+from typing import Any, Callable, Optional, Tuple, Type
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class DurationModel:
+    """
+    按提供商学习异步任务耗时
+
+    缓存键: ai_story:poll_duration:{key} -> {'mean', 'dev', 'samples'}
+    """
+
+    cache_prefix = 'ai_story:poll_duration'
+    # 指数加权系数,越大越偏向最近的任务
+    alpha = 0.3
+    # 样本数达到该值后才用于调度
+    min_samples = 3
+    cache_timeout = 30 * 86400
+
+    def estimate(self, key: str) -> Optional[Tuple[float, float]]:
+        """
+        预计耗时
+
+        Returns:
+            (mean, dev) 秒,样本不足时返回 None
+        """
+        try:
+            data = cache.get(self._cache_key(key))
+        except Exception as e:
+            logger.debug(f"读取任务耗时模型失败: {str(e)}")
+            return None
+        if not data or data.get('samples', 0) < self.min_samples:
+            return None
+        return data['mean'], data['dev']
+
+    def record(self, key: str, duration: float) -> None:
+        """记录一次任务完成耗时"""
+        cache_key = self._cache_key(key)
+        try:
+            data = cache.get(cache_key) or {}
+            if not data:
+                data = {'mean': duration, 'dev': duration * 0.25, 'samples': 1}
+            else:
+                deviation = abs(duration - data['mean'])
+                data = {
+                    'mean': (1 - self.alpha) * data['mean'] + self.alpha * duration,
+                    'dev': (1 - self.alpha) * data['dev'] + self.alpha * deviation,
+                    'samples': data.get('samples', 0) + 1,
+                }
+            cache.set(cache_key, data, timeout=self.cache_timeout)
+        except Exception as e:
+            logger.debug(f"更新任务耗时模型失败: {str(e)}")
+
+    def _cache_key(self, key: str) -> str:
+        return f'{self.cache_prefix}:{key}'
+
+
+_duration_model = DurationModel()
+
+
+def get_duration_model() -> DurationModel:
+    """获取共享的任务耗时模型"""
+    return _duration_model
+
+
+class PollSchedule:
+    """单个任务的轮询间隔调度"""
+
+    def __init__(
+        self,
+        estimate: Optional[Tuple[float, float]],
+        base_interval: float = 5,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        jitter: float = 0.2,
+        rng: Optional[random.Random] = None,
+    ):
+        self.min_interval = min_interval if min_interval is not None else getattr(
+            settings, 'AI_POLL_MIN_INTERVAL', 1.0
+        )
+        self.max_interval = max_interval if max_interval is not None else getattr(
+            settings, 'AI_POLL_MAX_INTERVAL', 30.0
+        )
+        self.base_interval = min(max(base_interval or 0, self.min_interval), self.max_interval)
+        self.jitter = jitter
+        self.rng = rng or random
+        self.attempt = 0
+        self.overdue_attempt = 0
+
+        self.window = None
+        if estimate:
+            mean, dev = estimate
+            # 偏差过小时至少留出均值10%的窗口
+            dev = max(dev, mean * 0.1, self.min_interval)
+            self.window = (max(mean - dev, 0), mean + dev)
+
+    def next_delay(self, elapsed: float) -> float:
+        """距下一次查询的秒数"""
+        self.attempt += 1
+
+        if self.window is None:
+            delay = self.base_interval * (1.5 ** (self.attempt - 1))
+        elif elapsed < self.window[0]:
+            # 对半逼近预计完成窗口
+            delay = max((self.window[0] - elapsed) / 2, self.min_interval)
+        elif elapsed <= self.window[1]:
+            delay = self.min_interval
+        else:
+            self.overdue_attempt += 1
+            delay = self.min_interval * (2 ** self.overdue_attempt)
+
+        delay = min(delay, self.max_interval)
+        if self.jitter:
+            delay *= self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(delay, self.min_interval)
+
+
+def build_poll_schedule(key: str, poll_interval: float = 5) -> PollSchedule:
+    """按提供商耗时模型创建轮询调度"""
+    return PollSchedule(get_duration_model().estimate(key), base_interval=poll_interval)
+
+
+def poll_until(
+    fetch: Callable[[], Any],
+    key: str,
+    poll_interval: float = 5,
+    max_wait_time: float = 600,
+    max_attempts: Optional[int] = None,
+    max_consecutive_errors: int = 0,
+    fatal_errors: Tuple[Type[BaseException], ...] = (),
+    started_at: Optional[float] = None,
+) -> Any:
+    """
+    轮询直到任务完成
+
+    Args:
+        fetch: 单次查询,进行中返回 None,完成返回结果,失败抛出异常
+        key: 耗时模型键(区分提供商/模型)
+        poll_interval: 无耗时数据时的初始查询间隔
+        max_wait_time: 最长等待秒数
+        max_attempts: 最多查询次数(为空不限制)
+        max_consecutive_errors: 允许的连续查询异常次数,0 表示异常直接抛出
+        fatal_errors: 不重试、直接抛出的异常类型
+        started_at: 任务提交时间,默认当前时间
+
+    Returns:
+        fetch 返回的完成结果
+
+    Raises:
+        TimeoutError: 超过 max_wait_time 或 max_attempts
+        RuntimeError: 连续查询异常达到 max_consecutive_errors
+    """
+    start_time = started_at or time.time()
+    schedule = build_poll_schedule(key, poll_interval)
+    attempts = 0
+    consecutive_errors = 0
+
+    while True:
+        remaining = max_wait_time - (time.time() - start_time)
+        if remaining <= 0:
+            raise TimeoutError(f'任务超时: 等待时间超过 {max_wait_time} 秒')
+        if max_attempts is not None and attempts >= max_attempts:
+            raise TimeoutError(f'任务熔断: 轮询次数超过 {max_attempts} 次')
+
+        time.sleep(min(schedule.next_delay(time.time() - start_time), remaining))
+
+        try:
+            result = fetch()
+        except fatal_errors:
+            raise
+        except Exception as exc:
+            if max_consecutive_errors <= 0:
+                raise
+            consecutive_errors += 1
+            if consecutive_errors >= max_consecutive_errors:
+                raise RuntimeError(
+                    f'任务熔断: 连续查询异常达到 {max_consecutive_errors} 次, 最后错误: {exc}'
+                )
+            logger.warning(f"任务状态查询异常: key={key} attempt={consecutive_errors} error={str(exc)}")
+            continue
+
+        attempts += 1
+        consecutive_errors = 0
+        if result is not None:
+            get_duration_model().record(key, time.time() - start_time)
+            return result
+
@@ -0,0 +1,126 @@
+"""
+AI客户端限流接入
+职责: 为工厂创建的客户端实例挂载提供商限流,使所有调用入口先经过 ProviderRateLimiter
+
+- 仅包装发起生成请求的入口方法(见 RATE_LIMITED_METHODS),状态查询不计入配额
+- 入口方法互相调用时(如 submit_video_task -> create_video_task)只扣减一次
+- 默认排队等待(最长 settings.AI_RATE_LIMIT_MAX_WAIT 秒);需要快速失败的调用方使用
+  rate_limit_policy(wait=False),超限时抛出 RateLimitExceeded
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+
+from core.redis.rate_limiter import RateLimitExceeded, get_rate_limiter
+
+RATE_LIMITED_METHODS = (
+    'generate',
+    'generate_stream',
+    'create_video_task',
+    'submit_video_task',
+    'generate_from_text2image_request',
+    'generate_from_image_edit_request',
+)
+
+_policy_var = contextvars.ContextVar('ai_rate_limit_policy', default=None)
+_active_var = contextvars.ContextVar('ai_rate_limit_active', default=False)
+
+__all__ = ['RateLimitExceeded', 'apply_rate_limit', 'rate_limit_policy']
+
+
+@contextmanager
+def rate_limit_policy(wait: bool = True, max_wait: Optional[float] = None):
+    """
+    指定当前上下文内AI调用的限流策略
+
+    Args:
+        wait: 配额不足时是否排队等待,False 表示快速失败
+        max_wait: 最长等待秒数,默认取 settings.AI_RATE_LIMIT_MAX_WAIT
+    """
+    token = _policy_var.set({'wait': wait, 'max_wait': max_wait})
+    try:
+        yield
+    finally:
+        _policy_var.reset(token)
+
+
+def apply_rate_limit(client, provider):
+    """
+    为客户端实例挂载提供商限流
+
+    Args:
+        client: AI客户端实例
+        provider: ModelProvider实例
+
+    Returns:
+        挂载限流后的同一客户端实例
+    """
+    if not getattr(settings, 'AI_RATE_LIMIT_ENABLED', True):
+        return client
+
+    rpm = getattr(provider, 'rate_limit_rpm', 0) or 0
+    rpd = getattr(provider, 'rate_limit_rpd', 0) or 0
+    if getattr(provider, 'pk', None) is None or (rpm <= 0 and rpd <= 0):
+        return client
+
+    limit = (str(provider.pk), rpm, rpd)
+    for name in RATE_LIMITED_METHODS:
+        method = getattr(client, name, None)
+        if callable(method):
+            setattr(client, name, _wrap_method(method, limit))
+    return client
+
+
+def _resolve_max_wait() -> Optional[float]:
+    policy = _policy_var.get() or {}
+    if not policy.get('wait', True):
+        return 0
+    return policy.get('max_wait')
+
+
+def _wrap_method(method, limit):
+    provider_id, rpm, rpd = limit
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            if not _active_var.get():
+                get_rate_limiter().acquire(provider_id, rpm, rpd, max_wait=_resolve_max_wait())
+            yield from method(*args, **kwargs)
+
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            if _active_var.get():
+                return await method(*args, **kwargs)
+            wait = get_rate_limiter().reserve(provider_id, rpm, rpd, max_wait=_resolve_max_wait())
+            if wait > 0:
+                await asyncio.sleep(wait)
+            token = _active_var.set(True)
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                _active_var.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if _active_var.get():
+            return method(*args, **kwargs)
+        get_rate_limiter().acquire(provider_id, rpm, rpd, max_wait=_resolve_max_wait())
+        token = _active_var.set(True)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _active_var.reset(token)
+
+    return wrapper
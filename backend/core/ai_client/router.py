@@ -0,0 +1,238 @@
+"""
+模型提供商路由
+职责: 按 ProjectModelConfig.load_balance_strategy 在项目为各阶段配置的多个提供商间分配调用
+
+- round_robin: 按路由键(项目配置 + 阶段)轮询
+- random: 均匀随机
+- weighted: 以 ModelProvider.priority 为权重随机(权重均为0时退化为均匀随机)
+- least_loaded: 选择当前进程内在途调用数最少的提供商,数量相同时按 priority 高者优先
+
+在途调用数由 apply_in_flight_tracking 在工厂创建客户端时挂载统计,
+与限流一致只统计发起生成请求的入口方法(见 rate_limit.RATE_LIMITED_METHODS)
+已熔断的提供商不参与选择;候选全部熔断时切换到其他同类型提供商(见 circuit.py)
+"""
+
+import contextvars
+import functools
+import inspect
+import itertools
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+from .circuit import get_failover_provider, is_provider_available
+from .rate_limit import RATE_LIMITED_METHODS
+
+logger = logging.getLogger(__name__)
+
+# 阶段类型 -> ProjectModelConfig 上的提供商字段
+STAGE_PROVIDER_FIELDS = {
+    'rewrite': 'rewrite_providers',
+    'asset_extraction': 'rewrite_providers',
+    'storyboard': 'storyboard_providers',
+    'camera_movement': 'camera_providers',
+    'image_generation': 'image_providers',
+    'multi_grid_image': 'image_providers',
+    'video_generation': 'video_providers',
+}
+
+DEFAULT_STRATEGY = 'weighted'
+
+_tracking_var = contextvars.ContextVar('ai_in_flight_tracking', default=False)
+
+
+class ProviderRouter:
+    """进程内提供商路由器,维护轮询游标与在途调用数"""
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()
+        self._counters: Dict[str, itertools.count] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def select(self, providers: Sequence[Any], strategy: str = DEFAULT_STRATEGY, route_key: str = ''):
+        """
+        从候选提供商中选择一个
+
+        Args:
+            providers: 候选 ModelProvider 列表
+            strategy: 负载均衡策略
+            route_key: 轮询路由键,同一键共享游标
+
+        Returns:
+            选中的 ModelProvider,候选为空时返回 None
+        """
+        if not providers:
+            return None
+        if len(providers) == 1:
+            return providers[0]
+
+        if strategy == 'round_robin':
+            return providers[self._next_index(route_key) % len(providers)]
+        if strategy == 'random':
+            return self._rng.choice(providers)
+        if strategy == 'least_loaded':
+            return self._select_least_loaded(providers)
+        if strategy != 'weighted':
+            logger.warning(f"未知的负载均衡策略 {strategy}, 使用权重随机")
+        return self._select_weighted(providers)
+
+    @contextmanager
+    def track(self, provider_id: str):
+        """在上下文内将提供商的在途调用数加一"""
+        provider_id = str(provider_id)
+        with self._lock:
+            self._in_flight[provider_id] = self._in_flight.get(provider_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                remaining = self._in_flight.get(provider_id, 1) - 1
+                if remaining > 0:
+                    self._in_flight[provider_id] = remaining
+                else:
+                    self._in_flight.pop(provider_id, None)
+
+    def in_flight(self, provider_id) -> int:
+        """当前进程内提供商的在途调用数"""
+        return self._in_flight.get(str(provider_id), 0)
+
+    def _next_index(self, route_key: str) -> int:
+        with self._lock:
+            counter = self._counters.get(route_key)
+            if counter is None:
+                counter = self._counters[route_key] = itertools.count()
+            return next(counter)
+
+    def _select_weighted(self, providers: Sequence[Any]):
+        weights = [max(getattr(provider, 'priority', 0) or 0, 0) for provider in providers]
+        if not any(weights):
+            return self._rng.choice(providers)
+        return self._rng.choices(providers, weights=weights, k=1)[0]
+
+    def _select_least_loaded(self, providers: Sequence[Any]):
+        return min(
+            providers,
+            key=lambda provider: (self.in_flight(provider.pk), -(getattr(provider, 'priority', 0) or 0)),
+        )
+
+
+_router: Optional[ProviderRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_provider_router() -> ProviderRouter:
+    """获取进程内共享的提供商路由器"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ProviderRouter()
+    return _router
+
+
+def get_stage_providers(project, stage_type: str) -> List[Any]:
+    """
+    获取项目为指定阶段配置的可用提供商(仅激活状态)
+
+    Returns:
+        List[ModelProvider]: 未配置项目模型配置或阶段无对应字段时返回空列表
+    """
+    field_name = STAGE_PROVIDER_FIELDS.get(stage_type)
+    if not field_name:
+        return []
+
+    config = getattr(project, 'model_config', None)
+    if not config:
+        return []
+    return list(getattr(config, field_name).filter(is_active=True))
+
+
+def route_stage_provider(project, stage_type: str, providers: Optional[Sequence[Any]] = None):
+    """
+    按项目负载均衡策略为阶段选择提供商
+
+    Args:
+        project: Project 实例
+        stage_type: 阶段类型
+        providers: 已查询好的候选列表(在工作线程中路由时传入,避免访问数据库)
+
+    Returns:
+        选中的 ModelProvider,项目未为该阶段配置提供商时返回 None
+    """
+    if providers is None:
+        providers = get_stage_providers(project, stage_type)
+    if not providers:
+        return None
+
+    config = getattr(project, 'model_config', None)
+    strategy = getattr(config, 'load_balance_strategy', None) or DEFAULT_STRATEGY
+    route_key = f'{getattr(config, "pk", project.pk)}:{STAGE_PROVIDER_FIELDS.get(stage_type, stage_type)}'
+
+    available = [provider for provider in providers if is_provider_available(provider)]
+    if not available:
+        return get_failover_provider(providers[0], providers)
+
+    provider = get_provider_router().select(available, strategy, route_key)
+    if len(available) > 1:
+        logger.debug(f"阶段 {stage_type} 按 {strategy} 策略选择提供商: {provider.name}")
+    return provider
+
+
+def apply_in_flight_tracking(client, provider):
+    """
+    为客户端实例挂载在途调用统计,供 least_loaded 策略使用
+
+    Returns:
+        挂载统计后的同一客户端实例
+    """
+    provider_id = getattr(provider, 'pk', None)
+    if provider_id is None:
+        return client
+
+    for name in RATE_LIMITED_METHODS:
+        method = getattr(client, name, None)
+        if callable(method):
+            setattr(client, name, _wrap_method(method, str(provider_id)))
+    return client
+
+
+@contextmanager
+def _tracked(provider_id: str):
+    # 入口方法互相调用时只计一次
+    if _tracking_var.get():
+        yield
+        return
+    token = _tracking_var.set(True)
+    try:
+        with get_provider_router().track(provider_id):
+            yield
+    finally:
+        _tracking_var.reset(token)
+
+
+def _wrap_method(method, provider_id: str):
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            with get_provider_router().track(provider_id):
+                yield from method(*args, **kwargs)
+
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            with _tracked(provider_id):
+                return await method(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with _tracked(provider_id):
+            return method(*args, **kwargs)
+
+    return wrapper
@@ -13,6 +13,7 @@ from urllib.parse import urlparse
 import requests
 
 from core.utils.file_storage import image_storage
+from core.utils.http_transport import http_get, http_post
 
 from .base import Text2ImageClient as BaseText2ImageClient, AIResponse
 
@@ -96,7 +97,7 @@ class Text2ImageClient(BaseText2ImageClient):
                 'original_url': image_url,
             }
 
-        response = requests.get(image_url, timeout=timeout)
+        response = http_get(image_url, timeout=timeout)
         response.raise_for_status()
         image_content = response.content
 
@@ -220,7 +221,7 @@ class Text2ImageClient(BaseText2ImageClient):
                 payload['response_format'] = kwargs['response_format']
 
         try:
-            response = requests.post(
+            response = http_post(
                 request_url,
                 headers=headers,
                 json=payload,
@@ -4,11 +4,11 @@
 
 import logging
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-import requests
-
-from core.ai_client.image2video_client import VideoGeneratorClient
+from core.ai_client.image2video_client import VideoGeneratorClient, VideoTaskFailedError
+from core.ai_client.polling import poll_until
+from core.utils.http_transport import http_get, http_post
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +31,7 @@ class VolcengineImage2VideoClient(VideoGeneratorClient):
 
     def _create_volc_task(self, payload: Dict[str, Any], timeout: int) -> str:
         """提交火山方舟视频任务。"""
-        response = requests.post(
+        response = http_post(
             self._build_create_task_url(),
             json=payload,
             headers=self.headers,
@@ -46,7 +46,7 @@ class VolcengineImage2VideoClient(VideoGeneratorClient):
 
     def _get_volc_task(self, task_id: str, timeout: int) -> Dict[str, Any]:
         """查询单次火山方舟任务状态。"""
-        response = requests.get(
+        response = http_get(
             self._build_task_status_url(task_id),
             headers=self.headers,
             timeout=timeout,
@@ -60,50 +60,32 @@ class VolcengineImage2VideoClient(VideoGeneratorClient):
         poll_interval: int,
         max_wait_time: int,
         timeout: int,
-        max_poll_attempts: int = 120,
+        max_poll_attempts: Optional[int] = None,
         max_consecutive_errors: int = 5,
+        started_at: Optional[float] = None,
     ) -> Dict[str, Any]:
-        """轮询等待火山方舟任务完成。"""
-        start_time = time.time()
-        poll_attempts = 0
-        consecutive_errors = 0
-
-        while True:
-            if time.time() - start_time > max_wait_time:
-                raise TimeoutError(f'任务超时: 超过 {max_wait_time} 秒')
-
-            if poll_attempts >= max_poll_attempts:
-                raise TimeoutError(f'任务熔断: 轮询次数超过 {max_poll_attempts} 次')
-
-            try:
-                task_info = self._get_volc_task(task_id, timeout=timeout)
-                consecutive_errors = 0
-            except Exception as exc:
-                consecutive_errors += 1
-                if consecutive_errors >= max_consecutive_errors:
-                    raise RuntimeError(
-                        f'任务熔断: 连续查询异常达到 {max_consecutive_errors} 次, 最后错误: {exc}'
-                    )
-                logger.warning(
-                    '火山方舟任务状态查询异常: task_id=%s attempt=%s error=%s',
-                    task_id,
-                    consecutive_errors,
-                    exc,
-                )
-                time.sleep(poll_interval)
-                continue
-
-            poll_attempts += 1
-            status = str(task_info.get('status') or '').lower()
+        """轮询等待火山方舟任务完成(自适应间隔,见 core.ai_client.polling)。"""
 
+        def fetch() -> Optional[Dict[str, Any]]:
+            task_info = self._get_volc_task(task_id, timeout=timeout)
+            status = str(task_info.get('status') or '').lower()
             if status in _VOLC_SUCCESS:
                 return task_info
-
             if status in _VOLC_FAILED:
                 message = task_info.get('message') or str(task_info.get('error') or '未知错误')
-                raise RuntimeError(f'任务失败: {message}')
-
-            time.sleep(poll_interval)
+                raise VideoTaskFailedError(f'任务失败: {message}')
+            return None
+
+        return poll_until(
+            fetch,
+            key=self.polling_key,
+            poll_interval=poll_interval,
+            max_wait_time=max_wait_time,
+            max_attempts=max_poll_attempts,
+            max_consecutive_errors=max_consecutive_errors,
+            fatal_errors=(VideoTaskFailedError,),
+            started_at=started_at,
+        )
 
     def _extract_videos_from_volc_result(self, result: Dict[str, Any]) -> List[dict]:
         """从火山方舟任务结果中提取视频地址。"""
@@ -190,6 +172,67 @@ class VolcengineImage2VideoClient(VideoGeneratorClient):
 
         return payload
 
+    def _build_volc_video_result(
+        self,
+        result: Dict[str, Any],
+        task_id: str,
+        start_time: float,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """将已完成的火山方舟任务转换为统一的生成结果。"""
+        timeout = int(kwargs.get('timeout', self.timeout))
+        video_data = self._extract_videos_from_volc_result(result)
+        if not video_data:
+            return {
+                'success': False,
+                'data': [],
+                'metadata': {
+                    'latency_ms': int((time.time() - start_time) * 1000),
+                    'model': kwargs.get('model') or self.model,
+                    'request_url': self._build_create_task_url(),
+                    'task_id': task_id,
+                    'error': '响应中未找到可用视频地址',
+                },
+            }
+
+        return {
+            'success': True,
+            'data': self._localize_video_data(video_data, timeout),
+            'metadata': {
+                'latency_ms': int((time.time() - start_time) * 1000),
+                'model': kwargs.get('model') or self.model,
+                'request_url': self._build_create_task_url(),
+                'task_id': task_id,
+                'usage': result.get('usage', {}),
+            },
+        }
+
+    def submit_video_task(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """只提交火山方舟视频任务,不等待完成。"""
+        timeout = int(kwargs.get('timeout', self.timeout))
+        payload = self._build_volc_payload(prompt=prompt, **kwargs)
+        return {'task_id': self._create_volc_task(payload, timeout=timeout), 'result': None}
+
+    def check_video_task(
+        self,
+        task_id: str,
+        started_at: Optional[float] = None,
+        **kwargs,
+    ) -> Optional[Dict[str, Any]]:
+        """单次查询火山方舟任务: 进行中返回 None, 完成返回生成结果, 失败抛出异常。"""
+        timeout = int(kwargs.get('timeout', self.timeout))
+        task_info = self._get_volc_task(task_id, timeout=timeout)
+        status = str(task_info.get('status') or '').lower()
+
+        if status in _VOLC_SUCCESS:
+            return self._build_volc_video_result(task_info, task_id, started_at or time.time(), **kwargs)
+
+        if status in _VOLC_FAILED:
+            message = task_info.get('message') or str(task_info.get('error') or '未知错误')
+            raise VideoTaskFailedError(f'任务失败: {message}')
+
+        return None
+
     def _generate_video(
         self,
         prompt: str,
@@ -209,32 +252,9 @@ class VolcengineImage2VideoClient(VideoGeneratorClient):
                 poll_interval=poll_interval,
                 max_wait_time=max_wait_time,
                 timeout=timeout,
+                started_at=start_time,
             )
-            video_data = self._extract_videos_from_volc_result(result)
-            if not video_data:
-                return {
-                    'success': False,
-                    'data': [],
-                    'metadata': {
-                        'latency_ms': int((time.time() - start_time) * 1000),
-                        'model': kwargs.get('model') or self.model,
-                        'request_url': self._build_create_task_url(),
-                        'task_id': task_id,
-                        'error': '响应中未找到可用视频地址',
-                    },
-                }
-
-            return {
-                'success': True,
-                'data': self._localize_video_data(video_data, timeout),
-                'metadata': {
-                    'latency_ms': int((time.time() - start_time) * 1000),
-                    'model': kwargs.get('model') or self.model,
-                    'request_url': self._build_create_task_url(),
-                    'task_id': task_id,
-                    'usage': result.get('usage', {}),
-                },
-            }
+            return self._build_volc_video_result(result, task_id, start_time, **kwargs)
         except Exception as exc:
             logger.error('火山方舟图生视频失败: %s', exc, exc_info=True)
             return {
@@ -0,0 +1,78 @@
+"""
+阶段依赖图工具
+职责: 校验阶段依赖关系(DAG),并给出稳定的拓扑执行顺序
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+def normalize_stage_graph(
+    stage_names: Sequence[str],
+    dependencies: Optional[Dict[str, Iterable[str]]] = None,
+) -> Dict[str, List[str]]:
+    """
+    标准化阶段依赖图
+
+    - 未提供依赖图时按 stage_names 顺序串行(每个阶段依赖前一个阶段)
+    - 依赖不存在的阶段或存在环时抛出 ValueError
+
+    Args:
+        stage_names: 全部阶段名称
+        dependencies: {阶段: [前置阶段, ...]}
+
+    Returns:
+        Dict[str, List[str]]: 覆盖全部阶段的依赖图
+    """
+    if dependencies is None:
+        return {
+            stage_name: [stage_names[index - 1]] if index > 0 else []
+            for index, stage_name in enumerate(stage_names)
+        }
+
+    known = set(stage_names)
+    graph: Dict[str, List[str]] = {}
+    for stage_name in stage_names:
+        upstream = list(dict.fromkeys(dependencies.get(stage_name, [])))
+        unknown = [name for name in upstream if name not in known]
+        if unknown:
+            raise ValueError(f'阶段 {stage_name} 依赖了不存在的阶段: {", ".join(unknown)}')
+        graph[stage_name] = upstream
+
+    extra = [name for name in dependencies if name not in known]
+    if extra:
+        raise ValueError(f'依赖图包含未注册的阶段: {", ".join(extra)}')
+
+    topological_sort(graph, stage_names)
+    return graph
+
+
+def topological_sort(dependencies: Dict[str, Iterable[str]], priority: Sequence[str] = ()) -> List[str]:
+    """
+    拓扑排序,同一时刻可执行的阶段按 priority 中的先后顺序排列
+
+    Args:
+        dependencies: {阶段: [前置阶段, ...]}
+        priority: 阶段优先顺序,未列出的阶段排在最后
+
+    Returns:
+        List[str]: 执行顺序
+
+    Raises:
+        ValueError: 依赖图存在环
+    """
+    rank = {stage_name: index for index, stage_name in enumerate(priority)}
+    remaining = {stage_name: set(upstream) for stage_name, upstream in dependencies.items()}
+    order: List[str] = []
+
+    while remaining:
+        ready = [stage_name for stage_name, upstream in remaining.items() if not upstream]
+        if not ready:
+            raise ValueError(f'阶段依赖存在环: {", ".join(sorted(remaining))}')
+
+        stage_name = min(ready, key=lambda name: (rank.get(name, len(rank)), name))
+        order.append(stage_name)
+        del remaining[stage_name]
+        for upstream in remaining.values():
+            upstream.discard(stage_name)
+
+    return order
@@ -5,8 +5,9 @@ Pipeline编排器
 
 import asyncio
 import logging
-from typing import List
+from typing import Dict, Iterable, List, Optional
 from .base import StageProcessor, PipelineContext, StageResult, ValidationError
+from .graph import normalize_stage_graph
 
 logger = logging.getLogger(__name__)
 
@@ -15,21 +16,35 @@ class ProjectPipeline:
     """
     项目工作流编排器
     遵循开闭原则: 可扩展阶段,无需修改核心逻辑
+
+    阶段按依赖图(DAG)调度: 前置阶段全部成功后即可执行,互不依赖的阶段并发执行
     """
 
-    def __init__(self, stages: List[StageProcessor]):
+    def __init__(
+        self,
+        stages: List[StageProcessor],
+        dependencies: Optional[Dict[str, Iterable[str]]] = None,
+    ):
         """
         初始化Pipeline
 
         Args:
             stages: 阶段处理器列表
+            dependencies: 阶段依赖图 {阶段名: [前置阶段名, ...]},
+                不传则按 stages 顺序串行执行
         """
         self.stages = stages
+        self.dependencies = normalize_stage_graph(
+            [stage.stage_name for stage in stages],
+            dependencies,
+        )
 
     async def execute(self, project_id: str) -> PipelineContext:
         """
         执行完整的项目工作流
 
+        任一阶段失败后不再启动新阶段,已在执行的阶段会等待其结束
+
         Args:
             project_id: 项目ID
 
@@ -41,43 +56,77 @@ class ProjectPipeline:
 
         logger.info(f'开始执行项目工作流: {project_id}')
 
-        for stage in self.stages:
-            logger.info(f'执行阶段: {stage.stage_name}')
-
-            try:
-                # 1. 验证阶段
-                if not await stage.validate(context):
-                    raise ValidationError(
-                        f'阶段 {stage.stage_name} 验证失败'
-                    )
-
-                # 2. 执行阶段
-                result = await stage.process(context)
+        stage_map = {stage.stage_name: stage for stage in self.stages}
+        pending = [stage.stage_name for stage in self.stages]
+        completed = set()
+        running = {}
+        failed = False
+
+        while pending or running:
+            if not failed:
+                # 启动所有前置阶段已完成的阶段
+                for stage_name in list(pending):
+                    if all(upstream in completed for upstream in self.dependencies[stage_name]):
+                        pending.remove(stage_name)
+                        logger.info(f'执行阶段: {stage_name}')
+                        task = asyncio.ensure_future(self._run_stage(stage_map[stage_name], context))
+                        running[task] = stage_name
+
+            if not running:
+                break
 
-                # 3. 处理结果
-                if result.success:
-                    context.add_result(stage.stage_name, result.data)
-                    await stage.on_success(context, result)
-                    logger.info(f'阶段 {stage.stage_name} 执行成功')
+            done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage_name = running.pop(task)
+                if task.result():
+                    completed.add(stage_name)
                 else:
-                    # 4. 处理失败
-                    if result.can_retry:
-                        logger.warning(f'阶段 {stage.stage_name} 执行失败,尝试重试')
-                        result = await self._retry_stage(stage, context)
-
-                    if not result.success:
-                        logger.error(
-                            f'阶段 {stage.stage_name} 执行失败: {result.error}'
-                        )
-                        break  # 停止工作流
-
-            except Exception as e:
-                logger.exception(f'阶段 {stage.stage_name} 发生异常')
-                await stage.on_failure(context, e)
-                break
+                    failed = True  # 停止工作流
+
+        if pending:
+            logger.warning(f'项目 {project_id} 以下阶段未执行: {", ".join(pending)}')
 
         return context
 
+    async def _run_stage(self, stage: StageProcessor, context: PipelineContext) -> bool:
+        """
+        执行单个阶段并将结果合并到上下文
+
+        Returns:
+            bool: 阶段是否成功
+        """
+        try:
+            # 1. 验证阶段
+            if not await stage.validate(context):
+                raise ValidationError(
+                    f'阶段 {stage.stage_name} 验证失败'
+                )
+
+            # 2. 执行阶段
+            result = await stage.process(context)
+
+            # 3. 处理失败
+            if not result.success and result.can_retry:
+                logger.warning(f'阶段 {stage.stage_name} 执行失败,尝试重试')
+                result = await self._retry_stage(stage, context)
+
+            if not result.success:
+                logger.error(
+                    f'阶段 {stage.stage_name} 执行失败: {result.error}'
+                )
+                return False
+
+            # 4. 处理结果
+            context.add_result(stage.stage_name, result.data)
+            await stage.on_success(context, result)
+            logger.info(f'阶段 {stage.stage_name} 执行成功')
+            return True
+
+        except Exception as e:
+            logger.exception(f'阶段 {stage.stage_name} 发生异常')
+            await stage.on_failure(context, e)
+            return False
+
     async def _retry_stage(
         self,
         stage: StageProcessor,
@@ -3,11 +3,13 @@ Redis工具模块
 提供Redis连接池和发布订阅功能
 """
 
+from .pool import get_redis_client
 from .publisher import RedisStreamPublisher
 from .subscriber import RedisStreamSubscriber
 
 
 __all__ = [
+    'get_redis_client',
     'RedisStreamPublisher',
     'RedisStreamSubscriber',
 ]
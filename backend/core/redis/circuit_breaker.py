@@ -0,0 +1,293 @@
+"""
+模型提供商熔断器
+职责: 基于真实调用的错误率与延迟维护每个 ModelProvider 的熔断状态,通过Redis在所有进程/Worker间共享
+
+状态流转:
+- closed: 正常放行,统计窗口内调用数达到 min_calls 且失败率(含慢调用)达到 failure_rate 时转为 open
+- open: 拒绝调用,持续 open_seconds 后放行一次探测调用并转为 half_open
+- half_open: 仅允许一个探测调用在途;探测成功转为 closed,失败重新 open
+
+慢调用: 耗时达到 provider.timeout * slow_call_ratio 的调用按失败计,
+使提供商开始超时时无需等每个请求都超时即可熔断
+Redis 不可用时放行请求(仅记录日志),与限流器保持一致
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import redis
+from django.conf import settings
+
+from .pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """提供商熔断中,调用被拒绝"""
+
+    def __init__(self, provider_id: str, retry_after: float):
+        self.provider_id = provider_id
+        self.retry_after = retry_after
+        super().__init__(f'模型提供商 {provider_id} 已熔断，请 {retry_after:.0f} 秒后重试')
+
+
+# KEYS[1]: 状态哈希
+# ARGV[1]: open_seconds
+# 返回: {是否放行, 状态, 剩余熔断秒数}
+_ALLOW_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local open_seconds = tonumber(ARGV[1])
+local data = redis.call('HMGET', KEYS[1], 'state', 'opened_at', 'probe_at')
+local state = data[1] or 'closed'
+
+if state == 'closed' then
+    return {1, state, '0'}
+end
+
+if state == 'open' then
+    local remaining = tonumber(data[2] or now) + open_seconds - now
+    if remaining > 0 then
+        return {0, state, tostring(remaining)}
+    end
+    redis.call('HSET', KEYS[1], 'state', 'half_open', 'probe_at', tostring(now))
+    return {1, 'half_open', '0'}
+end
+
+-- half_open: 探测调用超过 open_seconds 未回报时允许新的探测
+local probe_remaining = tonumber(data[3] or 0) + open_seconds - now
+if probe_remaining > 0 then
+    return {0, state, tostring(probe_remaining)}
+end
+redis.call('HSET', KEYS[1], 'probe_at', tostring(now))
+return {1, state, '0'}
+"""
+
+# KEYS[1]: 状态哈希, KEYS[2]: 当前统计窗口哈希
+# ARGV[1]: 是否失败(1/0), ARGV[2]: 耗时毫秒, ARGV[3]: 窗口秒数,
+# ARGV[4]: min_calls, ARGV[5]: failure_rate
+# 返回: 记录后的状态
+_RECORD_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local failed = tonumber(ARGV[1])
+local window = tonumber(ARGV[3])
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+
+redis.call('HINCRBY', KEYS[2], 'calls', 1)
+redis.call('HINCRBY', KEYS[2], 'failures', failed)
+redis.call('HINCRBY', KEYS[2], 'latency_ms', tonumber(ARGV[2]))
+redis.call('EXPIRE', KEYS[2], window * 2)
+
+if state == 'half_open' then
+    if failed == 1 then
+        redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', tostring(now))
+        return 'open'
+    end
+    redis.call('HSET', KEYS[1], 'state', 'closed')
+    redis.call('HDEL', KEYS[1], 'opened_at', 'probe_at')
+    return 'closed'
+end
+
+if state == 'closed' then
+    local calls = tonumber(redis.call('HGET', KEYS[2], 'calls'))
+    local failures = tonumber(redis.call('HGET', KEYS[2], 'failures'))
+    if calls >= tonumber(ARGV[4]) and failures / calls >= tonumber(ARGV[5]) then
+        redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', tostring(now))
+        return 'open'
+    end
+end
+return state
+"""
+
+
+class ProviderCircuitBreaker:
+    """
+    提供商熔断器
+
+    键命名: ai_story:circuit:{provider_id} (状态) / :{provider_id}:{窗口序号} (统计窗口)
+    """
+
+    key_prefix = 'ai_story:circuit'
+    # Redis 故障后暂停访问的秒数
+    unavailable_backoff = 30
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self._redis_client = redis_client
+        self._allow_script = None
+        self._record_script = None
+        self._unavailable_until = 0.0
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        return {
+            'failure_rate': float(getattr(settings, 'AI_CIRCUIT_FAILURE_RATE', 0.5)),
+            'min_calls': int(getattr(settings, 'AI_CIRCUIT_MIN_CALLS', 5)),
+            'window_seconds': int(getattr(settings, 'AI_CIRCUIT_WINDOW_SECONDS', 60)),
+            'open_seconds': int(getattr(settings, 'AI_CIRCUIT_OPEN_SECONDS', 30)),
+            'slow_call_ratio': float(getattr(settings, 'AI_CIRCUIT_SLOW_CALL_RATIO', 0.8)),
+        }
+
+    def before_call(self, provider_id: str) -> None:
+        """
+        调用前检查熔断状态
+
+        Raises:
+            CircuitOpenError: 提供商熔断中
+        """
+        result = self._run(
+            'allow',
+            keys=[self._state_key(provider_id)],
+            args=[self.options['open_seconds']],
+        )
+        if result is None:
+            return
+
+        allowed, state, retry_after = int(result[0]), result[1], float(result[2])
+        if not allowed:
+            raise CircuitOpenError(str(provider_id), retry_after)
+        if state == STATE_HALF_OPEN:
+            logger.info(f"模型提供商 {provider_id} 熔断半开, 放行探测调用")
+
+    def record(self, provider_id: str, success: bool, latency: float, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        记录一次调用结果
+
+        Args:
+            provider_id: 提供商ID
+            success: 调用是否成功
+            latency: 调用耗时(秒)
+            timeout: 提供商超时时间(秒),用于判定慢调用
+
+        Returns:
+            记录后的熔断状态,Redis 不可用时返回 None
+        """
+        options = self.options
+        failed = not success
+        if timeout and latency >= timeout * options['slow_call_ratio']:
+            failed = True
+
+        window_index = int(time.time() // options['window_seconds'])
+        state = self._run(
+            'record',
+            keys=[self._state_key(provider_id), f'{self._state_key(provider_id)}:{window_index}'],
+            args=[int(failed), int(latency * 1000), options['window_seconds'],
+                  options['min_calls'], options['failure_rate']],
+        )
+        if state == STATE_OPEN and failed:
+            logger.warning(f"模型提供商 {provider_id} 失败率过高, 熔断 {options['open_seconds']} 秒")
+        return state
+
+    def is_available(self, provider_id: str) -> bool:
+        """只读判断提供商当前是否可接收调用(不占用半开探测名额)"""
+        state = self.get_state(provider_id)
+        if state['state'] == STATE_CLOSED:
+            return True
+        return state['retry_after'] <= 0
+
+    def get_state(self, provider_id: str) -> Dict[str, Any]:
+        """
+        查询熔断状态与当前窗口统计
+
+        Returns:
+            Dict: state/retry_after/calls/failures/avg_latency_ms;available=False 表示熔断服务不可用
+        """
+        options = self.options
+        result = {
+            'state': STATE_CLOSED,
+            'retry_after': 0,
+            'calls': 0,
+            'failures': 0,
+            'avg_latency_ms': 0,
+            'available': True,
+        }
+
+        client = self._get_client()
+        if client is None:
+            result['available'] = False
+            return result
+
+        window_index = int(time.time() // options['window_seconds'])
+        try:
+            seconds, microseconds = client.time()
+            now = seconds + microseconds / 1000000
+            state, opened_at, probe_at = client.hmget(self._state_key(provider_id), 'state', 'opened_at', 'probe_at')
+            calls, failures, latency_ms = client.hmget(
+                f'{self._state_key(provider_id)}:{window_index}', 'calls', 'failures', 'latency_ms'
+            )
+        except redis.RedisError as e:
+            self._mark_unavailable(e)
+            result['available'] = False
+            return result
+
+        result['state'] = state or STATE_CLOSED
+        since = opened_at if result['state'] == STATE_OPEN else probe_at
+        if result['state'] != STATE_CLOSED and since is not None:
+            result['retry_after'] = max(round(float(since) + options['open_seconds'] - now, 1), 0)
+        result['calls'] = int(calls or 0)
+        result['failures'] = int(failures or 0)
+        if result['calls']:
+            result['avg_latency_ms'] = int(int(latency_ms or 0) / result['calls'])
+        return result
+
+    def reset(self, provider_id: str) -> None:
+        """手动关闭熔断"""
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            client.delete(self._state_key(provider_id))
+        except redis.RedisError as e:
+            self._mark_unavailable(e)
+
+    def _run(self, name: str, keys, args):
+        client = self._get_client()
+        if client is None:
+            return None
+
+        try:
+            if name == 'allow':
+                if self._allow_script is None:
+                    self._allow_script = client.register_script(_ALLOW_SCRIPT)
+                return self._allow_script(keys=keys, args=args)
+            if self._record_script is None:
+                self._record_script = client.register_script(_RECORD_SCRIPT)
+            return self._record_script(keys=keys, args=args)
+        except redis.RedisError as e:
+            self._mark_unavailable(e)
+            return None
+
+    def _get_client(self) -> Optional[redis.Redis]:
+        if time.monotonic() < self._unavailable_until:
+            return None
+        if self._redis_client is None:
+            self._redis_client = get_redis_client('rate_limit')
+        return self._redis_client
+
+    def _mark_unavailable(self, error: Exception) -> None:
+        self._unavailable_until = time.monotonic() + self.unavailable_backoff
+        logger.warning(f"熔断服务不可用, {self.unavailable_backoff} 秒内放行全部请求: {str(error)}")
+
+    def _state_key(self, provider_id) -> str:
+        return f'{self.key_prefix}:{provider_id}'
+
+
+_circuit_breaker: Optional[ProviderCircuitBreaker] = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> ProviderCircuitBreaker:
+    """获取进程内共享的熔断器"""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        with _circuit_breaker_lock:
+            if _circuit_breaker is None:
+                _circuit_breaker = ProviderCircuitBreaker()
+    return _circuit_breaker
@@ -0,0 +1,91 @@
+"""
+Redis连接池注册表
+职责: 进程内按用途共享Redis连接池,发布器、接收器、限流/熔断与队列记录不再各自建立连接池
+
+- 用途: pubsub (REDIS_PUBSUB_URL) / rate_limit (REDIS_RATE_LIMIT_URL) / cache (REDIS_CACHE_URL),
+  settings.REDIS_POOLS 可按用途覆盖连接参数
+- 池大小、等待连接超时与健康检查间隔统一由 REDIS_POOL_* 配置
+- 使用 BlockingConnectionPool: 连接用尽时等待归还而不是新建,连接数有上限
+- 连接池在 fork 后由 redis-py 按进程ID自动重建,Celery prefork/gevent Worker 均可安全共享
+"""
+
+import logging
+import threading
+from typing import Any, Dict
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 用途 -> (URL配置项, 默认URL)
+_URL_SETTINGS = {
+    'pubsub': ('REDIS_PUBSUB_URL', 'redis://localhost:6379/2'),
+    'rate_limit': ('REDIS_RATE_LIMIT_URL', 'redis://localhost:6379/3'),
+    'cache': ('REDIS_CACHE_URL', 'redis://localhost:6379/4'),
+}
+
+_pools: Dict[str, redis.ConnectionPool] = {}
+_lock = threading.Lock()
+
+
+def get_pool_options(alias: str) -> Dict[str, Any]:
+    """
+    连接池参数
+
+    Args:
+        alias: 用途 (pubsub / rate_limit / cache)
+
+    Returns:
+        传给 ConnectionPool.from_url 的参数 (含 url)
+    """
+    setting_name, default_url = _URL_SETTINGS.get(alias, (None, 'redis://localhost:6379/0'))
+    options = {
+        'url': getattr(settings, setting_name, default_url) if setting_name else default_url,
+        'max_connections': getattr(settings, 'REDIS_POOL_MAX_CONNECTIONS', 50),
+        'timeout': getattr(settings, 'REDIS_POOL_TIMEOUT', 20),
+        'health_check_interval': getattr(settings, 'REDIS_HEALTH_CHECK_INTERVAL', 30),
+        'socket_connect_timeout': 5,
+        'socket_timeout': 5,
+        'retry_on_timeout': True,
+        'decode_responses': True,
+    }
+    options.update(getattr(settings, 'REDIS_POOLS', {}).get(alias, {}))
+    return options
+
+
+def get_connection_pool(alias: str) -> redis.ConnectionPool:
+    """获取(首次调用时创建)该用途的进程内共享连接池"""
+    pool = _pools.get(alias)
+    if pool is not None:
+        return pool
+
+    with _lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            options = get_pool_options(alias)
+            url = options.pop('url')
+            pool = redis.BlockingConnectionPool.from_url(url, **options)
+            _pools[alias] = pool
+            logger.info(f"创建Redis连接池: alias={alias} max_connections={options.get('max_connections')}")
+    return pool
+
+
+def get_redis_client(alias: str = 'pubsub') -> redis.Redis:
+    """
+    获取使用共享连接池的Redis客户端
+
+    客户端本身很轻,可按需创建;close() 不会断开共享连接池
+    """
+    return redis.Redis(connection_pool=get_connection_pool(alias))
+
+
+def reset_connection_pools() -> None:
+    """断开并清空所有共享连接池 (测试或配置变更后使用)"""
+    with _lock:
+        for pool in _pools.values():
+            try:
+                pool.disconnect()
+            except Exception as e:
+                logger.debug(f"断开Redis连接池失败: {str(e)}")
+        _pools.clear()
@@ -0,0 +1,137 @@
+"""
+项目实时进度快照
+职责: 发布器每发出一条状态类事件,同步更新项目在Redis中的进度快照 (Hash),状态接口以O(1)读取
+
+Hash键: ai_story:project:{project_id}:progress
+字段 (按阶段展开,HSET 只覆盖本次事件带来的字段,无需先读后写):
+    {stage}:status        pending/processing/completed/failed
+    {stage}:done          已完成数量
+    {stage}:total         总数量
+    {stage}:progress      进度百分比
+    {stage}:current_item  当前处理项
+    {stage}:message       最近的状态描述
+    {stage}:last_error    最近的错误
+    {stage}:updated_at    最近更新时间
+    pipeline:status       整个流程状态 (completed/failed)
+    pipeline:error        流程错误
+    updated_at            快照最近更新时间
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_INT_FIELDS = {'done', 'total', 'progress'}
+_FLOAT_FIELDS = {'updated_at'}
+
+
+def get_progress_key(project_id: str) -> str:
+    """项目进度快照的Hash键"""
+    return f"ai_story:project:{project_id}:progress"
+
+
+def build_progress_update(message: Dict[str, Any], stage_name: str) -> Dict[str, Any]:
+    """
+    根据一条事件计算需要写入快照的字段
+
+    Args:
+        message: 发布器事件
+        stage_name: 事件所属阶段
+
+    Returns:
+        需要 HSET 的字段,不影响进度的事件 (如 token) 返回空字典
+    """
+    message_type = message.get('type')
+    now = message.get('timestamp') or time.time()
+    fields: Dict[str, Any] = {}
+
+    if message_type == 'stage_update':
+        fields['status'] = message.get('status', '')
+        if message.get('progress') is not None:
+            fields['progress'] = message['progress']
+        if message.get('message'):
+            fields['message'] = message['message']
+        if message.get('status') == 'processing':
+            fields['last_error'] = ''
+    elif message_type == 'progress':
+        fields.update({
+            'status': 'processing',
+            'done': message.get('current', 0),
+            'total': message.get('total', 0),
+            'progress': message.get('progress', 0),
+        })
+        if message.get('item_name'):
+            fields['current_item'] = message['item_name']
+    elif message_type == 'item_completed':
+        fields['current_item'] = f"{message.get('item_type', '')}#{message.get('sequence_number', '')}"
+    elif message_type in ('done', 'stage_completed'):
+        fields.update({'status': 'completed', 'progress': 100})
+    elif message_type == 'error':
+        fields.update({'status': 'failed', 'last_error': message.get('error', '')})
+    elif message_type == 'pipeline_done':
+        return {'pipeline:status': 'completed', 'pipeline:error': '', 'updated_at': now}
+    elif message_type == 'pipeline_error':
+        return {'pipeline:status': 'failed', 'pipeline:error': message.get('error', ''), 'updated_at': now}
+
+    if not fields:
+        return {}
+
+    fields['updated_at'] = now
+    update = {f'{stage_name}:{name}': value for name, value in fields.items()}
+    update['updated_at'] = now
+    return update
+
+
+def parse_progress_snapshot(raw: Dict[str, str]) -> Dict[str, Any]:
+    """将 HGETALL 结果还原为 {'stages': {...}, 'pipeline': {...}, 'updated_at': ...}"""
+    snapshot: Dict[str, Any] = {'stages': {}, 'pipeline': {}, 'updated_at': None}
+    for key, value in raw.items():
+        if key == 'updated_at':
+            snapshot['updated_at'] = _convert('updated_at', value)
+            continue
+        scope, _, name = key.partition(':')
+        if not name:
+            continue
+        target = snapshot['pipeline'] if scope == 'pipeline' else snapshot['stages'].setdefault(scope, {})
+        target[name] = _convert(name, value)
+    return snapshot
+
+
+def read_progress_snapshot(project_id: str) -> Optional[Dict[str, Any]]:
+    """
+    读取项目进度快照
+
+    Returns:
+        快照字典;快照不存在或Redis不可用时返回 None (调用方回退到数据库)
+    """
+    try:
+        raw = get_redis_client('pubsub').hgetall(get_progress_key(project_id))
+    except Exception as e:
+        logger.warning(f"读取进度快照失败: project_id={project_id}, error={str(e)}")
+        return None
+    if not raw:
+        return None
+    return parse_progress_snapshot(raw)
+
+
+def clear_progress_snapshot(project_id: str) -> None:
+    """删除项目进度快照 (阶段在数据库中被暂停/重置/重试后,旧的计数不再有效)"""
+    try:
+        get_redis_client('pubsub').delete(get_progress_key(project_id))
+    except Exception as e:
+        logger.warning(f"删除进度快照失败: project_id={project_id}, error={str(e)}")
+
+
+def _convert(name: str, value: str) -> Any:
+    try:
+        if name in _INT_FIELDS:
+            return int(float(value))
+        if name in _FLOAT_FIELDS:
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return value
@@ -1,27 +1,139 @@
 """
 Redis流式发布器
-职责: 将流式数据发布到Redis Pub/Sub频道
+职责: 将流式数据追加到项目的Redis Stream事件日志
 遵循单一职责原则(SRP)
+
+- 每个项目一个有界 Stream (XADD MAXLEN ~ + 过期时间),所有阶段的消息按序写入
+- Stream 条目ID即SSE事件ID,客户端断线重连时携带 Last-Event-ID 从断点重放
+- 状态类事件同时更新项目进度快照 (见 progress.py),供状态接口直接读取
 """
 
 import json
 import logging
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 import redis
 from django.conf import settings
 
+from .pool import get_redis_client
+from .progress import build_progress_update, get_progress_key
+
 logger = logging.getLogger(__name__)
 
 
+def get_event_stream_key(project_id: str) -> str:
+    """项目事件日志的 Stream 键"""
+    return f"ai_story:project:{project_id}:events"
+
+
+class TokenCoalescer:
+    """
+    Token合并器
+    职责: 按时间/长度窗口合并流式文本片段,并定期附带完整文本快照
+
+    - 每条消息只携带增量 content 及其在完整文本中的起始 offset
+    - 距上次发送超过 flush_interval 秒或缓冲超过 flush_chars 个字符时发送
+    - 距上次快照超过 snapshot_interval 秒或新增 snapshot_chars 个字符时附带 full_text,
+      中途加入或发现 offset 不连续的订阅者据此重新同步
+    - 按 scene_number 分别合并,并发生成的多个分镜互不影响
+    """
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        flush_chars: Optional[int] = None,
+        snapshot_interval: Optional[float] = None,
+        snapshot_chars: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'AI_STREAM_TOKEN_FLUSH_MS', 50
+        ) / 1000
+        self.flush_chars = flush_chars or getattr(settings, 'AI_STREAM_TOKEN_FLUSH_CHARS', 256)
+        self.snapshot_interval = snapshot_interval if snapshot_interval is not None else getattr(
+            settings, 'AI_STREAM_SNAPSHOT_INTERVAL', 2.0
+        )
+        self.snapshot_chars = snapshot_chars or getattr(settings, 'AI_STREAM_SNAPSHOT_CHARS', 4096)
+        self.clock = clock
+        self._streams: Dict[Optional[int], Dict[str, Any]] = {}
+
+    def add(self, content: str, full_text: str = "", scene_number: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        加入一个文本片段
+
+        Returns:
+            需要立即发送的消息字段 (content/offset[/full_text/snapshot/scene_number]),仍在缓冲时返回 None
+        """
+        stream = self._streams.get(scene_number)
+        if stream is None:
+            stream = self._streams[scene_number] = {
+                'pending': [],
+                'pending_chars': 0,
+                'sent_chars': 0,
+                'parts': [],
+                'full_text': '',
+                'last_flush': None,
+                'last_snapshot': self.clock(),
+                'since_snapshot': 0,
+            }
+
+        if content:
+            stream['pending'].append(content)
+            stream['pending_chars'] += len(content)
+            stream['parts'].append(content)
+        if full_text:
+            stream['full_text'] = full_text
+
+        now = self.clock()
+        if stream['pending_chars'] >= self.flush_chars or (
+            stream['last_flush'] is None or now - stream['last_flush'] >= self.flush_interval
+        ):
+            return self._flush(scene_number, stream, now)
+        return None
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """取出所有缓冲中的片段 (阶段结束或发送其他消息前调用,保证顺序)"""
+        now = self.clock()
+        payloads = []
+        for scene_number, stream in self._streams.items():
+            payload = self._flush(scene_number, stream, now)
+            if payload is not None:
+                payloads.append(payload)
+        return payloads
+
+    def _flush(self, scene_number: Optional[int], stream: Dict[str, Any], now: float) -> Optional[Dict[str, Any]]:
+        if not stream['pending']:
+            return None
+
+        delta = ''.join(stream['pending'])
+        payload = {'content': delta, 'offset': stream['sent_chars']}
+        if scene_number is not None:
+            payload['scene_number'] = scene_number
+
+        stream['pending'] = []
+        stream['pending_chars'] = 0
+        stream['sent_chars'] += len(delta)
+        stream['since_snapshot'] += len(delta)
+        stream['last_flush'] = now
+
+        if stream['since_snapshot'] >= self.snapshot_chars or now - stream['last_snapshot'] >= self.snapshot_interval:
+            stream['parts'] = [''.join(stream['parts'])]
+            payload['full_text'] = stream['full_text'] or stream['parts'][0]
+            payload['snapshot'] = True
+            stream['since_snapshot'] = 0
+            stream['last_snapshot'] = now
+        return payload
+
+
 class RedisStreamPublisher:
     """
     Redis流式发布器
 
-    负责将AI生成的流式数据发布到Redis Pub/Sub频道
-    前端可通过WebSocket订阅该频道接收实时数据
+    负责将AI生成的流式数据追加到项目事件日志 (Redis Stream)
+    前端通过SSE接口读取该日志接收实时数据,断线后可按事件ID重放
 
-    频道命名规范: ai_story:project:{project_id}:stage:{stage_name}
+    Stream命名规范: ai_story:project:{project_id}:events (条目字段 stage/data)
+    频道命名规范: ai_story:project:{project_id}:stage:{stage_name} (随消息下发,兼容前端)
     """
 
     def __init__(self, project_id: str, stage_name: str):
@@ -35,9 +147,11 @@ class RedisStreamPublisher:
         self.project_id = project_id
         self.stage_name = stage_name
         self.channel = f"ai_story:project:{project_id}:stage:{stage_name}"
+        self.stream_key = get_event_stream_key(project_id)
 
         # 使用连接池
         self.redis_client = self._get_redis_client()
+        self._token_coalescer = TokenCoalescer()
 
         logger.info(f"初始化Redis发布器: {self.channel}")
 
@@ -47,25 +161,15 @@ class RedisStreamPublisher:
         使用连接池提高性能
         """
         try:
-            # 从Django settings获取Redis Pub/Sub专用配置
-            redis_url = getattr(settings, 'REDIS_PUBSUB_URL', 'redis://localhost:6379/2')
-
-            # 解析Redis URL
-            return redis.from_url(
-                redis_url,
-                decode_responses=True,  # 自动解码为字符串
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
+            # 借用进程内共享的流式推送连接池,不为每个实例新建
+            return get_redis_client('pubsub')
         except Exception as e:
             logger.error(f"Redis连接失败: {str(e)}")
             raise
 
     def publish(self, message: Dict[str, Any]) -> bool:
         """
-        发布消息到Redis频道
+        发布消息到项目事件日志
 
         Args:
             message: 消息字典
@@ -73,6 +177,10 @@ class RedisStreamPublisher:
         Returns:
             bool: 是否发布成功
         """
+        if message.get('type') != 'token':
+            # 先发出缓冲中的Token,保证消息顺序
+            self.flush_tokens()
+
         try:
             # 添加时间戳
             if 'timestamp' not in message:
@@ -81,10 +189,23 @@ class RedisStreamPublisher:
             # 序列化为JSON
             message_json = json.dumps(message, ensure_ascii=False)
 
-            # 发布到频道
-            subscribers = self.redis_client.publish(self.channel, message_json)
+            # 追加到事件日志 (近似裁剪,避免每次精确截断的开销)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.xadd(
+                self.stream_key,
+                {'stage': self.stage_name, 'data': message_json},
+                maxlen=getattr(settings, 'REDIS_EVENT_STREAM_MAXLEN', 5000),
+                approximate=True,
+            )
+            pipe.expire(self.stream_key, getattr(settings, 'REDIS_EVENT_STREAM_TTL', 86400))
 
-            # logger.debug(f"发布消息到 {self.channel}: {message.get('type')} (订阅者: {subscribers})")
+            # 同步更新项目进度快照 (状态接口O(1)读取)
+            progress_update = build_progress_update(message, self.stage_name)
+            if progress_update:
+                progress_key = get_progress_key(self.project_id)
+                pipe.hset(progress_key, mapping=progress_update)
+                pipe.expire(progress_key, getattr(settings, 'REDIS_EVENT_STREAM_TTL', 86400))
+            pipe.execute()
 
             return True
 
@@ -95,23 +216,43 @@ class RedisStreamPublisher:
             logger.error(f"消息发布异常: {str(e)}")
             return False
 
-    def publish_token(self, content: str, full_text: str = "") -> bool:
+    def publish_token(self, content: str, full_text: str = "", scene_number: Optional[int] = None) -> bool:
         """
         发布Token消息 (流式文本片段)
 
+        片段经 TokenCoalescer 合并后只发送增量 content 与 offset,定期附带 full_text 快照
+
         Args:
             content: 文本片段
-            full_text: 累积的完整文本
+            full_text: 累积的完整文本 (仅用于快照)
+            scene_number: 分镜序号 (多个分镜并发生成时用于区分来源)
 
         Returns:
-            bool: 是否发布成功
+            bool: 是否发布成功 (仍在缓冲时返回 True)
+        """
+        payload = self._token_coalescer.add(content, full_text, scene_number)
+        if payload is None:
+            return True
+        return self._publish_token_payload(payload)
+
+    def flush_tokens(self) -> bool:
+        """
+        立即发送所有缓冲中的Token
+
+        Returns:
+            bool: 是否全部发布成功
         """
+        success = True
+        for payload in self._token_coalescer.drain():
+            success = self._publish_token_payload(payload) and success
+        return success
+
+    def _publish_token_payload(self, payload: Dict[str, Any]) -> bool:
         message = {
             'type': 'token',
-            'content': content,
-            'full_text': full_text,
             'stage': self.stage_name,
-            'project_id': self.project_id
+            'project_id': self.project_id,
+            **payload,
         }
         return self.publish(message)
 
@@ -324,6 +465,7 @@ class RedisStreamPublisher:
         """
         try:
             if self.redis_client:
+                self.flush_tokens()
                 self.redis_client.close()
                 logger.info(f"关闭Redis连接: {self.channel}")
         except Exception as e:
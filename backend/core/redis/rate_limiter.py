@@ -0,0 +1,239 @@
+"""
+模型提供商限流器
+职责: 基于Redis令牌桶在所有进程/Worker间共享 ModelProvider 的 rate_limit_rpm / rate_limit_rpd 配额
+
+- 每个提供商两个令牌桶: 分钟桶(容量 rpm)与天桶(容量 rpd),按时间连续补充
+- 采用预约方式扣减: 令牌不足时仍可预约(令牌数记为负),调用方按返回的等待时间休眠,
+  先预约者先放行,多个 Worker 排队公平
+- 等待时间超过 max_wait 时不预约并抛出 RateLimitExceeded(max_wait=0 即快速失败)
+- Redis 不可用时放行请求(仅记录日志),避免限流组件故障阻断生成
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import redis
+from django.conf import settings
+
+from .pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """超出提供商限流配额"""
+
+    def __init__(self, provider_id: str, retry_after: float):
+        self.provider_id = provider_id
+        self.retry_after = retry_after
+        super().__init__(f'模型提供商 {provider_id} 请求过于频繁，请 {retry_after:.1f} 秒后重试')
+
+
+# KEYS[1]: 分钟桶, KEYS[2]: 天桶
+# ARGV[1]: rpm, ARGV[2]: rpd (<=0 表示不限制), ARGV[3]: 最长等待秒数
+# 返回: {是否已预约, 等待秒数, 分钟桶剩余, 天桶剩余}
+_RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local max_wait = tonumber(ARGV[3])
+
+local function refill(key, capacity, period)
+    if capacity <= 0 then
+        return nil, nil
+    end
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1])
+    local ts = tonumber(data[2])
+    local rate = capacity / period
+    if tokens == nil or ts == nil then
+        tokens = capacity
+        ts = now
+    end
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate), rate
+end
+
+local buckets = {
+    {KEYS[1], tonumber(ARGV[1]), 60},
+    {KEYS[2], tonumber(ARGV[2]), 86400},
+}
+local wait = 0
+local remaining = {'-1', '-1'}
+for index, bucket in ipairs(buckets) do
+    local tokens, rate = refill(bucket[1], bucket[2], bucket[3])
+    bucket[4] = tokens
+    if tokens ~= nil then
+        if tokens < 1 then
+            wait = math.max(wait, (1 - tokens) / rate)
+        end
+        remaining[index] = tostring(tokens)
+    end
+end
+
+if wait > max_wait then
+    return {0, tostring(wait), remaining[1], remaining[2]}
+end
+
+for index, bucket in ipairs(buckets) do
+    if bucket[4] ~= nil then
+        local tokens = bucket[4] - 1
+        redis.call('HSET', bucket[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('EXPIRE', bucket[1], bucket[3] * 2 + math.ceil(wait))
+        remaining[index] = tostring(tokens)
+    end
+end
+return {1, tostring(wait), remaining[1], remaining[2]}
+"""
+
+
+class ProviderRateLimiter:
+    """
+    提供商令牌桶限流器
+
+    键命名: ai_story:ratelimit:{provider_id}:rpm / :rpd
+    """
+
+    key_prefix = 'ai_story:ratelimit'
+    # Redis 故障后暂停访问的秒数
+    unavailable_backoff = 30
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self._redis_client = redis_client
+        self._script = None
+        self._unavailable_until = 0.0
+
+    def reserve(
+        self,
+        provider_id: str,
+        rpm: int,
+        rpd: int,
+        max_wait: Optional[float] = None,
+    ) -> float:
+        """
+        预约一次调用配额
+
+        Args:
+            provider_id: 提供商ID
+            rpm: 每分钟请求数限制(<=0 不限制)
+            rpd: 每天请求数限制(<=0 不限制)
+            max_wait: 可接受的最长等待秒数,默认取 settings.AI_RATE_LIMIT_MAX_WAIT
+
+        Returns:
+            float: 调用前需等待的秒数
+
+        Raises:
+            RateLimitExceeded: 需等待时间超过 max_wait
+        """
+        if (rpm or 0) <= 0 and (rpd or 0) <= 0:
+            return 0.0
+        if max_wait is None:
+            max_wait = getattr(settings, 'AI_RATE_LIMIT_MAX_WAIT', 300)
+
+        result = self._run_script(provider_id, rpm, rpd, max_wait)
+        if result is None:
+            return 0.0
+
+        reserved, wait = int(result[0]), float(result[1])
+        if not reserved:
+            raise RateLimitExceeded(str(provider_id), wait)
+        if wait > 0:
+            logger.info(f"模型提供商 {provider_id} 触发限流, 排队等待 {wait:.2f} 秒")
+        return wait
+
+    def acquire(
+        self,
+        provider_id: str,
+        rpm: int,
+        rpd: int,
+        max_wait: Optional[float] = None,
+    ) -> float:
+        """预约配额并阻塞等待到可调用时刻,返回实际等待秒数"""
+        wait = self.reserve(provider_id, rpm, rpd, max_wait=max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def get_budget(self, provider) -> Dict[str, Any]:
+        """
+        查询提供商剩余配额(不扣减)
+
+        Returns:
+            Dict: rpm/rpd 限制与剩余配额;available=False 表示限流服务不可用
+        """
+        rpm = provider.rate_limit_rpm or 0
+        rpd = provider.rate_limit_rpd or 0
+        budget = {
+            'provider_id': str(provider.pk),
+            'rpm_limit': rpm,
+            'rpm_remaining': rpm,
+            'rpd_limit': rpd,
+            'rpd_remaining': rpd,
+            'available': True,
+        }
+
+        client = self._get_client()
+        if client is None:
+            budget['available'] = False
+            return budget
+
+        try:
+            seconds, microseconds = client.time()
+            now = seconds + microseconds / 1000000
+            for field, capacity, period in (('rpm', rpm, 60), ('rpd', rpd, 86400)):
+                if capacity <= 0:
+                    continue
+                tokens, ts = client.hmget(self._key(provider.pk, field), 'tokens', 'ts')
+                if tokens is None or ts is None:
+                    continue
+                refilled = min(capacity, float(tokens) + max(0.0, now - float(ts)) * capacity / period)
+                budget[f'{field}_remaining'] = max(int(refilled), 0)
+        except redis.RedisError as e:
+            self._mark_unavailable(e)
+            budget['available'] = False
+
+        return budget
+
+    def _run_script(self, provider_id: str, rpm: int, rpd: int, max_wait: float):
+        client = self._get_client()
+        if client is None:
+            return None
+
+        try:
+            if self._script is None:
+                self._script = client.register_script(_RESERVE_SCRIPT)
+            return self._script(
+                keys=[self._key(provider_id, 'rpm'), self._key(provider_id, 'rpd')],
+                args=[int(rpm or 0), int(rpd or 0), float(max_wait)],
+            )
+        except redis.RedisError as e:
+            self._mark_unavailable(e)
+            return None
+
+    def _get_client(self) -> Optional[redis.Redis]:
+        if time.monotonic() < self._unavailable_until:
+            return None
+        if self._redis_client is None:
+            self._redis_client = get_redis_client('rate_limit')
+        return self._redis_client
+
+    def _mark_unavailable(self, error: Exception) -> None:
+        self._unavailable_until = time.monotonic() + self.unavailable_backoff
+        logger.warning(f"限流服务不可用, {self.unavailable_backoff} 秒内放行全部请求: {str(error)}")
+
+    def _key(self, provider_id, field: str) -> str:
+        return f'{self.key_prefix}:{provider_id}:{field}'
+
+
+_rate_limiter: Optional[ProviderRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> ProviderRateLimiter:
+    """获取进程内共享的限流器"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = ProviderRateLimiter()
+    return _rate_limiter
@@ -1,50 +1,101 @@
 """
 Redis流式接收器
-职责: 订阅Redis Pub/Sub频道并接收流式数据
+职责: 读取项目的Redis Stream事件日志并接收流式数据
 遵循单一职责原则(SRP)
+
+- 从指定事件ID之后开始读取 (SSE 的 Last-Event-ID),未指定时只接收连接之后的新消息
+- 单阶段订阅按条目的 stage 字段过滤,全阶段订阅接收项目所有阶段的消息
+- AsyncRedisStreamSubscriber 基于 redis.asyncio,供 ASGI 下的异步SSE使用,不占用线程
 """
 
+import asyncio
 import json
 import logging
-from typing import AsyncGenerator, Dict, Any, Optional
+import re
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, Generator, Optional
 import redis
-from django.conf import settings
+import redis.asyncio as aioredis
+
+from .pool import get_pool_options, get_redis_client
+from .publisher import get_event_stream_key
 
 logger = logging.getLogger(__name__)
 
+_EVENT_ID_PATTERN = re.compile(r'^\d+-\d+$')
 
-class RedisStreamSubscriber:
-    """
-    Redis流式接收器
 
-    负责订阅Redis Pub/Sub频道并接收实时流式数据
-    支持异步迭代器模式,可用于SSE流式响应
+def normalize_event_id(event_id: Optional[str]) -> Optional[str]:
+    """校验客户端传入的事件ID,格式不合法时返回 None"""
+    if event_id and _EVENT_ID_PATTERN.match(event_id.strip()):
+        return event_id.strip()
+    return None
 
-    频道命名规范: ai_story:project:{project_id}:stage:{stage_name}
-    """
 
-    def __init__(self, project_id: str, stage_name: Optional[str] = None):
+class _EventLogReader:
+    """事件日志读取的公共部分: 读取起点、缓冲与条目解析 (不含I/O)"""
+
+    # 单次读取的最大条目数
+    batch_size = 100
+
+    def __init__(self, project_id: str, stage_name: Optional[str] = None, last_event_id: Optional[str] = None):
         """
         初始化接收器
 
         Args:
             project_id: 项目ID
-            stage_name: 阶段名称 (可选,为None时订阅项目所有阶段)
+            stage_name: 阶段名称 (可选,为None时接收项目所有阶段)
+            last_event_id: 客户端最后收到的事件ID (可选,从该事件之后开始重放)
         """
         self.project_id = project_id
         self.stage_name = stage_name
+        self.stream_key = get_event_stream_key(project_id)
 
-        # 构建频道模式
+        # 频道名称 (随消息下发,兼容前端)
         if stage_name:
             self.channel = f"ai_story:project:{project_id}:stage:{stage_name}"
         else:
-            # 订阅项目所有阶段
             self.channel = f"ai_story:project:{project_id}:stage:*"
 
+        self.last_id = normalize_event_id(last_event_id)
         self.redis_client = None
-        self.pubsub = None
+        self._buffer: Deque[Dict[str, Any]] = deque()
+
+        logger.info(f"初始化Redis接收器: {self.stream_key} stage={stage_name} last_event_id={self.last_id}")
+
+    def _parse_entry(self, event_id: str, fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        stage = fields.get('stage')
+        if self.stage_name and stage != self.stage_name:
+            return None
+        try:
+            data = json.loads(fields.get('data') or '{}')
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON解析失败: {str(e)}, 事件ID: {event_id}")
+            return None
+
+        data['event_id'] = event_id
+        data['channel'] = f"ai_story:project:{self.project_id}:stage:{stage}"
+        return data
+
+    def _buffer_entries(self, response) -> None:
+        for _, entries in response or []:
+            for event_id, fields in entries:
+                self.last_id = event_id
+                data = self._parse_entry(event_id, fields)
+                if data is not None:
+                    self._buffer.append(data)
+
+
+class RedisStreamSubscriber(_EventLogReader):
+    """
+    Redis流式接收器
 
-        logger.info(f"初始化Redis接收器: {self.channel}")
+    负责读取项目事件日志并接收实时流式数据
+    每条消息附带 event_id (Stream条目ID),可用于断线后重放
+
+    Stream命名规范: ai_story:project:{project_id}:events
+    """
 
     def _get_redis_client(self) -> redis.Redis:
         """
@@ -52,65 +103,45 @@ class RedisStreamSubscriber:
         使用连接池提高性能
         """
         try:
-            # 从Django settings获取Redis Pub/Sub专用配置
-            redis_url = getattr(settings, 'REDIS_PUBSUB_URL', 'redis://localhost:6379/2')
-
-            # 解析Redis URL
-            return redis.from_url(
-                redis_url,
-                decode_responses=True,  # 自动解码为字符串
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
+            # 借用进程内共享的流式推送连接池,不为每个实例新建
+            return get_redis_client('pubsub')
         except Exception as e:
             logger.error(f"Redis连接失败: {str(e)}")
             raise
 
     def subscribe(self):
         """
-        订阅频道
+        确定读取起点
+
+        未指定 last_event_id 时从日志当前末尾开始,只接收之后的新消息
         """
         try:
             if not self.redis_client:
                 self.redis_client = self._get_redis_client()
 
-            if not self.pubsub:
-                self.pubsub = self.redis_client.pubsub()
-
-            # 支持模式匹配订阅
-            if '*' in self.channel:
-                self.pubsub.psubscribe(self.channel)
-                logger.info(f"模式订阅频道: {self.channel}")
+            if self.last_id is None:
+                latest = self.redis_client.xrevrange(self.stream_key, count=1)
+                self.last_id = latest[0][0] if latest else '0-0'
+                logger.info(f"订阅事件日志: {self.stream_key} 起点={self.last_id}")
             else:
-                self.pubsub.subscribe(self.channel)
-                logger.info(f"订阅频道: {self.channel}")
+                logger.info(f"从事件 {self.last_id} 之后重放: {self.stream_key}")
 
         except Exception as e:
-            logger.error(f"订阅频道失败: {str(e)}")
+            logger.error(f"订阅事件日志失败: {str(e)}")
             raise
 
     def unsubscribe(self):
         """
-        取消订阅
+        取消订阅 (事件日志无需服务端取消,清空本地缓冲)
         """
-        try:
-            if self.pubsub:
-                if '*' in self.channel:
-                    self.pubsub.punsubscribe(self.channel)
-                else:
-                    self.pubsub.unsubscribe(self.channel)
-                logger.info(f"取消订阅频道: {self.channel}")
-        except Exception as e:
-            logger.error(f"取消订阅失败: {str(e)}")
+        self._buffer.clear()
 
-    def listen(self, timeout: Optional[int] = None) -> AsyncGenerator[Dict[str, Any], None]:
+    def listen(self, timeout: Optional[int] = None) -> Generator[Dict[str, Any], None, None]:
         """
         监听消息 (同步生成器)
 
         Args:
-            timeout: 超时时间(秒),None表示永不超时
+            timeout: 单次阻塞读取的超时时间(秒),None表示默认1秒
 
         Yields:
             Dict[str, Any]: 解析后的消息字典
@@ -118,54 +149,24 @@ class RedisStreamSubscriber:
         try:
             self.subscribe()
 
-            # 设置超时
-            if timeout:
-                self.pubsub.connection_pool.connection_kwargs['socket_timeout'] = timeout
-
-            for message in self.pubsub.listen():
-                # 过滤订阅确认消息
-                if message['type'] in ('subscribe', 'psubscribe'):
-                    logger.debug(f"订阅成功: {message}")
+            while True:
+                data = self._read(timeout or 1.0, raise_errors=True)
+                if data is None:
                     continue
 
-                # 过滤取消订阅消息
-                if message['type'] in ('unsubscribe', 'punsubscribe'):
-                    logger.debug(f"取消订阅: {message}")
-                    break
-
-                # 处理实际消息
-                if message['type'] in ('message', 'pmessage'):
-                    try:
-                        # 解析JSON数据
-                        data = json.loads(message['data'])
-
-                        # 添加频道信息
-                        data['channel'] = message.get('channel', self.channel)
-
-                        # logger.debug(f"接收消息: {data.get('type')} from {data['channel']}")
-
-                        yield data
-
-                        # 判断是否应该结束监听
-                        # 单阶段订阅: done/error 时结束
-                        # 全阶段订阅(模式匹配): pipeline_done/pipeline_error 时结束
-                        if '*' in self.channel:
-                            # 全阶段订阅: 只有 pipeline_done 或 pipeline_error 才结束
-                            if data.get('type') in ('pipeline_done', 'pipeline_error'):
-                                logger.info(f"收到流程结束消息: {data.get('type')}")
-                                break
-                        else:
-                            # 单阶段订阅: done/error 时结束
-                            if data.get('type') in ('done', 'error'):
-                                logger.info(f"收到阶段结束消息: {data.get('type')}")
-                                break
-
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON解析失败: {str(e)}, 原始数据: {message['data']}")
-                        continue
-                    except Exception as e:
-                        logger.error(f"消息处理异常: {str(e)}")
-                        continue
+                yield data
+
+                # 判断是否应该结束监听
+                # 单阶段订阅: done/error 时结束
+                # 全阶段订阅: pipeline_done/pipeline_error 时结束
+                if self.stage_name is None:
+                    if data.get('type') in ('pipeline_done', 'pipeline_error'):
+                        logger.info(f"收到流程结束消息: {data.get('type')}")
+                        break
+                else:
+                    if data.get('type') in ('done', 'error'):
+                        logger.info(f"收到阶段结束消息: {data.get('type')}")
+                        break
 
         except redis.RedisError as e:
             logger.error(f"Redis监听失败: {str(e)}")
@@ -186,7 +187,7 @@ class RedisStreamSubscriber:
 
     def get_message(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
         """
-        获取单条消息 (非阻塞)
+        获取单条消息 (最多阻塞 timeout 秒)
 
         Args:
             timeout: 超时时间(秒)
@@ -195,49 +196,41 @@ class RedisStreamSubscriber:
             Optional[Dict[str, Any]]: 消息字典,无消息返回None
         """
         try:
-            if not self.pubsub:
+            if self.last_id is None or not self.redis_client:
                 self.subscribe()
-
-            message = self.pubsub.get_message(timeout=timeout)
-
-            if not message:
-                return None
-
-            # 过滤订阅确认消息
-            if message['type'] in ('subscribe', 'psubscribe', 'unsubscribe', 'punsubscribe'):
-                return None
-
-            # 处理实际消息
-            if message['type'] in ('message', 'pmessage'):
-                try:
-                    data = json.loads(message['data'])
-                    data['channel'] = message.get('channel', self.channel)
-                    return data
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON解析失败: {str(e)}")
-                    return None
-
-            return None
-
+            return self._read(timeout)
         except Exception as e:
             logger.error(f"获取消息失败: {str(e)}")
             return None
 
+    def _read(self, timeout: float, raise_errors: bool = False) -> Optional[Dict[str, Any]]:
+        """从本地缓冲或事件日志读取下一条本订阅关心的消息"""
+        if not self._buffer:
+            try:
+                response = self.redis_client.xread(
+                    {self.stream_key: self.last_id},
+                    count=self.batch_size,
+                    block=max(int(timeout * 1000), 1),
+                )
+            except redis.RedisError:
+                if raise_errors:
+                    raise
+                logger.exception("读取事件日志失败")
+                return None
+            self._buffer_entries(response)
+
+        return self._buffer.popleft() if self._buffer else None
+
     def close(self):
         """
         关闭连接
         """
         try:
-            if self.pubsub:
-                self.unsubscribe()
-                self.pubsub.close()
-                self.pubsub = None
-                logger.info(f"关闭PubSub连接: {self.channel}")
-
+            self.unsubscribe()
             if self.redis_client:
                 self.redis_client.close()
                 self.redis_client = None
-                logger.info(f"关闭Redis连接: {self.channel}")
+                logger.info(f"关闭Redis连接: {self.stream_key}")
 
         except Exception as e:
             logger.error(f"关闭连接失败: {str(e)}")
@@ -254,3 +247,86 @@ class RedisStreamSubscriber:
     def __del__(self):
         """析构函数"""
         self.close()
+
+
+# 每个事件循环共享一个异步连接池 (redis.asyncio 连接绑定创建它的事件循环)
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]' = weakref.WeakKeyDictionary()
+
+
+def get_async_redis_client() -> aioredis.Redis:
+    """
+    获取当前事件循环共享的异步Redis客户端
+
+    所有异步SSE连接共用一个连接池,阻塞读取期间才占用连接,不为每个连接创建客户端
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        options = get_pool_options('pubsub')
+        client = aioredis.from_url(
+            options['url'],
+            decode_responses=True,
+            socket_connect_timeout=options['socket_connect_timeout'],
+            # XREAD BLOCK 由服务端控制阻塞时长,不设读超时
+            socket_timeout=None,
+            health_check_interval=options['health_check_interval'],
+        )
+        _async_clients[loop] = client
+    return client
+
+
+class AsyncRedisStreamSubscriber(_EventLogReader):
+    """
+    异步Redis流式接收器
+
+    与 RedisStreamSubscriber 读取同一事件日志、消息格式一致,
+    等待消息时让出事件循环,单进程可同时维持大量SSE连接
+    """
+
+    async def subscribe(self):
+        """确定读取起点 (未指定 last_event_id 时从日志当前末尾开始)"""
+        if not self.redis_client:
+            self.redis_client = get_async_redis_client()
+
+        if self.last_id is None:
+            latest = await self.redis_client.xrevrange(self.stream_key, count=1)
+            self.last_id = latest[0][0] if latest else '0-0'
+            logger.info(f"订阅事件日志: {self.stream_key} 起点={self.last_id}")
+        else:
+            logger.info(f"从事件 {self.last_id} 之后重放: {self.stream_key}")
+
+    async def get_message(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """
+        获取单条消息 (最多等待 timeout 秒)
+
+        Args:
+            timeout: 超时时间(秒)
+
+        Returns:
+            Optional[Dict[str, Any]]: 消息字典,无消息返回None
+        """
+        try:
+            if self.last_id is None or not self.redis_client:
+                await self.subscribe()
+
+            if not self._buffer:
+                response = await self.redis_client.xread(
+                    {self.stream_key: self.last_id},
+                    count=self.batch_size,
+                    block=max(int(timeout * 1000), 1),
+                )
+                self._buffer_entries(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"获取消息失败: {str(e)}")
+            # 避免Redis不可用时空转
+            await asyncio.sleep(min(timeout, 1.0))
+            return None
+
+        return self._buffer.popleft() if self._buffer else None
+
+    async def close(self):
+        """释放本地缓冲 (连接归还共享连接池,不关闭)"""
+        self._buffer.clear()
+        self.redis_client = None
@@ -0,0 +1,176 @@
+"""
+Celery任务存活登记
+职责: Worker 通过 Celery 信号为每个已接收/执行中/等待重试的任务维护带过期时间的心跳键,
+队列恢复只需查一个键,不再向整个集群广播 inspect()
+
+键: ai_story:task_alive:{task_id} -> 状态 (reserved/active/retry),过期时间 CELERY_TASK_HEARTBEAT_TTL
+- task_received: 任务进入 Worker (含 ETA/countdown 任务),过期时间覆盖到预计执行时刻之后
+- task_prerun: 任务开始执行,由 Worker 进程内的心跳线程按 CELERY_TASK_HEARTBEAT_INTERVAL 续期
+- task_retry: 任务将重新投递,过期时间覆盖到重试时刻之后
+- task_postrun / task_revoked: 删除 (重试中的任务保留)
+- Worker 异常退出时心跳停止,键在 TTL 内过期,任务即被视为不存活
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, Optional, Set
+
+from django.conf import settings
+
+from .pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def get_task_heartbeat_key(task_id: str) -> str:
+    return f"ai_story:task_alive:{task_id}"
+
+
+def _heartbeat_ttl() -> int:
+    return int(getattr(settings, 'CELERY_TASK_HEARTBEAT_TTL', 90))
+
+
+def _seconds_until(eta) -> float:
+    """ETA (datetime 或 ISO 字符串) 距现在的秒数"""
+    if not eta:
+        return 0.0
+    if isinstance(eta, str):
+        try:
+            eta = datetime.fromisoformat(eta)
+        except ValueError:
+            return 0.0
+    if eta.tzinfo is None:
+        eta = eta.replace(tzinfo=dt_timezone.utc)
+    return max((eta - datetime.now(dt_timezone.utc)).total_seconds(), 0.0)
+
+
+class TaskHeartbeatRegistry:
+    """任务存活登记 (每个 Worker 进程一个实例)"""
+
+    def __init__(self):
+        self._active: Set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def mark(self, task_id: str, state: str, extra_seconds: float = 0) -> None:
+        """写入/刷新任务心跳键"""
+        if not task_id:
+            return
+        try:
+            get_redis_client('cache').set(
+                get_task_heartbeat_key(task_id),
+                state,
+                ex=int(_heartbeat_ttl() + max(extra_seconds, 0)),
+            )
+        except Exception as e:
+            logger.warning(f"写入任务心跳失败: task_id={task_id}, error={str(e)}")
+
+    def clear(self, task_id: str) -> None:
+        """删除任务心跳键"""
+        if not task_id:
+            return
+        try:
+            get_redis_client('cache').delete(get_task_heartbeat_key(task_id))
+        except Exception as e:
+            logger.warning(f"删除任务心跳失败: task_id={task_id}, error={str(e)}")
+
+    def on_received(self, task_id: str, eta=None) -> None:
+        self.mark(task_id, 'reserved', extra_seconds=_seconds_until(eta))
+
+    def on_started(self, task_id: str) -> None:
+        with self._lock:
+            self._active.add(task_id)
+        self.mark(task_id, 'active')
+        self._ensure_refresher()
+
+    def on_retry(self, task_id: str, when=None) -> None:
+        if isinstance(when, (int, float)):
+            delay = float(when)
+        else:
+            delay = _seconds_until(when)
+        self.mark(task_id, 'retry', extra_seconds=delay)
+
+    def on_finished(self, task_id: str, state: Optional[str] = None) -> None:
+        with self._lock:
+            self._active.discard(task_id)
+        if state != 'RETRY':
+            self.clear(task_id)
+
+    def refresh_active(self) -> None:
+        """为本进程内执行中的任务续期 (一次 pipeline)"""
+        with self._lock:
+            task_ids = list(self._active)
+        if not task_ids:
+            return
+        try:
+            pipe = get_redis_client('cache').pipeline(transaction=False)
+            for task_id in task_ids:
+                pipe.set(get_task_heartbeat_key(task_id), 'active', ex=_heartbeat_ttl())
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"任务心跳续期失败: {str(e)}")
+
+    def _ensure_refresher(self) -> None:
+        # fork 出的子进程需要重新启动心跳线程
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._refresh_loop, name='task-heartbeat', daemon=True)
+            self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        interval = float(getattr(settings, 'CELERY_TASK_HEARTBEAT_INTERVAL', 30))
+        while True:
+            time.sleep(interval)
+            self.refresh_active()
+
+
+_registry = TaskHeartbeatRegistry()
+
+
+def get_task_heartbeat_registry() -> TaskHeartbeatRegistry:
+    """获取本进程的任务存活登记"""
+    return _registry
+
+
+def is_task_alive(task_id: str) -> Optional[bool]:
+    """
+    任务是否仍由某个 Worker 持有 (已接收、执行中或等待重试)
+
+    Returns:
+        True/False;Redis 不可用时返回 None (调用方应视为无法判断)
+    """
+    if not task_id:
+        return False
+    try:
+        return bool(get_redis_client('cache').exists(get_task_heartbeat_key(task_id)))
+    except Exception as e:
+        logger.warning(f"读取任务心跳失败: task_id={task_id}, error={str(e)}")
+        return None
+
+
+def get_tasks_alive(task_ids: Iterable[str]) -> Optional[Dict[str, bool]]:
+    """
+    批量判断任务是否存活 (一次 pipeline)
+
+    Returns:
+        {task_id: bool};Redis 不可用时返回 None
+    """
+    task_ids = [task_id for task_id in task_ids if task_id]
+    if not task_ids:
+        return {}
+    try:
+        pipe = get_redis_client('cache').pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.exists(get_task_heartbeat_key(task_id))
+        return {task_id: bool(found) for task_id, found in zip(task_ids, pipe.execute())}
+    except Exception as e:
+        logger.warning(f"批量读取任务心跳失败: {str(e)}")
+        return None
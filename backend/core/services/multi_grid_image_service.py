@@ -9,11 +9,11 @@ from typing import Dict, List
 from urllib.parse import urlparse
 import uuid
 
-import requests
 from django.conf import settings
 from PIL import Image
 
 from core.utils.file_storage import image_storage
+from core.utils.http_transport import http_get
 
 
 class MultiGridImageService:
@@ -30,7 +30,7 @@ class MultiGridImageService:
             image_path = Path(settings.STORAGE_ROOT) / 'image' / relative_path
             return Image.open(image_path).convert('RGB')
 
-        response = requests.get(image_url, timeout=120)
+        response = http_get(image_url, timeout=120)
         response.raise_for_status()
         return Image.open(BytesIO(response.content)).convert('RGB')
 
@@ -0,0 +1,174 @@
+"""
+有限并发执行工具
+职责: 以固定上限并发执行阻塞调用或流式调用(如AI服务请求),并按完成/到达顺序返回结果
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_NO_ITEM = object()
+
+
+def _run_in_worker(func: Callable[[Any], Any], item: Any) -> Any:
+    """在工作线程中执行任务,结束后释放该线程持有的数据库连接。"""
+    try:
+        return func(item)
+    finally:
+        connections.close_all()
+
+
+def iter_bounded_concurrent(
+    items: Iterable[Any],
+    func: Callable[[Any], Any],
+    max_workers: int = 1,
+    thread_name_prefix: str = 'bounded-worker',
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    以有限并发执行 func(item),按完成先后产出结果
+
+    - 任意时刻最多 max_workers 个调用在途,完成一个再补充一个
+    - max_workers <= 1 时在当前线程顺序执行,行为与普通循环一致
+    - 调用方提前关闭生成器时,尚未开始的任务会被取消
+
+    Args:
+        items: 待处理对象序列
+        func: 处理函数,接收单个对象
+        max_workers: 最大并发数
+        thread_name_prefix: 工作线程名前缀
+
+    Yields:
+        (item, result, error): error 不为 None 时 result 为 None
+    """
+    max_workers = max(int(max_workers or 1), 1)
+
+    if max_workers == 1:
+        for item in items:
+            try:
+                result = func(item)
+            except Exception as exc:
+                yield item, None, exc
+            else:
+                yield item, result, None
+        return
+
+    items_iter = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    pending = {}
+
+    def submit_next() -> bool:
+        item = next(items_iter, _NO_ITEM)
+        if item is _NO_ITEM:
+            return False
+        pending[executor.submit(_run_in_worker, func, item)] = item
+        return True
+
+    try:
+        for _ in range(max_workers):
+            if not submit_next():
+                break
+
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                submit_next()
+
+                error = future.exception()
+                if error is not None:
+                    yield item, None, error
+                else:
+                    yield item, future.result(), None
+    finally:
+        if pending:
+            logger.info(f"并发任务提前结束, 取消 {len(pending)} 个未完成任务")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_concurrent_streams(
+    items: Iterable[Any],
+    stream_func: Callable[[Any], Iterable[Any]],
+    max_workers: int = 1,
+    thread_name_prefix: str = 'stream-worker',
+) -> Iterator[Tuple[Any, Any, bool, Optional[BaseException]]]:
+    """
+    以有限并发消费多个流(生成器),将各流的输出按到达顺序合并产出
+
+    - 任意时刻最多 max_workers 个流在消费,一个流结束再启动下一个
+    - max_workers <= 1 时在当前线程逐个消费,行为与嵌套循环一致
+    - 调用方提前关闭生成器时,各工作线程在下一个分片处停止
+
+    Args:
+        items: 待处理对象序列
+        stream_func: 接收单个对象并返回可迭代流的函数
+        max_workers: 最大并发流数量
+        thread_name_prefix: 工作线程名前缀
+
+    Yields:
+        (item, chunk, finished, error):
+            finished 为 False 时 chunk 为流中的一个分片;
+            finished 为 True 表示该流已结束,error 不为 None 表示流异常中断
+    """
+    max_workers = max(int(max_workers or 1), 1)
+
+    if max_workers == 1:
+        for item in items:
+            try:
+                for chunk in stream_func(item):
+                    yield item, chunk, False, None
+            except Exception as exc:
+                yield item, None, True, exc
+            else:
+                yield item, None, True, None
+        return
+
+    items_iter = iter(items)
+    events: queue.Queue = queue.Queue()
+    stopped = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    running = 0
+
+    def consume(item: Any) -> None:
+        error = None
+        try:
+            for chunk in stream_func(item):
+                if stopped.is_set():
+                    return
+                events.put((item, chunk, False, None))
+        except Exception as exc:
+            error = exc
+        finally:
+            connections.close_all()
+            events.put((item, None, True, error))
+
+    def start_next() -> bool:
+        item = next(items_iter, _NO_ITEM)
+        if item is _NO_ITEM:
+            return False
+        executor.submit(consume, item)
+        return True
+
+    try:
+        for _ in range(max_workers):
+            if not start_next():
+                break
+            running += 1
+
+        while running:
+            item, chunk, finished, error = events.get()
+            if finished:
+                running -= 1
+                if start_next():
+                    running += 1
+            yield item, chunk, finished, error
+    finally:
+        if running:
+            logger.info(f"并发流提前结束, 停止 {running} 个未完成的流")
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,284 @@
+"""
+共享HTTP传输层
+职责: 为各AI客户端提供按主机划分、长连接复用的HTTP连接池,统一超时与重试策略并统计请求指标
+
+- 每个 scheme://host:port 一个带连接池的 HTTPAdapter,进程内所有线程共享
+- requests.Session 不保证线程安全,每个线程按主机持有自己的 Session,挂载共享的 HTTPAdapter
+- Session 不保存响应设置的 Cookie,避免一个API密钥的会话Cookie被其他提供商/用户的请求带上
+- 连接池在进程内复用(同一 Celery worker 进程内的多次任务共享);fork 后的子进程自动重建
+- 重试仅针对连接失败,以及幂等方法(GET/HEAD/OPTIONS)的读取失败与可重试状态码,
+  避免重复提交生成类 POST 请求
+"""
+
+import logging
+import os
+from http.cookiejar import DefaultCookiePolicy
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+TimeoutType = Union[None, float, Tuple[float, float]]
+
+DEFAULT_TRANSPORT_CONFIG = {
+    'pool_maxsize': 20,
+    'connect_timeout': 10,
+    'read_timeout': 600,
+    'max_retries': 2,
+    'backoff_factor': 0.5,
+    'retry_status_codes': (429, 502, 503, 504),
+}
+
+
+def _load_transport_config() -> Dict[str, Any]:
+    """从 Django settings 读取传输层配置,未配置时使用默认值"""
+    config = dict(DEFAULT_TRANSPORT_CONFIG)
+    try:
+        from django.conf import settings
+
+        config.update({
+            'pool_maxsize': getattr(settings, 'HTTP_POOL_MAXSIZE', config['pool_maxsize']),
+            'connect_timeout': getattr(settings, 'HTTP_CONNECT_TIMEOUT', config['connect_timeout']),
+            'read_timeout': getattr(settings, 'HTTP_READ_TIMEOUT', config['read_timeout']),
+            'max_retries': getattr(settings, 'HTTP_MAX_RETRIES', config['max_retries']),
+            'backoff_factor': getattr(settings, 'HTTP_RETRY_BACKOFF_FACTOR', config['backoff_factor']),
+            'retry_status_codes': tuple(
+                getattr(settings, 'HTTP_RETRY_STATUS_CODES', config['retry_status_codes'])
+            ),
+        })
+    except Exception:
+        # 未配置 Django 时(如独立脚本)使用默认配置
+        pass
+    return config
+
+
+class HostStats:
+    """单个主机的请求统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_latency_ms = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed = self.requests - self.in_flight
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'avg_latency_ms': int(self.total_latency_ms / completed) if completed > 0 else 0,
+        }
+
+
+class HttpTransport:
+    """
+    按主机复用连接的HTTP传输层
+
+    用法与 requests 一致:
+        transport.get(url, params=..., timeout=...)
+        transport.post(url, json=..., headers=..., stream=True)
+    """
+
+    def __init__(self, **config):
+        self.config = {**_load_transport_config(), **config}
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def request(self, method: str, url: str, timeout: TimeoutType = None, **kwargs) -> requests.Response:
+        """
+        发送HTTP请求
+
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            timeout: 超时时间,未传入时使用 (connect_timeout, read_timeout)
+            **kwargs: 透传给 requests.Session.request 的参数
+
+        Returns:
+            requests.Response
+        """
+        host_key = self._host_key(url)
+        session = self._get_session(host_key)
+        stats = self._stats[host_key]
+        if timeout is None:
+            timeout = (self.config['connect_timeout'], self.config['read_timeout'])
+
+        with self._lock:
+            stats.requests += 1
+            stats.in_flight += 1
+        start_time = time.time()
+        try:
+            return session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                stats.errors += 1
+            raise
+        finally:
+            with self._lock:
+                stats.in_flight -= 1
+                stats.total_latency_ms += int((time.time() - start_time) * 1000)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        连接池统计
+
+        Returns:
+            Dict: {'pid', 'config', 'hosts': {host: {requests, errors, in_flight, avg_latency_ms, pool}}}
+        """
+        with self._lock:
+            hosts = {}
+            for host_key, adapter in self._adapters.items():
+                host_stats = self._stats[host_key].to_dict()
+                host_stats['pool'] = self._pool_stats(adapter)
+                hosts[host_key] = host_stats
+
+        return {
+            'pid': self._pid,
+            'config': {**self.config, 'retry_status_codes': list(self.config['retry_status_codes'])},
+            'hosts': hosts,
+        }
+
+    def close(self) -> None:
+        """关闭全部连接池"""
+        with self._lock:
+            adapters = list(self._adapters.values())
+            self._adapters.clear()
+            self._stats.clear()
+            self._local = threading.local()
+        for adapter in adapters:
+            adapter.close()
+
+    def _get_session(self, host_key: str) -> requests.Session:
+        """当前线程访问该主机使用的 Session (共享连接池)"""
+        adapter = self._get_adapter(host_key)
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+
+        session = sessions.get(host_key)
+        if session is None or session.get_adapter(host_key) is not adapter:
+            session = sessions[host_key] = self._build_session(adapter)
+        return session
+
+    def _get_adapter(self, host_key: str) -> HTTPAdapter:
+        if os.getpid() != self._pid:
+            # fork 后的子进程不能复用父进程的套接字
+            self._reset_after_fork()
+
+        adapter = self._adapters.get(host_key)
+        if adapter is not None:
+            return adapter
+
+        with self._lock:
+            adapter = self._adapters.get(host_key)
+            if adapter is None:
+                adapter = self._build_adapter()
+                self._adapters[host_key] = adapter
+                self._stats[host_key] = HostStats()
+                logger.debug(f"创建HTTP连接池: {host_key}, 大小: {self.config['pool_maxsize']}")
+        return adapter
+
+    @staticmethod
+    def _build_session(adapter: HTTPAdapter) -> requests.Session:
+        session = requests.Session()
+        # 不保存任何响应Cookie (请求显式传入的 cookies 参数不受影响)
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _build_adapter(self) -> HTTPAdapter:
+        max_retries = self.config['max_retries']
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=self.config['backoff_factor'],
+            status_forcelist=self.config['retry_status_codes'],
+            allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),
+            raise_on_status=False,
+        )
+        return HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config['pool_maxsize'],
+            max_retries=retry,
+        )
+
+    def _reset_after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._adapters = {}
+        self._stats = {}
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parsed = urlparse(url)
+        scheme = parsed.scheme or 'http'
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        return f'{scheme}://{parsed.hostname or ""}:{port}'
+
+    @staticmethod
+    def _pool_stats(adapter: HTTPAdapter) -> Dict[str, Any]:
+        """读取 urllib3 连接池状态(空闲连接数、已建立连接数)"""
+        pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if pools is None:
+            return {}
+
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            return {
+                'num_connections': getattr(pool, 'num_connections', 0),
+                'num_requests': getattr(pool, 'num_requests', 0),
+                'idle_connections': pool.pool.qsize() if getattr(pool, 'pool', None) else 0,
+                'maxsize': getattr(pool.pool, 'maxsize', None) if getattr(pool, 'pool', None) else None,
+            }
+        return {}
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HttpTransport:
+    """获取进程内共享的HTTP传输层"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
+
+
+def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """通过共享传输层发送请求"""
+    return get_http_transport().request(method, url, **kwargs)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """通过共享传输层发送 GET 请求"""
+    return get_http_transport().get(url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    """通过共享传输层发送 POST 请求"""
+    return get_http_transport().post(url, **kwargs)
@@ -14,6 +14,8 @@ from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 
+from core.utils.http_transport import http_get
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,7 +47,7 @@ class ImageDownloader:
                 return False, "", {"error": "无效的图片URL"}
 
             # 发送HTTP请求获取图片
-            response = requests.get(
+            response = http_get(
                 image_url,
                 stream=True,
                 timeout=self.download_timeout,
@@ -25,6 +25,7 @@ export class SSEClient {
     this.instanceId = ++sseClientInstanceId;
     this.lastUrl = null;
     this.connectStack = null;
+    this.lastEventId = null; // 最后收到的事件ID, 重连时用于从断点重放
   }
 
   /**
@@ -36,8 +37,11 @@ export class SSEClient {
    * @returns {SSEClient} 返回自身以支持链式调用
    */
   connect(url, options = {}) {
-    const { autoReconnect = false, allStagesMode = false } = options;
+    const { autoReconnect = false, allStagesMode = false, resume = false } = options;
     this.isAllStagesMode = allStagesMode;
+    if (!resume) {
+      this.lastEventId = null;
+    }
     this.lastUrl = url;
     this.connectStack = new Error(`[SSE#${this.instanceId}] connect stack`).stack;
 
@@ -67,6 +71,9 @@ export class SSEClient {
 
       // 监听消息
       this.eventSource.onmessage = (event) => {
+        if (event.lastEventId) {
+          this.lastEventId = event.lastEventId;
+        }
         try {
           const data = JSON.parse(event.data);
           // console.log('[SSE] 收到消息:', data);
@@ -109,7 +116,8 @@ export class SSEClient {
             this.reconnectAttempts++;
             console.log(`[SSE#${this.instanceId}] 尝试重连 (${this.reconnectAttempts}/${this.maxReconnectAttempts})...`, { url: this.lastUrl });
             setTimeout(() => {
-              this.connect(url, options);
+              // 携带最后收到的事件ID重连, 后端从断点重放断线期间的事件
+              this.connect(this.withLastEventId(url), { ...options, resume: true });
             }, this.reconnectDelay * this.reconnectAttempts);
           } else {
             this.cleanup();
@@ -124,6 +132,18 @@ export class SSEClient {
     return this;
   }
 
+  /**
+   * 为URL附加 last_event_id 参数 (手动重连时 EventSource 不会自动发送 Last-Event-ID)
+   * @param {string} url - SSE端点URL
+   * @returns {string} 附加参数后的URL
+   */
+  withLastEventId(url) {
+    if (!this.lastEventId) return url;
+    const target = new URL(url, window.location.origin);
+    target.searchParams.set('last_event_id', this.lastEventId);
+    return target.toString();
+  }
+
   /**
    * 监听事件
    * @param {string} event - 事件名称
@@ -244,6 +264,56 @@ export function createProjectAllStagesSSE(projectId, options = {}) {
   return client;
 }
 
+/**
+ * token 增量合并缓冲
+ *
+ * 服务端 token 消息只携带增量 content 及其在完整文本中的起始 offset,
+ * 定期附带 full_text 快照; 多个分镜并发生成时按 scene_number 区分来源。
+ * 每个来源单独维护文本, 避免交错到达的增量被拼接到同一段文本中:
+ * - 带 full_text 的快照直接替换该来源的文本
+ * - offset 与已有长度一致时追加; 小于已有长度(重复投递)时从 offset 处覆盖
+ * - offset 大于已有长度说明中间有丢失, 忽略该增量, 等待下一个快照重新同步
+ */
+export class TokenStreamBuffer {
+  constructor() {
+    this.reset();
+  }
+
+  reset() {
+    this.streams = {};
+  }
+
+  /**
+   * 合并一条 token 消息
+   * @param {Object} data - token 消息 (content/offset/full_text/scene_number)
+   * @returns {string} 合并后的完整文本
+   */
+  apply(data) {
+    const key = data.scene_number !== undefined && data.scene_number !== null ? String(data.scene_number) : '';
+    const current = this.streams[key] || '';
+
+    if (data.full_text !== undefined) {
+      this.streams[key] = data.full_text;
+    } else if (data.content) {
+      const offset = data.offset !== undefined ? data.offset : current.length;
+      if (offset <= current.length) {
+        this.streams[key] = current.slice(0, offset) + data.content;
+      }
+    }
+    return this.text;
+  }
+
+  /**
+   * 按来源顺序拼接的完整文本 (无 scene_number 的文本在前, 分镜按序号排列)
+   */
+  get text() {
+    return Object.keys(this.streams)
+      .sort((a, b) => (a === '' ? -1 : b === '' ? 1 : Number(a) - Number(b)))
+      .map((key) => this.streams[key])
+      .join('\n\n');
+  }
+}
+
 /**
  * SSE事件类型常量
  */
@@ -370,6 +440,7 @@ export const sseClientMixin = {
 
 export default {
   SSEClient,
+  TokenStreamBuffer,
   createProjectStageSSE,
   createProjectAllStagesSSE,
   SSE_EVENT_TYPES,